@@ -1,12 +1,18 @@
+import logging
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, status, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from models import User
-from database import get_db
+from database import get_db, get_async_db
+from auth_cache import get_cached_user_context, cache_user_context
+
+logger = logging.getLogger(__name__)
 
 # Security configuration
 SECRET_KEY = "your-secret-key-change-in-production"
@@ -18,6 +24,8 @@ pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 # JWT token security
 security = HTTPBearer()
+# Streaming endpoints also take ?token= (EventSource can't send an Authorization header)
+optional_security = HTTPBearer(auto_error=False)
 
 def is_bcrypt_hash(hashed_password: str) -> bool:
     """Check if a hash is a bcrypt hash"""
@@ -34,7 +42,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
             truncated_password = plain_password[:72].encode('utf-8')
             return bcrypt.checkpw(truncated_password, hashed_password.encode('utf-8'))
         except Exception as e:
-            print(f"Error verifying bcrypt password: {e}")
+            logger.error(f"Error verifying bcrypt password: {e}")
             return False
     
     # For pbkdf2_sha256 hashes, use the normal context
@@ -86,33 +94,37 @@ def migrate_user_password(db: Session, user: User, new_password: str) -> bool:
         db.commit()
         return True
     except Exception as e:
-        print(f"Error migrating user password: {e}")
+        logger.error(f"Error migrating user password: {e}")
         db.rollback()
         return False
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> dict:
-    """Get the current authenticated user from JWT token"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _user_id_from_token(token: str) -> str:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    return user_id
+
+def user_id_from_authorization(header: Optional[str]) -> Optional[str]:
+    """User id of a valid "Bearer <jwt>" header, or None - for tagging logs, not for authorization"""
+    if not header or not header.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(header[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+def _user_context(user: User) -> dict:
     return {
         "user_id": user.id,
         "email": user.email,
@@ -123,3 +135,58 @@ def get_current_user(
         "subscription_status": user.subscription_status,
         "subscription_expires_at": user.subscription_expires_at.isoformat() if user.subscription_expires_at else None
     }
+
+def get_current_user_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """Authenticate from the JWT alone - for endpoints that only need current_user["user_id"]"""
+    return {"user_id": _user_id_from_token(credentials.credentials)}
+
+def get_stream_user_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = Query(None, description="JWT, for clients that cannot set headers")
+) -> dict:
+    """get_current_user_claims that also accepts the token as a query parameter"""
+    if credentials is not None:
+        return {"user_id": _user_id_from_token(credentials.credentials)}
+    if token:
+        return {"user_id": _user_id_from_token(token)}
+    raise _credentials_exception()
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> dict:
+    """Get the current authenticated user from JWT token"""
+    user_id = _user_id_from_token(credentials.credentials)
+    
+    context, version = get_cached_user_context(user_id)
+    if context is not None:
+        return context
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        raise _credentials_exception()
+    
+    context = _user_context(user)
+    cache_user_context(user_id, context, version)
+    return context
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> dict:
+    """Async variant of get_current_user for endpoints on the async session"""
+    user_id = _user_id_from_token(credentials.credentials)
+    
+    context, version = get_cached_user_context(user_id)
+    if context is not None:
+        return context
+    
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    if user is None:
+        raise _credentials_exception()
+    
+    context = _user_context(user)
+    cache_user_context(user_id, context, version)
+    return context
@@ -0,0 +1,176 @@
+"""
+Short-lived cache of user auth contexts.
+
+get_current_user used to run a users-table lookup on every authenticated
+request just to build the credits/subscription dict. Contexts are now kept in
+a small in-process LRU with a short TTL, backed by Redis when REDIS_URL is set
+so a fresh worker can skip the database too.
+
+Anything that changes credits or subscription fields must call
+invalidate_user_context(user_id), which bumps the user's version. Entries are
+stored with the version read *before* the users row was loaded, so a context
+loaded just before an invalidation is never served after it. With Redis the
+version lives there and is checked on every read, so all workers see an
+invalidation at once; without it, other workers' entries expire after
+AUTH_CACHE_TTL_SECONDS at most.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from redis_fallback import RedisFallback
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# In-process entries are short-lived so other workers converge quickly after an invalidation
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "15"))
+AUTH_CACHE_REDIS_TTL_SECONDS = int(os.getenv("AUTH_CACHE_REDIS_TTL_SECONDS", "120"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Versions must outlive every entry written under them
+AUTH_VERSION_TTL_SECONDS = 24 * 3600
+
+# (local version, Redis version or None) as read before loading the user
+Version = Tuple[int, Optional[int]]
+
+
+class AuthContextCache:
+    """TTL LRU in front of an optional Redis tier, versioned per user"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Invalidations made while Redis was unreachable, replayed once it is back
+        self._pending_invalidations = set()
+        client = None
+        if redis_url:
+            try:
+                import redis
+                client = redis.Redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+            except Exception as e:
+                logger.warning(f"⚠️ Redis auth cache unavailable, using in-process cache only: {e}")
+        self._redis = RedisFallback(client, "auth cache", "skipping Redis")
+
+    def _redis_available(self) -> bool:
+        """Redis is usable and any invalidations missed while it was down have been replayed"""
+        if not self._redis.available():
+            return False
+        if self._pending_invalidations:
+            return self._replay_invalidations()
+        return True
+
+    def _bump_redis_versions(self, user_ids):
+        pipe = self._redis.client.pipeline()
+        for user_id in user_ids:
+            pipe.incr(f"auth:version:{user_id}")
+            pipe.expire(f"auth:version:{user_id}", AUTH_VERSION_TTL_SECONDS)
+        pipe.execute()
+
+    def _replay_invalidations(self) -> bool:
+        with self._lock:
+            pending, self._pending_invalidations = self._pending_invalidations, set()
+        try:
+            self._bump_redis_versions(pending)
+            return True
+        except Exception as e:
+            with self._lock:
+                self._pending_invalidations |= pending
+            self._redis.failed("invalidation replay", e)
+            return False
+
+    def _local_version(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def _set_local(self, user_id: str, version: Version, context: dict):
+        with self._lock:
+            if version[0] != self._local_version(user_id):
+                return
+            self._entries[user_id] = (time.monotonic() + AUTH_CACHE_TTL_SECONDS, version, context)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > AUTH_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def get(self, user_id: str) -> Tuple[Optional[dict], Version]:
+        """(context or None, version to pass to set() after loading the user on a miss)"""
+        with self._lock:
+            local_version = self._local_version(user_id)
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[user_id]
+                entry = None
+            elif entry is not None:
+                self._entries.move_to_end(user_id)
+
+        if not self._redis_available():
+            if entry is not None:
+                return dict(entry[2]), entry[1]
+            return None, (local_version, None)
+
+        try:
+            raw_version, raw = self._redis.client.mget(f"auth:version:{user_id}", f"auth:{user_id}")
+        except Exception as e:
+            self._redis.failed("read", e)
+            if entry is not None:
+                return dict(entry[2]), entry[1]
+            return None, (local_version, None)
+        version = (local_version, int(raw_version or 0))
+        if entry is not None and entry[1] == version:
+            return dict(entry[2]), version
+        if raw:
+            stored = json.loads(raw)
+            if stored.get("version") == version[1]:
+                self._set_local(user_id, version, stored["context"])
+                return dict(stored["context"]), version
+        return None, version
+
+    def set(self, user_id: str, context: dict, version: Version):
+        """Cache a context loaded after get() returned version; dropped if the user was invalidated since"""
+        self._set_local(user_id, version, context)
+        if version[1] is not None and self._redis_available():
+            try:
+                # Readers compare the stored version with the current one, so a late write is simply ignored
+                self._redis.client.set(f"auth:{user_id}", json.dumps({"version": version[1], "context": context}),
+                                ex=AUTH_CACHE_REDIS_TTL_SECONDS)
+            except Exception as e:
+                self._redis.failed("write", e)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._versions[user_id] = self._local_version(user_id) + 1
+            self._versions.move_to_end(user_id)
+            while len(self._versions) > AUTH_CACHE_MAX_ENTRIES:
+                self._versions.popitem(last=False)
+        if self._redis.client is None:
+            return
+        if self._redis_available():
+            try:
+                self._bump_redis_versions([user_id])
+                return
+            except Exception as e:
+                self._redis.failed("invalidate", e)
+        with self._lock:
+            self._pending_invalidations.add(user_id)
+
+
+auth_cache = AuthContextCache(REDIS_URL)
+
+
+def get_cached_user_context(user_id: str) -> Tuple[Optional[dict], Version]:
+    return auth_cache.get(user_id)
+
+
+def cache_user_context(user_id: str, context: dict, version: Version):
+    auth_cache.set(user_id, context, version)
+
+
+def invalidate_user_context(user_id: str):
+    """Drop a user's cached auth context after credits or subscription fields change"""
+    auth_cache.invalidate(user_id)
@@ -0,0 +1,197 @@
+"""
+Per-user library of base compositions.
+
+A campaign's base image (Qwen composition of pose + first product + scene,
+then add_product_to_image for every further product) depends only on those
+input images and the products' clothing types, yet every new campaign with
+the same outfit and scene composed it again from scratch. Bases are now
+remembered per user under a key derived from the inputs' *content* hashes,
+so a re-uploaded packshot or a pose served from another URL still matches.
+
+  * lookup     generate_campaign_images_background looks every model × scene
+               combination up before building its DAG; on a hit the combo
+               skips straight to the variations.
+  * choice     GET /base-compositions lists a user's bases (most recently
+               used first) and a campaign can be started from one of them.
+  * eviction   each user keeps at most BASE_LIBRARY_SIZE bases; the least
+               recently used ones go first. Evicting a base never touches
+               campaigns that already use its image.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Sequence
+from urllib.parse import urlparse
+
+import requests
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import BaseComposition
+
+logger = logging.getLogger(__name__)
+
+# Bases kept per user (least recently used are evicted)
+BASE_LIBRARY_SIZE = int(os.getenv("BASE_LIBRARY_SIZE", "50"))
+
+# URL -> content hash; input images (packshots, poses, scenes) are immutable once uploaded
+URL_HASH_CACHE_SIZE = 4096
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Local directories /static URLs are served from
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIRS = (os.path.join(API_DIR, "static"), os.path.join(API_DIR, "uploads"), "uploads")
+
+_url_hashes: "OrderedDict[str, str]" = OrderedDict()
+_url_hashes_lock = threading.Lock()
+
+
+def _local_static_path(url: str) -> Optional[str]:
+    path = urlparse(url).path
+    if "/static/" not in path:
+        return None
+    relative = path.split("/static/", 1)[1]
+    for directory in STATIC_DIRS:
+        candidate = os.path.normpath(os.path.join(directory, relative))
+        if candidate.startswith(os.path.normpath(directory)) and os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def url_content_hash(url: str) -> str:
+    """sha256 of the image behind url (local /static files are read from disk)"""
+    with _url_hashes_lock:
+        if url in _url_hashes:
+            _url_hashes.move_to_end(url)
+            return _url_hashes[url]
+
+    digest = hashlib.sha256()
+    local_path = _local_static_path(url)
+    if local_path:
+        with open(local_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    else:
+        response = requests.get(url, stream=True, timeout=30)
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+
+    with _url_hashes_lock:
+        _url_hashes[url] = content_hash
+        while len(_url_hashes) > URL_HASH_CACHE_SIZE:
+            _url_hashes.popitem(last=False)
+    return content_hash
+
+
+def composition_key(pose_url: str, product_urls: Sequence[str], scene_url: str,
+                    clothing_types: Sequence[Optional[str]], quality_mode: str = "standard") -> str:
+    """Library key for a base; product order matters (the first product is composed, the rest added in turn)"""
+    payload = {
+        "pose": url_content_hash(pose_url),
+        "products": [url_content_hash(url) for url in product_urls],
+        "scene": url_content_hash(scene_url),
+        "clothing_types": [clothing_type or "" for clothing_type in clothing_types],
+        "quality_mode": quality_mode,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def find_base(db: Session, user_id: str, key: str) -> Optional[BaseComposition]:
+    """The user's base for key, marked as used"""
+    base = db.execute(
+        select(BaseComposition).where(BaseComposition.user_id == user_id, BaseComposition.composition_key == key)
+    ).scalar_one_or_none()
+    if base is not None:
+        touch_base(db, base)
+    return base
+
+
+def get_base(db: Session, user_id: str, base_id: str) -> Optional[BaseComposition]:
+    return db.execute(
+        select(BaseComposition).where(BaseComposition.id == base_id, BaseComposition.user_id == user_id)
+    ).scalar_one_or_none()
+
+
+def touch_base(db: Session, base: BaseComposition):
+    base.last_used_at = datetime.utcnow()
+    base.use_count = (base.use_count or 0) + 1
+    db.commit()
+
+
+def list_bases(db: Session, user_id: str, model_id: Optional[str] = None, scene_id: Optional[str] = None,
+               limit: int = BASE_LIBRARY_SIZE) -> List[BaseComposition]:
+    """The user's bases, most recently used first"""
+    query = select(BaseComposition).where(BaseComposition.user_id == user_id)
+    if model_id:
+        query = query.where(BaseComposition.model_id == model_id)
+    if scene_id:
+        query = query.where(BaseComposition.scene_id == scene_id)
+    query = query.order_by(BaseComposition.last_used_at.desc()).limit(limit)
+    return list(db.execute(query).scalars())
+
+
+def remember_base(db: Session, user_id: str, key: str, image_url: str, model_id: Optional[str] = None,
+                  scene_id: Optional[str] = None, product_ids: Optional[list] = None,
+                  inputs: Optional[dict] = None) -> BaseComposition:
+    """Add a freshly composed base to the user's library (or refresh the existing one) and evict the overflow"""
+    base = BaseComposition(
+        user_id=user_id,
+        composition_key=key,
+        image_url=image_url,
+        model_id=model_id,
+        scene_id=scene_id,
+        product_ids=product_ids or [],
+        inputs=inputs or {},
+        use_count=1,
+    )
+    db.add(base)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Composed concurrently by another campaign: keep one row, pointing at the newest image
+        db.rollback()
+        base = db.execute(
+            select(BaseComposition).where(BaseComposition.user_id == user_id, BaseComposition.composition_key == key)
+        ).scalar_one()
+        base.image_url = image_url
+        touch_base(db, base)
+    evict_bases(db, user_id)
+    return base
+
+
+def evict_bases(db: Session, user_id: str, keep: int = BASE_LIBRARY_SIZE) -> int:
+    """Drop the user's least recently used bases beyond `keep`; returns how many were dropped"""
+    stale = db.execute(
+        select(BaseComposition.id)
+        .where(BaseComposition.user_id == user_id)
+        .order_by(BaseComposition.last_used_at.desc())
+        .offset(keep)
+    ).scalars().all()
+    if not stale:
+        return 0
+    db.execute(delete(BaseComposition).where(BaseComposition.id.in_(stale)))
+    db.commit()
+    logger.info(f"🧹 Evicted {len(stale)} base composition(s) for user {user_id}")
+    return len(stale)
+
+
+def base_to_dict(base: BaseComposition) -> dict:
+    return {
+        "id": base.id,
+        "image_url": base.image_url,
+        "model_id": base.model_id,
+        "scene_id": base.scene_id,
+        "product_ids": base.product_ids or [],
+        "inputs": base.inputs or {},
+        "use_count": base.use_count or 0,
+        "created_at": base.created_at.isoformat() if base.created_at else None,
+        "last_used_at": base.last_used_at.isoformat() if base.last_used_at else None,
+    }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Load test for the read endpoints (/campaigns and /auth/me).
+
+Seeds a database, starts uvicorn on the given app directory and hammers each
+endpoint with concurrent clients for a fixed duration, printing requests per
+second and p50/p95 latency. Point --app-dir at a checkout of an older revision
+(e.g. a `git worktree`) to compare the sync and async session paths on the
+same data.
+
+Usage (from apps/api):
+    python benchmarks/bench_async_reads.py
+    python benchmarks/bench_async_reads.py --app-dir /tmp/aura-before --concurrency 64
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_async_reads.py
+
+The target database is wiped - never point it at real data.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+if not BENCH_DATABASE_URL:
+    BENCH_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='aura_bench_'), 'bench.db')}"
+# database.py reads DATABASE_URL at import time
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+
+import httpx  # noqa: E402
+
+ENDPOINTS = ["/campaigns", "/auth/me"]
+
+
+def seed(num_campaigns: int, images_per_campaign: int) -> str:
+    """Create one user with campaigns and images; returns a bearer token"""
+    from auth import create_access_token
+    from campaign_assets import add_campaign_images
+    from database import SessionLocal, engine
+    from models import Base, Campaign, User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        user = User(id=str(uuid.uuid4()), email="bench@bench.local", hashed_password="x", credits=100)
+        db.add(user)
+        db.commit()
+        for i in range(num_campaigns):
+            campaign = Campaign(user_id=user.id, name=f"Campaign {i}", settings={"selected_shot_types": ["front"]})
+            db.add(campaign)
+            db.flush()
+            add_campaign_images(db, campaign.id, [
+                {"image_url": f"https://example.com/{campaign.id}/{k}.jpg", "shot_type": "front", "shot_name": f"Shot {k}"}
+                for k in range(images_per_campaign)
+            ], commit=False)
+        db.commit()
+        return create_access_token({"sub": user.id})
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app_dir: str, port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": BENCH_DATABASE_URL}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main_simple:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_healthy(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError("server did not become healthy")
+
+
+async def load(base_url: str, path: str, token: str, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=API_DIR, help="directory containing main_simple.py")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--images", type=int, default=8, help="images per campaign")
+    args = parser.parse_args()
+
+    print(f"🌱 Seeding {args.campaigns} campaigns x {args.images} images")
+    token = seed(args.campaigns, args.images)
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    print(f"🚀 Starting {os.path.abspath(args.app_dir)} on {base_url} ({args.workers} worker(s))")
+    server = start_server(args.app_dir, port, args.workers)
+    try:
+        wait_until_healthy(base_url)
+        print(f"\n{'endpoint':<14} {'req/s':>9} {'p50':>10} {'p95':>10} {'errors':>7}")
+        for path in ENDPOINTS:
+            asyncio.run(load(base_url, path, token, args.concurrency, 1.0))  # warm-up
+            result = asyncio.run(load(base_url, path, token, args.concurrency, args.duration))
+            print(f"{path:<14} {result['rps']:>9.1f} {result['p50']:>8.2f}ms {result['p95']:>8.2f}ms {result['errors']:>7}")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+if __name__ == "__main__":
+    main()
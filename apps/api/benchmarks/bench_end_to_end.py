@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark against local Replicate and Cloudinary stand-ins.
+
+Starts a fake provider server in a subprocess - Replicate's prediction API
+with a latency (queue + run) and failure distribution per model slug, a
+Cloudinary upload endpoint and a file store serving the generated images and
+videos - points the app at it through its usual environment variables, seeds
+a database and drives the real endpoints in-process:
+
+  * burst       --users users create a campaign at the same moment
+  * template    every burst campaign runs a keyframe template
+  * bulk-video  every burst campaign animates its images (wan, 480p)
+
+For each scenario it prints jobs per hour, p50/p95 time to first output
+(image, or video for bulk-video) and to completion, event-loop lag, DB writes
+per job, provider calls and peak RSS. Nothing leaves the loopback interface,
+so it runs without network access or API keys. Exits non-zero when a job times
+out, fails (unless --allow-failures) or the event loop is blocked for longer
+than --max-loop-lag: a blocked loop stalls every request and job in the
+process, which is what this benchmark exists to catch.
+
+Latencies are log-normal (median, sigma) in seconds and scaled by
+--time-scale, keeping the ratios between models. The default run (20 users,
+time scale 0.1) takes about three minutes on one core, most of it the bulk
+video batch queueing behind the pipelines' shared video limit; use --users
+or --time-scale to shrink it. --profile takes a JSON file of overrides
+in the same shape as DEFAULT_PROFILE.
+
+Usage (from apps/api):
+    python benchmarks/bench_end_to_end.py
+    python benchmarks/bench_end_to_end.py --users 50 --time-scale 0.25 --scenarios burst,bulk-video
+    python benchmarks/bench_end_to_end.py --profile latency.json --fail-rate 0.05 --allow-failures
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_end_to_end.py
+
+The target database is wiped - never point it at real data.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Tuple
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+SCENARIOS = ("burst", "template", "bulk-video")
+
+# Seconds, before --time-scale: [median, sigma] of a log-normal
+DEFAULT_PROFILE = {
+    "models": {
+        "default": {"queue": [0.5, 0.5], "run": [6.0, 0.3], "fail": 0.0},
+        "qwen/qwen-image-edit-plus": {"queue": [0.5, 0.5], "run": [8.0, 0.3], "fail": 0.0},
+        "black-forest-labs/flux-2-pro": {"queue": [1.0, 0.5], "run": [12.0, 0.3], "fail": 0.0},
+        "google/nano-banana": {"queue": [0.5, 0.5], "run": [7.0, 0.3], "fail": 0.0},
+        "google/nano-banana-pro": {"queue": [1.0, 0.5], "run": [15.0, 0.3], "fail": 0.0},
+        "wan-video/wan-2.2-i2v-fast": {"queue": [2.0, 0.5], "run": [40.0, 0.3], "fail": 0.0, "output": "video"},
+        "bytedance/seedance-1-pro": {"queue": [2.0, 0.5], "run": [60.0, 0.3], "fail": 0.0, "output": "video"},
+        "kwaivgi/kling-v2.5-turbo-pro": {"queue": [3.0, 0.5], "run": [90.0, 0.3], "fail": 0.0, "output": "video"},
+        "google/veo-3.1": {"queue": [3.0, 0.5], "run": [120.0, 0.3], "fail": 0.0, "output": "video"},
+    },
+    "storage": {"upload": [0.8, 0.4], "download": [0.15, 0.4]},
+}
+
+TEMPLATE_ID = "industrial_editorial"
+
+
+# ---------- Fake providers (runs in its own process) ----------
+
+def _sample(rng: random.Random, spec, scale: float) -> float:
+    median, sigma = spec
+    return rng.lognormvariate(math.log(median), sigma) * scale
+
+
+def _iso(moment: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(moment)) + f".{int(moment % 1 * 1e6):06d}Z"
+
+
+def _fake_png() -> bytes:
+    from PIL import Image
+    image = Image.new("RGB", (768, 1152))
+    image.putdata([(x % 256, y % 256, (x + y) % 256) for y in range(1152) for x in range(768)])
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeProviders(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # set by serve_fakes
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, status: int, payload: dict):
+        self._reply(status, json.dumps(payload).encode())
+
+    def _count(self, key: str):
+        with self.state["lock"]:
+            self.state["counts"][key] = self.state["counts"].get(key, 0) + 1
+
+    def _model(self, slug: str) -> dict:
+        models = self.state["profile"]["models"]
+        return {**models["default"], **models.get(slug, {})}
+
+    def _prediction(self, prediction: dict) -> dict:
+        elapsed = time.time() - prediction["created"]
+        body = {
+            "id": prediction["id"], "model": prediction["model"], "version": "bench", "input": prediction["input"],
+            "output": None, "logs": "", "error": None, "metrics": {}, "urls": {},
+            "created_at": _iso(prediction["created"]), "started_at": None, "completed_at": None,
+            "status": "starting",
+        }
+        if elapsed >= prediction["queue"]:
+            body["status"] = "processing"
+            body["started_at"] = _iso(prediction["created"] + prediction["queue"])
+        if elapsed >= prediction["queue"] + prediction["run"]:
+            body["completed_at"] = _iso(prediction["created"] + prediction["queue"] + prediction["run"])
+            body["metrics"] = {"predict_time": prediction["run"]}
+            if prediction["fail"]:
+                body["status"], body["error"] = "failed", "fake provider failure"
+            else:
+                body["status"] = "succeeded"
+                body["output"] = prediction["output"]
+        return body
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        state = self.state
+        match = re.fullmatch(r"/v1/models/([^/]+)/([^/]+)/predictions", self.path)
+        if match:
+            slug = f"{match.group(1)}/{match.group(2)}"
+            spec = self._model(slug)
+            self._count(f"replicate {slug}")
+            with state["lock"]:
+                rng = state["rng"]
+                kind = "mp4" if spec.get("output") == "video" else "png"
+                prediction = {
+                    "id": uuid.uuid4().hex, "model": slug, "input": {}, "created": time.time(),
+                    "queue": _sample(rng, spec["queue"], state["scale"]),
+                    "run": _sample(rng, spec["run"], state["scale"]),
+                    "fail": rng.random() < (state["fail_rate"] if state["fail_rate"] is not None else spec["fail"]),
+                    "output": f"{state['base_url']}/files/{uuid.uuid4().hex}.{kind}",
+                }
+                state["predictions"][prediction["id"]] = prediction
+            return self._json(201, self._prediction(prediction))
+
+        match = re.fullmatch(r"/v1_1/[^/]+/(image|video|raw|auto)/upload", self.path)
+        if match:
+            self._count("cloudinary upload")
+            with state["lock"]:
+                delay = _sample(state["rng"], state["profile"]["storage"]["upload"], state["scale"])
+            time.sleep(delay)
+            kind = "mp4" if match.group(1) == "video" else "png"
+            public_id = uuid.uuid4().hex
+            return self._json(200, {
+                "public_id": public_id, "resource_type": match.group(1), "format": kind,
+                "secure_url": f"{state['base_url']}/files/{public_id}.{kind}",
+                "url": f"{state['base_url']}/files/{public_id}.{kind}",
+            })
+        self._json(404, {"detail": "not found"})
+
+    def do_GET(self):
+        state = self.state
+        match = re.fullmatch(r"/v1/predictions/([0-9a-f]+)", self.path)
+        if match:
+            prediction = state["predictions"].get(match.group(1))
+            if prediction is None:
+                return self._json(404, {"detail": "not found"})
+            return self._json(200, self._prediction(prediction))
+        if self.path.startswith("/files/"):
+            self._count("storage download")
+            with state["lock"]:
+                delay = _sample(state["rng"], state["profile"]["storage"]["download"], state["scale"])
+            time.sleep(delay)
+            if self.path.endswith(".mp4"):
+                return self._reply(200, state["mp4"], "video/mp4")
+            return self._reply(200, state["png"], "image/png")
+        if self.path == "/_stats":
+            with state["lock"]:
+                return self._json(200, dict(state["counts"]))
+        self._json(404, {"detail": "not found"})
+
+    do_HEAD = do_GET
+
+
+def serve_fakes(host: str, port: int, profile: dict, scale: float, fail_rate, seed: int):
+    base_url = f"http://{host}:{port}"
+    FakeProviders.state = {
+        "profile": profile, "scale": scale, "fail_rate": fail_rate, "base_url": base_url,
+        "rng": random.Random(seed), "lock": threading.Lock(), "predictions": {}, "counts": {},
+        "png": _fake_png(), "mp4": b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom" + bytes(256 * 1024),
+    }
+    server = ThreadingHTTPServer((host, port), FakeProviders)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+# ---------- Harness ----------
+
+def free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def load_profile(path) -> dict:
+    profile = json.loads(json.dumps(DEFAULT_PROFILE))
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        for slug, spec in overrides.get("models", {}).items():
+            profile["models"][slug] = {**profile["models"].get(slug, {}), **spec}
+        profile["storage"].update(overrides.get("storage", {}))
+    return profile
+
+
+def start_fakes(args) -> Tuple[subprocess.Popen, str]:
+    import httpx
+
+    port = free_port(args.fake_host)
+    command = [sys.executable, os.path.abspath(__file__), "--serve-fakes", str(port), "--fake-host", args.fake_host,
+               "--time-scale", str(args.time_scale), "--seed", str(args.seed)]
+    if args.profile:
+        command += ["--profile", args.profile]
+    if args.fail_rate is not None:
+        command += ["--fail-rate", str(args.fail_rate)]
+    process = subprocess.Popen(command)
+    base_url = f"http://{args.fake_host}:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/_stats", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake provider server did not start")
+
+
+def configure_environment(fake_host: str, fake_url: str, poll_interval: float):
+    """Point the app at the fakes; must run before main_simple (and database) are imported"""
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='aura_bench_'), 'bench.db')}"
+    os.environ.update({
+        "DATABASE_URL": database_url,
+        "REPLICATE_API_TOKEN": "bench",
+        "REPLICATE_BASE_URL": fake_url,
+        "REPLICATE_POLL_INTERVAL": str(poll_interval),
+        "CLOUDINARY_CLOUD_NAME": "bench",
+        "CLOUDINARY_API_KEY": "bench",
+        "CLOUDINARY_API_SECRET": "bench",
+        "CLOUDINARY_UPLOAD_PREFIX": fake_url,
+        "NO_PROXY": fake_host,
+        "no_proxy": fake_host,
+    })
+    os.environ.pop("REDIS_URL", None)
+    os.environ.pop("OTEL_EXPORTER_OTLP_ENDPOINT", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def seed(users: int, fake_url: str) -> list:
+    """One user per burst campaign, each with a product, a model and a scene; returns their ids and tokens"""
+    from auth import create_access_token
+    from database import SessionLocal, engine
+    from models import Base, Model, Product, Scene, User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    accounts = []
+    db = SessionLocal()
+    try:
+        for i in range(users):
+            user = User(id=str(uuid.uuid4()), email=f"bench{i}@bench.local", hashed_password="x", credits=100000)
+            product = Product(user_id=user.id, name=f"Shirt {i}", category="top", clothing_type="top",
+                              image_url=f"{fake_url}/files/product_{i}.png",
+                              packshot_front_url=f"{fake_url}/files/packshot_{i}.png")
+            model = Model(user_id=user.id, name=f"Model {i}", image_url=f"{fake_url}/files/model_{i}.png", poses=[])
+            scene = Scene(user_id=user.id, name=f"Scene {i}", image_url=f"{fake_url}/files/scene_{i}.png")
+            db.add_all([user, product, model, scene])
+            db.flush()
+            accounts.append({"user_id": user.id, "token": create_access_token({"sub": user.id}),
+                             "product_id": product.id, "model_id": model.id, "scene_id": scene.id})
+        db.commit()
+    finally:
+        db.close()
+    return accounts
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class Job:
+    def __init__(self, campaign_id: str, outputs_before: int, started: float):
+        self.campaign_id = campaign_id
+        self.outputs_before = outputs_before
+        self.started = started
+        self.first_output = None
+        self.finished = None
+        self.outcome = None
+
+
+class LoopLagProbe:
+    """Measures how late a 10ms sleep wakes up - time the event loop spent blocked"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval) * 1000)
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+class WriteCounter:
+    """Counts INSERT/UPDATE/DELETE statements on the app's engines"""
+
+    def __init__(self):
+        from database import async_engine, engine
+        self.engines = [engine, async_engine.sync_engine]
+        self.writes = 0
+
+    def _count(self, conn, cursor, statement, *args):
+        if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self.writes += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._count)
+
+
+async def output_counts(campaign_ids: list, videos: bool) -> dict:
+    from sqlalchemy import func, select
+
+    from database import AsyncSessionLocal
+    from models import CampaignImage
+
+    query = select(CampaignImage.campaign_id, func.count()).where(CampaignImage.campaign_id.in_(campaign_ids))
+    if videos:
+        query = query.where(CampaignImage.video_url.isnot(None))
+    async with AsyncSessionLocal() as db:
+        return dict((await db.execute(query.group_by(CampaignImage.campaign_id))).all())
+
+
+async def job_states(campaign_ids: list, videos: bool) -> dict:
+    """campaign id -> "running" / "completed" / "failed" """
+    from sqlalchemy import select
+
+    from database import AsyncSessionLocal
+    from models import Campaign
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Campaign.id, Campaign.generation_status, Campaign.settings).where(Campaign.id.in_(campaign_ids))
+        )).all()
+    states = {}
+    for campaign_id, generation_status, settings in rows:
+        status = (settings or {}).get("bulk_video_status") if videos else generation_status
+        states[campaign_id] = status if status in ("completed", "failed") else "running"
+    return states
+
+
+async def watch(jobs: list, videos: bool, timeout: float, poll: float = 0.05):
+    deadline = time.monotonic() + timeout
+    pending = {job.campaign_id: job for job in jobs}
+    while pending and time.monotonic() < deadline:
+        await asyncio.sleep(poll)
+        ids = list(pending)
+        counts, states = await asyncio.gather(output_counts(ids, videos), job_states(ids, videos))
+        now = time.monotonic()
+        for campaign_id in ids:
+            job = pending[campaign_id]
+            if job.first_output is None and counts.get(campaign_id, 0) > job.outputs_before:
+                job.first_output = now
+            if states.get(campaign_id, "running") != "running":
+                job.finished, job.outcome = now, states[campaign_id]
+                del pending[campaign_id]
+    for job in pending.values():
+        job.outcome = "timeout"
+
+
+async def start_burst(client, accounts: list) -> list:
+    async def create(account):
+        started = time.monotonic()
+        response = await client.post("/campaigns/create", headers={"Authorization": f"Bearer {account['token']}"}, data={
+            "name": "Bench campaign",
+            "product_ids": json.dumps([account["product_id"]]),
+            "model_ids": json.dumps([account["model_id"]]),
+            "scene_ids": json.dumps([account["scene_id"]]),
+            "reuse_base": "false",
+        })
+        response.raise_for_status()
+        return Job(response.json()["campaign"]["id"], 0, started)
+    return list(await asyncio.gather(*(create(account) for account in accounts)))
+
+
+async def start_template(client, accounts: list, campaign_ids: list) -> list:
+    before = await output_counts(campaign_ids, videos=False)
+
+    async def run(account, campaign_id):
+        started = time.monotonic()
+        response = await client.post(f"/campaigns/{campaign_id}/generate-template-keyframes",
+                                     headers={"Authorization": f"Bearer {account['token']}"},
+                                     data={"template_id": TEMPLATE_ID})
+        response.raise_for_status()
+        return Job(campaign_id, before.get(campaign_id, 0), started)
+    return list(await asyncio.gather(*(run(account, campaign_id) for account, campaign_id in zip(accounts, campaign_ids))))
+
+
+async def start_bulk_video(client, accounts: list, campaign_ids: list) -> list:
+    before = await output_counts(campaign_ids, videos=True)
+
+    async def run(account, campaign_id):
+        started = time.monotonic()
+        response = await client.post(f"/campaigns/{campaign_id}/generate-videos-bulk",
+                                     headers={"Authorization": f"Bearer {account['token']}"},
+                                     json={"model": "wan", "video_quality": "480p", "duration": "5s"})
+        response.raise_for_status()
+        return Job(campaign_id, before.get(campaign_id, 0), started)
+    return list(await asyncio.gather(*(run(account, campaign_id) for account, campaign_id in zip(accounts, campaign_ids))))
+
+
+def provider_calls(fake_url: str) -> dict:
+    import httpx
+    return httpx.get(f"{fake_url}/_stats", timeout=5).json()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def report(name: str, jobs: list, elapsed: float, lags: list, writes: int, calls_before: dict, calls_after: dict):
+    done = [job for job in jobs if job.outcome == "completed"]
+    failed = [job for job in jobs if job.outcome == "failed"]
+    timed_out = [job for job in jobs if job.outcome == "timeout"]
+    first = [job.first_output - job.started for job in jobs if job.first_output is not None]
+    total = [job.finished - job.started for job in done]
+    calls = {key: calls_after.get(key, 0) - calls_before.get(key, 0) for key in calls_after}
+    replicate_calls = sum(count for key, count in calls.items() if key.startswith("replicate "))
+
+    print(f"\n▶ {name}: {len(done)} completed, {len(failed)} failed, {len(timed_out)} timed out in {elapsed:.1f}s")
+    print(f"  jobs/hour              {len(done) / elapsed * 3600:>10.0f}")
+    print(f"  first output p50/p95   {percentile(first, 0.5):>8.2f}s {percentile(first, 0.95):>8.2f}s")
+    print(f"  completion p50/p95     {percentile(total, 0.5):>8.2f}s {percentile(total, 0.95):>8.2f}s")
+    print(f"  loop lag p50/p95/max   {percentile(lags, 0.5):>7.1f}ms {percentile(lags, 0.95):>7.1f}ms {max(lags or [0]):>7.1f}ms")
+    print(f"  DB writes per job      {writes / max(1, len(jobs)):>10.1f}")
+    print(f"  provider calls         {replicate_calls:>10} replicate, {calls.get('cloudinary upload', 0)} uploads, "
+          f"{calls.get('storage download', 0)} downloads")
+    print(f"  peak RSS               {peak_rss_mb():>9.0f}MB")
+    return len(failed), len(timed_out)
+
+
+async def run_scenarios(args, fake_url: str, accounts: list) -> tuple:
+    import httpx
+
+    import main_simple
+
+    failures = timeouts = 0
+    blocked = []
+    campaign_ids = []
+    transport = httpx.ASGITransport(app=main_simple.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for name in args.scenarios:
+            if name != "burst" and not campaign_ids:
+                print(f"\n▶ {name}: skipped (needs the campaigns from the burst scenario)")
+                continue
+            calls_before = provider_calls(fake_url)
+            with LoopLagProbe() as probe, WriteCounter() as counter:
+                started = time.monotonic()
+                if name == "burst":
+                    jobs = await start_burst(client, accounts)
+                elif name == "template":
+                    jobs = await start_template(client, accounts, campaign_ids)
+                else:
+                    jobs = await start_bulk_video(client, accounts, campaign_ids)
+                await watch(jobs, videos=name == "bulk-video", timeout=args.timeout)
+                elapsed = time.monotonic() - started
+            failed, timed_out = report(name, jobs, elapsed, probe.lags, counter.writes,
+                                       calls_before, provider_calls(fake_url))
+            failures, timeouts = failures + failed, timeouts + timed_out
+            worst_lag = max(probe.lags, default=0.0)
+            if worst_lag > args.max_loop_lag:
+                print(f"  ❌ event loop blocked for {worst_lag:.0f}ms (limit {args.max_loop_lag:.0f}ms)")
+                blocked.append(name)
+            if name == "burst":
+                campaign_ids = [job.campaign_id for job in jobs]
+            # Let fire-and-forget tails (event publishing, progress cleanup) settle between scenarios
+            await asyncio.sleep(0.5)
+    return failures, timeouts, blocked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="users (and campaigns) in the burst")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="multiplier for every simulated latency")
+    parser.add_argument("--profile", help="JSON file overriding DEFAULT_PROFILE")
+    parser.add_argument("--fail-rate", type=float, default=None, help="failure probability for every model")
+    parser.add_argument("--allow-failures", action="store_true", help="only timeouts make the run fail")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds per scenario")
+    parser.add_argument("--max-loop-lag", type=float, default=1000.0, metavar="MS",
+                        help="fail when the event loop is blocked longer than this (milliseconds)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fake-host", default="127.0.0.2",
+                        help="loopback address for the fakes (the app rejects 127.0.0.1/localhost image URLs)")
+    parser.add_argument("--serve-fakes", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_fakes:
+        serve_fakes(args.fake_host, args.serve_fakes, load_profile(args.profile), args.time_scale, args.fail_rate, args.seed)
+        return
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    fakes, fake_url = start_fakes(args)
+    try:
+        configure_environment(args.fake_host, fake_url, poll_interval=max(0.02, 0.5 * args.time_scale))
+        print(f"🧪 Fake Replicate/Cloudinary on {fake_url} (time scale {args.time_scale})")
+        print(f"🌱 Seeding {args.users} users")
+        accounts = seed(args.users, fake_url)
+        failures, timeouts, blocked = asyncio.run(run_scenarios(args, fake_url, accounts))
+    finally:
+        fakes.terminate()
+        fakes.wait(timeout=10)
+
+    if timeouts or blocked or (failures and not args.allow_failures):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Bulk scene import benchmark.
+
+Writes a scene library of small image files to a temp directory, imports it
+for one user, then imports it again (everything should be skipped) and once
+more with renamed copies and content de-duplication on. Prints wall time and
+the number of SQL statements for each run.
+
+Usage (from apps/api):
+    python benchmarks/bench_scene_import.py
+    python benchmarks/bench_scene_import.py --files 20000 --file-size 65536
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_scene_import.py
+
+The target database is wiped - never point it at real data.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+if not BENCH_DATABASE_URL:
+    BENCH_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='aura_bench_'), 'bench.db')}"
+# database.py reads DATABASE_URL at import time
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+
+from sqlalchemy import event, func, select  # noqa: E402
+
+
+def write_library(directory: Path, count: int, size: int, prefix: str = "scene_") -> list:
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(count):
+        path = directory / f"{prefix}{i:05d}.jpg"
+        path.write_bytes(i.to_bytes(4, "big") * (size // 4))
+        files.append(path)
+    return files
+
+
+def timed_import(db, engine, user_id, files, dedupe_content):
+    from scene_import import import_scene_files
+
+    statements = []
+    listener = lambda *args: statements.append(1)  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        started = time.perf_counter()
+        result = import_scene_files(db, user_id, files, "http://localhost:8000", dedupe_content)
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, elapsed, len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--file-size", type=int, default=16384, help="bytes per image file")
+    args = parser.parse_args()
+
+    from database import SessionLocal, engine
+    from models import Base, Scene, User
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    library = Path(tempfile.mkdtemp(prefix="aura_scenes_"))
+    try:
+        print(f"🖼️ Writing {args.files} scene files of {args.file_size} bytes")
+        files = write_library(library, args.files, args.file_size)
+        # Same images under different names - only content de-duplication catches these
+        renamed = [library / f"scene_copy_{path.name[len('scene_'):]}" for path in files]
+        for source, target in zip(files, renamed):
+            shutil.copyfile(source, target)
+
+        db = SessionLocal()
+
+        def new_user(email):
+            user = User(id=str(uuid.uuid4()), email=email, hashed_password="x")
+            db.add(user)
+            db.commit()
+            return user.id
+
+        first_user, second_user = new_user("bench@bench.local"), new_user("bench2@bench.local")
+        runs = [
+            ("first import", first_user, files, False),
+            ("re-import", first_user, files, False),
+            ("first import + hashes", second_user, files, True),
+            ("renamed copies, dedupe", second_user, renamed, True),
+        ]
+        print(f"\n{'run':<24} {'added':>7} {'skipped':>8} {'time':>9} {'queries':>8}")
+        for label, user_id, run_files, dedupe in runs:
+            result, elapsed, statements = timed_import(db, engine, user_id, run_files, dedupe)
+            print(f"{label:<24} {result['added']:>7} {result['skipped']:>8} {elapsed:>8.2f}s {statements:>8}")
+
+        total = db.execute(select(func.count(Scene.id))).scalar()
+        print(f"\n✅ {total} scenes in the database")
+        db.close()
+    finally:
+        shutil.rmtree(library, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
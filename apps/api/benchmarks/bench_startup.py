@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: import time and time-to-ready, checked against a budget.
+
+Measures, in fresh interpreters:
+  * import time of main_simple, and how much of it is the app itself rather
+    than the framework floor (fastapi + sqlalchemy + pydantic);
+  * time from spawning uvicorn until /health answers (interpreter start,
+    imports and the startup hook), against a migrated database;
+  * that none of the lazily loaded SDKs (stripe, replicate, cloudinary, PIL,
+    alembic) were imported along the way.
+
+Exits non-zero when a budget is exceeded, so it can gate CI. Point --app-dir
+at a checkout of an older revision to compare.
+
+Usage (from apps/api):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --app-budget-ms 300 --ready-budget-ms 800
+    python benchmarks/bench_startup.py --app-dir /tmp/aura-before
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ("stripe", "replicate", "cloudinary", "PIL", "alembic")
+
+FRAMEWORK_IMPORTS = "import fastapi, fastapi.security, sqlalchemy, sqlalchemy.orm, sqlalchemy.ext.asyncio, pydantic"
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{imports}
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def probe_import(app_dir: str, imports: str, env: dict) -> dict:
+    code = IMPORT_PROBE.format(imports=imports, lazy=LAZY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=app_dir, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def health_ok(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.5) as sock:
+            sock.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            return sock.recv(32).startswith(b"HTTP/1.1 200")
+    except OSError:
+        return False
+
+
+def time_to_ready(app_dir: str, env: dict, timeout: float = 60.0) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main_simple:app", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if health_ok(port):
+                return (time.perf_counter() - started) * 1000
+            if server.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            time.sleep(0.005)
+        raise RuntimeError("server did not become healthy")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=API_DIR, help="directory containing main_simple.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app-budget-ms", type=float, default=600.0,
+                        help="median import time of main_simple above the framework floor")
+    parser.add_argument("--ready-budget-ms", type=float, default=1000.0,
+                        help="median time from spawning uvicorn to a 200 from /health")
+    args = parser.parse_args()
+
+    database_url = os.getenv("BENCH_DATABASE_URL") or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='aura_bench_'), 'bench.db')}"
+    env = {**os.environ, "DATABASE_URL": database_url, "MIGRATE_ON_STARTUP": "false"}
+
+    print("🗄️ Migrating benchmark database...")
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=API_DIR, env=env,
+                   check=True, capture_output=True)
+
+    # One untimed run so bytecode caches are warm, as on a deployed image
+    probe_import(args.app_dir, "import main_simple", env)
+
+    framework = [probe_import(args.app_dir, FRAMEWORK_IMPORTS, env)["ms"] for _ in range(args.runs)]
+    app_probes = [probe_import(args.app_dir, "import main_simple", env) for _ in range(args.runs)]
+    ready = [time_to_ready(args.app_dir, env) for _ in range(args.runs)]
+
+    framework_ms = statistics.median(framework)
+    import_ms = statistics.median(probe["ms"] for probe in app_probes)
+    app_ms = import_ms - framework_ms
+    ready_ms = statistics.median(ready)
+    loaded = sorted({module for probe in app_probes for module in probe["loaded"]})
+
+    checks = [
+        ("framework floor", framework_ms, None),
+        ("import main_simple", import_ms, None),
+        ("  app's own share", app_ms, args.app_budget_ms),
+        ("time to /health", ready_ms, args.ready_budget_ms),
+    ]
+    print(f"\n{'measure':<22} {'median':>10} {'budget':>10}")
+    failed = False
+    for label, value, budget in checks:
+        verdict = ""
+        if budget is not None:
+            ok = value <= budget
+            failed |= not ok
+            verdict = "✅" if ok else "❌"
+        budget_text = f"{budget:.0f}ms" if budget is not None else "-"
+        print(f"{label:<22} {value:>8.0f}ms {budget_text:>10} {verdict}")
+
+    if loaded:
+        failed = True
+        print(f"\n❌ Loaded at import (should be lazy): {', '.join(loaded)}")
+    else:
+        print(f"\n✅ None of {', '.join(LAZY_MODULES)} loaded at import")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the per-user composite indexes (migration 0002).
+
+Seeds a database with 100k campaigns (plus products, models, scenes and
+generations) at schema revision 0001, measures the hot list queries, upgrades
+to head and measures again. Prints the query plan and p50/p95 latency of each
+query before and after.
+
+Usage (from apps/api):
+    python benchmarks/bench_user_indexes.py                      # temp SQLite file
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_user_indexes.py
+
+The target database is wiped - never point it at real data.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+if not BENCH_DATABASE_URL:
+    BENCH_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='aura_bench_'), 'bench.db')}"
+# database.py reads DATABASE_URL at import time
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+
+NUM_USERS = int(os.getenv("BENCH_USERS", "500"))
+NUM_CAMPAIGNS = int(os.getenv("BENCH_CAMPAIGNS", "100000"))
+NUM_PRODUCTS = int(os.getenv("BENCH_PRODUCTS", "50000"))
+NUM_MODELS = int(os.getenv("BENCH_MODELS", "20000"))
+NUM_SCENES = int(os.getenv("BENCH_SCENES", "20000"))
+NUM_GENERATIONS = int(os.getenv("BENCH_GENERATIONS", "100000"))
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "200"))
+BATCH_SIZE = 5000
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from database import engine  # noqa: E402
+
+QUERIES = {
+    "campaigns by created_at": (
+        "SELECT * FROM campaigns WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 20"
+    ),
+    "campaigns by updated_at": (
+        "SELECT * FROM campaigns WHERE user_id = :user_id ORDER BY updated_at DESC LIMIT 20"
+    ),
+    "campaigns count": "SELECT COUNT(*) FROM campaigns WHERE user_id = :user_id",
+    "products list": "SELECT * FROM products WHERE user_id = :user_id ORDER BY created_at DESC",
+    "models list": "SELECT * FROM models WHERE user_id = :user_id ORDER BY created_at DESC",
+    "scenes list": "SELECT * FROM scenes WHERE user_id = :user_id ORDER BY created_at DESC",
+    "dashboard stats": (
+        "SELECT (SELECT COUNT(*) FROM products WHERE user_id = :user_id),"
+        " (SELECT COUNT(*) FROM models WHERE user_id = :user_id),"
+        " (SELECT COUNT(*) FROM scenes WHERE user_id = :user_id),"
+        " (SELECT COUNT(*) FROM campaigns WHERE user_id = :user_id)"
+    ),
+    "generations by campaign": "SELECT * FROM generations WHERE campaign_id = :campaign_id",
+    "generations by status": "SELECT id FROM generations WHERE status = 'processing'",
+}
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(API_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(API_DIR, "migrations"))
+    return config
+
+
+def reset_schema():
+    from models import Base
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    command.upgrade(alembic_config(), "0001")
+
+
+def _insert(conn, table, rows):
+    if not rows:
+        return
+    columns = list(rows[0])
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"
+    conn.execute(text(sql), rows)
+
+
+def _seed_rows(conn, table, count, user_ids, make_row):
+    batch = []
+    for i in range(count):
+        batch.append(make_row(i, random.choice(user_ids)))
+        if len(batch) >= BATCH_SIZE:
+            _insert(conn, table, batch)
+            batch = []
+    _insert(conn, table, batch)
+
+
+def seed():
+    random.seed(42)
+    start = datetime(2024, 1, 1)
+
+    def created(i):
+        return start + timedelta(seconds=i * 37)
+
+    user_ids = [str(uuid.uuid4()) for _ in range(NUM_USERS)]
+    campaign_ids = []
+
+    with engine.begin() as conn:
+        _insert(conn, "users", [
+            {"id": user_id, "email": f"user{i}@bench.local", "hashed_password": "x", "credits": 100,
+             "subscription_credits": 0, "subscription_status": "inactive",
+             "created_at": start, "updated_at": start}
+            for i, user_id in enumerate(user_ids)
+        ])
+
+        def campaign_row(i, user_id):
+            campaign_id = str(uuid.uuid4())
+            campaign_ids.append(campaign_id)
+            return {"id": campaign_id, "user_id": user_id, "name": f"Campaign {i}", "status": "completed",
+                    "generation_status": "completed", "settings": "{}",
+                    "created_at": created(i), "updated_at": created(i) + timedelta(hours=random.randint(0, 500))}
+
+        _seed_rows(conn, "campaigns", NUM_CAMPAIGNS, user_ids, campaign_row)
+        _seed_rows(conn, "products", NUM_PRODUCTS, user_ids, lambda i, user_id: {
+            "id": str(uuid.uuid4()), "user_id": user_id, "name": f"Product {i}", "packshots": "[]", "tags": "[]",
+            "created_at": created(i), "updated_at": created(i)})
+        _seed_rows(conn, "models", NUM_MODELS, user_ids, lambda i, user_id: {
+            "id": str(uuid.uuid4()), "user_id": user_id, "name": f"Model {i}", "poses": "[]",
+            "created_at": created(i), "updated_at": created(i)})
+        _seed_rows(conn, "scenes", NUM_SCENES, user_ids, lambda i, user_id: {
+            "id": str(uuid.uuid4()), "user_id": user_id, "name": f"Scene {i}", "tags": "[]", "is_standard": False,
+            "created_at": created(i), "updated_at": created(i)})
+        _seed_rows(conn, "generations", NUM_GENERATIONS, user_ids, lambda i, user_id: {
+            "id": str(uuid.uuid4()), "user_id": user_id, "campaign_id": random.choice(campaign_ids),
+            "mode": "scene_composite", "prompt": "bench",
+            "status": "processing" if i % 500 == 0 else "completed", "credits_used": 1,
+            "created_at": created(i)})
+
+    return user_ids, campaign_ids
+
+
+def analyze():
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def query_plan(conn, sql, params) -> str:
+    if engine.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+        return "\n".join(f"      {row[-1]}" for row in rows)
+    rows = conn.execute(text(f"EXPLAIN {sql}"), params).fetchall()
+    return "\n".join(f"      {row[0]}" for row in rows)
+
+
+def measure(user_ids, campaign_ids) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = query_plan(conn, sql, {"user_id": user_ids[0], "campaign_id": campaign_ids[0]})
+            timings = []
+            for _ in range(ITERATIONS):
+                params = {"user_id": random.choice(user_ids), "campaign_id": random.choice(campaign_ids)}
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = {
+                "plan": plan,
+                "p50": statistics.median(timings),
+                "p95": timings[int(len(timings) * 0.95) - 1],
+            }
+    return results
+
+
+def main():
+    print(f"📊 Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"🌱 Seeding {NUM_CAMPAIGNS} campaigns, {NUM_PRODUCTS} products, {NUM_MODELS} models, "
+          f"{NUM_SCENES} scenes, {NUM_GENERATIONS} generations across {NUM_USERS} users...")
+
+    reset_schema()
+    started = time.perf_counter()
+    user_ids, campaign_ids = seed()
+    analyze()
+    print(f"✅ Seeded in {time.perf_counter() - started:.1f}s")
+
+    before = measure(user_ids, campaign_ids)
+
+    print("🔄 Upgrading to head (building indexes)...")
+    started = time.perf_counter()
+    command.upgrade(alembic_config(), "head")
+    analyze()
+    print(f"✅ Indexes built in {time.perf_counter() - started:.1f}s")
+
+    after = measure(user_ids, campaign_ids)
+
+    print()
+    for name in QUERIES:
+        b, a = before[name], after[name]
+        speedup = b["p50"] / a["p50"] if a["p50"] > 0 else float("inf")
+        print(f"▶ {name}")
+        print(f"   before: p50 {b['p50']:.3f} ms  p95 {b['p95']:.3f} ms")
+        print(b["plan"])
+        print(f"   after:  p50 {a['p50']:.3f} ms  p95 {a['p95']:.3f} ms  ({speedup:.1f}x)")
+        print(a["plan"])
+
+    print()
+    print(f"{'query':<28} {'p50 before':>12} {'p50 after':>12} {'p95 before':>12} {'p95 after':>12}")
+    for name in QUERIES:
+        b, a = before[name], after[name]
+        print(f"{name:<28} {b['p50']:>10.3f}ms {a['p50']:>10.3f}ms {b['p95']:>10.3f}ms {a['p95']:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Per-row storage for campaign images and videos.
+
+Generated images and videos used to live as lists inside the Campaign.settings
+JSON blob, so every append or delete rewrote the whole blob and concurrent
+background tasks could overwrite each other. They now live in the
+campaign_images / campaign_videos tables: appends are single inserts, edits
+are single-row updates guarded by an optimistic version column.
+
+API responses keep the old shape - settings["generated_images"] and
+settings["videos"] are rebuilt from the rows on read.
+"""
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import Campaign, CampaignImage, CampaignVideo
+
+logger = logging.getLogger(__name__)
+
+# Keys promoted to real columns; everything else stays in the row's `data` JSON
+IMAGE_COLUMNS = ("image_url", "video_url", "shot_type", "shot_name", "is_base_image")
+VIDEO_COLUMNS = ("video_url", "image_url", "shot_type", "shot_name", "error")
+
+# Retries for optimistic-version conflicts on single-row updates
+MAX_UPDATE_RETRIES = 3
+
+
+def _split_entry(entry: dict, columns: tuple) -> tuple:
+    """Split a legacy settings entry into (column values, leftover data)"""
+    column_values = {key: entry[key] for key in columns if key in entry}
+    data = {key: value for key, value in entry.items() if key not in columns and key not in ("image_id", "video_id")}
+    return column_values, data
+
+
+def image_to_dict(row: CampaignImage) -> dict:
+    """Rebuild the legacy generated_images entry for a row"""
+    entry = dict(row.data or {})
+    for key in IMAGE_COLUMNS:
+        value = getattr(row, key)
+        if value is not None:
+            entry[key] = value
+    entry["image_id"] = row.id
+    return entry
+
+
+def video_to_dict(row: CampaignVideo) -> dict:
+    """Rebuild the legacy videos entry for a row (video_url is always present, possibly None)"""
+    entry = dict(row.data or {})
+    for key in VIDEO_COLUMNS:
+        value = getattr(row, key)
+        if value is not None:
+            entry[key] = value
+    entry["video_url"] = row.video_url
+    entry["video_id"] = row.id
+    return entry
+
+
+def _next_position(db: Session, model, campaign_id: str) -> int:
+    current_max = db.query(func.max(model.position)).filter(model.campaign_id == campaign_id).scalar()
+    return 0 if current_max is None else current_max + 1
+
+
+# ---------- Images ----------
+
+def add_campaign_images(db: Session, campaign_id: str, images: List[dict], commit: bool = True) -> List[CampaignImage]:
+    """Append images to a campaign as new rows (no read-modify-write of existing images)"""
+    position = _next_position(db, CampaignImage, campaign_id)
+    rows = []
+    for offset, image in enumerate(images):
+        column_values, data = _split_entry(image, IMAGE_COLUMNS)
+        row = CampaignImage(campaign_id=campaign_id, position=position + offset, data=data, **column_values)
+        db.add(row)
+        rows.append(row)
+    if commit:
+        db.commit()
+    return rows
+
+
+def add_campaign_image(db: Session, campaign_id: str, image: dict, commit: bool = True) -> CampaignImage:
+    """Append a single image to a campaign"""
+    return add_campaign_images(db, campaign_id, [image], commit=commit)[0]
+
+
+def get_campaign_image_rows(db: Session, campaign_id: str) -> List[CampaignImage]:
+    return (
+        db.query(CampaignImage)
+        .filter(CampaignImage.campaign_id == campaign_id)
+        .order_by(CampaignImage.position, CampaignImage.created_at)
+        .all()
+    )
+
+
+def get_campaign_images(db: Session, campaign_id: str) -> List[dict]:
+    """Images of a campaign in display order, in the legacy dict shape"""
+    return [image_to_dict(row) for row in get_campaign_image_rows(db, campaign_id)]
+
+
+def count_campaign_images(db: Session, campaign_id: str) -> int:
+    return db.query(func.count(CampaignImage.id)).filter(CampaignImage.campaign_id == campaign_id).scalar() or 0
+
+
+def get_campaign_image_at(db: Session, campaign_id: str, index: int) -> Optional[CampaignImage]:
+    """Row at a display index (the index the frontend uses)"""
+    if index < 0:
+        return None
+    return (
+        db.query(CampaignImage)
+        .filter(CampaignImage.campaign_id == campaign_id)
+        .order_by(CampaignImage.position, CampaignImage.created_at)
+        .offset(index)
+        .first()
+    )
+
+
+def find_campaign_image_by_url(db: Session, campaign_id: str, image_url: str) -> Optional[CampaignImage]:
+    return (
+        db.query(CampaignImage)
+        .filter(CampaignImage.campaign_id == campaign_id, CampaignImage.image_url == image_url)
+        .order_by(CampaignImage.position)
+        .first()
+    )
+
+
+def update_campaign_image(db: Session, image_id: str, **changes) -> Optional[CampaignImage]:
+    """Update one image row, retrying on optimistic version conflicts.
+
+    Column keys are set directly; any other key is merged into the row's data.
+    """
+    column_changes, data_changes = _split_entry(changes, IMAGE_COLUMNS)
+    for attempt in range(MAX_UPDATE_RETRIES):
+        row = db.get(CampaignImage, image_id)
+        if row is None:
+            return None
+        for key, value in column_changes.items():
+            setattr(row, key, value)
+        if data_changes:
+            row.data = {**(row.data or {}), **data_changes}
+        try:
+            db.commit()
+            return row
+        except StaleDataError:
+            db.rollback()
+            db.expire_all()
+            logger.warning(f"⚠️ Version conflict updating campaign image {image_id} (attempt {attempt + 1}/{MAX_UPDATE_RETRIES})")
+    raise StaleDataError(f"Campaign image {image_id} kept changing; gave up after {MAX_UPDATE_RETRIES} attempts")
+
+
+def delete_campaign_image_at(db: Session, campaign_id: str, index: int) -> Optional[dict]:
+    """Delete the image at a display index; later images move up one index without being rewritten"""
+    row = get_campaign_image_at(db, campaign_id, index)
+    if row is None:
+        return None
+    deleted = image_to_dict(row)
+    db.delete(row)
+    db.commit()
+    return deleted
+
+
+# ---------- Videos ----------
+
+def get_campaign_videos(db: Session, campaign_id: str) -> List[dict]:
+    rows = (
+        db.query(CampaignVideo)
+        .filter(CampaignVideo.campaign_id == campaign_id)
+        .order_by(CampaignVideo.position, CampaignVideo.created_at)
+        .all()
+    )
+    return [video_to_dict(row) for row in rows]
+
+
+def add_campaign_videos(db: Session, campaign_id: str, videos: List[dict], commit: bool = True) -> List[CampaignVideo]:
+    position = _next_position(db, CampaignVideo, campaign_id)
+    rows = []
+    for offset, video in enumerate(videos):
+        column_values, data = _split_entry(video, VIDEO_COLUMNS)
+        row = CampaignVideo(campaign_id=campaign_id, position=position + offset, data=data, **column_values)
+        db.add(row)
+        rows.append(row)
+    if commit:
+        db.commit()
+    return rows
+
+
+def clear_campaign_videos(db: Session, campaign_id: str, commit: bool = True):
+    # ORM deletes (not Query.delete) so the user_stats counters see them
+    for row in db.query(CampaignVideo).filter(CampaignVideo.campaign_id == campaign_id):
+        db.delete(row)
+    if commit:
+        db.commit()
+
+
+def replace_campaign_videos(db: Session, campaign_id: str, videos: List[dict], commit: bool = True) -> List[CampaignVideo]:
+    """Replace a campaign's video set in one transaction"""
+    clear_campaign_videos(db, campaign_id, commit=False)
+    rows = add_campaign_videos(db, campaign_id, videos, commit=False)
+    if commit:
+        db.commit()
+    return rows
+
+
+# ---------- Read views ----------
+
+def _campaign_asset_selects(campaign_ids: List[str]):
+    images = (
+        select(CampaignImage)
+        .where(CampaignImage.campaign_id.in_(campaign_ids))
+        .order_by(CampaignImage.campaign_id, CampaignImage.position, CampaignImage.created_at)
+    )
+    videos = (
+        select(CampaignVideo)
+        .where(CampaignVideo.campaign_id.in_(campaign_ids))
+        .order_by(CampaignVideo.campaign_id, CampaignVideo.position, CampaignVideo.created_at)
+    )
+    return images, videos
+
+
+def _group_campaign_assets(campaign_ids: List[str], image_rows, video_rows) -> Dict[str, dict]:
+    assets = {campaign_id: {"generated_images": [], "videos": []} for campaign_id in campaign_ids}
+    for row in image_rows:
+        assets[row.campaign_id]["generated_images"].append(image_to_dict(row))
+    for row in video_rows:
+        assets[row.campaign_id]["videos"].append(video_to_dict(row))
+    return assets
+
+
+def load_campaign_assets(db: Session, campaign_ids: List[str]) -> Dict[str, dict]:
+    """Images and videos for many campaigns in two queries (avoids N+1 on list endpoints)"""
+    if not campaign_ids:
+        return {}
+    images, videos = _campaign_asset_selects(campaign_ids)
+    return _group_campaign_assets(campaign_ids, db.scalars(images).all(), db.scalars(videos).all())
+
+
+async def load_campaign_assets_async(db: AsyncSession, campaign_ids: List[str]) -> Dict[str, dict]:
+    """load_campaign_assets on an async session"""
+    if not campaign_ids:
+        return {}
+    images, videos = _campaign_asset_selects(campaign_ids)
+    image_rows = (await db.scalars(images)).all()
+    video_rows = (await db.scalars(videos)).all()
+    return _group_campaign_assets(campaign_ids, image_rows, video_rows)
+
+
+def campaign_settings_with_assets(db: Session, campaign: Campaign, assets: Optional[dict] = None) -> dict:
+    """Campaign settings with generated_images/videos filled in from their tables (legacy response shape)"""
+    if assets is None:
+        assets = load_campaign_assets(db, [campaign.id])[campaign.id]
+    settings = dict(campaign.settings) if campaign.settings else {}
+    settings["generated_images"] = assets["generated_images"]
+    settings["videos"] = assets["videos"]
+    return settings
+
+
+def campaign_summary_select(user_id: str):
+    """
+    Lightweight projection for campaign lists: no settings JSON and no asset rows,
+    just counts and the cover image computed in SQL (one row per campaign).
+    """
+    image_count = (
+        select(func.count(CampaignImage.id))
+        .where(CampaignImage.campaign_id == Campaign.id)
+        .correlate(Campaign)
+        .scalar_subquery()
+    )
+    image_video_count = (
+        select(func.count(CampaignImage.id))
+        .where(CampaignImage.campaign_id == Campaign.id, CampaignImage.video_url.isnot(None))
+        .correlate(Campaign)
+        .scalar_subquery()
+    )
+    video_count = (
+        select(func.count(CampaignVideo.id))
+        .where(CampaignVideo.campaign_id == Campaign.id, CampaignVideo.video_url.isnot(None))
+        .correlate(Campaign)
+        .scalar_subquery()
+    )
+    cover_image_url = (
+        select(CampaignImage.image_url)
+        .where(CampaignImage.campaign_id == Campaign.id, CampaignImage.image_url.isnot(None))
+        .order_by(CampaignImage.position)
+        .limit(1)
+        .correlate(Campaign)
+        .scalar_subquery()
+    )
+    return select(
+        Campaign.id,
+        Campaign.name,
+        Campaign.status,
+        Campaign.generation_status,
+        image_count.label("image_count"),
+        (image_video_count + video_count).label("video_count"),
+        cover_image_url.label("cover_image_url"),
+        Campaign.created_at,
+        Campaign.updated_at,
+    ).where(Campaign.user_id == user_id)
+
+
+def summary_row_to_dict(row) -> dict:
+    summary = dict(row._mapping)
+    summary["generation_status"] = summary["generation_status"] or "idle"
+    return summary
+
+
+# ---------- Status polling ----------
+
+def _asset_state_columns(model, prefix: str) -> list:
+    """Count, latest update and version sum of a campaign's rows - changes whenever a row is added, edited or deleted"""
+    aggregates = (
+        (func.count(model.id), "count"),
+        (func.max(model.updated_at), "updated_at"),
+        (func.coalesce(func.sum(model.version), 0), "version_sum"),
+    )
+    return [
+        select(aggregate).where(model.campaign_id == Campaign.id).correlate(Campaign).scalar_subquery().label(f"{prefix}_{name}")
+        for aggregate, name in aggregates
+    ]
+
+
+def campaign_state_select(campaign_id: str, user_id: str):
+    """One narrow row describing everything /status returns, without loading settings or asset rows"""
+    return select(
+        Campaign.updated_at,
+        Campaign.status,
+        Campaign.generation_status,
+        *_asset_state_columns(CampaignImage, "images"),
+        *_asset_state_columns(CampaignVideo, "videos"),
+    ).where(Campaign.id == campaign_id, Campaign.user_id == user_id)
+
+
+async def load_campaign_assets_since_async(db: AsyncSession, campaign_id: str, since) -> dict:
+    """Images and videos of one campaign added or updated after `since`"""
+    images, videos = _campaign_asset_selects([campaign_id])
+    image_rows = (await db.scalars(images.where(CampaignImage.updated_at > since))).all()
+    video_rows = (await db.scalars(videos.where(CampaignVideo.updated_at > since))).all()
+    return _group_campaign_assets([campaign_id], image_rows, video_rows)[campaign_id]
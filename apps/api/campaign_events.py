@@ -0,0 +1,191 @@
+"""
+Push channel for campaign generation events.
+
+Clients watching a generation used to poll /campaigns/{id}/status (the whole
+campaign, settings blob included) and /keyframe-progress every couple of
+seconds. Background jobs now publish small structured events instead and
+GET /campaigns/{id}/events streams them as Server-Sent Events:
+
+  image-ready   a generated image row was committed
+  video-ready   a video_url was committed for an image or a video row
+  progress      a progress tick (same fields as the progress store entry)
+  status        one of the campaign's status fields changed
+  failed        a status field moved to "failed", or a video row failed
+
+Events come from two places: set_progress() for ticks, and a session listener
+that inspects committed Campaign / CampaignImage / CampaignVideo changes, so
+pipelines need no extra calls and a rolled-back write never produces an event.
+
+Events travel over the event bus (event_bus.py, one channel per campaign), so
+a client connected to any worker sees jobs running on every worker. A
+reconnecting client's Last-Event-ID is replayed from the channel's buffer;
+when the events it missed are gone it gets a `resync` event and should fetch
+/campaigns/{id}/status once. An idle stream never touches the database.
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from campaign_assets import image_to_dict, video_to_dict
+from event_bus import event_bus
+from models import Campaign, CampaignImage, CampaignVideo
+
+logger = logging.getLogger(__name__)
+
+# Comment line sent on idle streams so proxies don't close them
+HEARTBEAT_SECONDS = 15
+
+# Campaign columns and settings keys reported in `status` events
+STATUS_COLUMNS = ("status", "generation_status")
+STATUS_SETTINGS_KEYS = ("video_generation_status", "bulk_video_status", "unified_video_status")
+
+# Campaigns whose last published status this process remembers (for change detection)
+STATUS_CACHE_SIZE = 5000
+
+RESYNC_EVENT = {"id": None, "event": "resync", "data": {"reason": "events missed, reload campaign status"}}
+
+_last_status: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+_last_status_lock = threading.Lock()
+
+
+def campaign_channel(campaign_id: str) -> str:
+    return f"campaign:{campaign_id}"
+
+
+def publish_event(campaign_id: str, event_type: str, data: dict, coalesce_key: Optional[str] = None) -> dict:
+    return event_bus.publish(campaign_channel(campaign_id), event_type, data, coalesce_key)
+
+
+def note_campaign_status(campaign_id: str, **fields) -> bool:
+    """Publish `status` (and `failed`) events for status fields that actually changed"""
+    with _last_status_lock:
+        last = _last_status.pop(campaign_id, {})
+        _last_status[campaign_id] = last
+        while len(_last_status) > STATUS_CACHE_SIZE:
+            _last_status.popitem(last=False)
+        changed = {key: value for key, value in fields.items() if value is not None and last.get(key) != value}
+        if not changed:
+            return False
+        last.update(changed)
+        snapshot = {**last, "changed": sorted(changed)}
+    publish_event(campaign_id, "status", snapshot)
+    for key, value in changed.items():
+        if value == "failed":
+            publish_event(campaign_id, "failed", {"field": key})
+    return True
+
+
+async def campaign_event_stream(campaign_id: str, last_event_id: Optional[str] = None,
+                                heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[Optional[dict]]:
+    """Yield events after last_event_id, then live events; None means "send a heartbeat" """
+    channel = campaign_channel(campaign_id)
+    # Subscribe before replaying so nothing published in between is lost; duplicates are skipped by id
+    subscription = event_bus.subscribe(channel)
+    cursor = last_event_id.strip() if last_event_id else None
+    try:
+        complete, backlog = event_bus.replay(channel, cursor)
+        while True:
+            if not complete:
+                yield RESYNC_EVENT
+            for message in backlog:
+                if cursor is None or event_bus.is_after(message["id"], cursor):
+                    yield message
+                    cursor = message["id"]
+            lagged, backlog = await subscription.next_batch(heartbeat)
+            complete = True
+            if lagged:
+                # Fell behind the subscriber buffer: catch up from the channel's replay buffer
+                complete, backlog = event_bus.replay(channel, cursor)
+                # Without a cursor there is no telling whether the missed events are still buffered
+                complete = complete and cursor is not None
+            elif not backlog:
+                yield None
+    finally:
+        subscription.close()
+
+
+def format_sse(entry: Optional[dict]) -> str:
+    """One SSE frame (a comment line for heartbeats)"""
+    if entry is None:
+        return ": keep-alive\n\n"
+    lines = []
+    if entry.get("id"):
+        lines.append(f"id: {entry['id']}")
+    lines.append(f"event: {entry['event']}")
+    lines.append(f"data: {json.dumps(entry['data'], default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+# ---------- Session listener ----------
+
+def _loaded(obj) -> dict:
+    """Attributes already loaded on obj (never triggers a lazy load mid-flush)"""
+    return inspect(obj).dict
+
+
+def _video_url_set(obj) -> bool:
+    history = inspect(obj).attrs.video_url.history
+    return bool(history.added and history.added[0])
+
+
+def _campaign_status_fields(campaign: Campaign) -> dict:
+    loaded = _loaded(campaign)
+    fields = {key: loaded[key] for key in STATUS_COLUMNS if key in loaded}
+    settings = loaded.get("settings")
+    if isinstance(settings, dict):
+        for key in STATUS_SETTINGS_KEYS:
+            if settings.get(key):
+                fields[key] = settings[key]
+        template = settings.get("template_generation")
+        if isinstance(template, dict) and template.get("status"):
+            fields["template_status"] = template["status"]
+    return fields
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_campaign_events(session: Session, flush_context):
+    pending = session.info.setdefault("campaign_events", [])
+    for obj in session.new:
+        if isinstance(obj, CampaignImage):
+            pending.append((obj.campaign_id, "image-ready", {"position": obj.position, "image": image_to_dict(obj)}))
+            if obj.video_url:
+                pending.append((obj.campaign_id, "video-ready", {"image_id": obj.id, "video_url": obj.video_url}))
+        elif isinstance(obj, CampaignVideo):
+            if obj.video_url:
+                pending.append((obj.campaign_id, "video-ready", {"video": video_to_dict(obj)}))
+            elif obj.error:
+                pending.append((obj.campaign_id, "failed", {"video": video_to_dict(obj)}))
+        elif isinstance(obj, Campaign):
+            pending.append((obj.id, None, _campaign_status_fields(obj)))
+    for obj in session.dirty:
+        if obj in session.deleted:
+            continue
+        if isinstance(obj, CampaignImage) and _video_url_set(obj):
+            pending.append((obj.campaign_id, "video-ready", {"image_id": obj.id, "video_url": obj.video_url}))
+        elif isinstance(obj, CampaignVideo) and _video_url_set(obj):
+            pending.append((obj.campaign_id, "video-ready", {"video": video_to_dict(obj)}))
+        elif isinstance(obj, Campaign) and session.is_modified(obj):
+            pending.append((obj.id, None, _campaign_status_fields(obj)))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_campaign_events(session: Session):
+    pending = session.info.pop("campaign_events", None)
+    for campaign_id, event_type, data in pending or ():
+        try:
+            if event_type is None:
+                note_campaign_status(campaign_id, **data)
+            else:
+                publish_event(campaign_id, event_type, data)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to publish campaign event for {campaign_id}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_campaign_events(session: Session):
+    session.info.pop("campaign_events", None)
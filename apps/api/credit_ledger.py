@@ -0,0 +1,179 @@
+"""
+Atomic credit accounting.
+
+Balances live on users.subscription_credits / users.credits. Every change is a
+single conditional UPDATE (`... WHERE credits >= n`), so two jobs can never
+spend the same credits and no row lock is held while a provider call runs.
+Subscription credits are always spent before purchased credits.
+
+Jobs reserve their worst-case cost up front, then commit credits for each
+completed step and release them for each failed step; close_reservation()
+hands back whatever is left. Every movement is appended to credit_ledger.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from auth_cache import invalidate_user_context
+from metrics import note_credits_spent
+from models import CreditLedgerEntry, CreditReservation, User
+
+logger = logging.getLogger(__name__)
+
+# The balance can move between reading it and the conditional UPDATE; re-read and retry this many times
+MAX_DEBIT_RETRIES = 5
+
+# Retries for optimistic-version conflicts on reservations settled by parallel steps
+MAX_UPDATE_RETRIES = 3
+
+
+def _debit(db: Session, user_id: str, amount: int) -> Optional[int]:
+    """Take credits in one conditional UPDATE (subscription first); returns the subscription part or None.
+
+    Writes nothing when it returns None, so the caller's pending changes are left alone.
+    """
+    for _ in range(MAX_DEBIT_RETRIES):
+        row = db.execute(
+            select(User.subscription_credits, User.credits).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        subscription, purchased = row.subscription_credits or 0, row.credits or 0
+        if subscription + purchased < amount:
+            return None
+
+        subscription_part = min(subscription, amount)
+        purchased_part = amount - subscription_part
+        result = db.execute(
+            update(User)
+            .where(
+                User.id == user_id,
+                func.coalesce(User.subscription_credits, 0) >= subscription_part,
+                func.coalesce(User.credits, 0) >= purchased_part,
+            )
+            .values(
+                subscription_credits=func.coalesce(User.subscription_credits, 0) - subscription_part,
+                credits=func.coalesce(User.credits, 0) - purchased_part,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return subscription_part
+    return None
+
+
+def _credit(db: Session, user_id: str, amount: int, subscription_part: int = 0):
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            subscription_credits=func.coalesce(User.subscription_credits, 0) + subscription_part,
+            credits=func.coalesce(User.credits, 0) + (amount - subscription_part),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _record(db: Session, user_id: str, kind: str, amount: int, subscription_part: int = 0,
+            reason: Optional[str] = None, reservation_id: Optional[str] = None):
+    db.add(CreditLedgerEntry(
+        user_id=user_id,
+        reservation_id=reservation_id,
+        kind=kind,
+        amount=amount,
+        subscription_amount=subscription_part,
+        reason=reason,
+    ))
+
+
+def _finish(db: Session, user_id: str):
+    # Commit expires loaded User objects, so callers re-read the new balance
+    db.commit()
+    invalidate_user_context(user_id)
+
+
+def charge_credits(db: Session, user_id: str, amount: int, reason: Optional[str] = None) -> bool:
+    """Spend credits immediately; False if the balance is too low"""
+    if amount <= 0:
+        return True
+    subscription_part = _debit(db, user_id, amount)
+    if subscription_part is None:
+        return False
+    _record(db, user_id, "charge", amount, subscription_part, reason)
+    _finish(db, user_id)
+    note_credits_spent(amount)
+    return True
+
+
+def grant_credits(db: Session, user_id: str, amount: int, reason: Optional[str] = None):
+    """Add purchased credits"""
+    _credit(db, user_id, amount)
+    _record(db, user_id, "purchase", amount, 0, reason)
+    _finish(db, user_id)
+
+
+def reserve_credits(db: Session, user_id: str, amount: int, reason: str) -> Optional[CreditReservation]:
+    """Hold credits for a job; None if the balance is too low"""
+    subscription_part = _debit(db, user_id, amount)
+    if subscription_part is None:
+        return None
+    reservation = CreditReservation(user_id=user_id, reason=reason, amount=amount, subscription_amount=subscription_part)
+    db.add(reservation)
+    db.flush()
+    _record(db, user_id, "reserve", amount, subscription_part, reason, reservation.id)
+    _finish(db, user_id)
+    return reservation
+
+
+def _settle(db: Session, reservation_id: str, amount: Optional[int], kind: str, close: bool = False) -> int:
+    """Commit or release part of a reservation; returns the credits actually settled"""
+    for attempt in range(MAX_UPDATE_RETRIES):
+        reservation = db.get(CreditReservation, reservation_id)
+        if reservation is None or reservation.status != "open":
+            return 0
+
+        remaining = reservation.amount - reservation.committed - reservation.released
+        settled = remaining if amount is None else max(0, min(amount, remaining))
+        # Held credits are consumed subscription-first, in the same order they were taken
+        used = reservation.committed + reservation.released
+        subscription_part = max(0, min(settled, reservation.subscription_amount - used))
+
+        if kind == "commit":
+            reservation.committed += settled
+        else:
+            reservation.released += settled
+            if settled:
+                _credit(db, reservation.user_id, settled, subscription_part)
+        if settled:
+            _record(db, reservation.user_id, kind, settled, subscription_part, reservation.reason, reservation.id)
+        if close or reservation.committed + reservation.released >= reservation.amount:
+            reservation.status = "closed"
+
+        try:
+            _finish(db, reservation.user_id)
+            if kind == "commit":
+                note_credits_spent(settled)
+            return settled
+        except StaleDataError:
+            db.rollback()
+            db.expire_all()
+            logger.warning(f"⚠️ Version conflict settling credit reservation {reservation_id} (attempt {attempt + 1}/{MAX_UPDATE_RETRIES})")
+    raise StaleDataError(f"Credit reservation {reservation_id} kept changing; gave up after {MAX_UPDATE_RETRIES} attempts")
+
+
+def commit_credits(db: Session, reservation_id: str, amount: int) -> int:
+    """Spend reserved credits for a completed step"""
+    return _settle(db, reservation_id, amount, "commit")
+
+
+def release_credits(db: Session, reservation_id: str, amount: int) -> int:
+    """Return reserved credits for a failed step"""
+    return _settle(db, reservation_id, amount, "release")
+
+
+def close_reservation(db: Session, reservation_id: str) -> int:
+    """Release whatever is still held and close the reservation (safe to call more than once)"""
+    return _settle(db, reservation_id, None, "release", close=True)
@@ -1,13 +1,61 @@
+from fastapi import Request
 from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.dml import UpdateBase
+import logging
 import os
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 # Database URL - use PostgreSQL in production, SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./aura_engine.db")
 
+# Optional read replica for the read-heavy GET endpoints (see get_async_read_db)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# Requests carrying this header read from the primary even where a replica is configured
+FRESH_READ_HEADER = "X-Fresh-Read"
+
+# Connection pool settings (PostgreSQL); defaults match SQLAlchemy's except pre-ping/recycle
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),  # seconds; drop connections before the server/proxy does
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+}
+
+
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # Enable WAL mode
+    cursor.execute("PRAGMA busy_timeout=30000")  # 30 second timeout
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Better performance
+    cursor.close()
+    logger.info("✅ SQLite WAL mode enabled for concurrent access")
+
+
+def async_database_url(url: str):
+    """Map the sync DATABASE_URL onto its async driver (aiosqlite / asyncpg)"""
+    parsed = make_url(url)
+    connect_args = {}
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite"), connect_args
+    if parsed.get_backend_name() in ("postgresql", "postgres"):
+        # asyncpg takes ssl as a connect arg rather than libpq's sslmode
+        query = dict(parsed.query)
+        sslmode = query.pop("sslmode", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        return parsed.set(drivername="postgresql+asyncpg", query=query), connect_args
+    return parsed, connect_args
+
 # Create engine
 if DATABASE_URL.startswith("sqlite"):
     # SQLite with WAL mode for better concurrency (allows reads during writes)
@@ -20,16 +68,9 @@ if DATABASE_URL.startswith("sqlite"):
     )
     
     # Enable WAL mode for concurrent reads/writes
-    @event.listens_for(engine, "connect")
-    def set_sqlite_pragma(dbapi_connection, connection_record):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA journal_mode=WAL")  # Enable WAL mode
-        cursor.execute("PRAGMA busy_timeout=30000")  # 30 second timeout
-        cursor.execute("PRAGMA synchronous=NORMAL")  # Better performance
-        cursor.close()
-        print("✅ SQLite WAL mode enabled for concurrent access")
+    event.listen(engine, "connect", _set_sqlite_pragma)
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **POOL_SETTINGS)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -42,12 +83,61 @@ def get_db():
     finally:
         db.close()
 
-def create_tables():
-    """Create all database tables"""
-    from models import Base
-    Base.metadata.create_all(bind=engine)
+def _create_async_engine(url: str):
+    async_url, connect_args = async_database_url(url)
+    if url.startswith("sqlite"):
+        # aiosqlite defaults to NullPool (a new connection + pragmas per request); keep connections open instead
+        async_engine = create_async_engine(
+            async_url,
+            connect_args={"timeout": 30},
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=POOL_SETTINGS["pool_size"],
+            max_overflow=POOL_SETTINGS["max_overflow"],
+        )
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragma)
+        return async_engine
+    return create_async_engine(async_url, connect_args=connect_args, **POOL_SETTINGS)
 
+# Async engine for read endpoints - queries no longer block the event loop
+async_engine = _create_async_engine(DATABASE_URL)
+read_async_engine = _create_async_engine(DATABASE_READ_URL) if DATABASE_READ_URL else None
 
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
 
+class ReplicaRoutingSession(Session):
+    """Reads go to the replica; flushes and Core writes go to the primary, and so does everything after them"""
 
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("use_primary") or self._flushing or isinstance(clause, UpdateBase):
+            # Stay on the primary so this session reads its own writes
+            self.info["use_primary"] = True
+            return async_engine.sync_engine
+        return read_async_engine.sync_engine
 
+ReadAsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=ReplicaRoutingSession, expire_on_commit=False, autoflush=False
+) if read_async_engine is not None else AsyncSessionLocal
+
+def pin_to_primary(db: AsyncSession):
+    """Send the rest of this session's statements to the primary (no-op without a replica)"""
+    db.sync_session.info["use_primary"] = True
+
+async def get_async_db():
+    """Dependency to get an async database session (primary)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    """Dependency for read-mostly GET endpoints: the replica when DATABASE_READ_URL is set.
+
+    Send `X-Fresh-Read: 1` to read from the primary instead (e.g. right after a write).
+    """
+    fresh = request.headers.get(FRESH_READ_HEADER, "").lower() in ("1", "true", "yes")
+    session_factory = AsyncSessionLocal if fresh else ReadAsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
+def create_tables():
+    """Create all database tables"""
+    from models import Base
+    Base.metadata.create_all(bind=engine)
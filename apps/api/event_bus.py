@@ -0,0 +1,396 @@
+"""
+Pub/sub bus for generation events.
+
+Pipelines publish to a channel (one per campaign) and streaming endpoints
+subscribe to it. Two implementations share one interface:
+
+  MemoryEventBus  channels live in this process - enough for a single worker
+  RedisEventBus   one Redis Stream per channel, so a job running on one
+                  uvicorn worker reaches clients connected to any other;
+                  used when REDIS_URL is set, with the memory bus as fallback
+
+Every channel keeps its last CHANNEL_BUFFER_SIZE events for replay from a
+Last-Event-ID. An event published with a coalesce_key (progress ticks)
+replaces the previous one with the same key, so ticks never push real
+events out of that buffer. Every subscriber gets a bounded buffer of
+SUBSCRIBER_BUFFER_SIZE events. Publishing never waits on subscribers: a
+subscriber that falls that far behind has its buffer dropped and is told it
+lagged, then catches up from the channel's replay buffer (or resyncs if that
+has moved on too). A slow client costs a bounded amount of memory and never
+slows the pipeline down.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from redis_fallback import RedisFallback
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Events kept per channel for replay
+CHANNEL_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "200"))
+
+# Events a subscriber may have queued before it is marked as lagging
+SUBSCRIBER_BUFFER_SIZE = int(os.getenv("EVENT_SUBSCRIBER_BUFFER_SIZE", "100"))
+
+# Channels quiet for this long (and without subscribers) are dropped
+CHANNEL_RETENTION_SECONDS = int(os.getenv("EVENT_RETENTION_SECONDS", str(60 * 60)))
+
+# Entries per XREAD; must stay below CHANNEL_BUFFER_SIZE so a partial batch proves no gap
+READ_BATCH_SIZE = 100
+
+# Streams whose latest coalesced entry ids this worker remembers (oldest forgotten first)
+MAX_COALESCED_STREAMS = 1000
+
+# Redis stream entry ids ("<ms>-<seq>"); memory ids are "m<epoch>-<seq>"
+_REDIS_ID = re.compile(r"^\d+-\d+$")
+
+
+class Subscription:
+    """A subscriber's bounded buffer; deliver() may be called from any thread"""
+
+    def __init__(self, bus, channel: str, buffer_size: int = SUBSCRIBER_BUFFER_SIZE):
+        self.channel = channel
+        self._bus = bus
+        self._buffer = deque()
+        self._buffer_size = buffer_size
+        self._lagged = False
+        self._lock = threading.Lock()
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    def deliver(self, message: dict):
+        with self._lock:
+            if self._lagged:
+                return
+            if len(self._buffer) >= self._buffer_size:
+                # Too far behind: drop the backlog, the reader catches up from the replay buffer
+                self._buffer.clear()
+                self._lagged = True
+            else:
+                self._buffer.append(message)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def mark_lagged(self):
+        """Events were lost upstream; the reader must catch up from the replay buffer"""
+        with self._lock:
+            self._buffer.clear()
+            self._lagged = True
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass
+
+    def _drain(self) -> Tuple[bool, List[dict]]:
+        with self._lock:
+            lagged, self._lagged = self._lagged, False
+            messages = list(self._buffer)
+            self._buffer.clear()
+        return lagged, messages
+
+    async def next_batch(self, timeout: float) -> Tuple[bool, List[dict]]:
+        """(lagged, messages) - waits up to timeout; (False, []) when nothing arrived"""
+        self._ready.clear()
+        lagged, messages = self._drain()
+        if lagged or messages:
+            return lagged, messages
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False, []
+        return self._drain()
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class _Channel:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.events = deque(maxlen=CHANNEL_BUFFER_SIZE)
+        self.next_seq = 1
+        self.evicted_through = 0  # highest seq pushed out of the buffer
+        self.coalesced: Dict[str, tuple] = {}  # coalesce_key -> its buffered entry
+        self.subscribers: Set[Subscription] = set()
+        self.touched_at = time.monotonic()
+
+
+class MemoryEventBus:
+    """Per-process channels (used when Redis is not configured)"""
+
+    def __init__(self):
+        self._channels: Dict[str, _Channel] = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, name: str) -> _Channel:
+        channel = self._channels.get(name)
+        if channel is None:
+            channel = self._channels[name] = _Channel()
+        return channel
+
+    def _prune(self):
+        cutoff = time.monotonic() - CHANNEL_RETENTION_SECONDS
+        for name in [n for n, c in self._channels.items() if c.touched_at < cutoff and not c.subscribers]:
+            del self._channels[name]
+
+    def publish(self, channel_name: str, event_type: str, data: dict, coalesce_key: Optional[str] = None) -> dict:
+        """Append an event and hand it to every subscriber.
+
+        An event with a coalesce_key replaces the previous one with that key in
+        the replay buffer (progress ticks can't push real events out of it).
+        """
+        with self._lock:
+            self._prune()
+            channel = self._channel(channel_name)
+            message = {"id": f"m{channel.epoch}-{channel.next_seq}", "event": event_type, "data": data}
+            entry = (channel.next_seq, coalesce_key, message)
+            channel.next_seq += 1
+            if coalesce_key:
+                previous = channel.coalesced.get(coalesce_key)
+                if previous is not None and previous in channel.events:
+                    channel.events.remove(previous)
+                channel.coalesced[coalesce_key] = entry
+            if len(channel.events) == channel.events.maxlen:
+                channel.evicted_through = channel.events[0][0]
+            channel.events.append(entry)
+            channel.touched_at = time.monotonic()
+            subscribers = list(channel.subscribers)
+        for subscription in subscribers:
+            subscription.deliver(message)
+        return message
+
+    def replay(self, channel_name: str, after_id: Optional[str] = None) -> Tuple[bool, List[dict]]:
+        """(complete, buffered events after after_id); complete is False when some were missed"""
+        with self._lock:
+            channel = self._channel(channel_name)
+            buffered = [(seq, message) for seq, _, message in channel.events]
+            if after_id is None:
+                return True, [message for _, message in buffered]
+            cursor = _parse_memory_id(after_id)
+            if cursor is None or cursor[0] != channel.epoch:
+                return False, [message for _, message in buffered]
+            seq = cursor[1]
+            complete = channel.evicted_through <= seq < channel.next_seq
+            return complete, [message for event_seq, message in buffered if event_seq > seq]
+
+    def is_after(self, event_id: str, cursor_id: Optional[str]) -> bool:
+        event, cursor = _parse_memory_id(event_id), _parse_memory_id(cursor_id)
+        if event is None or cursor is None or event[0] != cursor[0]:
+            return True
+        return event[1] > cursor[1]
+
+    def _attach(self, subscription: Subscription):
+        with self._lock:
+            self._channel(subscription.channel).subscribers.add(subscription)
+
+    def subscribe(self, channel_name: str) -> Subscription:
+        """Start buffering events published to a channel (call from the event loop)"""
+        subscription = Subscription(self, channel_name)
+        self._attach(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            channel = self._channels.get(subscription.channel)
+            if channel is not None:
+                channel.subscribers.discard(subscription)
+                channel.touched_at = time.monotonic()
+
+
+def _parse_memory_id(event_id: Optional[str]) -> Optional[Tuple[str, int]]:
+    if not event_id or not event_id.startswith("m"):
+        return None
+    epoch, _, seq = event_id[1:].rpartition("-")
+    try:
+        return epoch, int(seq)
+    except ValueError:
+        return None
+
+
+def _parse_redis_id(event_id: Optional[str]) -> Optional[Tuple[int, int]]:
+    if not event_id or not _REDIS_ID.match(event_id):
+        return None
+    ms, seq = event_id.split("-")
+    return int(ms), int(seq)
+
+
+class RedisEventBus:
+    """Channels as Redis Streams, shared by every worker.
+
+    Each worker runs one reader thread that blocks on XREAD for all channels
+    with local subscribers and fans entries out to their buffers, so a worker
+    holds one extra Redis connection however many clients it streams to.
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._reader = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=2)
+        self._fallback = MemoryEventBus()
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._cursors: Dict[str, str] = {}  # stream key -> last entry id read
+        self._coalesced: "OrderedDict[str, Dict[str, str]]" = OrderedDict()  # stream key -> coalesce_key -> entry id
+        self._lock = threading.Lock()
+        self._reader_thread: Optional[threading.Thread] = None
+        self._redis = RedisFallback(self._client, "event bus", "using in-process bus")
+
+    @staticmethod
+    def _key(channel_name: str) -> str:
+        return f"events:{channel_name}"
+
+    @staticmethod
+    def _decode(entry_id, fields: dict) -> dict:
+        fields = {key.decode(): value.decode() for key, value in fields.items()}
+        entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+        return {"id": entry_id, "event": fields["event"], "data": json.loads(fields["data"])}
+
+    def _replace_coalesced(self, key: str, coalesce_key: str, entry_id: Optional[str]) -> Optional[str]:
+        """Remember entry_id as the latest entry for coalesce_key; returns the one it replaces"""
+        with self._lock:
+            entries = self._coalesced.setdefault(key, {})
+            self._coalesced.move_to_end(key)
+            while len(self._coalesced) > MAX_COALESCED_STREAMS:
+                self._coalesced.popitem(last=False)
+            previous = entries.pop(coalesce_key, None)
+            if entry_id is not None:
+                entries[coalesce_key] = entry_id
+            return previous
+
+    def publish(self, channel_name: str, event_type: str, data: dict, coalesce_key: Optional[str] = None) -> dict:
+        if self._redis.available():
+            key = self._key(channel_name)
+            # The job publishing a channel's progress runs on this worker, so it knows the entry to replace
+            previous = self._replace_coalesced(key, coalesce_key, None) if coalesce_key else None
+            try:
+                pipe = self._client.pipeline(transaction=False)
+                if previous:
+                    pipe.xdel(key, previous)
+                pipe.xadd(key, {"event": event_type, "data": json.dumps(data, default=str)},
+                          maxlen=CHANNEL_BUFFER_SIZE, approximate=True)
+                pipe.expire(key, CHANNEL_RETENTION_SECONDS)
+                entry_id = pipe.execute()[-2].decode()
+                if coalesce_key:
+                    self._replace_coalesced(key, coalesce_key, entry_id)
+                # Local subscribers get it from the reader thread like everyone else
+                return {"id": entry_id, "event": event_type, "data": data}
+            except Exception as e:
+                self._redis.failed("publish", e)
+        return self._fallback.publish(channel_name, event_type, data, coalesce_key)
+
+    def replay(self, channel_name: str, after_id: Optional[str] = None) -> Tuple[bool, List[dict]]:
+        if after_id is not None and _parse_redis_id(after_id) is None:
+            return self._fallback.replay(channel_name, after_id)
+        if not self._redis.available():
+            return False, []
+        key = self._key(channel_name)
+        try:
+            if after_id is None:
+                return True, [self._decode(i, f) for i, f in self._client.xrange(key, "-", "+")]
+            pipe = self._client.pipeline(transaction=False)
+            pipe.xrange(key, "-", "+", count=1)
+            pipe.xrange(key, f"({after_id}", "+")
+            first, entries = pipe.execute()
+        except Exception as e:
+            self._redis.failed("replay", e)
+            return False, []
+        # Complete only if after_id is still inside the stream (nothing after it was trimmed)
+        complete = bool(first) and _parse_redis_id(first[0][0].decode()) <= _parse_redis_id(after_id)
+        return complete, [self._decode(i, f) for i, f in entries]
+
+    def is_after(self, event_id: str, cursor_id: Optional[str]) -> bool:
+        event, cursor = _parse_redis_id(event_id), _parse_redis_id(cursor_id)
+        if event is None or cursor is None:
+            return self._fallback.is_after(event_id, cursor_id)
+        return event > cursor
+
+    def subscribe(self, channel_name: str) -> Subscription:
+        subscription = Subscription(self, channel_name)
+        self._fallback._attach(subscription)
+        key = self._key(channel_name)
+        start_id = "0-0"
+        if self._redis.available():
+            try:
+                last = self._client.xrevrange(key, "+", "-", count=1)
+                if last:
+                    start_id = last[0][0].decode()
+            except Exception as e:
+                self._redis.failed("subscribe", e)
+        with self._lock:
+            self._subscriptions.setdefault(channel_name, set()).add(subscription)
+            self._cursors.setdefault(key, start_id)
+            if self._reader_thread is None or not self._reader_thread.is_alive():
+                self._reader_thread = threading.Thread(target=self._read_forever, name="event-bus-reader", daemon=True)
+                self._reader_thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._fallback.unsubscribe(subscription)
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+                    self._cursors.pop(self._key(subscription.channel), None)
+
+    def _read_forever(self):
+        while True:
+            with self._lock:
+                streams = dict(self._cursors)
+            if not streams or not self._redis.available():
+                time.sleep(0.5)
+                continue
+            try:
+                result = self._reader.xread(streams, count=READ_BATCH_SIZE, block=1000)
+            except Exception as e:
+                self._redis.failed("read", e)
+                continue
+            for key, entries in result or ():
+                key = key.decode()
+                channel_name = key[len("events:"):]
+                # XREAD skips silently over trimmed entries; only a full batch can be that far behind
+                gap = len(entries) == READ_BATCH_SIZE and self._trimmed_past(key, streams[key])
+                messages = [self._decode(entry_id, fields) for entry_id, fields in entries]
+                with self._lock:
+                    if key in self._cursors:
+                        self._cursors[key] = messages[-1]["id"]
+                    subscribers = list(self._subscriptions.get(channel_name, ()))
+                for subscription in subscribers:
+                    if gap:
+                        subscription.mark_lagged()
+                        continue
+                    for message in messages:
+                        subscription.deliver(message)
+
+    def _trimmed_past(self, key: str, entry_id: str) -> bool:
+        try:
+            first = self._reader.xrange(key, "-", "+", count=1)
+        except Exception:
+            return True
+        return bool(first) and _parse_redis_id(first[0][0].decode()) > _parse_redis_id(entry_id)
+
+
+def create_event_bus(redis_url: Optional[str] = None):
+    if redis_url:
+        try:
+            bus = RedisEventBus(redis_url)
+            logger.info("✅ Event bus using Redis")
+            return bus
+        except Exception as e:
+            logger.warning(f"⚠️ Redis event bus unavailable, using in-process bus: {e}")
+    return MemoryEventBus()
+
+
+event_bus = create_event_bus(REDIS_URL)
@@ -0,0 +1,318 @@
+"""
+Per-step provider records in the generations table.
+
+The pipelines used to keep their history only in Campaign.settings, so there
+was no way to ask how long a model takes or what it costs. Every Replicate
+prediction made through replicate_run() is now stored as a Generation row
+(mode "provider_step"):
+
+  * record_prediction()   model slug, prediction id, queue and run time,
+                          input hashes and output URL, attributed to the
+                          user / campaign in the log context
+  * note_upload()         the Cloudinary upload of that output: upload time
+                          and the stored URL
+  * attribute_credits()   credits committed for outputs, split across the
+                          steps that produced them
+
+Outputs are matched by URL through a bounded in-process map, so a process
+restart between a prediction and its upload only loses the upload time.
+step_stats() aggregates the rows into p50/p95 latency and cost per model: in
+SQL on PostgreSQL (percentile_disc), in Python on SQLite over at most the
+newest MAX_STATS_ROWS steps of the window.
+"""
+import hashlib
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SessionLocal
+from log_config import get_log_context
+from metrics import prediction_queue_seconds, prediction_run_seconds
+from models import Campaign, Generation
+
+logger = logging.getLogger(__name__)
+
+STEP_MODE = "provider_step"
+
+# Output / stored URL -> generation id, for uploads and credits that happen after the prediction
+MAX_TRACKED_OUTPUTS = 4096
+
+# Stored prompts are for reference only
+MAX_PROMPT_LENGTH = 2000
+
+# Rows the Python (SQLite) aggregation reads per call; older steps in the window are left out
+MAX_STATS_ROWS = 20000
+
+_outputs: "OrderedDict[str, str]" = OrderedDict()
+_outputs_lock = threading.Lock()
+
+
+def _track_output(url: Optional[str], generation_id: str):
+    if not url:
+        return
+    with _outputs_lock:
+        _outputs[url] = generation_id
+        _outputs.move_to_end(url)
+        while len(_outputs) > MAX_TRACKED_OUTPUTS:
+            _outputs.popitem(last=False)
+
+
+def _tracked(url: Optional[str]) -> Optional[str]:
+    if not isinstance(url, str):
+        return None
+    with _outputs_lock:
+        return _outputs.get(url)
+
+
+def input_hashes(input: Optional[dict]) -> Dict[str, str]:
+    """sha256 prefix per input value (URLs and data URLs alike), to spot repeated inputs"""
+    return {
+        key: hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        for key, value in (input or {}).items()
+    }
+
+
+def output_url(output) -> Optional[str]:
+    """First URL of a Replicate output (a URL, a list of URLs or a file object)"""
+    if isinstance(output, (list, tuple)):
+        output = output[0] if output else None
+    if output is None:
+        return None
+    url = getattr(output, "url", output)
+    return url if isinstance(url, str) else str(url)
+
+
+def _first_image_url(input: dict) -> Optional[str]:
+    for key in ("image", "input_image", "model_image", "image_input", "reference_images", "garment_image"):
+        value = input.get(key)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if isinstance(value, str) and value.startswith("http"):
+            return value
+    return None
+
+
+def record_prediction(model: str, prediction, input: Optional[dict]) -> Optional[str]:
+    """Store a finished prediction as a provider step; returns the row id (None when no user is in context)"""
+    context = get_log_context()
+    user_id, campaign_id = context.get("user_id"), context.get("campaign_id")
+    input = input or {}
+    url = output_url(prediction.output) if prediction.status == "succeeded" else None
+    db = SessionLocal()
+    try:
+        if user_id is None and campaign_id:
+            user_id = db.execute(select(Campaign.user_id).where(Campaign.id == campaign_id)).scalar_one_or_none()
+        if user_id is None:
+            logger.debug(f"No user in context, not recording prediction {prediction.id}")
+            return None
+        row = Generation(
+            user_id=user_id,
+            campaign_id=campaign_id,
+            mode=STEP_MODE,
+            prompt=str(input.get("prompt") or "")[:MAX_PROMPT_LENGTH],
+            settings={key: context[key] for key in ("job_id", "node", "request_id") if key in context},
+            input_image_url=_first_image_url(input),
+            output_urls=[url] if url else [],
+            status="completed" if prediction.status == "succeeded" else "failed",
+            credits_used=0,
+            provider_model=model,
+            prediction_id=prediction.id,
+            queue_seconds=prediction_queue_seconds(prediction),
+            run_seconds=prediction_run_seconds(prediction),
+            input_hashes=input_hashes(input),
+            completed_at=datetime.utcnow(),
+        )
+        db.add(row)
+        db.commit()
+        _track_output(url, row.id)
+        return row.id
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"⚠️ Failed to record provider step {model} ({prediction.id}): {e}")
+        return None
+    finally:
+        db.close()
+
+
+def note_upload(source_url: Optional[str], stored_url: Optional[str], seconds: float):
+    """Add the upload of a provider output to its step (no-op for URLs no step produced)"""
+    generation_id = _tracked(source_url)
+    if generation_id is None or not stored_url or stored_url == source_url:
+        return
+    db = SessionLocal()
+    try:
+        row = db.get(Generation, generation_id)
+        if row is None:
+            return
+        row.upload_seconds = (row.upload_seconds or 0) + seconds
+        row.output_urls = [stored_url]
+        db.commit()
+        _track_output(stored_url, generation_id)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"⚠️ Failed to record upload for provider step {generation_id}: {e}")
+    finally:
+        db.close()
+
+
+def attribute_credits(urls: Iterable[Optional[str]], credits: int):
+    """Split credits committed for these outputs across the provider steps that produced them"""
+    generation_ids = [generation_id for generation_id in map(_tracked, urls) if generation_id]
+    if not generation_ids or credits <= 0:
+        return
+    share, remainder = divmod(credits, len(generation_ids))
+    db = SessionLocal()
+    try:
+        for index, generation_id in enumerate(generation_ids):
+            row = db.get(Generation, generation_id)
+            if row is not None:
+                row.credits_used = (row.credits_used or 0) + share + (1 if index < remainder else 0)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"⚠️ Failed to attribute {credits} credits to provider steps: {e}")
+    finally:
+        db.close()
+
+
+# ---------- Aggregation ----------
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def _latency(values: List[Optional[float]]) -> dict:
+    present = sorted(value for value in values if value is not None)
+    return {
+        "p50": percentile(present, 0.50),
+        "p95": percentile(present, 0.95),
+        "max": present[-1] if present else None,
+    }
+
+
+def _bucket_start(moment: datetime, bucket: str) -> datetime:
+    if bucket == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _total_seconds(queue, run, upload) -> Optional[float]:
+    """Queue + run + upload time of a step (None until it has a run time)"""
+    if run is None:
+        return None
+    return sum(part for part in (queue, run, upload) if part is not None)
+
+
+def _stats_entry(model_slug, bucket_start: Optional[datetime], steps: int, failed: int, credits: int,
+                 latency: Dict[str, dict], sampled: bool) -> dict:
+    return {
+        "model": model_slug,
+        "bucket_start": bucket_start.isoformat() if bucket_start else None,
+        "steps": steps,
+        "failed": failed,
+        **latency,
+        "credits": credits,
+        "credits_per_step": round(credits / steps, 3) if steps else 0,
+        "sampled": sampled,
+    }
+
+
+async def step_stats(db: AsyncSession, since: datetime, bucket: Optional[str] = None,
+                     user_id: Optional[str] = None, model: Optional[str] = None) -> List[dict]:
+    """p50/p95 latency and cost per model (and per hour/day bucket) for provider steps since `since`"""
+    filters = [Generation.mode == STEP_MODE, Generation.created_at >= since]
+    if user_id:
+        filters.append(Generation.user_id == user_id)
+    if model:
+        filters.append(Generation.provider_model == model)
+
+    if db.get_bind().dialect.name == "postgresql":
+        return await _step_stats_sql(db, filters, bucket)
+    return await _step_stats_python(db, filters, since, bucket)
+
+
+async def _step_stats_sql(db: AsyncSession, filters: list, bucket: Optional[str]) -> List[dict]:
+    """Aggregate in the database; percentile_disc matches percentile()'s nearest rank"""
+    total = case(
+        (Generation.run_seconds.isnot(None),
+         Generation.run_seconds + func.coalesce(Generation.queue_seconds, 0) + func.coalesce(Generation.upload_seconds, 0)),
+    )
+    # A literal unit, so the SELECT and GROUP BY expressions are identical (bound parameters would differ)
+    bucket_start = func.date_trunc(literal_column("'day'" if bucket == "day" else "'hour'"), Generation.created_at) \
+        if bucket else None
+    latency_columns = {
+        "queue_seconds": Generation.queue_seconds,
+        "run_seconds": Generation.run_seconds,
+        "upload_seconds": Generation.upload_seconds,
+        "total_seconds": total,
+    }
+    columns = [
+        Generation.provider_model.label("model"),
+        func.count().label("steps"),
+        func.count().filter(Generation.status == "failed").label("failed"),
+        func.coalesce(func.sum(Generation.credits_used), 0).label("credits"),
+    ]
+    for name, column in latency_columns.items():
+        columns += [
+            func.percentile_disc(0.50).within_group(column).label(f"{name}_p50"),
+            func.percentile_disc(0.95).within_group(column).label(f"{name}_p95"),
+            func.max(column).label(f"{name}_max"),
+        ]
+    group_by = [Generation.provider_model]
+    if bucket_start is not None:
+        columns.append(bucket_start.label("bucket_start"))
+        group_by.append(bucket_start)
+    query = select(*columns).where(*filters).group_by(*group_by).order_by(*group_by)
+
+    stats = []
+    for row in (await db.execute(query)).mappings():
+        latency = {
+            name: {stat: row[f"{name}_{stat}"] for stat in ("p50", "p95", "max")}
+            for name in latency_columns
+        }
+        stats.append(_stats_entry(row["model"], row.get("bucket_start"), row["steps"], row["failed"],
+                                  int(row["credits"]), latency, sampled=False))
+    return stats
+
+
+async def _step_stats_python(db: AsyncSession, filters: list, since: datetime, bucket: Optional[str]) -> List[dict]:
+    query = select(
+        Generation.provider_model, Generation.created_at, Generation.status, Generation.credits_used,
+        Generation.queue_seconds, Generation.run_seconds, Generation.upload_seconds,
+    ).where(*filters).order_by(Generation.created_at.desc()).limit(MAX_STATS_ROWS + 1)
+    rows = (await db.execute(query)).all()
+    sampled = len(rows) > MAX_STATS_ROWS
+    if sampled:
+        rows = rows[:MAX_STATS_ROWS]
+        logger.info(f"📊 Step stats read the newest {MAX_STATS_ROWS} steps of the window only")
+
+    groups: Dict[tuple, list] = {}
+    for row in rows:
+        key = (row.provider_model, _bucket_start(row.created_at, bucket) if bucket else None)
+        groups.setdefault(key, []).append(row)
+
+    stats = []
+    for (model_slug, bucket_start), rows in sorted(groups.items(), key=lambda item: (item[0][0] or "", item[0][1] or since)):
+        latency = {
+            "queue_seconds": _latency([row.queue_seconds for row in rows]),
+            "run_seconds": _latency([row.run_seconds for row in rows]),
+            "upload_seconds": _latency([row.upload_seconds for row in rows]),
+            "total_seconds": _latency([
+                _total_seconds(row.queue_seconds, row.run_seconds, row.upload_seconds) for row in rows
+            ]),
+        }
+        stats.append(_stats_entry(
+            model_slug, bucket_start, len(rows), sum(1 for row in rows if row.status == "failed"),
+            sum(row.credits_used or 0 for row in rows), latency, sampled,
+        ))
+    return stats
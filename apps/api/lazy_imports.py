@@ -0,0 +1,59 @@
+"""
+Deferred imports for heavy SDKs.
+
+stripe, replicate, cloudinary and PIL used to be imported (and configured)
+when main_simple was loaded, adding about a second to every cold start even
+though no request needs them until it calls a provider. A LazyModule stands
+in for the module: the real import happens on first attribute access, and an
+optional configure hook runs once right after it (API keys and the like).
+
+Submodules resolve on demand too, so `cloudinary.uploader.upload(...)` works
+without importing cloudinary.uploader up front.
+"""
+import importlib
+import threading
+from typing import Callable, Optional
+
+
+class LazyModule:
+    """Module proxy that imports `name` on first use"""
+
+    def __init__(self, name: str, configure: Optional[Callable] = None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_configure", configure)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is not None:
+            return module
+        with self._lock:
+            if self._module is None:
+                module = importlib.import_module(self._name)
+                if self._configure is not None:
+                    self._configure(module)
+                object.__setattr__(self, "_module", module)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        module = self._load()
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            # Not imported by the package itself - try it as a submodule
+            try:
+                return importlib.import_module(f"{self._name}.{attr}")
+            except ImportError:
+                raise AttributeError(f"module '{self._name}' has no attribute '{attr}'") from None
+
+    def __setattr__(self, attr: str, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str, configure: Optional[Callable] = None) -> LazyModule:
+    return LazyModule(name, configure)
@@ -0,0 +1,194 @@
+"""
+Structured logging for the API and its background jobs.
+
+The API used to print() everything - several hundred calls, many of them on
+per-image and per-shot paths - straight to stdout from the event loop.
+Modules now log through the standard `logging` module and setup_logging()
+installs:
+
+  * a queue handler - emitting only enqueues the record; a listener thread
+    does the formatting and the blocking write. When the queue is full,
+    records are dropped (and counted) rather than stalling a request.
+  * JSON lines (LOG_FORMAT=json, the default) or plain text (LOG_FORMAT=text).
+  * context ids - request_id, campaign_id, job_id (pipeline run) and
+    prediction_id (Replicate) bound with log_context()/bind_log_context()
+    are added to every record logged in that context, including from worker
+    threads started with asyncio.to_thread.
+  * per-logger levels - LOG_LEVEL for the root, LOG_LEVELS for overrides,
+    e.g. "pipeline=WARNING,main_simple.steps=DEBUG".
+  * sampling - per-step chatter goes to "<module>.steps" loggers, of which
+    only LOG_STEP_SAMPLE_RATE (default 0.1) of the records below WARNING are
+    kept.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+STEP_LOGGER_SUFFIX = ".steps"
+
+_log_context: contextvars.ContextVar = contextvars.ContextVar("log_context", default={})
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+dropped_records = 0
+
+
+# ---------- Context ----------
+
+def get_log_context() -> dict:
+    return _log_context.get()
+
+
+def bind_log_context(**ids) -> contextvars.Token:
+    """Add ids to the current context (the rest of this task / request); None values are ignored"""
+    return _log_context.set({**_log_context.get(), **{key: value for key, value in ids.items() if value is not None}})
+
+
+@contextmanager
+def log_context(**ids):
+    """Add ids to the log context for the duration of the block"""
+    token = bind_log_context(**ids)
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class RequestIdMiddleware:
+    """Binds a request_id (the client's X-Request-ID, or a new one) for everything logged while serving a request
+
+    identify(headers) may add more ids (e.g. the caller's user_id) from the request headers.
+    """
+
+    def __init__(self, app, identify: Optional[Callable[[dict], dict]] = None):
+        self.app = app
+        self.identify = identify
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers", ())}
+        request_id = headers.get("x-request-id", "")[:64] or uuid.uuid4().hex[:16]
+        ids = self.identify(headers) if self.identify else {}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-request-id", request_id.encode("latin-1")))
+            await send(message)
+
+        with log_context(request_id=request_id, **ids):
+            await self.app(scope, receive, send_with_id)
+
+
+# ---------- Handlers, filters, formatters ----------
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with their message and log context resolved in the emitting thread"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.context = _log_context.get()
+        return record
+
+    def enqueue(self, record):
+        global dropped_records
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records += 1
+
+
+class StepSampler(logging.Filter):
+    """Keeps a fraction of the records below WARNING from "*.steps" loggers"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.WARNING or not record.name.endswith(STEP_LOGGER_SUFFIX):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        context = getattr(record, "context", {})
+        line = super().format(record)
+        if context:
+            line += " [" + " ".join(f"{key}={value}" for key, value in context.items()) + "]"
+        return line
+
+
+# ---------- Setup ----------
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Install the queue handler on the root logger (idempotent)"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        if os.getenv("LOG_FORMAT", "json").lower() == "text":
+            formatter = TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        else:
+            formatter = JsonFormatter()
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(formatter)
+
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        queue_handler = ContextQueueHandler(log_queue)
+        queue_handler.addFilter(StepSampler(float(os.getenv("LOG_STEP_SAMPLE_RATE", "0.1"))))
+
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
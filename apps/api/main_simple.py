@@ -3,63 +3,121 @@
 Simple working version for debugging
 Updated: Fixed Vella 1.5 API parameter (garment_image)
 """
-from fastapi import FastAPI, HTTPException, Depends, Request, Form, File, UploadFile, Query
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Form, File, UploadFile, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
 from sqlalchemy.orm.attributes import flag_modified
-from database import SessionLocal, create_tables
+from database import SessionLocal, AsyncSessionLocal, get_async_db, get_async_read_db
 from models import User, Product, Model, Scene, Campaign, Generation
-from schemas import UserCreate, UserResponse, Token, ProductResponse, ModelResponse, SceneResponse, CampaignResponse, ChangePasswordRequest
-from auth import get_current_user, create_access_token, verify_password, get_password_hash
+from schemas import UserCreate, UserResponse, Token, ProductResponse, ModelResponse, SceneResponse, CampaignResponse, CampaignSummaryResponse, ChangePasswordRequest, Page
+from auth import get_current_user, get_current_user_async, get_current_user_claims, get_stream_user_claims, create_access_token, verify_password, get_password_hash, user_id_from_authorization
+from campaign_assets import (
+    add_campaign_image, add_campaign_images, get_campaign_images, count_campaign_images,
+    find_campaign_image_by_url, update_campaign_image, delete_campaign_image_at,
+    get_campaign_videos, replace_campaign_videos, clear_campaign_videos,
+    load_campaign_assets_async, campaign_settings_with_assets, campaign_summary_select, summary_row_to_dict,
+    campaign_state_select, load_campaign_assets_since_async
+)
+from auth_cache import invalidate_user_context
+from credit_ledger import (
+    close_reservation,
+    commit_credits,
+    grant_credits,
+    release_credits,
+    reserve_credits,
+)
+from progress_store import set_progress, get_progress, get_all_progress
+from campaign_events import campaign_event_stream, format_sse, note_campaign_status
+from pipeline import Node, Pipeline, Ref, register_step, run_limited, run_pipeline
+from base_library import (
+    base_to_dict, composition_key, find_base, get_base, list_bases, remember_base, touch_base
+)
+from user_stats import get_user_stats_async
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate_select
 from datetime import datetime, timedelta
 import os
 import json
 import uuid
-import stripe
-import replicate
+import threading
 import base64
+import hashlib
 import mimetypes
+import time
 import requests
-from typing import List, Optional
+from typing import List, Optional, Union
 from io import BytesIO
-from PIL import Image, ImageFilter, ImageOps
 from pydantic import BaseModel
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+from lazy_imports import lazy_import
+from log_config import RequestIdMiddleware, bind_log_context, log_context, setup_logging
+from metrics import METRICS_TOKEN, metrics_authorized, observe_prediction, render_metrics, setup_tracing, timed, track_job
+from generation_log import attribute_credits, note_upload, record_prediction, step_stats
+import logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+# Per-step chatter (sampled, see log_config)
+step_logger = logging.getLogger(f"{__name__}.steps")
 
 # Environment variables
 REPLICATE_API_TOKEN = os.getenv("REPLICATE_API_TOKEN")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY", "")
 
-# Initialize Stripe
-if STRIPE_SECRET_KEY:
-    stripe.api_key = STRIPE_SECRET_KEY
-else:
-    print("⚠️ STRIPE_SECRET_KEY not set - Stripe features will not work")
-
 # Cloudinary configuration
 CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 
-# Configure Cloudinary
-print(f"🔍 DEBUG: CLOUDINARY_CLOUD_NAME = {CLOUDINARY_CLOUD_NAME}")
-print(f"🔍 DEBUG: CLOUDINARY_API_KEY = {CLOUDINARY_API_KEY}")
-print(f"🔍 DEBUG: CLOUDINARY_API_SECRET = {'*' * len(CLOUDINARY_API_SECRET) if CLOUDINARY_API_SECRET else None}")
+if not STRIPE_SECRET_KEY:
+    logger.warning("⚠️ STRIPE_SECRET_KEY not set - Stripe features will not work")
+if not (CLOUDINARY_CLOUD_NAME and CLOUDINARY_API_KEY and CLOUDINARY_API_SECRET):
+    logger.warning("⚠️ Cloudinary not configured - using local storage fallback")
+    logger.warning(f"Missing: CLOUD_NAME={bool(CLOUDINARY_CLOUD_NAME)}, API_KEY={bool(CLOUDINARY_API_KEY)}, API_SECRET={bool(CLOUDINARY_API_SECRET)}")
 
-if CLOUDINARY_CLOUD_NAME and CLOUDINARY_API_KEY and CLOUDINARY_API_SECRET:
-    cloudinary.config(
-        cloud_name=CLOUDINARY_CLOUD_NAME,
-        api_key=CLOUDINARY_API_KEY,
-        api_secret=CLOUDINARY_API_SECRET
-    )
-    print("✅ Cloudinary configured successfully")
-else:
-    print("⚠️ Cloudinary not configured - using local storage fallback")
-    print(f"   Missing: CLOUD_NAME={bool(CLOUDINARY_CLOUD_NAME)}, API_KEY={bool(CLOUDINARY_API_KEY)}, API_SECRET={bool(CLOUDINARY_API_SECRET)}")
+
+def _configure_stripe(module):
+    module.api_key = STRIPE_SECRET_KEY
+
+
+def _configure_cloudinary(module):
+    if CLOUDINARY_CLOUD_NAME and CLOUDINARY_API_KEY and CLOUDINARY_API_SECRET:
+        module.config(
+            cloud_name=CLOUDINARY_CLOUD_NAME,
+            api_key=CLOUDINARY_API_KEY,
+            api_secret=CLOUDINARY_API_SECRET
+        )
+
+
+# Heavy SDKs load on first use instead of at import (see lazy_imports.py)
+stripe = lazy_import("stripe", _configure_stripe)
+replicate = lazy_import("replicate")
+cloudinary = lazy_import("cloudinary", _configure_cloudinary)
+Image = lazy_import("PIL.Image")
+ImageFilter = lazy_import("PIL.ImageFilter")
+ImageOps = lazy_import("PIL.ImageOps")
+
+
+def replicate_run(ref: str, input: Optional[dict] = None, **params):
+    """replicate.run() for "owner/name[:version]" refs, logging with the prediction id in context"""
+    model, _, version_id = ref.partition(":")
+    if version_id:
+        prediction = replicate.predictions.create(version=version_id, input=input or {}, **params)
+    else:
+        prediction = replicate.models.predictions.create(model=model, input=input or {}, **params)
+    with log_context(prediction_id=prediction.id, model=model), timed("provider", model):
+        step_logger.info("Replicate prediction started")
+        prediction.wait()
+        observe_prediction(model, prediction)
+        record_prediction(model, prediction, input)
+        if prediction.status == "failed":
+            logger.warning(f"⚠️ Replicate prediction failed: {prediction.error}")
+            raise replicate.exceptions.ModelError(prediction.error)
+        step_logger.info(f"Replicate prediction {prediction.status}")
+    return prediction.output
 
 def convert_localhost_video_urls(settings: dict) -> dict:
     """
@@ -103,6 +161,12 @@ def get_static_url(filename: str) -> str:
     """Generate a static file URL"""
     return f"{get_base_url()}/static/{filename}"
 
+def is_stable_url(url) -> bool:
+    """Cloudinary or our own /static URL (safe to keep; replicate.delivery URLs expire)"""
+    return isinstance(url, str) and (
+        url.startswith("https://res.cloudinary.com/") or url.startswith(get_base_url() + "/static/")
+    )
+
 def stabilize_url(url: str, prefix: str) -> str:
     """
     Persist ephemeral (replicate.delivery) or data URLs to Cloudinary and return a stable URL.
@@ -112,7 +176,7 @@ def stabilize_url(url: str, prefix: str) -> str:
         if not isinstance(url, str):
             return url
         # Already stable (Cloudinary or static)
-        if url.startswith("https://res.cloudinary.com/") or url.startswith(get_base_url() + "/static/"):
+        if is_stable_url(url):
             return url
         # Data URL → upload to Cloudinary
         if url.startswith("data:image/"):
@@ -123,7 +187,7 @@ def stabilize_url(url: str, prefix: str) -> str:
         # Other http(s) URLs: leave as-is
         return url
     except Exception as e:
-        print(f"stabilize_url failed for {url[:120] if isinstance(url, str) else url}...: {e}")
+        logger.error(f"stabilize_url failed for {url[:120] if isinstance(url, str) else url}...: {e}")
         return url
 
 def get_model_url(gender: str) -> str:
@@ -159,12 +223,8 @@ def to_url(value: object) -> str:
     except Exception:
         return str(value)
 
-STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./aura_engine.db")
 
-# Configure Stripe
-stripe.api_key = STRIPE_SECRET_KEY
-
 # Pydantic models
 class LoginRequest(BaseModel):
     email: str
@@ -180,91 +240,57 @@ app = FastAPI(title="Aura API", version="1.0.0")
 # Cache for pose image URLs (Cloudinary URLs)
 POSE_IMAGE_URLS = {}
 
-def upload_pose_images_to_cloudinary():
-    """Upload pose images to Cloudinary on startup"""
-    global POSE_IMAGE_URLS
+@timed("storage", "cloudinary_upload")
+def _upload_pose_asset(pose_path: str, public_id: str) -> str:
+    """Upload a pose image under a content-derived public id (idempotent across workers)"""
+    if not (CLOUDINARY_CLOUD_NAME and CLOUDINARY_API_KEY and CLOUDINARY_API_SECRET):
+        return get_static_url(f"poses/{os.path.basename(pose_path)}")
+    result = cloudinary.uploader.upload(
+        pose_path,
+        folder="poses",
+        public_id=public_id,
+        overwrite=False,
+        resource_type="image"
+    )
+    return result['secure_url']
+
+def load_pose_image_urls():
+    """Populate POSE_IMAGE_URLS from the persisted pose manifest (no network calls)"""
+    from pose_assets import load_pose_urls
     try:
-        if not CLOUDINARY_CLOUD_NAME or not CLOUDINARY_API_KEY or not CLOUDINARY_API_SECRET:
-            print("⚠️ Cloudinary not configured - pose images will use local static URLs")
-            return
-        
-        import os
-        api_dir = os.path.dirname(os.path.abspath(__file__))
-        poses_dir = os.path.join(api_dir, "static", "poses")
-        
-        if not os.path.exists(poses_dir):
-            print(f"⚠️ Poses directory not found: {poses_dir}")
-            return
-        
-        pose_files = ["Pose-neutral.jpg", "Pose-handneck.jpg", "Pose-thinking.jpg"]
-        
-        for pose_file in pose_files:
-            pose_path = os.path.join(poses_dir, pose_file)
-            if os.path.exists(pose_path):
-                try:
-                    # Read file and upload to Cloudinary
-                    with open(pose_path, "rb") as f:
-                        file_content = f.read()
-                        import base64
-                        ext = pose_file.split('.')[-1]
-                        data_url = f"data:image/{ext};base64,{base64.b64encode(file_content).decode()}"
-                        cloudinary_url = upload_to_cloudinary(data_url, "poses")
-                        POSE_IMAGE_URLS[pose_file] = cloudinary_url
-                        print(f"✅ Uploaded {pose_file} to Cloudinary: {cloudinary_url[:50]}...")
-                except Exception as e:
-                    print(f"⚠️ Failed to upload {pose_file} to Cloudinary: {e}")
-                    print(f"⚠️ Will try to upload on-demand when needed")
-                    # Don't set fallback URL - we'll upload on-demand
-                    POSE_IMAGE_URLS[pose_file] = None
-            else:
-                print(f"⚠️ Pose file not found: {pose_path}")
-                print(f"⚠️ Will try to upload on-demand when needed")
-                # Don't set fallback URL - we'll upload on-demand
-                POSE_IMAGE_URLS[pose_file] = None
-        
-        print(f"✅ Pose images initialized: {len(POSE_IMAGE_URLS)} poses")
+        POSE_IMAGE_URLS.update(load_pose_urls())
+        ready = sum(1 for url in POSE_IMAGE_URLS.values() if url)
+        logger.info(f"✅ Pose images initialized from manifest: {ready}/{len(POSE_IMAGE_URLS)} poses have stable URLs")
     except Exception as e:
-        print(f"⚠️ Error uploading pose images to Cloudinary: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.warning(f"⚠️ Error loading pose manifest: {e}")
+
+def get_pose_image_url(pose_filename: str) -> str:
+    """Get the Cloudinary URL for a pose, uploading it once and recording it in the manifest on a miss"""
+    from pose_assets import resolve_pose_url
+    cached_url = POSE_IMAGE_URLS.get(pose_filename)
+    if cached_url and cached_url.startswith("https://res.cloudinary.com/"):
+        return cached_url
+    pose_url = resolve_pose_url(pose_filename, _upload_pose_asset)
+    POSE_IMAGE_URLS[pose_filename] = pose_url
+    return pose_url
 
 @app.on_event("startup")
 async def startup_event():
+    setup_tracing()
     try:
-        print("🔧 MODEL GENERATION: Using external URLs - NO LOCAL FILES")
-        print("🗄️ Creating database tables...")
-        create_tables()
-        print("✅ Database tables created successfully")
-        
-        # Run migration for subscription columns if needed
-        try:
-            from migrate_subscription_columns import migrate_subscription_columns
-            print("🔄 Running subscription columns migration...")
-            migrate_subscription_columns()
-        except Exception as migration_error:
-            print(f"⚠️ Migration error (may be OK if columns already exist): {migration_error}")
-        
-        # Test database connection
-        from sqlalchemy import text
+        # Migrations run as a deploy step (`alembic upgrade head`); boot only checks the revision
         from database import engine
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
-            print("✅ Database connection test successful")
+        from schema_version import check_schema
+        if not check_schema(engine, DATABASE_URL):
+            logger.warning("⚠️ Serving with an outdated database schema - requests touching new tables will fail")
         
-        # Upload pose images to Cloudinary (non-blocking, don't fail startup if this fails)
-        print("🖼️ Uploading pose images to Cloudinary...")
-        try:
-            upload_pose_images_to_cloudinary()
-        except Exception as pose_error:
-            print(f"⚠️ Pose image upload failed (non-critical): {pose_error}")
-            print("⚠️ Continuing startup - pose images will use fallback URLs")
+        # Resolve pose image URLs from the persisted manifest; missing poses upload lazily on first use
+        load_pose_image_urls()
         
-        print("✅ Application startup complete")
+        logger.info("✅ Application startup complete")
             
     except Exception as e:
-        print(f"❌ Critical startup error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Critical startup error: {e}")
         # Don't raise - let the app start even if there are non-critical errors
         # Only raise for truly critical errors that prevent the app from functioning
         if "database" in str(e).lower() or "connection" in str(e).lower():
@@ -286,7 +312,7 @@ allowed_origins = (
     ]
 )
 
-print(f"🌐 CORS allowed origins: {allowed_origins}")
+logger.info(f"🌐 CORS allowed origins: {allowed_origins}")
 
 app.add_middleware(
     CORSMiddleware,
@@ -295,6 +321,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestIdMiddleware, identify=lambda headers: {"user_id": user_id_from_authorization(headers.get("authorization"))})
 
 # Config
 DISABLE_PLACEHOLDERS = True
@@ -307,6 +334,19 @@ def get_db():
     finally:
         db.close()
 
+def campaign_to_response(db: Session, campaign: Campaign, assets: Optional[dict] = None) -> CampaignResponse:
+    """Build a CampaignResponse with generated_images/videos loaded from their tables"""
+    return CampaignResponse(
+        id=campaign.id,
+        name=campaign.name,
+        description=campaign.description,
+        status=campaign.status,
+        generation_status=campaign.generation_status or "idle",
+        settings=campaign_settings_with_assets(db, campaign, assets),
+        created_at=campaign.created_at,
+        updated_at=campaign.updated_at
+    )
+
 # ---------- API Endpoints ----------
 @app.get("/")
 async def root():
@@ -316,18 +356,28 @@ async def root():
 async def health():
     return {"status": "healthy", "message": "Aura API is running"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus metrics (see metrics.py); needs METRICS_TOKEN as a bearer token"""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not metrics_authorized(authorization):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
+
 @app.get("/poses")
 async def get_pose_urls():
     """Get URLs for all pose images (Cloudinary URLs if available, otherwise static URLs) - Public endpoint"""
-    global POSE_IMAGE_URLS
-    # If poses haven't been uploaded yet, try to get static URLs
-    if not POSE_IMAGE_URLS:
-        pose_files = ["Pose-neutral.jpg", "Pose-handneck.jpg", "Pose-thinking.jpg"]
-        for pose_file in pose_files:
-            POSE_IMAGE_URLS[pose_file] = get_static_url(f"poses/{pose_file}")
+    from pose_assets import POSE_FILES
+    # Poses without a manifest entry yet are served from static until first use uploads them
+    poses = {
+        pose_file: POSE_IMAGE_URLS.get(pose_file) or get_static_url(f"poses/{pose_file}")
+        for pose_file in POSE_FILES
+    }
     
     return {
-        "poses": POSE_IMAGE_URLS,
+        "poses": poses,
         "base_url": get_base_url()
     }
 
@@ -433,28 +483,28 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     """Login user"""
     try:
-        print(f"🔐 Login attempt for email: {login_data.email}")
+        logger.info(f"🔐 Login attempt for email: {login_data.email}")
         email = login_data.email
         password = login_data.password
         
-        print(f"🔍 Querying database for user...")
+        logger.info(f"🔍 Querying database for user...")
         user = db.query(User).filter(User.email == email).first()
-        print(f"👤 User found: {user is not None}")
+        logger.info(f"👤 User found: {user is not None}")
         
         if not user:
-            print(f"❌ User not found for email: {email}")
+            logger.error(f"❌ User not found for email: {email}")
             raise HTTPException(status_code=401, detail="Incorrect email or password")
         
-        print(f"🔑 Verifying password...")
+        logger.info(f"🔑 Verifying password...")
         if not verify_password(password, user.hashed_password):
-            print(f"❌ Password verification failed")
+            logger.error(f"❌ Password verification failed")
             raise HTTPException(status_code=401, detail="Incorrect email or password")
         
-        print(f"✅ Password verified, creating token...")
+        logger.info(f"✅ Password verified, creating token...")
         # Create access token
         access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
         
-        print(f"🎉 Login successful for user: {user.email}")
+        logger.info(f"🎉 Login successful for user: {user.email}")
         return {
             "access_token": access_token,
             "token_type": "bearer",
@@ -462,22 +512,20 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
         }
         
     except HTTPException as he:
-        print(f"❌ HTTP Exception: {he.detail}")
+        logger.error(f"❌ HTTP Exception: {he.detail}")
         raise he
     except Exception as e:
-        print(f"❌ Login error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Login error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/auth/me")
 async def get_current_user_info(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user info for token verification"""
     try:
-        user = db.query(User).filter(User.id == current_user["user_id"]).first()
+        user = await db.get(User, current_user["user_id"])
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -501,7 +549,7 @@ async def get_current_user_info(
 @app.post("/auth/change-password")
 async def change_password(
     password_data: ChangePasswordRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Change user password"""
@@ -543,58 +591,81 @@ async def change_password(
         raise
     except Exception as e:
         db.rollback()
-        print(f"❌ Error changing password: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error changing password: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ---------- Basic CRUD Endpoints ----------
-@app.get("/products", response_model=list[ProductResponse])
+@app.get("/products", response_model=Union[Page[ProductResponse], list[ProductResponse]])
 async def get_products(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    paginate: bool = Query(True, description="Set to false to get every product as a plain list"),
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get all products for the current user"""
+    """Get products for the current user, newest first, one page at a time"""
     try:
-        products = db.query(Product).filter(Product.user_id == current_user["user_id"]).all()
-        return products
+        stmt = select(Product).where(Product.user_id == current_user["user_id"])
+        if not paginate:
+            return (await db.scalars(stmt.order_by(Product.created_at.desc(), Product.id.desc()))).all()
+        products, next_cursor = await paginate_select(db, stmt, Product.created_at, Product.id, cursor, page_size)
+        return {"items": products, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/models", response_model=list[ModelResponse])
+@app.get("/models", response_model=Union[Page[ModelResponse], list[ModelResponse]])
 async def get_models(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    paginate: bool = Query(True, description="Set to false to get every model as a plain list"),
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get all models for the current user"""
+    """Get models for the current user, newest first, one page at a time"""
     try:
-        models = db.query(Model).filter(Model.user_id == current_user["user_id"]).all()
-        return models
+        stmt = select(Model).where(Model.user_id == current_user["user_id"])
+        if not paginate:
+            return (await db.scalars(stmt.order_by(Model.created_at.desc(), Model.id.desc()))).all()
+        models, next_cursor = await paginate_select(db, stmt, Model.created_at, Model.id, cursor, page_size)
+        return {"items": models, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/scenes", response_model=list[SceneResponse])
+@app.get("/scenes", response_model=Union[Page[SceneResponse], list[SceneResponse]])
 async def get_scenes(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    paginate: bool = Query(True, description="Set to false to get every scene as a plain list"),
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get all scenes for the current user"""
+    """Get scenes for the current user, newest first, one page at a time"""
     try:
-        scenes = db.query(Scene).filter(Scene.user_id == current_user["user_id"]).all()
-        return scenes
+        stmt = select(Scene).where(Scene.user_id == current_user["user_id"])
+        if not paginate:
+            return (await db.scalars(stmt.order_by(Scene.created_at.desc(), Scene.id.desc()))).all()
+        scenes, next_cursor = await paginate_select(db, stmt, Scene.created_at, Scene.id, cursor, page_size)
+        return {"items": scenes, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/scenes/bulk-add-from-uploads")
 async def bulk_add_scenes_from_uploads(
-    current_user: dict = Depends(get_current_user),
+    dedupe_content: bool = Query(False, description="Also skip files whose content matches an existing scene"),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Bulk add all scene images from uploads directory as scenes"""
     try:
-        import os
-        import glob
+        import asyncio
         from pathlib import Path
+        from scene_import import import_scene_files
         
         # Get all scene images from uploads directory
         uploads_dir = Path("uploads")
@@ -603,79 +674,28 @@ async def bulk_add_scenes_from_uploads(
         if not scene_files:
             return {"message": "No scene images found in uploads directory", "added": 0, "skipped": 0}
         
-        added_count = 0
-        skipped_count = 0
-        added_scenes = []
-        
-        for scene_file in scene_files:
-            try:
-                # Extract scene name from filename
-                scene_name = scene_file.stem.replace("scene_", "").replace("_", " ").title()
-                
-                # Create a more readable name
-                if scene_name.startswith("-"):
-                    scene_name = f"Scene {scene_name[1:]}"
-                else:
-                    scene_name = f"Scene {scene_name}"
-                
-                # Check if scene already exists
-                existing_scene = db.query(Scene).filter(
-                    Scene.user_id == current_user["user_id"],
-                    Scene.name == scene_name
-                ).first()
-                
-                if existing_scene:
-                    skipped_count += 1
-                    continue
-                
-                # Create the scene URL (using the static URL format)
-                scene_url = f"{get_base_url()}/static/{scene_file.name}"
-                
-                # Create scene in database
-                scene = Scene(
-                    id=str(uuid.uuid4()),
-                    user_id=current_user["user_id"],
-                    name=scene_name,
-                    description="Professional fashion photography scene",
-                    category="lifestyle",
-                    tags=["fashion", "photography", "background"],
-                    image_url=scene_url,
-                    is_standard=False,
-                    created_at=datetime.utcnow()
-                )
-                
-                db.add(scene)
-                added_scenes.append({
-                    "id": scene.id,
-                    "name": scene.name,
-                    "image_url": scene.image_url
-                })
-                added_count += 1
-                
-            except Exception as e:
-                print(f"Error adding scene {scene_file.name}: {e}")
-                continue
-        
-        # Commit all changes
-        db.commit()
+        # One existence query and batched inserts; hashing runs off the event loop
+        result = await asyncio.to_thread(
+            import_scene_files, db, current_user["user_id"], scene_files, get_base_url(), dedupe_content
+        )
         
         return {
-            "message": f"Bulk scene import complete! Added {added_count} scenes, skipped {skipped_count} existing scenes.",
-            "added": added_count,
-            "skipped": skipped_count,
+            "message": f"Bulk scene import complete! Added {result['added']} scenes, skipped {result['skipped']} existing scenes.",
+            "added": result["added"],
+            "skipped": result["skipped"],
             "total_found": len(scene_files),
-            "scenes": added_scenes
+            "scenes": result["scenes"]
         }
         
     except Exception as e:
-        print(f"Bulk scene import error: {e}")
+        logger.error(f"Bulk scene import error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.patch("/scenes/{scene_id}")
 async def update_scene(
     scene_id: str,
     is_standard: bool = Form(None),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Update scene properties"""
@@ -703,7 +723,7 @@ async def update_scene(
         }
         
     except Exception as e:
-        print(f"Scene update error: {e}")
+        logger.error(f"Scene update error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/scenes/upload")
@@ -713,7 +733,7 @@ async def upload_scene(
     category: str = Form(""),
     tags: str = Form(""),
     image: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Upload a new scene"""
@@ -729,6 +749,7 @@ async def upload_scene(
         with open(image_path, "wb") as f:
             content = await image.read()
             f.write(content)
+        content_hash = hashlib.sha256(content).hexdigest()
         
         # Upload to Replicate for reliable serving
         try:
@@ -752,6 +773,7 @@ async def upload_scene(
             tags=tag_list,
             image_url=image_url,
             is_standard=is_standard_scene,
+            content_hash=content_hash,
             created_at=datetime.utcnow()
         )
         
@@ -772,39 +794,41 @@ async def upload_scene(
         }
         
     except Exception as e:
-        print(f"Scene upload error: {e}")
+        logger.error(f"Scene upload error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/campaigns", response_model=list[CampaignResponse])
+@app.get("/campaigns", response_model=Union[Page[CampaignResponse], list[CampaignResponse]])
 async def get_campaigns(
-    limit: Optional[int] = Query(None, description="Limit number of campaigns returned"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Campaigns per page"),
+    paginate: bool = Query(True, description="Set to false to get campaigns as a plain list"),
+    limit: Optional[int] = Query(None, description="Limit number of campaigns returned (unpaginated mode)"),
     order_by: Optional[str] = Query("created_at", description="Field to order by"),
     order: Optional[str] = Query("desc", description="Order direction (asc/desc)"),
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get campaigns for the current user with optional limit and ordering"""
+    """Get campaigns for the current user, one page at a time (or as a plain list with paginate=false)"""
     try:
         # Start with base query
-        query = db.query(Campaign).filter(Campaign.user_id == current_user["user_id"])
+        stmt = select(Campaign).where(Campaign.user_id == current_user["user_id"])
+        sort_column = Campaign.updated_at if order_by == "updated_at" else Campaign.created_at
+        descending = order != "asc"
         
-        # Apply ordering
-        if order_by == "created_at":
-            if order == "desc":
-                query = query.order_by(Campaign.created_at.desc())
-            else:
-                query = query.order_by(Campaign.created_at.asc())
-        elif order_by == "updated_at":
-            if order == "desc":
-                query = query.order_by(Campaign.updated_at.desc())
+        next_cursor = None
+        if paginate:
+            campaigns, next_cursor = await paginate_select(db, stmt, sort_column, Campaign.id, cursor, page_size, descending)
+        else:
+            if descending:
+                stmt = stmt.order_by(sort_column.desc(), Campaign.id.desc())
             else:
-                query = query.order_by(Campaign.updated_at.asc())
+                stmt = stmt.order_by(sort_column.asc(), Campaign.id.asc())
+            if limit:
+                stmt = stmt.limit(limit)
+            campaigns = (await db.scalars(stmt)).all()
         
-        # Apply limit if provided
-        if limit:
-            campaigns = query.limit(limit).all()
-        else:
-            campaigns = query.all()
+        # Load images/videos for all campaigns in two queries
+        assets_by_campaign = await load_campaign_assets_async(db, [campaign.id for campaign in campaigns])
         
         # Process campaigns (optimize validation)
         result = []
@@ -823,67 +847,272 @@ async def get_campaigns(
                 # if campaign.settings:
                 #     campaign.settings = convert_localhost_video_urls(campaign.settings)
                 
-                # Debug: Log if campaign has videos
-                if campaign.settings and campaign.settings.get("videos"):
-                    print(f"📹 Campaign {campaign.id} has {len(campaign.settings['videos'])} videos in settings")
-                
-                result.append(CampaignResponse.model_validate(campaign))
+                result.append(campaign_to_response(db, campaign, assets_by_campaign[campaign.id]))
             except Exception as validation_error:
-                print(f"⚠️ Campaign validation failed for {campaign.id}: {validation_error}")
+                logger.warning(f"⚠️ Campaign validation failed for {campaign.id}: {validation_error}")
                 # Skip this campaign if validation fails
                 continue
         
-        return result
+        if not paginate:
+            return result
+        return {"items": result, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error fetching campaigns: {e}")
+        logger.error(f"❌ Error fetching campaigns: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/campaigns/summary", response_model=Union[Page[CampaignSummaryResponse], list[CampaignSummaryResponse]])
+async def get_campaigns_summary(
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Campaigns per page"),
+    paginate: bool = Query(True, description="Set to false to get campaigns as a plain list"),
+    order_by: Optional[str] = Query("created_at", description="Field to order by"),
+    order: Optional[str] = Query("desc", description="Order direction (asc/desc)"),
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Campaign list for cards: counts and cover image only (full settings via GET /campaigns/{id})"""
+    try:
+        stmt = campaign_summary_select(current_user["user_id"])
+        sort_column = Campaign.updated_at if order_by == "updated_at" else Campaign.created_at
+        descending = order != "asc"
+        
+        if not paginate:
+            if descending:
+                stmt = stmt.order_by(sort_column.desc(), Campaign.id.desc())
+            else:
+                stmt = stmt.order_by(sort_column.asc(), Campaign.id.asc())
+            return [summary_row_to_dict(row) for row in (await db.execute(stmt)).all()]
+        
+        rows, next_cursor = await paginate_select(db, stmt, sort_column, Campaign.id, cursor, page_size, descending, scalars=False)
+        return {"items": [summary_row_to_dict(row) for row in rows], "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error fetching campaign summaries: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/campaigns/count")
 async def get_campaigns_count(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get total count of campaigns for the current user (fast endpoint)"""
     try:
-        count = db.query(Campaign).filter(Campaign.user_id == current_user["user_id"]).count()
+        count = await db.scalar(
+            select(func.count(Campaign.id)).where(Campaign.user_id == current_user["user_id"])
+        )
         return {"count": count}
     except Exception as e:
-        print(f"❌ Error fetching campaigns count: {e}")
+        logger.error(f"❌ Error fetching campaigns count: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def save_generation_progress(db: Session, campaign_id: str, generated_images: list, current: int, total: int, status: str = "generating"):
-    """
-    Save generation progress after EACH image is generated.
-    This enables progressive loading in the frontend.
-    """
+# ============================================================
+# Pipeline steps: the provider helpers as typed DAG steps (see pipeline.py)
+# ============================================================
+def step_stabilize(url: str, prefix: str) -> str:
+    """Persist an input or provider output URL (stable URLs pass through)"""
+    return stabilize_url(to_url(url), prefix)
+
+def step_compose(model_image_url: str, product_image_url: str, scene_image_url: str, product_name: str,
+                 clothing_type: Optional[str] = None, quality_mode: str = "standard",
+                 shot_type_prompt: Optional[str] = None) -> str:
+    """Base composition: model + first product + scene (Qwen)"""
+    return to_url(run_qwen_triple_composition(
+        model_image_url, product_image_url, scene_image_url, product_name, quality_mode,
+        shot_type_prompt=shot_type_prompt, clothing_type=clothing_type
+    ))
+
+def step_add_product(image_url: str, product_image_url: str, product_name: str, product_type: str = "garment") -> str:
+    return to_url(add_product_to_image(image_url, product_image_url, product_name, product_type))
+
+def step_variation(prompt: str, reference_images: list, guidance: float = 3.5, steps: int = 28, aspect_ratio: str = "9:16") -> str:
+    """New shot from reference images (Flux 2 Pro)"""
+    result = run_flux_2_pro(prompt=prompt, reference_images=reference_images, guidance=guidance,
+                            steps=steps, aspect_ratio=aspect_ratio)
+    if not result:
+        raise RuntimeError("Flux 2 Pro returned no image")
+    return to_url(result)
+
+def step_upload(url: str, folder: str) -> str:
+    """Upload to Cloudinary, keeping the provider URL if the upload fails"""
+    return upload_to_cloudinary(url, folder) or url
+
+def step_video(image_url: str, model: str = "seedance", video_quality: str = "480p", duration: str = "5s",
+               custom_prompt: Optional[str] = None) -> str:
+    if model == "seedance":
+        video_url = run_seedance_video_generation(image_url, video_quality, duration, custom_prompt)
+    elif model == "veo":
+        video_url = run_veo_video_generation(image_url, video_quality, duration, custom_prompt)
+    elif model == "kling":
+        video_url = run_kling_video_generation(image_url, video_quality, duration, custom_prompt)
+    else:  # wan
+        video_url = run_wan_video_generation(image_url, video_quality, custom_prompt)
+    if not video_url:
+        raise RuntimeError(f"{model} returned no video")
+    return video_url
+
+def step_concat(video_urls: list) -> str:
+    """Concatenate clips into one local mp4 (clips are normalized once and cached)"""
+    import tempfile
+    from video_segments import get_normalized_segment, concat_segments
+    segment_paths = [get_normalized_segment(video_url) for video_url in video_urls]
+    output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+    output_file.close()
+    concat_segments(segment_paths, output_file.name)
+    return output_file.name
+
+_save_image_lock = threading.Lock()
+
+def step_save_image(campaign_id: str, image: dict, generation_status: Optional[str] = None) -> str:
+    """Append a generated image (stamped with generated_at) to the campaign in its own short session; returns the row id"""
+    db = SessionLocal()
     try:
-        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-        if not campaign:
-            print(f"⚠️ Campaign {campaign_id} not found for progress update")
+        # Serialized so concurrent saves get distinct display positions
+        with _save_image_lock:
+            row = add_campaign_image(db, campaign_id, {**image, "generated_at": datetime.utcnow().isoformat()}, commit=False)
+            if generation_status:
+                # Only touch the campaign row when the status actually changes
+                db.query(Campaign).filter(
+                    Campaign.id == campaign_id,
+                    Campaign.generation_status != generation_status
+                ).update({Campaign.generation_status: generation_status}, synchronize_session=False)
+            db.commit()
+        if generation_status:
+            # The narrow UPDATE above bypasses the session listener that publishes status events
+            note_campaign_status(campaign_id, generation_status=generation_status)
+        return row.id
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def step_attach_video(image_id: str, video_url: str, reservation_id: Optional[str] = None, credits: int = 0) -> str:
+    """Store a finished video on its image row and spend the credits held for it"""
+    db = SessionLocal()
+    try:
+        update_campaign_image(db, image_id, video_url=video_url)
+        if reservation_id:
+            commit_credits(db, reservation_id, credits)
+            attribute_credits([video_url], credits)
+        return video_url
+    finally:
+        db.close()
+
+def step_remember_base(user_id: str, key: str, image_url: str, model_id: Optional[str] = None,
+                       scene_id: Optional[str] = None, product_ids: Optional[list] = None,
+                       inputs: Optional[dict] = None) -> Optional[str]:
+    """Add a composed base to the user's base library; returns the library entry id"""
+    if not is_stable_url(image_url):
+        # stabilize_url hands back the ephemeral provider URL when the upload failed
+        logger.warning(f"⚠️ Not adding base to the library, its image is not stored: {str(image_url)[:120]}")
+        return None
+    db = SessionLocal()
+    try:
+        return remember_base(db, user_id, key, image_url, model_id, scene_id, product_ids, inputs).id
+    finally:
+        db.close()
+
+register_step("stabilize", step_stabilize, limit="upload", deterministic=True)
+register_step("compose", step_compose, limit="replicate")
+register_step("add-product", step_add_product, limit="replicate")
+register_step("variation", step_variation, limit="replicate")
+register_step("upload", step_upload, limit="upload")
+register_step("video", step_video, limit="video")
+register_step("concat", step_concat, limit="ffmpeg")
+register_step("save-image", step_save_image, limit="db")
+register_step("attach-video", step_attach_video, limit="db")
+register_step("remember-base", step_remember_base, limit="db")
+
+# ============================================================
+# "images+videos" mode: every saved keyframe goes straight into the video stage
+# ============================================================
+GENERATION_MODES = ("images", "images+videos")
+
+def reserve_video_stage(db: Session, user_id: str, count: int, model: str, video_quality: str,
+                        duration: str, custom_prompt: Optional[str] = None) -> dict:
+    """Hold credits for up to `count` pipelined videos; returns the video options for the flow.
+
+    Raises the usual insufficient-credits error; credits for videos that never
+    run are released when the flow finishes (finish_video_stage).
+    """
+    credits_per_video = video_credits_per_video(model, video_quality, duration)
+    reservation = reserve_credits(db, user_id, credits_per_video * count, "pipelined_video")
+    if reservation is None:
+        raise insufficient_credits_error(db, user_id, credits_per_video * count, f"{count} videos at {credits_per_video} each")
+    return {
+        "model": model,
+        "video_quality": video_quality,
+        "duration": duration,
+        "custom_prompt": custom_prompt,
+        "credits_per_video": credits_per_video,
+        "reservation_id": reservation.id,
+    }
+
+def release_video_stage(db: Session, video_options: Optional[dict]):
+    """Hand back the whole video-stage hold when the flow could not be started"""
+    if video_options:
+        db.rollback()
+        close_reservation(db, video_options["reservation_id"])
+
+def add_video_nodes(nodes: list, save_node: str, image_url, video_options: dict, label: Optional[str] = None):
+    """Video for one keyframe: starts as soon as the image URL is ready, attached once its row is saved"""
+    nodes.append(Node(f"{save_node}.video", "video", {
+        "image_url": image_url,
+        "model": video_options["model"],
+        "video_quality": video_options["video_quality"],
+        "duration": video_options["duration"],
+        "custom_prompt": video_options.get("custom_prompt"),
+    }, label=label))
+    nodes.append(Node(f"{save_node}.attach_video", "attach-video", {
+        "image_id": Ref(save_node),
+        "video_url": Ref(f"{save_node}.video"),
+        "reservation_id": video_options.get("reservation_id"),
+        "credits": video_options.get("credits_per_video", 0),
+    }, label=label))
+
+def track_video_stage(campaign_id: str, total: int, counts: dict):
+    """Pipeline listener keeping the bulk_video progress entry current"""
+    set_progress(campaign_id, "bulk_video", current=0, total=total, started_at=datetime.utcnow().isoformat())
+    
+    def on_node(node, state, value):
+        if node.step == "attach-video" and state == "done":
+            counts["success"] += 1
+        elif node.step in ("video", "attach-video") and state == "failed":
+            counts["failed"] += 1
+        else:
             return
-        
-        # Update settings with current progress
+        set_progress(campaign_id, "bulk_video", current=counts["success"] + counts["failed"], total=total,
+                     success_count=counts["success"], failed_count=counts["failed"], current_name=node.label)
+    return on_node
+
+def finish_video_stage(db: Session, campaign_id: str, video_options: dict, counts: dict):
+    """Release credits held for videos that never ran and record the final video status"""
+    reservation_id = video_options.get("reservation_id")
+    if reservation_id:
+        close_reservation(db, reservation_id)
+    final_progress = {
+        "current": counts["success"] + counts["failed"],
+        "total": counts["success"] + counts["failed"],
+        "success_count": counts["success"],
+        "failed_count": counts["failed"],
+        "credits_used": counts["success"] * video_options.get("credits_per_video", 0),
+        "completed_at": datetime.utcnow().isoformat()
+    }
+    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+    if campaign:
         new_settings = dict(campaign.settings) if campaign.settings else {}
-        new_settings["generated_images"] = generated_images
-        new_settings["generation_progress"] = {
-            "current": current,
-            "total": total,
-            "percent": int((current / total) * 100) if total > 0 else 0
-        }
+        new_settings["bulk_video_status"] = "completed"
+        new_settings["bulk_video_progress"] = final_progress
         campaign.settings = new_settings
-        campaign.generation_status = status
-        
-        # Force SQLAlchemy to detect the change
         flag_modified(campaign, "settings")
-        
         db.commit()
-        print(f"💾 Progress saved: {current}/{total} images ({new_settings['generation_progress']['percent']}%)")
-        
-    except Exception as e:
-        print(f"⚠️ Failed to save progress: {e}")
-        # Don't raise - we don't want to break generation if progress save fails
-        db.rollback()
+    set_progress(campaign_id, "bulk_video", **final_progress)
+    logger.info(f"✅ Pipelined videos complete: {counts['success']} success, {counts['failed']} failed")
 
+@track_job("campaign_images")
 async def generate_campaign_images_background(
     campaign_id: str,
     product_id_list: list,
@@ -891,7 +1120,10 @@ async def generate_campaign_images_background(
     scene_id_list: list,
     selected_poses_dict: dict,
     number_of_images: int,
-    manikin_pose: str = "Pose-neutral.jpg"
+    manikin_pose: str = "Pose-neutral.jpg",
+    video_options: Optional[dict] = None,
+    reuse_bases: bool = True,
+    base_composition_id: Optional[str] = None
 ):
     """
     Generate campaign images using BASE IMAGE + VARIATIONS workflow.
@@ -904,27 +1136,34 @@ async def generate_campaign_images_background(
        - Different angles
     
     This ensures CONSISTENCY across all video keyframes.
+    
+    With video_options ("images+videos" mode, see reserve_video_stage) each
+    keyframe also goes straight into the video stage as soon as it is stable.
+    
+    Base images come from the user's base library when one was already composed
+    from the same inputs (reuse_bases), or from an explicitly chosen library
+    base (base_composition_id); new bases are added to the library.
     """
+    bind_log_context(campaign_id=campaign_id)
     # Create a NEW database session for this background task
     db = SessionLocal()
     try:
         # Get campaign from database
         campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         if not campaign:
-            print(f"❌ Campaign {campaign_id} not found")
+            logger.error(f"❌ Campaign {campaign_id} not found")
             return
         
-        print(f"🎯 Starting background generation for campaign: {campaign.name}")
-        print(f"📐 NEW WORKFLOW: Base Image → Keyframe Variations")
+        logger.info(f"🎯 Starting background generation for campaign: {campaign.name}")
+        logger.info(f"📐 NEW WORKFLOW: Base Image → Keyframe Variations")
         
         products = db.query(Product).filter(Product.id.in_(product_id_list)).all()
         models = db.query(Model).filter(Model.id.in_(model_id_list)).all()
         scenes = db.query(Scene).filter(Scene.id.in_(scene_id_list)).all()
         
-        # Load existing images to append to them (for multi-pose generation)
-        existing_images = campaign.settings.get("generated_images", []) if campaign.settings else []
-        generated_images = existing_images.copy()  # Start with existing images
-        print(f"📌 Starting with {len(existing_images)} existing images")
+        # New images are appended as rows after any existing ones (for multi-pose generation)
+        existing_image_count = count_campaign_images(db, campaign_id)
+        logger.info(f"📌 Starting with {existing_image_count} existing images")
         
         # Clamp requested number of images to available shot types
         try:
@@ -985,180 +1224,188 @@ async def generate_campaign_images_background(
         import random
         variations_to_use = KEYFRAME_VARIATIONS[:shots_to_generate_count]
         
-        # Generate each combination with BASE IMAGE + VARIATIONS workflow
+        # Build the flow: per model × scene, base composition → products → variations → saves.
+        # Independent branches (combinations, variations) run concurrently under the shared limits.
+        product_names = ", ".join([p.name for p in products])
+        combined_product_ids = [str(p.id) for p in products]
+        first_product = products[0]
+        first_product_image = first_product.packshot_front_url or first_product.image_url
+        first_product_type = first_product.clothing_type if getattr(first_product, 'clothing_type', None) else "outfit"
+        quality_mode = "standard"
+        
+        # Stabilize inputs to /static to avoid replicate 404s
+        nodes = []
+        for index, product in enumerate(products):
+            nodes.append(Node(f"product_{index}", "stabilize",
+                              {"url": product.packshot_front_url or product.image_url, "prefix": "product"}))
+        for scene in scenes:
+            nodes.append(Node(f"scene_{scene.id}", "stabilize", {"url": scene.image_url, "prefix": "scene"}))
+        
+        combos = []
         for model in models:
             for scene in scenes:
                 # Use model's selected pose if available
                 model_image = model.image_url
                 if selected_poses_dict.get(str(model.id)) and len(selected_poses_dict[str(model.id)]) > 0:
-                    import random
                     model_image = random.choice(selected_poses_dict[str(model.id)])
-                    print(f"🎭 Using selected pose for {model.name}")
+                    logger.info(f"🎭 Using selected pose for {model.name}")
                 elif model.poses and len(model.poses) > 0:
-                    import random
                     model_image = random.choice(model.poses)
-                    print(f"🎭 Using random pose for {model.name}")
-                
-                # Build product list names for logging
-                product_names = ", ".join([p.name for p in products])
-                print(f"\n{'='*60}")
-                print(f"🎬 Processing: [{product_names}] + {model.name} + {scene.name}")
-                print(f"{'='*60}")
-                
-                # ============================================================
-                # STEP 1: GENERATE BASE IMAGE (model + all clothes + scene)
-                # ============================================================
-                print(f"\n🎨 STEP 1: Generating BASE IMAGE...")
-                print(f"   📷 Model: {model.name}")
-                print(f"   👕 Products: {product_names}")
-                print(f"   🏞️ Scene: {scene.name}")
-                
-                first_product = products[0]
-                first_product_image = first_product.packshot_front_url or first_product.image_url
-                quality_mode = "standard"
-
-                # Stabilize inputs to /static to avoid replicate 404s
-                stable_model = stabilize_url(model_image, "pose") if 'stabilize_url' in globals() else model_image
-                stable_scene = stabilize_url(scene.image_url, "scene") if 'stabilize_url' in globals() else scene.image_url
-                stable_first_product = stabilize_url(first_product_image, "product") if 'stabilize_url' in globals() else first_product_image
-                
-                # Generate base composition with Qwen (model + first product + scene)
-                base_image_url = run_qwen_triple_composition(
-                    stable_model,
-                    stable_first_product,
-                    stable_scene,
-                    first_product.name,
-                    quality_mode,
-                    shot_type_prompt="Full body shot from head to feet. Professional fashion photography. Natural standing pose.",
-                    clothing_type=first_product.clothing_type
-                )
-                print(f"✅ Base composition created: {base_image_url[:60]}...")
-                
-                # Add additional products to base image
-                current_base_url = base_image_url
-                if len(products) > 1:
-                    print(f"👕 Adding {len(products) - 1} additional product(s) to base image...")
-                    for additional_product in products[1:]:
-                        additional_product_image = additional_product.packshot_front_url or additional_product.image_url
-                        stable_additional_product = stabilize_url(additional_product_image, "product") if 'stabilize_url' in globals() else additional_product_image
-                        
-                        product_type = additional_product.clothing_type if hasattr(additional_product, 'clothing_type') and additional_product.clothing_type else "garment"
-                        
-                        print(f"   ➕ Adding {additional_product.name} ({product_type})...")
-                        current_base_url = add_product_to_image(
-                            current_base_url,
-                            stable_additional_product,
-                            additional_product.name,
-                            product_type
-                        )
-                    print(f"✅ All {len(products)} products added to base image!")
-                
-                # Store stabilized base image URL
-                base_image_url = current_base_url
-                stable_base_url = stabilize_url(to_url(base_image_url), "base_image") if 'stabilize_url' in globals() else download_and_save_image(to_url(base_image_url), "campaign_base")
-                print(f"📦 Base image saved: {stable_base_url[:60]}...")
-                
-                # Store product info for results
-                combined_product_names = ", ".join([p.name for p in products])
-                combined_product_ids = [str(p.id) for p in products]
-                first_product_type = products[0].clothing_type if hasattr(products[0], 'clothing_type') and products[0].clothing_type else "outfit"
-                
-                # ============================================================
-                # STEP 2: GENERATE KEYFRAME VARIATIONS FROM BASE IMAGE
-                # ============================================================
-                print(f"\n🎬 STEP 2: Generating {len(variations_to_use)} KEYFRAME VARIATIONS from base image...")
-                
-                for var_idx, variation in enumerate(variations_to_use, 1):
-                    try:
-                        print(f"\n🎥 [{var_idx}/{len(variations_to_use)}] {variation['title']}")
-                        
-                        if variation.get("is_base", False):
-                            # Base image - no modification needed, just use it directly
-                            final_url = stable_base_url
-                            print(f"   ✅ Using base image directly (no modification)")
-                        else:
-                            # Generate variation from base image using Flux 2 Pro
-                            print(f"   🔄 Generating variation with Flux 2 Pro...")
-                            print(f"   📝 Prompt: {variation['prompt'][:80]}...")
-                            
-                            variation_url = run_flux_2_pro(
-                                prompt=variation['prompt'],
-                                reference_images=[stable_base_url],
-                                guidance=3.5,
-                                steps=28,
-                                aspect_ratio="9:16"
-                            )
-                            
-                            # Stabilize the variation URL
-                            final_url = stabilize_url(to_url(variation_url), f"variation_{variation['key']}") if 'stabilize_url' in globals() else download_and_save_image(to_url(variation_url), f"campaign_{variation['key']}")
-                            print(f"   ✅ Variation saved: {final_url[:60]}...")
-                        
-                        # Append to generated images
-                        generated_images.append({
-                            "product_name": combined_product_names,
-                            "product_id": combined_product_ids[0] if combined_product_ids else str(products[0].id),
-                            "product_ids": combined_product_ids,
-                            "model_name": model.name,
-                            "scene_name": scene.name,
-                            "shot_type": variation['title'],
-                            "shot_name": variation['name'],
-                            "image_url": final_url,
-                            "base_image_url": stable_base_url,  # NEW: Reference to base image
-                            "model_image_url": model_image,
-                            "product_image_url": first_product_image,
-                            "clothing_type": first_product_type,
-                            "is_base_image": variation.get("is_base", False)  # NEW: Flag for base image
-                        })
-                        
-                        # 🔥 PROGRESSIVE LOADING: Save after EACH image so frontend can display immediately
-                        save_generation_progress(
-                            db, 
-                            campaign_id, 
-                            generated_images, 
-                            current=len(generated_images), 
-                            total=len(variations_to_use) * len(models) * len(scenes),
-                            status="generating"
-                        )
-                        
-                        print(f"   ✅ Keyframe {var_idx} completed!")
-                        
-                    except Exception as e:
-                        print(f"❌ Failed variation {variation['title']}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        continue
+                    logger.info(f"🎭 Using random pose for {model.name}")
+                combos.append((model, scene, model_image))
+        
+        # Base library: key every combination on its inputs' content, so a base this user
+        # already composed (in any campaign) is reused instead of composed again
+        product_images = [p.packshot_front_url or p.image_url for p in products]
+        clothing_types = [p.clothing_type for p in products]
+        
+        def library_key(model_image: str, scene_image: str) -> Optional[str]:
+            try:
+                return composition_key(model_image, product_images, scene_image, clothing_types, quality_mode)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not hash base inputs, composing without the library: {e}")
+                return None
+        
+        import asyncio
+        library_keys = [None] * len(combos)
+        if reuse_bases:
+            # Hashing fetches the input images: don't hold a pooled connection across the await
+            db.close()
+            library_keys = await asyncio.gather(*(
+                asyncio.to_thread(library_key, model_image, scene.image_url) for _, scene, model_image in combos
+            ))
+        chosen_base = get_base(db, campaign.user_id, base_composition_id) if base_composition_id else None
+        
+        for (model, scene, model_image), library_key_value in zip(combos, library_keys):
+            logger.info(f"🎬 Queued: [{product_names}] + {model.name} + {scene.name} ({len(variations_to_use)} keyframes)")
+            combo = f"{model.id}_{scene.id}"
+            
+            cached_base = None
+            if chosen_base is not None and (chosen_base.model_id, chosen_base.scene_id) == (str(model.id), str(scene.id)):
+                cached_base = chosen_base
+                touch_base(db, cached_base)
+            elif library_key_value:
+                cached_base = find_base(db, campaign.user_id, library_key_value)
+            
+            if cached_base is not None:
+                # STEP 1 skipped: reuse the library base and go straight to the variations
+                logger.info(f"♻️ Reusing base composition {cached_base.id} for {model.name} + {scene.name}")
+                stable_base = cached_base.image_url
+            else:
+                # STEP 1: BASE IMAGE - Qwen composition (model + first product + scene), then remaining products
+                nodes.append(Node(f"{combo}.pose", "stabilize", {"url": model_image, "prefix": "pose"}))
+                nodes.append(Node(f"{combo}.compose", "compose", {
+                    "model_image_url": Ref(f"{combo}.pose"),
+                    "product_image_url": Ref("product_0"),
+                    "scene_image_url": Ref(f"scene_{scene.id}"),
+                    "product_name": first_product.name,
+                    "clothing_type": first_product.clothing_type,
+                    "quality_mode": quality_mode,
+                    "shot_type_prompt": "Full body shot from head to feet. Professional fashion photography. Natural standing pose.",
+                }))
+                current_base = Ref(f"{combo}.compose")
+                for index, additional_product in enumerate(products[1:], 1):
+                    product_type = additional_product.clothing_type if getattr(additional_product, 'clothing_type', None) else "garment"
+                    nodes.append(Node(f"{combo}.add_product_{index}", "add-product", {
+                        "image_url": current_base,
+                        "product_image_url": Ref(f"product_{index}"),
+                        "product_name": additional_product.name,
+                        "product_type": product_type,
+                    }))
+                    current_base = Ref(f"{combo}.add_product_{index}")
+                nodes.append(Node(f"{combo}.base", "stabilize", {"url": current_base, "prefix": "base_image"}))
+                stable_base = Ref(f"{combo}.base")
+                if library_key_value:
+                    nodes.append(Node(f"{combo}.remember_base", "remember-base", {
+                        "user_id": campaign.user_id,
+                        "key": library_key_value,
+                        "image_url": stable_base,
+                        "model_id": str(model.id),
+                        "scene_id": str(scene.id),
+                        "product_ids": combined_product_ids,
+                        "inputs": {"pose_url": model_image, "product_urls": product_images,
+                                   "scene_url": scene.image_url, "clothing_types": clothing_types},
+                    }))
                 
-                print(f"\n🎉 Campaign flow complete: [{product_names}] + {model.name} + {scene.name}")
-                print(f"   📸 Generated {len(variations_to_use)} keyframes from 1 base image")
+            # STEP 2: KEYFRAME VARIATIONS from the base image (Flux 2 Pro), each saved as soon as it's ready
+            for variation in variations_to_use:
+                key = f"{combo}.{variation['key']}"
+                if variation.get("is_base", False):
+                    # Base image - no modification needed, just use it directly
+                    final_url = stable_base
+                else:
+                    nodes.append(Node(key, "variation", {"prompt": variation['prompt'], "reference_images": [stable_base]}))
+                    nodes.append(Node(f"{key}.stable", "stabilize",
+                                      {"url": Ref(key), "prefix": f"variation_{variation['key']}"}))
+                    final_url = Ref(f"{key}.stable")
+                nodes.append(Node(f"{key}.save", "save-image", {
+                    "campaign_id": campaign_id,
+                    "image": {
+                        "product_name": product_names,
+                        "product_id": combined_product_ids[0],
+                        "product_ids": combined_product_ids,
+                        "model_name": model.name,
+                        "scene_name": scene.name,
+                        "shot_type": variation['title'],
+                        "shot_name": variation['name'],
+                        "image_url": final_url,
+                        "base_image_url": stable_base,  # Reference to base image
+                        "model_image_url": model_image,
+                        "product_image_url": first_product_image,
+                        "clothing_type": first_product_type,
+                        "is_base_image": variation.get("is_base", False),  # Flag for base image
+                    },
+                    "generation_status": "generating",
+                }, label=f"{model.name} + {scene.name}: {variation['title']}"))
+                if video_options:
+                    add_video_nodes(nodes, f"{key}.save", final_url, video_options,
+                                    label=f"{model.name} + {scene.name}: {variation['title']}")
+    
+        total = len(variations_to_use) * len(models) * len(scenes)
+        generated_images = []  # Image rows saved in this run
+        video_counts = {"success": 0, "failed": 0}
+        on_video = track_video_stage(campaign_id, total, video_counts) if video_options else None
+        
+        def on_node(node, state, value):
+            if on_video is not None:
+                on_video(node, state, value)
+            if node.step != "save-image" or state != "done":
+                return
+            generated_images.append(value)
+            # 🔥 PROGRESSIVE LOADING: each image is saved as soon as it exists; progress goes to the progress store
+            current = existing_image_count + len(generated_images)
+            percent = int((current / total) * 100) if total > 0 else 0
+            set_progress(campaign_id, "generation", current=current, total=total, percent=percent)
+            logger.info(f"💾 Progress saved: {current}/{total} images ({percent}%) - {node.label}")
+        
+        # Don't hold a pooled connection while the providers work
+        db.close()
+        await run_pipeline(Pipeline("campaign-images", nodes), campaign_id=campaign_id, listener=on_node)
         
-        # Update campaign with generated images
-        campaign.generation_status = "completed" if len(generated_images) > 0 else "failed"
+        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+        if not campaign:
+            logger.error(f"❌ Campaign {campaign_id} was deleted during generation")
+            return
+        campaign.generation_status = "completed" if existing_image_count + len(generated_images) > 0 else "failed"
         
-        # Create new settings dict to force SQLAlchemy to detect change
-        new_settings = dict(campaign.settings) if campaign.settings else {}
-        new_settings["generated_images"] = generated_images
-        # Mark preview as generated if this was a preview generation
+        # Images were already saved row by row; only the preview flag lives in settings
         if campaign.status == "preview":
+            new_settings = dict(campaign.settings) if campaign.settings else {}
             new_settings["preview_generated"] = True
-        campaign.settings = new_settings
-        
-        # Force SQLAlchemy to detect the change
-        flag_modified(campaign, "settings")
+            campaign.settings = new_settings
+            flag_modified(campaign, "settings")
         
         db.commit()
-        db.refresh(campaign)
+        if video_options:
+            finish_video_stage(db, campaign_id, video_options, video_counts)
         
-        print(f"🎉 Campaign generation completed with {len(generated_images)} images")
-        print(f"📊 Expected: {shots_to_generate_count} shots, Generated: {len(generated_images)} shots")
-        print(f"🔍 DEBUG: Generated images structure: {generated_images}")
-        print(f"🔍 DEBUG: Campaign settings after update: {campaign.settings}")
+        logger.info(f"🎉 Campaign generation completed with {len(generated_images)} images")
+        logger.info(f"📊 Expected: {shots_to_generate_count} shots, Generated: {len(generated_images)} shots")
         if len(generated_images) < shots_to_generate_count:
-            print(f"⚠️ WARNING: Only {len(generated_images)}/{shots_to_generate_count} shots were generated successfully")
+            logger.warning(f"⚠️ WARNING: Only {len(generated_images)}/{shots_to_generate_count} shots were generated successfully")
         
     except Exception as e:
-        print(f"❌ Background generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Background generation failed: {e}")
         
         # Update campaign status to failed
         try:
@@ -1167,11 +1414,17 @@ async def generate_campaign_images_background(
                 campaign.generation_status = "failed"
                 db.commit()
         except Exception as update_error:
-            print(f"❌ Failed to update campaign status: {update_error}")
+            logger.error(f"❌ Failed to update campaign status: {update_error}")
     finally:
+        # Credits still held for pipelined videos (a crash mid-run) go back to the user
+        if video_options and video_options.get("reservation_id"):
+            try:
+                close_reservation(db, video_options["reservation_id"])
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to close credit reservation {video_options['reservation_id']}: {e}")
         # CRITICAL: Close database session to prevent connection pool exhaustion
         db.close()
-        print(f"✅ Database session closed for campaign {campaign_id}")
+        logger.info(f"✅ Database session closed for campaign {campaign_id}")
 
 @app.post("/campaigns/create")
 async def create_campaign(
@@ -1183,10 +1436,17 @@ async def create_campaign(
     selected_poses: str = Form("{}"),  # JSON string
     manikin_pose: str = Form("Pose-neutral.jpg"),  # Selected manikin pose
     number_of_images: int = Form(1),
-    current_user: dict = Depends(get_current_user),
+    generation_mode: str = Form("images"),  # "images" or "images+videos" (animate each keyframe as it lands)
+    video_model: str = Form("wan"),
+    video_quality: str = Form("480p"),
+    video_duration: str = Form("5s"),
+    video_prompt: Optional[str] = Form(None),
+    reuse_base: bool = Form(True),  # Reuse a base already composed from the same pose/outfit/scene
+    base_composition_id: Optional[str] = Form(None),  # Start from this base (see GET /base-compositions)
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
-    """Create a new campaign"""
+    """Create a new campaign (generation_mode="images+videos" also animates each preview keyframe)"""
     try:
         import json
         
@@ -1198,89 +1458,224 @@ async def create_campaign(
         
         if not product_id_list or not model_id_list or not scene_id_list:
             raise HTTPException(status_code=400, detail="Please select at least one product, model, and scene")
+        if generation_mode not in GENERATION_MODES:
+            raise HTTPException(status_code=400, detail=f"generation_mode must be one of {', '.join(GENERATION_MODES)}")
+        if base_composition_id:
+            chosen_base = get_base(db, current_user["user_id"], base_composition_id)
+            if not chosen_base:
+                raise HTTPException(status_code=404, detail="Base composition not found")
+            if chosen_base.model_id not in map(str, model_id_list) or chosen_base.scene_id not in map(str, scene_id_list):
+                raise HTTPException(status_code=400, detail="Base composition does not match the selected models and scenes")
+        
+        # One preview keyframe (and video) per model × scene
+        video_options = None
+        if generation_mode == "images+videos":
+            video_options = reserve_video_stage(db, current_user["user_id"], len(model_id_list) * len(scene_id_list),
+                                                video_model, video_quality, video_duration, video_prompt)
         
-        # Create campaign with "preview" status
-        campaign = Campaign(
-            user_id=current_user["user_id"],
-            name=name,
-            description=description,
-            status="preview",  # New: preview status
-            generation_status="generating",
-            settings={
-                "product_ids": product_id_list,
-                "model_ids": model_id_list,
-                "scene_ids": scene_id_list,
-                "selected_poses": selected_poses_dict,
-                "manikin_pose": manikin_pose,  # Store initial pose for preview
-                "generated_images": [],
-                "preview_generated": False
-            }
-        )
-        db.add(campaign)
-        db.commit()
-        db.refresh(campaign)
-        
-        print(f"🎯 Campaign created with ID: {campaign.id}, generating PREVIEW with pose: {manikin_pose}...")
+        try:
+            # Create campaign with "preview" status
+            campaign = Campaign(
+                user_id=current_user["user_id"],
+                name=name,
+                description=description,
+                status="preview",  # New: preview status
+                generation_status="generating",
+                settings={
+                    "product_ids": product_id_list,
+                    "model_ids": model_id_list,
+                    "scene_ids": scene_id_list,
+                    "selected_poses": selected_poses_dict,
+                    "manikin_pose": manikin_pose,  # Store initial pose for preview
+                    "preview_generated": False,
+                    "generation_mode": generation_mode,
+                    **({"bulk_video_status": "generating"} if video_options else {})
+                }
+            )
+            db.add(campaign)
+            db.commit()
+            db.refresh(campaign)
         
-        # Return immediately so frontend can show the campaign with "generating" status
-        response_data = {
-            "campaign": CampaignResponse.model_validate(campaign),
-            "message": f"Campaign '{name}' created - generating preview!",
-            "generated_images": []
-        }
+            logger.info(f"🎯 Campaign created with ID: {campaign.id}, generating PREVIEW with pose: {manikin_pose}...")
         
-        # Start PREVIEW generation in background (only 1 image with selected pose)
-        import asyncio
-        asyncio.create_task(generate_campaign_images_background(
-            campaign.id, 
-            product_id_list, 
-            model_id_list, 
-            scene_id_list, 
-            selected_poses_dict, 
-            1,  # Only 1 preview image
-            manikin_pose  # Use selected pose
-        ))
+            # Return immediately so frontend can show the campaign with "generating" status
+            response_data = {
+                "campaign": campaign_to_response(db, campaign),
+                "message": f"Campaign '{name}' created - generating preview!",
+                "generated_images": []
+            }
+            # The request session would otherwise hold its connection until the response is sent
+            db.close()
+        
+            # Start PREVIEW generation in background (only 1 image with selected pose)
+            import asyncio
+            asyncio.create_task(generate_campaign_images_background(
+                campaign.id, 
+                product_id_list, 
+                model_id_list, 
+                scene_id_list, 
+                selected_poses_dict, 
+                1,  # Only 1 preview image
+                manikin_pose,  # Use selected pose
+                video_options,
+                reuse_base,
+                base_composition_id
+            ))
+        except BaseException:
+            # The flow never started, so nothing else will release the held credits
+            release_video_stage(db, video_options)
+            raise
         
         return response_data
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON format")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/base-compositions")
+async def get_base_compositions(
+    model_id: Optional[str] = None,
+    scene_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user_claims),
+    db: Session = Depends(get_db)
+):
+    """The user's reusable base compositions, most recently used first (pass one as base_composition_id)"""
+    bases = list_bases(db, current_user["user_id"], model_id, scene_id)
+    return {"base_compositions": [base_to_dict(base) for base in bases]}
+
+@app.delete("/base-compositions/{base_id}")
+async def delete_base_composition(
+    base_id: str,
+    current_user: dict = Depends(get_current_user_claims),
+    db: Session = Depends(get_db)
+):
+    """Remove a base from the library (campaigns already using its image are not affected)"""
+    base = get_base(db, current_user["user_id"], base_id)
+    if not base:
+        raise HTTPException(status_code=404, detail="Base composition not found")
+    db.delete(base)
+    db.commit()
+    return {"message": "Base composition deleted", "id": base_id}
+
+# Users allowed to aggregate provider steps across all accounts (comma-separated ids)
+STATS_ADMIN_USER_IDS = {user_id.strip() for user_id in os.getenv("STATS_ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+@app.get("/generations/step-stats")
+async def get_generation_step_stats(
+    hours: int = Query(24, ge=1, le=24 * 90, description="Window length, ending now"),
+    bucket: Optional[str] = Query(None, pattern="^(hour|day)$", description="Split the window into hour or day buckets"),
+    model: Optional[str] = Query(None, description="Only this model slug"),
+    all_users: bool = Query(False, description="Every account's steps (STATS_ADMIN_USER_IDS only)"),
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """p50/p95 latency (queue, run, upload, total) and credits per model for provider steps"""
+    if all_users and current_user["user_id"] not in STATS_ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Not allowed to read every account's steps")
+    since = datetime.utcnow() - timedelta(hours=hours)
+    stats = await step_stats(db, since, bucket, user_id=None if all_users else current_user["user_id"], model=model)
+    return {"since": since.isoformat(), "hours": hours, "bucket": bucket, "models": stats}
+
+# Rows updated this long before a `since` cursor are sent again, covering writes that
+# committed after a later-stamped row (clients merge assets by image_id / video_id)
+STATUS_CURSOR_OVERLAP = timedelta(seconds=5)
+
+def campaign_status_etag(state, progress: dict) -> str:
+    """Weak ETag over the campaign row stamp, its asset aggregates and live progress stamps"""
+    parts = [str(value) for value in state]
+    parts += [f"{key}:{entry.get('updated_at')}" for key, entry in sorted(progress.items())]
+    return 'W/"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
 @app.get("/campaigns/{campaign_id}/status")
 async def get_campaign_generation_status(
     campaign_id: str,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    since: Optional[str] = Query(None, description="`cursor` from a previous response: only return images/videos changed after it"),
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get the generation status of a campaign including full campaign data"""
+    """
+    Get the generation status of a campaign including full campaign data.
+
+    Responses carry an ETag; polling with If-None-Match gets a 304 until
+    something changes. With `since`, only images and videos added or updated
+    after the cursor are returned (with total counts, so a client can spot
+    deletions), and settings only when the campaign row itself changed.
+    """
     try:
-        campaign = db.query(Campaign).filter(
-            Campaign.id == campaign_id,
-            Campaign.user_id == current_user["user_id"]
-        ).first()
+        since_at = None
+        if since:
+            try:
+                since_at = datetime.fromisoformat(since)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid since cursor")
         
-        if not campaign:
+        # One narrow row decides whether anything changed - no settings blob, no asset rows
+        state = (await db.execute(campaign_state_select(campaign_id, current_user["user_id"]))).first()
+        if not state:
             raise HTTPException(status_code=404, detail="Campaign not found")
         
-        # Return full campaign object so frontend can update modal with videos
-        return {
+        progress = get_all_progress(campaign_id)
+        etag = campaign_status_etag(state, progress)
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers)
+        response.headers.update(cache_headers)
+        
+        stamps = [stamp for stamp in (state.updated_at, state.images_updated_at, state.videos_updated_at) if stamp]
+        cursor = max(stamps).isoformat() if stamps else None
+        
+        campaign_query = select(Campaign).where(Campaign.id == campaign_id)
+        if since_at is not None:
+            campaign_query = campaign_query.options(defer(Campaign.settings))
+        campaign = await db.scalar(campaign_query)
+        result = {
             "campaign_id": campaign.id,
             "generation_status": campaign.generation_status,
             "status": campaign.status,
-            "generated_images_count": len(campaign.settings.get("generated_images", [])) if campaign.settings else 0,
+            "generated_images_count": state.images_count,
             "updated_at": campaign.updated_at,
+            "cursor": cursor,
             # Include full campaign for video updates
             "campaign": {
                 "id": campaign.id,
                 "name": campaign.name,
                 "status": campaign.status,
                 "generation_status": campaign.generation_status,
-                "settings": campaign.settings,
                 "created_at": campaign.created_at.isoformat() if campaign.created_at else None,
                 "updated_at": campaign.updated_at.isoformat() if campaign.updated_at else None
             }
         }
+        
+        if since_at is None:
+            assets = (await load_campaign_assets_async(db, [campaign.id]))[campaign.id]
+            result["campaign"]["settings"] = {**campaign_settings_with_assets(db, campaign, assets), **progress}
+            return result
+        
+        # Delta: changed assets plus totals, and settings only if the campaign row changed
+        changed_after = since_at - STATUS_CURSOR_OVERLAP
+        result["delta"] = {
+            **(await load_campaign_assets_since_async(db, campaign.id, changed_after)),
+            "generated_images_count": state.images_count,
+            "videos_count": state.videos_count,
+        }
+        result["progress"] = progress
+        if campaign.updated_at and campaign.updated_at > changed_after:
+            settings = await db.scalar(select(Campaign.settings).where(Campaign.id == campaign_id))
+            settings = {key: value for key, value in (settings or {}).items() if key not in ("generated_images", "videos")}
+            result["campaign"]["settings"] = {**settings, **progress}
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1290,24 +1685,27 @@ async def get_campaign_generation_status(
 @app.get("/campaigns/{campaign_id}/keyframe-progress")
 async def get_keyframe_progress(
     campaign_id: str,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get the progress of keyframe generation"""
     try:
-        campaign = db.query(Campaign).filter(
+        # Narrow query: ownership check + status only, never the settings blob
+        row = (await db.execute(select(Campaign.generation_status, Campaign.settings["keyframe_progress"]).where(
             Campaign.id == campaign_id,
             Campaign.user_id == current_user["user_id"]
-        ).first()
+        ))).first()
         
-        if not campaign:
+        if not row:
             raise HTTPException(status_code=404, detail="Campaign not found")
         
-        # Get progress from settings
-        progress = campaign.settings.get("keyframe_progress", {}) if campaign.settings else {}
+        generation_status, legacy_progress = row
+        
+        # Live progress comes from the progress store; fall back to anything persisted by older versions
+        progress = get_progress(campaign_id, "keyframe") or legacy_progress or {}
         
         return {
-            "status": campaign.generation_status,
+            "status": generation_status,
             "current": progress.get("current", 0),
             "total": progress.get("total", 0),
             "current_name": progress.get("current_name", ""),
@@ -1315,6 +1713,41 @@ async def get_keyframe_progress(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/campaigns/{campaign_id}/events")
+async def stream_campaign_events(
+    campaign_id: str,
+    request: Request,
+    current_user: dict = Depends(get_stream_user_claims)
+):
+    """
+    Server-Sent Events stream of a campaign's generation events
+    (image-ready, video-ready, progress, status, failed).
+
+    Reconnects resume from the Last-Event-ID header (or ?last_event_id=); a
+    `resync` event means events were missed and /status should be fetched once.
+    The database is only read once, to check ownership.
+    """
+    # Short-lived session: a request-scoped one would hold a connection for the life of the stream
+    async with AsyncSessionLocal() as db:
+        owned = await db.scalar(select(Campaign.id).where(
+            Campaign.id == campaign_id,
+            Campaign.user_id == current_user["user_id"]
+        ))
+    if not owned:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+
+    async def event_stream():
+        yield "retry: 3000\n\n"
+        async for entry in campaign_event_stream(campaign_id, last_event_id):
+            yield format_sse(entry)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx/Railway proxies must not buffer the stream
+    })
+
 # ============================================================
 # NEW: Generate Keyframe Variations from Base Image
 # ============================================================
@@ -1322,7 +1755,12 @@ async def get_keyframe_progress(
 async def generate_keyframe_variations(
     campaign_id: str,
     number_of_keyframes: int = Form(4),
-    current_user: dict = Depends(get_current_user),
+    generation_mode: str = Form("images"),  # "images" or "images+videos" (animate each keyframe as it lands)
+    video_model: str = Form("wan"),
+    video_quality: str = Form("480p"),
+    video_duration: str = Form("5s"),
+    video_prompt: Optional[str] = Form(None),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """
@@ -1333,6 +1771,10 @@ async def generate_keyframe_variations(
     2. Generates keyframe variations (close-ups, poses) using nano-banana
     3. Appends them to the campaign's generated images
     
+    With generation_mode="images+videos" every keyframe is also turned into a
+    video as soon as it is saved (credits for number_of_keyframes videos are
+    held up front; unused ones are released when the run ends).
+    
     The model, clothes, and scene remain IDENTICAL - only the framing/pose changes.
     """
     try:
@@ -1346,7 +1788,7 @@ async def generate_keyframe_variations(
             raise HTTPException(status_code=404, detail="Campaign not found")
         
         # Get existing generated images
-        generated_images = campaign.settings.get("generated_images", []) if campaign.settings else []
+        generated_images = get_campaign_images(db, campaign_id)
         
         if not generated_images:
             raise HTTPException(status_code=400, detail="No base image found. Generate a campaign image first.")
@@ -1367,37 +1809,54 @@ async def generate_keyframe_variations(
         if not base_image_url:
             raise HTTPException(status_code=400, detail="Base image URL not found")
         
-        print(f"🎬 KEYFRAME GENERATION: Using base image: {base_image_url[:60]}...")
-        print(f"📸 Generating {number_of_keyframes} keyframe variations...")
-        
-        # Update campaign status
-        campaign.generation_status = "generating"
-        new_settings = dict(campaign.settings) if campaign.settings else {}
-        campaign.settings = new_settings
-        flag_modified(campaign, "settings")
-        db.commit()
+        if generation_mode not in GENERATION_MODES:
+            raise HTTPException(status_code=400, detail=f"generation_mode must be one of {', '.join(GENERATION_MODES)}")
         
-        # Start keyframe generation in background
-        import asyncio
-        asyncio.create_task(generate_keyframes_background(
-            campaign_id,
-            base_image_url,
-            base_image,  # Pass full base image data for metadata
-            number_of_keyframes
-        ))
+        logger.info(f"🎬 KEYFRAME GENERATION: Using base image: {base_image_url[:60]}...")
+        logger.info(f"📸 Generating {number_of_keyframes} keyframe variations...")
+        
+        video_options = None
+        if generation_mode == "images+videos":
+            video_options = reserve_video_stage(db, current_user["user_id"], number_of_keyframes,
+                                                video_model, video_quality, video_duration, video_prompt)
+        
+        try:
+            # Update campaign status
+            campaign.generation_status = "generating"
+            new_settings = dict(campaign.settings) if campaign.settings else {}
+            if video_options:
+                new_settings["bulk_video_status"] = "generating"
+                new_settings.pop("bulk_video_progress", None)  # Live progress is served from the progress store
+            campaign.settings = new_settings
+            flag_modified(campaign, "settings")
+            db.commit()
+        
+            # Start keyframe generation in background
+            import asyncio
+            asyncio.create_task(generate_keyframes_background(
+                campaign_id,
+                base_image_url,
+                base_image,  # Pass full base image data for metadata
+                number_of_keyframes,
+                video_options
+            ))
+        except BaseException:
+            # The flow never started, so nothing else will release the held credits
+            release_video_stage(db, video_options)
+            raise
         
         return {
             "message": f"Generating {number_of_keyframes} keyframe variations from base image...",
             "campaign_id": campaign_id,
             "base_image_url": base_image_url,
+            "generation_mode": generation_mode,
             "status": "generating"
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unexpected error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1693,7 +2152,7 @@ async def get_keyframe_templates():
 async def generate_template_keyframes(
     campaign_id: str,
     template_id: str = Form(...),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """
@@ -1716,7 +2175,7 @@ async def generate_template_keyframes(
             raise HTTPException(status_code=404, detail="Campaign not found")
         
         # Get base image
-        generated_images = campaign.settings.get("generated_images", []) if campaign.settings else []
+        generated_images = get_campaign_images(db, campaign_id)
         if not generated_images:
             raise HTTPException(status_code=400, detail="No base image found. Generate a campaign image first.")
         
@@ -1732,15 +2191,12 @@ async def generate_template_keyframes(
         if not base_image_url:
             raise HTTPException(status_code=400, detail="Base image URL not found")
         
-        print(f"\n{'='*60}")
-        print(f"🎬 TEMPLATE KEYFRAME GENERATION")
-        print(f"{'='*60}")
-        print(f"📋 Template ID: {template_id}")
-        print(f"📋 Template Name: {template['name']}")
-        print(f"📸 Number of shots: {len(template['shots'])}")
-        print(f"🖼️ Base image: {base_image_url[:80]}...")
-        print(f"🔗 Will call Replicate nano-banana-pro for each shot")
-        print(f"{'='*60}")
+        logger.info(f"🎬 TEMPLATE KEYFRAME GENERATION")
+        logger.info(f"📋 Template ID: {template_id}")
+        logger.info(f"📋 Template Name: {template['name']}")
+        logger.info(f"📸 Number of shots: {len(template['shots'])}")
+        logger.info(f"🖼️ Base image: {base_image_url[:80]}...")
+        logger.info(f"🔗 Will call Replicate nano-banana-pro for each shot")
         
         # Update campaign status
         campaign.generation_status = "generating"
@@ -1774,11 +2230,11 @@ async def generate_template_keyframes(
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unexpected error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@track_job("template_keyframes")
 async def generate_template_keyframes_background(
     campaign_id: str,
     base_image_url: str,
@@ -1786,11 +2242,12 @@ async def generate_template_keyframes_background(
     template: dict
 ):
     """Background task to generate keyframes from a template"""
+    bind_log_context(campaign_id=campaign_id)
     db = SessionLocal()
     try:
         campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         if not campaign:
-            print(f"❌ Campaign {campaign_id} not found")
+            logger.error(f"❌ Campaign {campaign_id} not found")
             return
         
         # Create folder path for this campaign's template images
@@ -1798,173 +2255,105 @@ async def generate_template_keyframes_background(
         template_name_safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in template["name"])
         cloudinary_folder = f"campaigns/{campaign_name_safe}/{template_name_safe}"
         
-        print(f"\n{'='*60}")
-        print(f"🎬 TEMPLATE GENERATION: {template['name']}")
-        print(f"📁 Saving to folder: {cloudinary_folder}")
-        print(f"{'='*60}")
+        logger.info(f"🎬 TEMPLATE GENERATION: {template['name']}")
+        logger.info(f"📁 Saving to folder: {cloudinary_folder}")
         
         shots = template["shots"]
         total_shots = len(shots)
         
-        # Update progress
-        campaign.settings["keyframe_progress"] = {
-            "current": 0,
-            "total": total_shots,
-            "current_name": "Starting template generation..."
-        }
-        flag_modified(campaign, "settings")
-        db.commit()
-        
-        # Release SQLite lock immediately
-        db.close()
-        db = SessionLocal()
-        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-        
-        generated_images = campaign.settings.get("generated_images", [])
-        template_images = []  # Track images generated in this template run
-        first_shot_url = None  # Store the first shot to use as style reference for subsequent shots
+        # Update progress (progress store - no DB write)
+        set_progress(campaign_id, "keyframe", current=0, total=total_shots, current_name="Starting template generation...")
         
+        # Flow per shot: generate (Flux 2 Pro) → upload to Cloudinary → save row.
+        # Shot 1 is generated from the base campaign image; every later shot uses
+        # SHOT 1 as style reference for color/lighting consistency (or the base
+        # image if shot 1 failed), so once shot 1 is uploaded shots 2..N are
+        # generated and uploaded concurrently. Rows are still saved in shot order.
+        first_shot_url = Ref("shot_01.upload", default=None)
+        nodes = []
         for idx, shot in enumerate(shots):
-            try:
-                shot_name_safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in shot["name"])
-                print(f"\n📸 [{idx+1}/{total_shots}] Generating: {shot['name']}")
-                print(f"   Prompt: {shot['prompt'][:80]}...")
-                
-                # Update progress
-                campaign.settings["keyframe_progress"] = {
-                    "current": idx,
-                    "total": total_shots,
-                    "current_name": f"Generating {shot['name']}..."
-                }
-                flag_modified(campaign, "settings")
-                db.commit()
-                
-                # Release SQLite lock immediately after progress update
-                db.close()
-                db = SessionLocal()
-                campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-                generated_images = campaign.settings.get("generated_images", [])
-                
-                # For first shot: use base image as reference
-                # For subsequent shots: use FIRST SHOT as style reference for color/lighting consistency
-                if idx == 0:
-                    # First shot - generate from base campaign image
-                    reference_url = base_image_url
-                    style_prompt = shot["prompt"]
-                    print(f"   🎨 Using base campaign image as reference (establishing style)")
-                else:
-                    # Subsequent shots - use first shot as style reference
-                    reference_url = first_shot_url if first_shot_url else base_image_url
-                    # Add style consistency instruction to prompt
-                    style_prompt = (
-                        f"{shot['prompt']} "
-                        f"IMPORTANT: Match the exact color grading, lighting style, contrast, and visual aesthetic "
-                        f"of the reference image. Maintain consistent skin tones, clothing colors, and atmosphere."
-                    )
-                    print(f"   🎨 Using Shot 1 as style reference for consistency")
-                
-                # Generate using Flux 2 Pro with input_images (supports up to 8 reference images)
-                result_url = run_flux_2_pro(
-                    prompt=style_prompt,
-                    reference_images=[reference_url],  # Use appropriate reference
-                    guidance=3.5,  # Flux uses lower guidance values
-                    steps=28,
-                    aspect_ratio="9:16"  # Portrait/fashion ratio
+            shot_key = f"shot_{idx+1:02d}"
+            shot_name_safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in shot["name"])
+            shot_folder = f"{cloudinary_folder}/shot_{idx+1:02d}_{shot_name_safe}"
+            if idx == 0:
+                reference_url = base_image_url
+                style_prompt = shot["prompt"]
+            else:
+                reference_url = Ref("shot_01.upload", default=base_image_url)
+                # Add style consistency instruction to prompt
+                style_prompt = (
+                    f"{shot['prompt']} "
+                    f"IMPORTANT: Match the exact color grading, lighting style, contrast, and visual aesthetic "
+                    f"of the reference image. Maintain consistent skin tones, clothing colors, and atmosphere."
                 )
-                
-                if result_url:
-                    # Upload to Cloudinary with organized folder structure
-                    shot_folder = f"{cloudinary_folder}/shot_{idx+1:02d}_{shot_name_safe}"
-                    stable_url = upload_to_cloudinary(result_url, shot_folder)
-                    
-                    if not stable_url:
-                        stable_url = result_url  # Fallback to Replicate URL if upload fails
-                    
-                    # Save first shot URL as style reference for subsequent shots
-                    if idx == 0:
-                        first_shot_url = stable_url
-                        print(f"   🎨 Shot 1 saved as style reference for all subsequent shots")
-                    
-                    print(f"   📁 Saved to: {shot_folder}")
-                    
-                    # Add to generated images
-                    new_image = {
-                        "image_url": stable_url,
-                        "original_replicate_url": result_url,
-                        "base_image_url": base_image_url,
-                        "style_reference_url": first_shot_url if idx > 0 else None,  # Track style reference
-                        "shot_type": shot["name"],
-                        "shot_name": shot["name"],
-                        "shot_index": idx + 1,
-                        "template_id": template["id"],
-                        "template_name": template["name"],
-                        "cloudinary_folder": shot_folder,
-                        "prompt_used": shot["prompt"],
-                        "model_name": base_image_data.get("model_name", "Model"),
-                        "product_name": base_image_data.get("product_name", "Product"),
-                        "scene_name": base_image_data.get("scene_name", "Scene"),
-                        "clothing_type": base_image_data.get("clothing_type", "Outfit"),
-                        "is_base_image": False,
-                        "is_template_shot": True,
-                        "is_style_reference": idx == 0,  # Mark first shot as the style reference
-                        "generated_at": datetime.utcnow().isoformat()
-                    }
-                    generated_images.append(new_image)
-                    template_images.append(new_image)
-                    
-                    # Update progress to show this shot is COMPLETE (idx + 1)
-                    campaign.settings["keyframe_progress"] = {
-                        "current": idx + 1,  # Completed shots count
-                        "total": total_shots,
-                        "current_name": f"✅ {shot['name']} complete"
-                    }
-                    
-                    # Save immediately after each image
-                    campaign.settings["generated_images"] = generated_images
-                    flag_modified(campaign, "settings")
-                    db.commit()
-                    
-                    # IMPORTANT: Release SQLite file lock to allow other requests
-                    # Close current session and get a fresh one
-                    db.close()
-                    db = SessionLocal()
-                    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-                    generated_images = campaign.settings.get("generated_images", [])
-                    
-                    print(f"   ✅ Success: {stable_url[:60]}...")
-                    print(f"   📊 Progress: {idx + 1}/{total_shots} complete")
-                else:
-                    print(f"   ❌ Failed to generate shot {idx+1}")
-                    
-            except Exception as e:
-                print(f"   ❌ Error generating {shot['name']}: {e}")
-                import traceback
-                traceback.print_exc()
-                # Continue with next shot even if one fails
-                continue
+            nodes.append(Node(
+                f"{shot_key}.generate", "variation",
+                # Flux 2 Pro with input_images; Flux uses lower guidance values, portrait/fashion ratio
+                {"prompt": style_prompt, "reference_images": [reference_url], "guidance": 3.5, "steps": 28, "aspect_ratio": "9:16"},
+                label=shot["name"],
+            ))
+            # Upload to Cloudinary with organized folder structure (falls back to the Replicate URL)
+            nodes.append(Node(f"{shot_key}.upload", "upload", {"url": Ref(f"{shot_key}.generate"), "folder": shot_folder},
+                              label=shot["name"]))
+            nodes.append(Node(f"{shot_key}.save", "save-image", {
+                "campaign_id": campaign_id,
+                "image": {
+                    "image_url": Ref(f"{shot_key}.upload"),
+                    "original_replicate_url": Ref(f"{shot_key}.generate"),
+                    "base_image_url": base_image_url,
+                    "style_reference_url": first_shot_url if idx > 0 else None,  # Track style reference
+                    "shot_type": shot["name"],
+                    "shot_name": shot["name"],
+                    "shot_index": idx + 1,
+                    "template_id": template["id"],
+                    "template_name": template["name"],
+                    "cloudinary_folder": shot_folder,
+                    "prompt_used": shot["prompt"],
+                    "model_name": base_image_data.get("model_name", "Model"),
+                    "product_name": base_image_data.get("product_name", "Product"),
+                    "scene_name": base_image_data.get("scene_name", "Scene"),
+                    "clothing_type": base_image_data.get("clothing_type", "Outfit"),
+                    "is_base_image": False,
+                    "is_template_shot": True,
+                    "is_style_reference": idx == 0,  # Mark first shot as the style reference
+                },
+            }, after=(f"shot_{idx:02d}.save",) if idx > 0 else (), label=shot["name"]))
+        
+        template_images = []  # Image rows saved in this template run
+        
+        def on_node(node, state, value):
+            if node.step == "variation" and state == "running":
+                logger.info(f"📸 Generating: {node.label}")
+                set_progress(campaign_id, "keyframe", current=len(template_images), total=total_shots,
+                             current_name=f"Generating {node.label}...")
+            elif node.step == "save-image" and state == "done":
+                template_images.append(value)
+                # Progress shows this shot as COMPLETE
+                set_progress(campaign_id, "keyframe", current=len(template_images), total=total_shots,
+                             current_name=f"✅ {node.label} complete")
+                step_logger.info(f"📊 Progress: {len(template_images)}/{total_shots} complete")
+        
+        # Don't hold a pooled connection while the providers work
+        db.close()
+        await run_pipeline(Pipeline("template-keyframes", nodes), campaign_id=campaign_id, listener=on_node)
         
-        print(f"\n📊 Template generation summary:")
-        print(f"   - Total shots attempted: {total_shots}")
-        print(f"   - Successfully generated: {len(template_images)}")
-        print(f"   - Saved to folder: {cloudinary_folder}")
+        logger.info(f"📊 Template generation summary:")
+        step_logger.info(f"- Total shots attempted: {total_shots}")
+        step_logger.info(f"- Successfully generated: {len(template_images)}")
+        step_logger.info(f"- Saved to folder: {cloudinary_folder}")
         
         # Mark complete
+        set_progress(campaign_id, "keyframe", current=total_shots, total=total_shots, current_name="Complete!")
+        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         campaign.generation_status = "completed"
-        campaign.settings["keyframe_progress"] = {
-            "current": total_shots,
-            "total": total_shots,
-            "current_name": "Complete!"
-        }
         campaign.settings["template_generation"]["status"] = "completed"
         flag_modified(campaign, "settings")
         db.commit()
         
-        print(f"\n✅ Template generation complete: {template['name']}")
+        logger.info(f"✅ Template generation complete: {template['name']}")
         
     except Exception as e:
-        print(f"❌ Template generation error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Template generation error: {e}")
         
         try:
             campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
@@ -1980,27 +2369,29 @@ async def generate_template_keyframes_background(
         db.close()
 
 
+@track_job("keyframes")
 async def generate_keyframes_background(
     campaign_id: str,
     base_image_url: str,
     base_image_data: dict,
-    number_of_keyframes: int
+    number_of_keyframes: int,
+    video_options: Optional[dict] = None
 ):
     """
     Background task to generate keyframe variations from a base image.
     Uses nano-banana-pro to create variations while preserving identity.
+    With video_options each keyframe is animated as soon as it is saved.
     """
+    bind_log_context(campaign_id=campaign_id)
     db = SessionLocal()
     try:
         campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         if not campaign:
-            print(f"❌ Campaign {campaign_id} not found")
+            logger.error(f"❌ Campaign {campaign_id} not found")
             return
         
-        print(f"\n{'='*60}")
-        print(f"🎬 KEYFRAME GENERATION for campaign: {campaign.name}")
-        print(f"{'='*60}")
-        print(f"📷 Base image: {base_image_url[:60]}...")
+        logger.info(f"🎬 KEYFRAME GENERATION for campaign: {campaign.name}")
+        logger.info(f"📷 Base image: {base_image_url[:60]}...")
         
         # Define all available keyframe variations - MIXED ORDER for variety
         # Close-ups interspersed with candid/scene shots
@@ -2107,7 +2498,7 @@ async def generate_keyframes_background(
         ]
         
         # Get existing images to append to
-        existing_images = campaign.settings.get("generated_images", []) if campaign.settings else []
+        existing_images = get_campaign_images(db, campaign_id)
         
         # Find which variations are already generated
         existing_keys = set()
@@ -2115,7 +2506,7 @@ async def generate_keyframes_background(
             if img.get("shot_name"):
                 existing_keys.add(img["shot_name"])
         
-        print(f"📌 Already generated: {existing_keys}")
+        logger.info(f"📌 Already generated: {existing_keys}")
         
         # Filter out variations that are already generated
         variations_to_generate = [v for v in KEYFRAME_VARIATIONS if v["name"] not in existing_keys]
@@ -2124,12 +2515,14 @@ async def generate_keyframes_background(
         variations_to_generate = variations_to_generate[:number_of_keyframes]
         
         if not variations_to_generate:
-            print(f"⚠️ All keyframe variations already generated!")
+            logger.warning(f"⚠️ All keyframe variations already generated!")
             campaign.generation_status = "completed"
             db.commit()
+            if video_options:
+                finish_video_stage(db, campaign_id, video_options, {"success": 0, "failed": 0})
             return
         
-        print(f"🎬 Generating {len(variations_to_generate)} new keyframe variations...")
+        logger.info(f"🎬 Generating {len(variations_to_generate)} new keyframe variations...")
         
         # Extract metadata from base image
         product_name = base_image_data.get("product_name", "outfit")
@@ -2141,55 +2534,20 @@ async def generate_keyframes_background(
         clothing_type = base_image_data.get("clothing_type", "outfit")
         
         total_to_generate = len(variations_to_generate)
-        new_images = []
         
-        # Initialize progress tracking
-        new_settings = dict(campaign.settings) if campaign.settings else {}
-        new_settings["keyframe_progress"] = {
-            "current": 0,
-            "total": total_to_generate,
-            "current_name": "Starting..."
-        }
-        campaign.settings = new_settings
-        flag_modified(campaign, "settings")
-        db.commit()
-        
-        for var_idx, variation in enumerate(variations_to_generate, 1):
-            try:
-                print(f"\n🎥 [{var_idx}/{total_to_generate}] {variation['title']}")
-                print(f"   📝 Prompt: {variation['prompt'][:80]}...")
-                print(f"   ⚙️ Strength: {variation['strength']}")
-                
-                # Update progress BEFORE generating
-                new_settings = dict(campaign.settings) if campaign.settings else {}
-                new_settings["keyframe_progress"] = {
-                    "current": var_idx - 1,
-                    "total": total_to_generate,
-                    "current_name": f"Generating: {variation['title']}..."
-                }
-                campaign.settings = new_settings
-                flag_modified(campaign, "settings")
-                db.commit()
-                
-                # Generate variation using Flux 2 Pro
-                variation_url = run_flux_2_pro(
-                    prompt=variation['prompt'],
-                    reference_images=[base_image_url],
-                    guidance=3.5,
-                    steps=28,
-                    aspect_ratio="9:16"
-                )
-                
-                # Stabilize the URL
-                if 'stabilize_url' in globals():
-                    final_url = stabilize_url(to_url(variation_url), f"keyframe_{variation['key']}")
-                else:
-                    final_url = download_and_save_image(to_url(variation_url), f"keyframe_{variation['key']}")
-                
-                print(f"   ✅ Keyframe saved: {final_url[:60]}...")
-                
-                # Create image entry
-                new_image = {
+        # Initialize progress tracking (progress store - no DB write)
+        set_progress(campaign_id, "keyframe", current=0, total=total_to_generate, current_name="Starting...")
+        
+        # Flow per variation: Flux 2 Pro from the base image → stabilize → save row (→ video)
+        nodes = []
+        for variation in variations_to_generate:
+            key = variation["key"]
+            nodes.append(Node(key, "variation", {"prompt": variation['prompt'], "reference_images": [base_image_url]},
+                              label=variation['title']))
+            nodes.append(Node(f"{key}.stable", "stabilize", {"url": Ref(key), "prefix": f"keyframe_{key}"}))
+            nodes.append(Node(f"{key}.save", "save-image", {
+                "campaign_id": campaign_id,
+                "image": {
                     "product_name": product_name,
                     "product_id": product_ids[0] if product_ids else "",
                     "product_ids": product_ids,
@@ -2197,67 +2555,54 @@ async def generate_keyframes_background(
                     "scene_name": scene_name,
                     "shot_type": variation['title'],
                     "shot_name": variation['name'],
-                    "image_url": final_url,
+                    "image_url": Ref(f"{key}.stable"),
                     "base_image_url": base_image_url,
                     "model_image_url": model_image_url,
                     "product_image_url": product_image_url,
                     "clothing_type": clothing_type,
                     "is_base_image": False,
                     "is_keyframe_variation": True
-                }
-                new_images.append(new_image)
-                
-                # IMMEDIATELY save image to campaign so user can see it
-                # Refresh existing images from DB to get latest state
-                db.refresh(campaign)
-                current_images = campaign.settings.get("generated_images", []) if campaign.settings else []
-                current_images.append(new_image)
-                
-                # Update progress AND images AFTER generating
-                new_settings = dict(campaign.settings) if campaign.settings else {}
-                new_settings["generated_images"] = current_images  # Save images immediately
-                new_settings["keyframe_progress"] = {
-                    "current": var_idx,
-                    "total": total_to_generate,
-                    "current_name": f"✅ {variation['title']}"
-                }
-                campaign.settings = new_settings
-                flag_modified(campaign, "settings")
-                db.commit()
-                
-                # IMPORTANT: Release SQLite file lock to allow other requests
-                db.close()
-                db = SessionLocal()
-                campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-                
-                print(f"   💾 Image saved to campaign - now visible to user!")
-                
-            except Exception as e:
-                print(f"❌ Failed keyframe {variation['title']}: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
+                },
+            }, label=variation['title']))
+            if video_options:
+                add_video_nodes(nodes, f"{key}.save", Ref(f"{key}.stable"), video_options, label=variation['title'])
+        
+        new_images = []  # Image rows saved in this run
+        video_counts = {"success": 0, "failed": 0}
+        on_video = track_video_stage(campaign_id, total_to_generate, video_counts) if video_options else None
+        
+        def on_node(node, state, value):
+            if on_video is not None:
+                on_video(node, state, value)
+            if node.step == "variation" and state == "running":
+                logger.info(f"🎥 Generating: {node.label}")
+                set_progress(campaign_id, "keyframe", current=len(new_images), total=total_to_generate,
+                             current_name=f"Generating: {node.label}...")
+            elif node.step == "save-image" and state == "done":
+                # Saved immediately so the user can see it
+                new_images.append(value)
+                set_progress(campaign_id, "keyframe", current=len(new_images), total=total_to_generate,
+                             current_name=f"✅ {node.label}")
+                step_logger.info(f"💾 {node.label} saved to campaign - now visible to user!")
+        
+        # Don't hold a pooled connection while the providers work
+        db.close()
+        await run_pipeline(Pipeline("keyframes", nodes), campaign_id=campaign_id, listener=on_node)
         
         # Mark as completed
+        set_progress(campaign_id, "keyframe", current=total_to_generate, total=total_to_generate, current_name="All keyframes completed!")
+        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         campaign.generation_status = "completed"
-        new_settings = dict(campaign.settings) if campaign.settings else {}
-        new_settings["keyframe_progress"] = {
-            "current": total_to_generate,
-            "total": total_to_generate,
-            "current_name": "All keyframes completed!"
-        }
-        campaign.settings = new_settings
-        flag_modified(campaign, "settings")
         db.commit()
+        if video_options:
+            finish_video_stage(db, campaign_id, video_options, video_counts)
         
-        print(f"\n🎉 Keyframe generation complete!")
-        print(f"   📸 Generated {len(new_images)} new keyframes")
-        print(f"   📊 Total images: {len(all_images)}")
+        logger.info(f"🎉 Keyframe generation complete!")
+        step_logger.info(f"📸 Generated {len(new_images)} new keyframes")
+        step_logger.info(f"📊 Total images: {len(existing_images) + len(new_images)}")
         
     except Exception as e:
-        print(f"❌ Keyframe generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Keyframe generation failed: {e}")
         
         try:
             campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
@@ -2265,10 +2610,16 @@ async def generate_keyframes_background(
                 campaign.generation_status = "failed"
                 db.commit()
         except Exception as update_error:
-            print(f"❌ Failed to update campaign status: {update_error}")
+            logger.error(f"❌ Failed to update campaign status: {update_error}")
     finally:
+        # Credits still held for pipelined videos (a crash mid-run) go back to the user
+        if video_options and video_options.get("reservation_id"):
+            try:
+                close_reservation(db, video_options["reservation_id"])
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to close credit reservation {video_options['reservation_id']}: {e}")
         db.close()
-        print(f"✅ Database session closed for keyframe generation {campaign_id}")
+        logger.info(f"✅ Database session closed for keyframe generation {campaign_id}")
 
 
 @app.post("/campaigns/{campaign_id}/generate")
@@ -2279,7 +2630,7 @@ async def generate_campaign_images(
     scene_ids: str = Form("[]"),
     selected_poses: str = Form("{}"),
     number_of_images: int = Form(1),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Generate images for a campaign"""
@@ -2311,12 +2662,12 @@ async def generate_campaign_images(
         campaign.status = "processing"
         db.commit()
         
-        print(f"🎯 Generating MORE images for campaign: {campaign.name}")
-        print(f"📊 {len(products)} products × {len(models)} models × {len(scenes)} scenes")
+        logger.info(f"🎯 Generating MORE images for campaign: {campaign.name}")
+        logger.info(f"📊 {len(products)} products × {len(models)} models × {len(scenes)} scenes")
         
-        # Get existing images to APPEND to them
-        existing_images = campaign.settings.get("generated_images", []) if campaign.settings else []
-        print(f"📌 Existing images: {len(existing_images)}")
+        # Count existing images - new ones are APPENDED as rows
+        existing_image_count = count_campaign_images(db, campaign_id)
+        logger.info(f"📌 Existing images: {existing_image_count}")
         
         new_images = []
         
@@ -2328,14 +2679,14 @@ async def generate_campaign_images(
                 if model.poses and len(model.poses) > 0:
                     import random
                     model_image = random.choice(model.poses)
-                    print(f"🎭 Using random pose for {model.name}")
+                    logger.info(f"🎭 Using random pose for {model.name}")
                 else:
                     model_image = model.image_url
                 
                 # Build product list names for logging
                 product_names = ", ".join([p.name for p in products])
-                print(f"🎬 Processing campaign flow: [{product_names}] + {model.name} + {scene.name}")
-                print(f"📸 Generating {number_of_images} images with {len(products)} product(s)...")
+                logger.info(f"🎬 Processing campaign flow: [{product_names}] + {model.name} + {scene.name}")
+                logger.info(f"📸 Generating {number_of_images} images with {len(products)} product(s)...")
                 
                 # Generate only the requested number of images - RANDOMIZED
                 import random
@@ -2352,17 +2703,17 @@ async def generate_campaign_images(
                     if full_body_frontal_shots and len(shot_types_to_generate) > 0:
                         # Replace first shot with a full body frontal one
                         shot_types_to_generate[0] = full_body_frontal_shots[0]
-                        print(f"🎯 Using full body frontal shot for manikin pose: {full_body_frontal_shots[0]['title']}")
+                        logger.info(f"🎯 Using full body frontal shot for manikin pose: {full_body_frontal_shots[0]['title']}")
                     elif len(shot_types_to_generate) > 0:
                         # Fallback to any frontal shot if no full body found
                         frontal_shots = [s for s in available_shots if 'side' not in s['name'].lower() and 'profile' not in s['name'].lower()]
                         if frontal_shots:
                             shot_types_to_generate[0] = frontal_shots[0]
-                            print(f"🎯 Using frontal shot for manikin pose: {frontal_shots[0]['title']}")
+                            logger.info(f"🎯 Using frontal shot for manikin pose: {frontal_shots[0]['title']}")
                 
                     for shot_idx, shot_type in enumerate(shot_types_to_generate, 1):
                         try:
-                            print(f"\n🎥 [{shot_idx}/{number_of_images}] {shot_type['title']}")
+                            logger.info(f"🎥 [{shot_idx}/{number_of_images}] {shot_type['title']}")
                             
                             # NEW MULTI-PRODUCT WORKFLOW
                             # Step 1: Generate base image with first product using Qwen
@@ -2375,7 +2726,7 @@ async def generate_campaign_images(
                             stable_scene = stabilize_url(scene.image_url, "scene") if 'stabilize_url' in globals() else scene.image_url
                             stable_first_product = stabilize_url(first_product_image, "product") if 'stabilize_url' in globals() else first_product_image
                             
-                            print(f"🎬 Step 1: Qwen base composition - Model + {first_product.name} + Scene...")
+                            logger.info(f"🎬 Step 1: Qwen base composition - Model + {first_product.name} + Scene...")
                             person_wearing_product_url = run_qwen_triple_composition(
                                 stable_model,
                                 stable_first_product,
@@ -2385,12 +2736,12 @@ async def generate_campaign_images(
                                 shot_type_prompt=shot_type['prompt'],
                                 clothing_type=first_product.clothing_type
                             )
-                            print(f"✅ Base image with {first_product.name} completed: {person_wearing_product_url[:50]}...")
+                            logger.info(f"✅ Base image with {first_product.name} completed: {person_wearing_product_url[:50]}...")
                             
                             # Step 2: Add additional products sequentially using nano-banana
                             current_image_url = person_wearing_product_url
                             if len(products) > 1:
-                                print(f"👕 Adding {len(products) - 1} additional product(s) using nano-banana...")
+                                logger.info(f"👕 Adding {len(products) - 1} additional product(s) using nano-banana...")
                                 for additional_product in products[1:]:
                                     additional_product_image = additional_product.packshot_front_url or additional_product.image_url
                                     stable_additional_product = stabilize_url(additional_product_image, "product") if 'stabilize_url' in globals() else additional_product_image
@@ -2398,14 +2749,14 @@ async def generate_campaign_images(
                                     # Get product type from clothing_type field
                                     product_type = additional_product.clothing_type if hasattr(additional_product, 'clothing_type') and additional_product.clothing_type else "garment"
                                     
-                                    print(f"➕ Adding {additional_product.name} ({product_type}) to current image...")
+                                    logger.info(f"➕ Adding {additional_product.name} ({product_type}) to current image...")
                                     current_image_url = add_product_to_image(
                                         current_image_url,
                                         stable_additional_product,
                                         additional_product.name,
                                         product_type
                                     )
-                                print(f"✅ All {len(products)} products added successfully!")
+                                logger.info(f"✅ All {len(products)} products added successfully!")
                             
                             # Update reference to final image with all products
                             person_wearing_product_url = current_image_url
@@ -2413,7 +2764,7 @@ async def generate_campaign_images(
                             # Step 3: SKIP manikin pose replacement - it causes unnatural results
                             # Just use the Qwen output directly
                             final_result_url = person_wearing_product_url
-                            print(f"✅ Using Qwen output directly (skipping pose replacement for more natural look)")
+                            logger.info(f"✅ Using Qwen output directly (skipping pose replacement for more natural look)")
                             
                             # OLD CODE - Causing unnatural poses:
                             # if shot_idx == 1:
@@ -2426,9 +2777,9 @@ async def generate_campaign_images(
                             first_product_type = products[0].clothing_type if hasattr(products[0], 'clothing_type') and products[0].clothing_type else "outfit"
                             
                             # Normalize and store final URL
-                            print(f"💾 Normalizing final result URL...")
+                            logger.info(f"💾 Normalizing final result URL...")
                             final_url = stabilize_url(to_url(final_result_url), f"final_{shot_type['name']}") if 'stabilize_url' in globals() else download_and_save_image(to_url(final_result_url), f"campaign_{shot_type['name']}")
-                            print(f"✅ Final result saved locally: {final_url[:50]}...")
+                            logger.info(f"✅ Final result saved locally: {final_url[:50]}...")
                             
                             new_images.append({
                                 "product_name": combined_product_names,
@@ -2444,56 +2795,47 @@ async def generate_campaign_images(
                                 "clothing_type": first_product_type
                             })
                             
-                            print(f"✅ Shot completed: {shot_type['title']}")
+                            logger.info(f"✅ Shot completed: {shot_type['title']}")
                             
                         except Exception as e:
-                            print(f"❌ Failed shot {shot_type['title']}: {e}")
-                            import traceback
-                            traceback.print_exc()
+                            logger.exception(f"❌ Failed shot {shot_type['title']}: {e}")
                             continue
                     
-                print(f"\n🎉 Campaign flow complete: [{product_names}] + {model.name} + {scene.name}")
+                logger.info(f"🎉 Campaign flow complete: [{product_names}] + {model.name} + {scene.name}")
         
         # Update campaign
         campaign.status = "completed" if len(new_images) > 0 else "failed"
         
         # APPEND new images to existing ones (don't replace!)
-        all_images = existing_images + new_images
-        print(f"📊 Total images: {len(existing_images)} existing + {len(new_images)} new = {len(all_images)} total")
-        
-        # Create new settings dict to force SQLAlchemy to detect change
-        new_settings = dict(campaign.settings) if campaign.settings else {}
-        new_settings["generated_images"] = all_images
-        campaign.settings = new_settings
-        
-        # Force SQLAlchemy to detect the change
-        flag_modified(campaign, "settings")
+        add_campaign_images(db, campaign_id, new_images, commit=False)
+        total_images = existing_image_count + len(new_images)
+        logger.info(f"📊 Total images: {existing_image_count} existing + {len(new_images)} new = {total_images} total")
         
         db.commit()
         db.refresh(campaign)
         
-        print(f"🎉 Campaign update complete: {len(new_images)} new images generated, {len(all_images)} total")
+        logger.info(f"🎉 Campaign update complete: {len(new_images)} new images generated, {total_images} total")
         
         return {
-            "message": f"Generated {len(new_images)} new images ({len(all_images)} total)",
-            "campaign": CampaignResponse.model_validate(campaign),
+            "message": f"Generated {len(new_images)} new images ({total_images} total)",
+            "campaign": campaign_to_response(db, campaign),
             "generated_images": new_images,  # Return only new images
-            "total_images": len(all_images)
+            "total_images": total_images
         }
         
     except Exception as e:
-        print(f"❌ Campaign generation failed: {e}")
+        logger.error(f"❌ Campaign generation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/campaigns/{campaign_id}/generate-all-poses")
 async def generate_all_pose_variations(
     campaign_id: str,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Generate images for ALL manikin poses (neutral, handneck, thinking)"""
-    print(f"🎯 ENDPOINT HIT: generate-all-poses for campaign {campaign_id}")
-    print(f"👤 User: {current_user.get('user_id', 'unknown')}")
+    logger.info(f"🎯 ENDPOINT HIT: generate-all-poses for campaign {campaign_id}")
+    logger.info(f"👤 User: {current_user.get('user_id', 'unknown')}")
     try:
         campaign = db.query(Campaign).filter(
             Campaign.id == campaign_id,
@@ -2501,7 +2843,7 @@ async def generate_all_pose_variations(
         ).first()
         
         if not campaign:
-            print(f"❌ Campaign {campaign_id} not found for user {current_user['user_id']}")
+            logger.error(f"❌ Campaign {campaign_id} not found for user {current_user['user_id']}")
             raise HTTPException(status_code=404, detail="Campaign not found")
         
         # All available poses
@@ -2513,9 +2855,9 @@ async def generate_all_pose_variations(
         # Generate for remaining poses
         remaining_poses = [pose for pose in ALL_POSES if pose != preview_pose]
         
-        print(f"🎯 Generating full campaign with {len(remaining_poses)} additional poses...")
-        print(f"📋 Preview pose: {preview_pose}")
-        print(f"📋 Remaining poses: {remaining_poses}")
+        logger.info(f"🎯 Generating full campaign with {len(remaining_poses)} additional poses...")
+        logger.info(f"📋 Preview pose: {preview_pose}")
+        logger.info(f"📋 Remaining poses: {remaining_poses}")
         
         campaign.status = "generating_full"
         campaign.generation_status = "generating"
@@ -2538,7 +2880,7 @@ async def generate_all_pose_variations(
             remaining_poses
         ))
         
-        print(f"✅ Background task started for {len(remaining_poses)} poses")
+        logger.info(f"✅ Background task started for {len(remaining_poses)} poses")
         
         return {
             "message": f"Generating {len(remaining_poses)} additional pose variations",
@@ -2550,9 +2892,7 @@ async def generate_all_pose_variations(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Failed to start full campaign generation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Failed to start full campaign generation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 async def generate_multiple_pose_variations(
@@ -2570,23 +2910,23 @@ async def generate_multiple_pose_variations(
         # Get campaign and preview image
         campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         if not campaign:
-            print(f"❌ Campaign {campaign_id} not found")
+            logger.error(f"❌ Campaign {campaign_id} not found")
             return
         
         # Get the preview image (first generated image)
-        existing_images = campaign.settings.get("generated_images", []) if campaign.settings else []
+        existing_images = get_campaign_images(db, campaign_id)
         if not existing_images or len(existing_images) == 0:
-            print(f"❌ No preview image found for campaign {campaign_id}")
+            logger.error(f"❌ No preview image found for campaign {campaign_id}")
             campaign.generation_status = "failed"
             db.commit()
             return
         
         preview_image = existing_images[0]
         preview_image_url = preview_image.get("image_url")
-        print(f"🖼️ Using preview image as base: {preview_image_url[:80]}...")
+        logger.info(f"🖼️ Using preview image as base: {preview_image_url[:80]}...")
         
-        # Load existing images to append new poses
-        generated_images = existing_images.copy()
+        # New pose images are appended as rows at the end
+        generated_images = []
         
         # Define different positions for the model WITHIN the scene for each pose
         pose_angles = {
@@ -2602,46 +2942,30 @@ async def generate_multiple_pose_variations(
         
         # For each remaining pose, use nano-banana to transfer pose + reposition model in scene
         for pose_idx, pose_filename in enumerate(poses, 1):
-            print(f"\n📸 [{pose_idx}/{len(poses)}] Applying pose: {pose_filename}")
+            logger.info(f"📸 [{pose_idx}/{len(poses)}] Applying pose: {pose_filename}")
             
             try:
-                # Get manikin pose URL from cache or upload on-demand
-                cached_url = POSE_IMAGE_URLS.get(pose_filename)
-                if cached_url and cached_url.startswith("https://res.cloudinary.com/"):
-                    manikin_pose_url = cached_url
-                    print(f"✅ Using Cloudinary URL for {pose_filename}")
-                else:
-                    # Not in cache or not a Cloudinary URL - try to upload
-                    print(f"⚠️ Pose {pose_filename} not in Cloudinary cache, uploading...")
-                    api_dir = os.path.dirname(os.path.abspath(__file__))
-                    static_path = os.path.join(api_dir, "static", "poses", pose_filename)
-                    if os.path.exists(static_path):
-                        import base64
-                        with open(static_path, "rb") as f:
-                            file_content = f.read()
-                            ext = pose_filename.split('.')[-1] if '.' in pose_filename else 'jpg'
-                            data_url = f"data:image/{ext};base64,{base64.b64encode(file_content).decode()}"
-                            manikin_pose_url = upload_to_cloudinary(data_url, "manikin_pose")
-                            # Update cache
-                            POSE_IMAGE_URLS[pose_filename] = manikin_pose_url
-                            print(f"✅ Uploaded {pose_filename} to Cloudinary: {manikin_pose_url[:80]}...")
-                    else:
-                        print(f"❌ Pose file not found: {static_path}")
-                        continue
+                # Get manikin pose URL from the pose manifest (uploads once on a miss)
+                try:
+                    manikin_pose_url = get_pose_image_url(pose_filename)
+                    logger.info(f"✅ Using pose URL for {pose_filename}: {manikin_pose_url[:80]}...")
+                except FileNotFoundError as e:
+                    logger.error(f"❌ {e}")
+                    continue
                 
                 # Use nano-banana to transfer pose
-                print(f"🍌 Transferring pose from {pose_filename} to preview image...")
+                logger.info(f"🍌 Transferring pose from {pose_filename} to preview image...")
                 new_pose_image_url = replace_manikin_with_person(manikin_pose_url, preview_image_url)
-                print(f"✅ Pose transfer completed: {new_pose_image_url[:80]}...")
+                logger.info(f"✅ Pose transfer completed: {new_pose_image_url[:80]}...")
                 
                 # Check if the result is different from preview
                 if new_pose_image_url == preview_image_url:
-                    print(f"⚠️ Result is same as preview - pose transfer may have failed")
+                    logger.warning(f"⚠️ Result is same as preview - pose transfer may have failed")
                 
                 # Apply model repositioning if defined for this pose
                 if pose_filename in pose_angles:
                     angle_info = pose_angles[pose_filename]
-                    print(f"📐 Repositioning model: {angle_info['angle']}")
+                    logger.info(f"📐 Repositioning model: {angle_info['angle']}")
                     
                     angle_prompt = (
                         f"Reposition the person to a different location within the same scene: {angle_info['angle']}. "
@@ -2666,29 +2990,27 @@ async def generate_multiple_pose_variations(
                     # Upload to Cloudinary
                     if angle_result_url:
                         new_pose_image_url = upload_to_cloudinary(angle_result_url, "angle_variation")
-                        print(f"✅ Camera angle applied: {angle_info['angle']}")
+                        logger.info(f"✅ Camera angle applied: {angle_info['angle']}")
                 
                 # Create new image entry with same metadata but new pose
-                new_image = preview_image.copy()
+                new_image = {key: value for key, value in preview_image.items() if key not in ("image_id", "video_url")}
                 new_image["image_url"] = new_pose_image_url
                 new_image["shot_type"] = f"Pose Variation ({pose_filename})"
                 new_image["shot_name"] = f"pose_{pose_filename.replace('.jpg', '').replace('Pose-', '').lower()}"
                 
                 generated_images.append(new_image)
-                print(f"✅ Added {pose_filename} to campaign (total images: {len(generated_images)})")
+                logger.info(f"✅ Added {pose_filename} to campaign (total images: {len(existing_images) + len(generated_images)})")
                 
             except Exception as pose_error:
-                print(f"❌ Failed to generate pose {pose_filename}: {pose_error}")
-                import traceback
-                traceback.print_exc()
+                logger.exception(f"❌ Failed to generate pose {pose_filename}: {pose_error}")
                 continue
         
         # Generate close-up detail shot after all poses - USE PREVIEW IMAGE AS BASE
-        print(f"\n🔍 Generating product close-up shot from reference image...")
+        logger.info(f"🔍 Generating product close-up shot from reference image...")
         try:
             # Use the preview/reference image as base for close-up
             if preview_image_url:
-                print(f"📸 Creating close-up from preview image: {preview_image_url[:80]}...")
+                logger.info(f"📸 Creating close-up from preview image: {preview_image_url[:80]}...")
                 
                 # Get product info for metadata
                 products = db.query(Product).filter(Product.id.in_(product_ids)).all()
@@ -2700,7 +3022,7 @@ async def generate_multiple_pose_variations(
                     model = models[0]
                     scene = scenes[0]
                     
-                    print(f"🎯 Close-up of reference image - focusing on shirt/top garment")
+                    logger.info(f"🎯 Close-up of reference image - focusing on shirt/top garment")
                     
                     # Close-up prompt - reframe the preview image to focus on upper body/shirt
                     closeup_prompt = (
@@ -2712,7 +3034,7 @@ async def generate_multiple_pose_variations(
                         f"Professional fashion product photography emphasizing the garment details."
                     )
                     
-                    print(f"📝 Close-up prompt: {closeup_prompt[:100]}...")
+                    logger.info(f"📝 Close-up prompt: {closeup_prompt[:100]}...")
                     
                     # Use nano-banana PRO to reframe/crop the preview image into a close-up
                     # (Better for reframing existing images with low strength)
@@ -2741,25 +3063,23 @@ async def generate_multiple_pose_variations(
                             "generated_at": datetime.utcnow().isoformat()
                         }
                         generated_images.append(closeup_image)
-                        print(f"✅ Added close-up shot from reference image (total images: {len(generated_images)})")
+                        logger.info(f"✅ Added close-up shot from reference image (total images: {len(existing_images) + len(generated_images)})")
                     else:
-                        print(f"⚠️ Close-up generation returned None")
+                        logger.warning(f"⚠️ Close-up generation returned None")
                 else:
-                    print(f"⚠️ Missing products/models/scenes for close-up metadata")
+                    logger.warning(f"⚠️ Missing products/models/scenes for close-up metadata")
             else:
-                print(f"⚠️ No preview image available for close-up generation")
+                logger.warning(f"⚠️ No preview image available for close-up generation")
                 
         except Exception as closeup_error:
-            print(f"⚠️ Shirt close-up generation failed: {closeup_error}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"⚠️ Shirt close-up generation failed: {closeup_error}")
         
         # Generate PANTS close-up shot after shirt close-up
-        print(f"\n👖 Generating pants close-up shot from reference image...")
+        logger.info(f"👖 Generating pants close-up shot from reference image...")
         try:
             # Use the preview/reference image as base for pants close-up
             if preview_image_url:
-                print(f"📸 Creating pants close-up from preview image: {preview_image_url[:80]}...")
+                logger.info(f"📸 Creating pants close-up from preview image: {preview_image_url[:80]}...")
                 
                 # Get product info for metadata (reuse from above)
                 products = db.query(Product).filter(Product.id.in_(product_ids)).all()
@@ -2783,7 +3103,7 @@ async def generate_multiple_pose_variations(
                     elif not pants_product:
                         pants_product = products[0]
                     
-                    print(f"🎯 Pants close-up - focusing on {pants_product.name}")
+                    logger.info(f"🎯 Pants close-up - focusing on {pants_product.name}")
                     
                     # Pants close-up prompt - editorial fashion style
                     pants_closeup_prompt = (
@@ -2796,7 +3116,7 @@ async def generate_multiple_pose_variations(
                         f"Professional fashion editorial photography with confident, stylish energy."
                     )
                     
-                    print(f"📝 Pants close-up prompt: {pants_closeup_prompt[:100]}...")
+                    logger.info(f"📝 Pants close-up prompt: {pants_closeup_prompt[:100]}...")
                     
                     # Use nano-banana PRO to reframe/crop into pants close-up
                     # (Better for reframing existing images with controlled strength)
@@ -2825,34 +3145,27 @@ async def generate_multiple_pose_variations(
                             "generated_at": datetime.utcnow().isoformat()
                         }
                         generated_images.append(pants_closeup_image)
-                        print(f"✅ Added pants close-up shot (total images: {len(generated_images)})")
+                        logger.info(f"✅ Added pants close-up shot (total images: {len(existing_images) + len(generated_images)})")
                     else:
-                        print(f"⚠️ Pants close-up generation returned None")
+                        logger.warning(f"⚠️ Pants close-up generation returned None")
                 else:
-                    print(f"⚠️ Missing products/models/scenes for pants close-up metadata")
+                    logger.warning(f"⚠️ Missing products/models/scenes for pants close-up metadata")
             else:
-                print(f"⚠️ No preview image available for pants close-up generation")
+                logger.warning(f"⚠️ No preview image available for pants close-up generation")
                 
         except Exception as pants_closeup_error:
-            print(f"⚠️ Pants close-up generation failed: {pants_closeup_error}")
-            import traceback
-            traceback.print_exc()
-        
-        # Update campaign with all images (including both close-ups)
-        if campaign.settings is None:
-            campaign.settings = {}
-        campaign.settings["generated_images"] = generated_images
+            logger.exception(f"⚠️ Pants close-up generation failed: {pants_closeup_error}")
+        
+        # Append all new images (including both close-ups)
+        add_campaign_images(db, campaign_id, generated_images, commit=False)
         campaign.status = "completed"
         campaign.generation_status = "completed"
-        flag_modified(campaign, "settings")
         db.commit()
         
-        print(f"🎉 Full campaign completed with {len(generated_images)} total images!")
+        logger.info(f"🎉 Full campaign completed with {len(existing_images) + len(generated_images)} total images!")
             
     except Exception as e:
-        print(f"❌ Multiple pose generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Multiple pose generation failed: {e}")
         campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         if campaign:
             campaign.generation_status = "failed"
@@ -2860,14 +3173,14 @@ async def generate_multiple_pose_variations(
     finally:
         # CRITICAL: Close database session to prevent connection pool exhaustion
         db.close()
-        print(f"✅ Database session closed for pose generation {campaign_id}")
+        logger.info(f"✅ Database session closed for pose generation {campaign_id}")
 
 @app.post("/campaigns/{campaign_id}/generate-videos")
 async def generate_campaign_videos(
     campaign_id: str,
     duration: int = Form(5),
     cfg_scale: float = Form(0.5),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Generate videos from all campaign images using Kling 2.5 Turbo Pro"""
@@ -2880,20 +3193,20 @@ async def generate_campaign_videos(
         if not campaign:
             raise HTTPException(status_code=404, detail="Campaign not found")
         
-        generated_images = campaign.settings.get("generated_images", []) if campaign.settings else []
+        generated_images = get_campaign_images(db, campaign_id)
         
         if not generated_images:
             raise HTTPException(status_code=400, detail="No images to generate videos from")
         
-        # Update settings
+        # Update settings and drop the previous video set
         new_settings = dict(campaign.settings) if campaign.settings else {}
         new_settings["video_generation_status"] = "generating"
-        new_settings["videos"] = []
         campaign.settings = new_settings
         flag_modified(campaign, "settings")
+        clear_campaign_videos(db, campaign_id, commit=False)
         db.commit()
         
-        print(f"🎬 Generating videos for {len(generated_images)} images...")
+        logger.info(f"🎬 Generating videos for {len(generated_images)} images...")
         
         # Start video generation in background
         import asyncio
@@ -2912,9 +3225,10 @@ async def generate_campaign_videos(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Failed to start video generation: {e}")
+        logger.error(f"❌ Failed to start video generation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@track_job("videos")
 async def generate_videos_background(
     campaign_id: str,
     images: list,
@@ -2922,7 +3236,7 @@ async def generate_videos_background(
     cfg_scale: float
 ):
     """Generate videos for each image using Kling 2.5 Turbo Pro"""
-    import replicate
+    bind_log_context(campaign_id=campaign_id)
     from datetime import datetime
     
     # Create a NEW database session for this background task
@@ -2942,11 +3256,11 @@ async def generate_videos_background(
         
         for idx, image_data in enumerate(images, 1):
             try:
-                print(f"\n🎬 [{idx}/{len(images)}] Generating video for {image_data.get('shot_type', 'image')}...")
+                logger.info(f"🎬 [{idx}/{len(images)}] Generating video for {image_data.get('shot_type', 'image')}...")
                 
                 # Select camera signature based on index (cycling)
                 camera_signature = CAMERA_SIGNATURES[(idx - 1) % len(CAMERA_SIGNATURES)]
-                print(f"🎥 Applied camera signature: {camera_signature.split(':')[0]}")
+                logger.info(f"🎥 Applied camera signature: {camera_signature.split(':')[0]}")
                 
                 # Build prompt for video
                 product_name = image_data.get('product_name', 'clothing')
@@ -2966,7 +3280,7 @@ async def generate_videos_background(
                             f"Runway-quality production. Natural movement shows how the garment flows. "
                             f"High-fashion campaign energy with artistic depth of field. Luxury brand aesthetic."
                         )
-                        print(f"👖 Using EDITORIAL PANTS CLOSE-UP prompt")
+                        logger.info(f"👖 Using EDITORIAL PANTS CLOSE-UP prompt")
                     else:
                         # Shirt/top close-up
                         video_prompt = (
@@ -2976,7 +3290,7 @@ async def generate_videos_background(
                             f"Cinematic shallow depth of field. Luxury brand campaign aesthetic. "
                             f"Subtle breathing movement brings the garment to life. Magazine-worthy composition."
                         )
-                        print(f"👕 Using EDITORIAL SHIRT CLOSE-UP prompt")
+                        logger.info(f"👕 Using EDITORIAL SHIRT CLOSE-UP prompt")
                 else:
                     # HIGH-FASHION EDITORIAL CAMPAIGN - Full body shots
                     video_prompt = (
@@ -2986,10 +3300,10 @@ async def generate_videos_background(
                         f"Subtle confident movement - a slight turn, weight shift, or knowing glance. "
                         f"Vogue-level production quality. The energy of a luxury brand campaign."
                     )
-                    print(f"🎬 Using EDITORIAL CAMPAIGN prompt")
+                    logger.info(f"🎬 Using EDITORIAL CAMPAIGN prompt")
                 
-                print(f"📝 Video prompt: {video_prompt[:150]}...")
-                print(f"🖼️ Image URL: {image_data['image_url'][:80]}...")
+                logger.info(f"📝 Video prompt: {video_prompt[:150]}...")
+                logger.info(f"🖼️ Image URL: {image_data['image_url'][:80]}...")
                 
                 # Build negative prompt - editorial quality standards
                 if 'close' in shot_type.lower() or 'closeup' in shot_name.lower() or 'close-up' in shot_type.lower():
@@ -3005,7 +3319,7 @@ async def generate_videos_background(
                     )
                 
                 # Call Kling 2.5 Turbo Pro API
-                output = replicate.run(
+                output = replicate_run(
                     "kwaivgi/kling-v2.5-turbo-pro",
                     input={
                         "mode": "image-to-video",
@@ -3028,14 +3342,14 @@ async def generate_videos_background(
                 else:
                     video_url = str(output)
                 
-                print(f"✅ Video generated: {video_url[:80]}...")
+                logger.info(f"✅ Video generated: {video_url[:80]}...")
                 
                 # Upload to Cloudinary for stable storage
                 try:
                     stable_video_url = upload_to_cloudinary(video_url, f"video_{idx}")
-                    print(f"✅ Video uploaded to Cloudinary: {stable_video_url[:80]}...")
+                    logger.info(f"✅ Video uploaded to Cloudinary: {stable_video_url[:80]}...")
                 except Exception as upload_error:
-                    print(f"⚠️ Failed to upload video to Cloudinary: {upload_error}")
+                    logger.warning(f"⚠️ Failed to upload video to Cloudinary: {upload_error}")
                     stable_video_url = video_url  # Use replicate URL as fallback
                 
                 videos.append({
@@ -3046,12 +3360,10 @@ async def generate_videos_background(
                     "generated_at": datetime.utcnow().isoformat()
                 })
                 
-                print(f"✅ Video {idx}/{len(images)} completed!")
+                logger.info(f"✅ Video {idx}/{len(images)} completed!")
                 
             except Exception as e:
-                print(f"❌ Failed to generate video {idx}: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception(f"❌ Failed to generate video {idx}: {e}")
                 videos.append({
                     **image_data,
                     "video_url": None,
@@ -3064,39 +3376,31 @@ async def generate_videos_background(
         campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         if campaign:
             new_settings = dict(campaign.settings) if campaign.settings else {}
-            new_settings["videos"] = videos
             new_settings["video_generation_status"] = "completed"
             campaign.settings = new_settings
             flag_modified(campaign, "settings")
+            replace_campaign_videos(db, campaign_id, videos, commit=False)
             db.commit()
             
             successful_videos = sum(1 for v in videos if v.get("video_url"))
-            print(f"🎉 Generated {successful_videos}/{len(videos)} videos for campaign {campaign_id}")
-            print(f"💾 Saved videos to database: {len(videos)} videos")
-            print(f"📊 Video URLs: {[v.get('video_url', 'None')[:50] for v in videos]}")
-            
-            # Verify it was saved
-            db.refresh(campaign)
-            saved_videos = campaign.settings.get("videos", []) if campaign.settings else []
-            print(f"✅ Verification: {len(saved_videos)} videos in database after commit")
+            logger.info(f"🎉 Generated {successful_videos}/{len(videos)} videos for campaign {campaign_id}")
+            logger.info(f"💾 Saved videos to database: {len(videos)} videos")
     except Exception as e:
-        print(f"❌ Failed to update campaign with videos: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Failed to update campaign with videos: {e}")
     finally:
         # CRITICAL: Close database session to prevent connection pool exhaustion
         db.close()
-        print(f"✅ Database session closed for video generation {campaign_id}")
+        logger.info(f"✅ Database session closed for video generation {campaign_id}")
 
 @app.post("/campaigns/{campaign_id}/generate-unified-video")
 async def generate_unified_campaign_video(
     campaign_id: str,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Generate a unified campaign video by concatenating all videos in storytelling order"""
     try:
-        print(f"🎬 UNIFIED VIDEO: Request received for campaign {campaign_id}")
+        logger.info(f"🎬 UNIFIED VIDEO: Request received for campaign {campaign_id}")
         
         campaign = db.query(Campaign).filter(
             Campaign.id == campaign_id,
@@ -3106,7 +3410,7 @@ async def generate_unified_campaign_video(
         if not campaign:
             raise HTTPException(status_code=404, detail="Campaign not found")
         
-        videos = campaign.settings.get("videos", []) if campaign.settings else []
+        videos = get_campaign_videos(db, campaign_id)
         
         if not videos or len(videos) < 3:
             raise HTTPException(status_code=400, detail="Need at least 3 videos to create unified campaign video. Generate videos first.")
@@ -3115,7 +3419,7 @@ async def generate_unified_campaign_video(
         # Shot 1 (Neutral pose - intro) → Shot 4 (Shirt closeup) → Shot 2 (Pose 1) → Shot 5 (Pants closeup) → Shot 3 (Pose 2)
         desired_order = [0, 3, 1, 4, 2]  # 0-indexed
         
-        print(f"🎬 Creating unified video from {len(videos)} clips in order: {[i+1 for i in desired_order]}")
+        logger.info(f"🎬 Creating unified video from {len(videos)} clips in order: {[i+1 for i in desired_order]}")
         
         # Update settings to track unified video generation
         new_settings = dict(campaign.settings) if campaign.settings else {}
@@ -3142,29 +3446,27 @@ async def generate_unified_campaign_video(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Failed to start unified video generation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Failed to start unified video generation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@track_job("unified_video")
 async def generate_unified_video_background(
     campaign_id: str,
     videos: list,
     order: list
 ):
     """Generate unified video by concatenating individual videos using FFmpeg"""
+    bind_log_context(campaign_id=campaign_id)
     db = SessionLocal()
     try:
-        import subprocess
+        import asyncio
         import tempfile
         import os
         
-        print(f"🎬 Starting unified video generation for campaign {campaign_id}...")
+        logger.info(f"🎬 Starting unified video generation for campaign {campaign_id}...")
         
-        # Download all video files
-        temp_files = []
-        concat_list_path = None
+        # Normalized segments live in the shared cache; only the output is temporary
         output_path = None
         
         try:
@@ -3174,69 +3476,39 @@ async def generate_unified_video_background(
                 if idx < len(videos) and videos[idx].get("video_url"):
                     ordered_videos.append(videos[idx])
                 else:
-                    print(f"⚠️ Video at index {idx} not found or has no URL")
+                    logger.warning(f"⚠️ Video at index {idx} not found or has no URL")
             
             if len(ordered_videos) < 2:
                 raise Exception(f"Not enough videos to create unified video. Found {len(ordered_videos)}, need at least 2")
             
-            print(f"📋 Creating unified video with {len(ordered_videos)} clips")
-            print(f"📺 Sequence: {[v.get('shot_type', 'unknown') for v in ordered_videos]}")
+            logger.info(f"📋 Creating unified video with {len(ordered_videos)} clips")
+            logger.info(f"📺 Sequence: {[v.get('shot_type', 'unknown') for v in ordered_videos]}")
             
-            # Download each video to a temporary file
+            # Normalize each clip once to the canonical profile (cached by content hash)
+            from video_segments import get_normalized_segment, concat_segments
+            segment_paths = []
             for i, video_data in enumerate(ordered_videos):
                 video_url = video_data.get("video_url")
                 shot_name = video_data.get("shot_name", f"shot_{i}")
                 
-                print(f"📥 Downloading clip {i+1}/{len(ordered_videos)}: {shot_name}...")
-                
-                # Download video
-                response = requests.get(video_url, stream=True, timeout=180)
-                response.raise_for_status()
-                
-                # Save to temp file
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4", mode='wb')
-                for chunk in response.iter_content(chunk_size=8192):
-                    temp_file.write(chunk)
-                temp_file.close()
-                temp_files.append(temp_file.name)
-                
-                print(f"✅ Downloaded clip {i+1}: {os.path.getsize(temp_file.name)} bytes")
-            
-            # Create concat list file for FFmpeg
-            concat_list = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix=".txt")
-            concat_list_path = concat_list.name
-            
-            for temp_file in temp_files:
-                # Use absolute path and escape special characters
-                escaped_path = temp_file.replace("'", "'\\''")
-                concat_list.write(f"file '{escaped_path}'\n")
-            concat_list.close()
-            
-            print(f"📝 Created concat list with {len(temp_files)} files")
+                logger.info(f"📥 Preparing clip {i+1}/{len(ordered_videos)}: {shot_name}...")
+                segment_path = await asyncio.to_thread(get_normalized_segment, video_url)
+                segment_paths.append(segment_path)
+                logger.info(f"✅ Clip {i+1} ready: {os.path.getsize(segment_path)} bytes")
             
             # Create output file path
             output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
             output_path = output_file.name
             output_file.close()
             
-            # Run FFmpeg to concatenate videos
-            print(f"🎬 Running FFmpeg to concatenate videos...")
-            cmd = [
-                'ffmpeg',
-                '-f', 'concat',
-                '-safe', '0',
-                '-i', concat_list_path,
-                '-c', 'copy',
-                '-y',  # Overwrite output file
-                output_path
-            ]
-            
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            print(f"✅ FFmpeg completed successfully")
-            print(f"📦 Output file size: {os.path.getsize(output_path)} bytes")
+            # Segments share one profile, so a copy-only concat is safe and fast
+            logger.info(f"🎬 Running FFmpeg to concatenate {len(segment_paths)} normalized segments...")
+            await asyncio.to_thread(concat_segments, segment_paths, output_path)
+            logger.info(f"✅ FFmpeg completed successfully")
+            logger.info(f"📦 Output file size: {os.path.getsize(output_path)} bytes")
             
             # Upload unified video to Cloudinary
-            print(f"☁️ Uploading unified video to Cloudinary...")
+            logger.info(f"☁️ Uploading unified video to Cloudinary...")
             with open(output_path, 'rb') as f:
                 import cloudinary.uploader
                 result = cloudinary.uploader.upload(
@@ -3248,7 +3520,7 @@ async def generate_unified_video_background(
                 )
                 unified_video_url = result['secure_url']
             
-            print(f"✅ Unified video uploaded: {unified_video_url[:80]}...")
+            logger.info(f"✅ Unified video uploaded: {unified_video_url[:80]}...")
             
             # Update campaign with unified video URL
             campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
@@ -3262,34 +3534,20 @@ async def generate_unified_video_background(
                 flag_modified(campaign, "settings")
                 db.commit()
                 
-                print(f"🎉 Unified campaign video generated successfully!")
-                print(f"📺 URL: {unified_video_url}")
+                logger.info(f"🎉 Unified campaign video generated successfully!")
+                logger.info(f"📺 URL: {unified_video_url}")
         
         finally:
             # Clean up temporary files
-            print(f"🧹 Cleaning up temporary files...")
-            for temp_file in temp_files:
-                try:
-                    os.remove(temp_file)
-                except Exception as e:
-                    print(f"⚠️ Failed to remove temp file {temp_file}: {e}")
-            
-            if concat_list_path:
-                try:
-                    os.remove(concat_list_path)
-                except Exception as e:
-                    print(f"⚠️ Failed to remove concat list: {e}")
-            
+            logger.info(f"🧹 Cleaning up temporary files...")
             if output_path:
                 try:
                     os.remove(output_path)
                 except Exception as e:
-                    print(f"⚠️ Failed to remove output file: {e}")
+                    logger.warning(f"⚠️ Failed to remove output file: {e}")
             
     except Exception as e:
-        print(f"❌ Unified video generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Unified video generation failed: {e}")
         
         # Update campaign status to failed
         try:
@@ -3302,17 +3560,33 @@ async def generate_unified_video_background(
                 flag_modified(campaign, "settings")
                 db.commit()
         except Exception as update_error:
-            print(f"❌ Failed to update campaign status: {update_error}")
+            logger.error(f"❌ Failed to update campaign status: {update_error}")
     
     finally:
         db.close()
-        print(f"✅ Database session closed for unified video generation {campaign_id}")
+        logger.info(f"✅ Database session closed for unified video generation {campaign_id}")
+
+@app.get("/campaigns/{campaign_id}", response_model=CampaignResponse)
+async def get_campaign(
+    campaign_id: str,
+    current_user: dict = Depends(get_current_user_claims),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a single campaign with its full settings, images and videos"""
+    campaign = await db.scalar(select(Campaign).where(
+        Campaign.id == campaign_id,
+        Campaign.user_id == current_user["user_id"]
+    ))
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    assets = (await load_campaign_assets_async(db, [campaign.id]))[campaign.id]
+    return campaign_to_response(db, campaign, assets)
 
 @app.put("/campaigns/{campaign_id}")
 async def update_campaign(
     campaign_id: str,
     request: dict,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Update campaign name and description"""
@@ -3336,7 +3610,7 @@ async def update_campaign(
         db.commit()
         db.refresh(campaign)
         
-        print(f"✅ Updated campaign: {campaign.name}")
+        logger.info(f"✅ Updated campaign: {campaign.name}")
         
         return {
             "id": campaign.id,
@@ -3345,18 +3619,18 @@ async def update_campaign(
             "status": campaign.status,
             "created_at": campaign.created_at,
             "updated_at": campaign.updated_at,
-            "settings": campaign.settings
+            "settings": campaign_settings_with_assets(db, campaign)
         }
         
     except Exception as e:
         db.rollback()
-        print(f"❌ Failed to update campaign: {e}")
+        logger.error(f"❌ Failed to update campaign: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/campaigns/{campaign_id}")
 async def delete_campaign(
     campaign_id: str,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Delete a campaign"""
@@ -3376,7 +3650,7 @@ async def delete_campaign(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting campaign: {e}")
+        logger.error(f"Error deleting campaign: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ---------- Product Update Endpoint ----------
@@ -3389,7 +3663,7 @@ async def update_product(
     clothing_type: str = Form(None),
     tags: str = Form(None),
     product_image: UploadFile = File(None),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Update a product"""
@@ -3428,9 +3702,9 @@ async def update_product(
             # ALWAYS upload to Cloudinary - no local URLs
             try:
                 product.image_url = upload_to_cloudinary(image_path, f"product_{product.id}")
-                print(f"✅ Product image uploaded to Cloudinary: {product.image_url[:80]}...")
+                logger.info(f"✅ Product image uploaded to Cloudinary: {product.image_url[:80]}...")
             except Exception as e:
-                print(f"❌ Failed to upload product image to Cloudinary: {e}")
+                logger.error(f"❌ Failed to upload product image to Cloudinary: {e}")
                 raise HTTPException(status_code=500, detail=f"Failed to upload product image to Cloudinary: {str(e)}")
         
         # Update updated_at timestamp
@@ -3439,7 +3713,7 @@ async def update_product(
         db.commit()
         db.refresh(product)
         
-        print(f"✅ Updated product: {product.name}")
+        logger.info(f"✅ Updated product: {product.name}")
         
         return {
             "id": product.id,
@@ -3460,16 +3734,14 @@ async def update_product(
         raise
     except Exception as e:
         db.rollback()
-        print(f"❌ Error updating product: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error updating product: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to update product: {str(e)}")
 
 # ---------- Delete Endpoints ----------
 @app.delete("/products/{product_id}")
 async def delete_product(
     product_id: str,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Delete a product"""
@@ -3489,7 +3761,7 @@ async def delete_product(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting product: {e}")
+        logger.error(f"Error deleting product: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 def run_nano_banana_model_generation(
@@ -3505,17 +3777,17 @@ def run_nano_banana_model_generation(
 ) -> List[str]:
     """Generate model images using Nano Banana with base model images"""
     try:
-        print(f"🎭 Running Nano Banana model generation: {prompt}")
-        print(f"🔧 DEBUG: This is the NEW version with external URLs!")
+        logger.info(f"🎭 Running Nano Banana model generation: {prompt}")
+        logger.debug(f"🔧 DEBUG: This is the NEW version with external URLs!")
         
         # Use the base model image as starting point based on gender
         base_model_url = get_model_url(gender)
         
-        print(f"🔍 Using external model URL: {base_model_url}")
-        print(f"🔍 URL starts with http: {base_model_url.startswith('http')}")
+        logger.info(f"🔍 Using external model URL: {base_model_url}")
+        logger.info(f"🔍 URL starts with http: {base_model_url.startswith('http')}")
         
         # External URL - use it directly for Replicate
-        print(f"✅ Using external model URL for generation - NO LOCAL FILES")
+        logger.info(f"✅ Using external model URL for generation - NO LOCAL FILES")
         
         generated_urls = []
         
@@ -3531,11 +3803,11 @@ def run_nano_banana_model_generation(
                 else:
                     enhanced_prompt = f"Modify the person's physical features to be: {physical_description}. Keep the exact same pose, black t-shirt, black shorts, sandals, and white background. Only change facial features, skin tone, hair, and body proportions. Professional fashion photography style."
                 
-                print(f"🎭 Processing variant {i+1} with base model image...")
-                print(f"📝 Prompt: {enhanced_prompt[:150]}...")
+                logger.info(f"🎭 Processing variant {i+1} with base model image...")
+                logger.info(f"📝 Prompt: {enhanced_prompt[:150]}...")
                 
                 # Run Nano Banana model generation with very low strength to preserve input
-                out = replicate.run("google/nano-banana", input={
+                out = replicate_run("google/nano-banana", input={
                     "prompt": enhanced_prompt,  # Use 'prompt' parameter
                     "image": base_model_url,
                     "num_inference_steps": 10,  # Low steps to preserve input
@@ -3558,46 +3830,28 @@ def run_nano_banana_model_generation(
                 else:
                     generated_urls.append(str(out))
                 
-                print(f"✅ Nano Banana variant {i+1} completed")
+                logger.info(f"✅ Nano Banana variant {i+1} completed")
                 
             except Exception as e:
-                print(f"❌ Nano Banana variant {i+1} failed: {e}")
+                logger.error(f"❌ Nano Banana variant {i+1} failed: {e}")
                 raise
         
-        print(f"✅ Nano Banana model generation completed: {len(generated_urls)} images")
+        logger.info(f"✅ Nano Banana model generation completed: {len(generated_urls)} images")
         return generated_urls
         
     except Exception as e:
-        print(f"❌ Nano Banana model generation error: {e}")
+        logger.error(f"❌ Nano Banana model generation error: {e}")
         raise
 
-def deduct_credits(user: User, credits_needed: int, db: Session):
-    """
-    Deduct credits from user, prioritizing subscription credits first.
-    Returns True if deduction was successful, False otherwise.
-    """
-    # Calculate total available credits (subscription + purchased)
-    total_available = (user.subscription_credits or 0) + user.credits
-    
-    if total_available < credits_needed:
-        return False
-    
-    # First, deduct from subscription credits
-    if user.subscription_credits and user.subscription_credits > 0:
-        if user.subscription_credits >= credits_needed:
-            user.subscription_credits -= credits_needed
-            credits_needed = 0
-        else:
-            # Use all subscription credits, then deduct remaining from purchased credits
-            credits_needed -= user.subscription_credits
-            user.subscription_credits = 0
-    
-    # Deduct remaining credits from purchased credits
-    if credits_needed > 0:
-        user.credits -= credits_needed
-    
-    db.commit()
-    return True
+def insufficient_credits_error(db: Session, user_id: str, credits_needed: int, what: str = "") -> HTTPException:
+    """400 with the user's current balance for a failed reservation"""
+    user = db.query(User).filter(User.id == user_id).first()
+    subscription_credits = (user.subscription_credits or 0) if user else 0
+    purchased_credits = (user.credits or 0) if user else 0
+    return HTTPException(
+        status_code=400,
+        detail=f"Insufficient credits. You have {subscription_credits + purchased_credits} total credits ({subscription_credits} subscription + {purchased_credits} purchased), but need {credits_needed}{' for ' + what if what else ''}"
+    )
 
 @app.post("/models/ai-generate")
 async def generate_model(
@@ -3610,15 +3864,16 @@ async def generate_model(
     hair_color: str = Form("brown"),
     eye_color: str = Form("brown"),
     skin_tone: str = Form("medium"),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Generate a new model using AI"""
-    print("=== MODEL GENERATION ENDPOINT CALLED ===")
-    print(f"Prompt: {prompt}")
-    print(f"Variants: {variants}")
-    print(f"Gender: {gender}")
+    logger.info("=== MODEL GENERATION ENDPOINT CALLED ===")
+    logger.info(f"Prompt: {prompt}")
+    logger.info(f"Variants: {variants}")
+    logger.info(f"Gender: {gender}")
     
+    reservation_id = None
     try:
         # Check user credits (1 credit per variant)
         user = db.query(User).filter(User.id == current_user["user_id"]).first()
@@ -3626,19 +3881,17 @@ async def generate_model(
             raise HTTPException(status_code=404, detail="User not found")
         
         credits_needed = variants
-        total_available = (user.subscription_credits or 0) + user.credits
-        if total_available < credits_needed:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Insufficient credits. You have {total_available} total credits ({user.subscription_credits or 0} subscription + {user.credits} purchased), but need {credits_needed}"
-            )
+        reservation = reserve_credits(db, user.id, credits_needed, "model_generation")
+        if reservation is None:
+            raise insufficient_credits_error(db, user.id, credits_needed)
+        reservation_id = reservation.id
         
         # Generate model images using Nano Banana
-        print(f"Calling run_nano_banana_model_generation...")
+        logger.info(f"Calling run_nano_banana_model_generation...")
         model_urls = run_nano_banana_model_generation(
             prompt, variants, gender, age, height, build, hair_color, eye_color, skin_tone
         )
-        print(f"Got model URLs: {model_urls}")
+        logger.info(f"Got model URLs: {model_urls}")
         
         # Download and store model images locally
         local_model_urls = []
@@ -3647,14 +3900,14 @@ async def generate_model(
                 local_url = upload_to_cloudinary(model_url, f"generated_model_{i+1}")
                 local_model_urls.append(local_url)
             except Exception as e:
-                print(f"⚠️ Failed to download model {i+1}, using original URL: {e}")
+                logger.warning(f"⚠️ Failed to download model {i+1}, using original URL: {e}")
                 local_model_urls.append(model_url)
         
-        print(f"Stored local model URLs: {local_model_urls}")
+        logger.info(f"Stored local model URLs: {local_model_urls}")
         
-        # Deduct credits (prioritizing subscription credits)
-        if not deduct_credits(user, credits_needed, db):
-            raise HTTPException(status_code=400, detail="Failed to deduct credits")
+        # Spend the reserved credits
+        commit_credits(db, reservation_id, credits_needed)
+        attribute_credits(local_model_urls, credits_needed)
         
         # Create model records in database
         created_models = []
@@ -3672,7 +3925,7 @@ async def generate_model(
         
         db.commit()
         
-        print(f"✅ Created {len(created_models)} models in database")
+        logger.info(f"✅ Created {len(created_models)} models in database")
         
         return {
             "message": f"Successfully generated {len(created_models)} models",
@@ -3689,11 +3942,15 @@ async def generate_model(
             "remaining_credits": user.credits
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Model generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Model generation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Hand back anything not spent (generation failed before the commit)
+        if reservation_id:
+            close_reservation(db, reservation_id)
 
 @app.post("/models/upload")
 async def upload_model(
@@ -3701,7 +3958,7 @@ async def upload_model(
     description: str = Form(""),
     gender: str = Form(""),
     model_image: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Upload a new model image"""
@@ -3714,7 +3971,7 @@ async def upload_model(
         image_data = await model_image.read()
         
         # Upload to Cloudinary
-        print(f"📤 Uploading model image to Cloudinary...")
+        logger.info(f"📤 Uploading model image to Cloudinary...")
         cloudinary_url = upload_to_cloudinary(
             f"data:image/{model_image.content_type.split('/')[-1]};base64,{base64.b64encode(image_data).decode()}",
             "models"
@@ -3723,7 +3980,7 @@ async def upload_model(
         if not cloudinary_url:
             raise HTTPException(status_code=500, detail="Failed to upload image to Cloudinary")
         
-        print(f"✅ Model image uploaded: {cloudinary_url}")
+        logger.info(f"✅ Model image uploaded: {cloudinary_url}")
         
         # Create model in database
         model = Model(
@@ -3738,7 +3995,7 @@ async def upload_model(
         db.commit()
         db.refresh(model)
         
-        print(f"✅ Model created with ID: {model.id}")
+        logger.info(f"✅ Model created with ID: {model.id}")
         
         return {
             "model": {
@@ -3755,20 +4012,19 @@ async def upload_model(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Model upload failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Model upload failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/models/{model_id}/generate-poses")
 async def generate_poses(
     model_id: str,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Generate poses for a model using Qwen Image Edit Plus"""
+    reservation_id = None
     try:
-        print(f"🎭 Generating poses for model: {model_id}")
+        logger.info(f"🎭 Generating poses for model: {model_id}")
         
         # Get the model
         model = db.query(Model).filter(
@@ -3787,11 +4043,10 @@ async def generate_poses(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        if user.credits < 1:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Insufficient credits. You have {user.credits} credits, but need 1"
-            )
+        reservation = reserve_credits(db, user.id, 1, "model_poses")
+        if reservation is None:
+            raise insufficient_credits_error(db, user.id, 1)
+        reservation_id = reservation.id
         
         # Generate poses using Qwen Image Edit Plus
         poses = []
@@ -3805,10 +4060,10 @@ async def generate_poses(
         
         for i, prompt in enumerate(pose_prompts):
             try:
-                print(f"🎭 Generating pose {i+1}: {prompt[:50]}...")
+                logger.info(f"🎭 Generating pose {i+1}: {prompt[:50]}...")
                 
                 # Use Qwen Image Edit Plus for pose generation
-                out = replicate.run("qwen/qwen-image-edit-plus", input={
+                out = replicate_run("qwen/qwen-image-edit-plus", input={
                     "prompt": f"Modify the person's pose to: {prompt}. Keep the same person, clothes, and background. Only change the pose and body position. Professional fashion photography style.",
                     "image": [model.image_url],
                     "num_inference_steps": 30,
@@ -3835,12 +4090,12 @@ async def generate_poses(
                 if pose_url:
                     stable_pose_url = upload_to_cloudinary(pose_url, f"pose_{i+1}")
                     poses.append(stable_pose_url)
-                    print(f"✅ Pose {i+1} generated and saved: {stable_pose_url[:50]}...")
+                    logger.info(f"✅ Pose {i+1} generated and saved: {stable_pose_url[:50]}...")
                 else:
-                    print(f"⚠️ Pose {i+1} had no valid URL")
+                    logger.warning(f"⚠️ Pose {i+1} had no valid URL")
                 
             except Exception as e:
-                print(f"❌ Pose {i+1} generation failed: {e}")
+                logger.error(f"❌ Pose {i+1} generation failed: {e}")
                 continue
         
         if not poses:
@@ -3850,11 +4105,11 @@ async def generate_poses(
         model.poses = poses
         db.commit()
         
-        # Deduct credits (prioritizing subscription credits)
-        if not deduct_credits(user, 1, db):
-            raise HTTPException(status_code=400, detail="Failed to deduct credits")
+        # Spend the reserved credit
+        commit_credits(db, reservation_id, 1)
+        attribute_credits(poses, 1)
         
-        print(f"✅ Generated {len(poses)} poses for model {model_id}")
+        logger.info(f"✅ Generated {len(poses)} poses for model {model_id}")
         
         return {
             "message": f"Successfully generated {len(poses)} poses",
@@ -3870,15 +4125,16 @@ async def generate_poses(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Pose generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Pose generation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if reservation_id:
+            close_reservation(db, reservation_id)
 
 @app.delete("/models/{model_id}")
 async def delete_model(
     model_id: str,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Delete a model"""
@@ -3898,13 +4154,13 @@ async def delete_model(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting model: {e}")
+        logger.error(f"Error deleting model: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/scenes/{scene_id}")
 async def delete_scene(
     scene_id: str,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Delete a scene"""
@@ -3924,34 +4180,31 @@ async def delete_scene(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error deleting scene: {e}")
+        logger.error(f"Error deleting scene: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ---------- Dashboard Endpoint ----------
 @app.get("/dashboard/stats")
 async def get_dashboard_stats(
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get dashboard statistics"""
     try:
-        user_id = current_user["user_id"]
-        
-        # Count entities
-        products_count = db.query(Product).filter(Product.user_id == user_id).count()
-        models_count = db.query(Model).filter(Model.user_id == user_id).count()
-        scenes_count = db.query(Scene).filter(Scene.user_id == user_id).count()
-        campaigns_count = db.query(Campaign).filter(Campaign.user_id == user_id).count()
+        # Counters are maintained on write, so this is a single-row read
+        stats = await get_user_stats_async(db, current_user["user_id"])
         
-        # Get user credits
-        user = db.query(User).filter(User.id == user_id).first()
-        credits = user.credits if user else 0
+        # Credits come with the auth context
+        credits = current_user["credits"] or 0
         
         return {
-            "products": products_count,
-            "models": models_count,
-            "scenes": scenes_count,
-            "campaigns": campaigns_count,
+            "products": stats["products"],
+            "models": stats["models"],
+            "scenes": stats["scenes"],
+            "campaigns": stats["campaigns"],
+            "images": stats["images"],
+            "videos": stats["videos"],
+            "credits_spent": stats["credits_spent"],
             "credits": credits
         }
     except Exception as e:
@@ -3968,7 +4221,7 @@ async def get_payment_config():
 @app.post("/payments/create-intent")
 async def create_payment_intent(
     request: Request,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Create a Stripe payment intent for credit purchase"""
@@ -4031,7 +4284,7 @@ async def create_payment_intent(
 @app.post("/payments/confirm")
 async def confirm_payment(
     request: PaymentConfirmRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Confirm payment and add credits to user account
@@ -4077,8 +4330,7 @@ async def confirm_payment(
             )
         
         # Add credits to user account (purchased credits)
-        user.credits += credits_to_add
-        db.commit()
+        grant_credits(db, user.id, credits_to_add, "purchase")
         
         return {
             "message": f"Successfully added {credits_to_add} credits",
@@ -4167,9 +4419,7 @@ async def create_subscription_checkout(
         }
         
     except Exception as e:
-        print(f"❌ Subscription checkout creation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Subscription checkout creation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create checkout session: {str(e)}")
 
 @app.post("/subscriptions/webhook")
@@ -4202,12 +4452,12 @@ async def subscription_webhook(
             # Get user from metadata
             user_id = session.get('metadata', {}).get('user_id')
             if not user_id:
-                print("⚠️ No user_id in session metadata")
+                logger.warning("⚠️ No user_id in session metadata")
                 return {"status": "ok"}
             
             user = db.query(User).filter(User.id == user_id).first()
             if not user:
-                print(f"⚠️ User not found: {user_id}")
+                logger.warning(f"⚠️ User not found: {user_id}")
                 return {"status": "ok"}
             
             # Get subscription details from metadata
@@ -4229,7 +4479,8 @@ async def subscription_webhook(
             user.subscription_expires_at = expires_at
             
             db.commit()
-            print(f"✅ Subscription activated for user {user_id}: {subscription_type} with {credits} credits")
+            invalidate_user_context(user_id)
+            logger.info(f"✅ Subscription activated for user {user_id}: {subscription_type} with {credits} credits")
         
         elif event['type'] == 'customer.subscription.deleted':
             subscription = event['data']['object']
@@ -4238,14 +4489,12 @@ async def subscription_webhook(
             
             # Find user by customer ID or subscription metadata
             # Note: You may need to store Stripe customer_id in user model
-            print(f"📋 Subscription cancelled: {subscription.get('id')}")
+            logger.info(f"📋 Subscription cancelled: {subscription.get('id')}")
         
         return {"status": "ok"}
         
     except Exception as e:
-        print(f"❌ Webhook processing failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Webhook processing failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 class VerifyCheckoutRequest(BaseModel):
@@ -4254,7 +4503,7 @@ class VerifyCheckoutRequest(BaseModel):
 @app.post("/subscriptions/verify-checkout")
 async def verify_checkout_session(
     request: VerifyCheckoutRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Verify and activate subscription from Stripe checkout session"""
@@ -4294,7 +4543,7 @@ async def verify_checkout_session(
         
         # Check if subscription is already activated
         if user.subscription_status == "active" and user.subscription_type:
-            print(f"ℹ️ Subscription already active for user {user_id}")
+            logger.info(f"ℹ️ Subscription already active for user {user_id}")
             return {
                 "message": "Subscription already activated",
                 "status": "active",
@@ -4322,8 +4571,9 @@ async def verify_checkout_session(
         
         db.commit()
         db.refresh(user)
+        invalidate_user_context(user_id)
         
-        print(f"✅ Subscription activated via verify-checkout for user {user_id}: {subscription_type} with {credits} credits")
+        logger.info(f"✅ Subscription activated via verify-checkout for user {user_id}: {subscription_type} with {credits} credits")
         
         return {
             "message": "Subscription activated successfully",
@@ -4335,20 +4585,18 @@ async def verify_checkout_session(
         }
         
     except stripe.error.StripeError as e:
-        print(f"❌ Stripe error verifying checkout: {e}")
+        logger.error(f"❌ Stripe error verifying checkout: {e}")
         raise HTTPException(status_code=400, detail=f"Stripe error: {str(e)}")
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        print(f"❌ Error verifying checkout: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error verifying checkout: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/subscriptions/check-activation")
 async def check_subscription_activation(
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Check and activate any paid subscriptions that haven't been activated yet"""
@@ -4400,8 +4648,9 @@ async def check_subscription_activation(
                     
                     db.commit()
                     db.refresh(user)
+                    invalidate_user_context(user.id)
                     
-                    print(f"✅ Subscription activated via check-activation for user {user.id}: {subscription_type} with {credits} credits")
+                    logger.info(f"✅ Subscription activated via check-activation for user {user.id}: {subscription_type} with {credits} credits")
                     
                     return {
                         "message": "Subscription activated successfully",
@@ -4418,7 +4667,7 @@ async def check_subscription_activation(
             }
             
         except stripe.error.StripeError as e:
-            print(f"⚠️ Stripe error checking subscriptions: {e}")
+            logger.warning(f"⚠️ Stripe error checking subscriptions: {e}")
             return {
                 "message": f"Could not check subscriptions: {str(e)}",
                 "status": "error"
@@ -4428,14 +4677,12 @@ async def check_subscription_activation(
         raise
     except Exception as e:
         db.rollback()
-        print(f"❌ Error checking subscription activation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error checking subscription activation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/subscriptions/cancel")
 async def cancel_subscription(
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Cancel user subscription"""
@@ -4457,6 +4704,7 @@ async def cancel_subscription(
         # The subscription will remain active until expires_at
         db.commit()
         db.refresh(user)
+        invalidate_user_context(user.id)
         
         return {
             "message": "Subscription cancelled successfully. Access will continue until the end of the current billing period.",
@@ -4467,9 +4715,7 @@ async def cancel_subscription(
         raise
     except Exception as e:
         db.rollback()
-        print(f"❌ Error cancelling subscription: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error cancelling subscription: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ---------- Helper Functions for Packshot Generation ----------
@@ -4494,10 +4740,10 @@ def has_alpha(url: str) -> bool:
     except Exception:
         return url.lower().endswith(".png")
 
-def rembg_cutout(photo_url: str) -> Image.Image:
+def rembg_cutout(photo_url: str) -> "Image.Image":
     """Use Replicate's rembg to remove background"""
     try:
-        print(f"🪄 Removing background for: {photo_url[:80]}...")
+        logger.info(f"🪄 Removing background for: {photo_url[:80]}...")
         
         # If this is a data URL, decode and save to temp file, then use rembg
         if photo_url.startswith("data:image"):
@@ -4513,9 +4759,9 @@ def rembg_cutout(photo_url: str) -> Image.Image:
                 tmp_file_path = tmp_file.name
             
             try:
-                print("🔄 Calling rembg API for data URL (via temp file)...")
+                logger.info("🔄 Calling rembg API for data URL (via temp file)...")
                 with open(tmp_file_path, 'rb') as f:
-                    out = replicate.run("cjwbw/rembg", input={"image": f})
+                    out = replicate_run("cjwbw/rembg", input={"image": f})
                 if hasattr(out, 'url'):
                     result_url = out.url()
                 elif isinstance(out, str):
@@ -4540,9 +4786,9 @@ def rembg_cutout(photo_url: str) -> Image.Image:
             filename = photo_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
             if os.path.exists(filepath):
-                print(f"🔄 Calling rembg API for local file: {filepath}")
+                logger.info(f"🔄 Calling rembg API for local file: {filepath}")
                 with open(filepath, "rb") as f:
-                    out = replicate.run("cjwbw/rembg", input={"image": f})
+                    out = replicate_run("cjwbw/rembg", input={"image": f})
                     if hasattr(out, 'url'):
                         result_url = out.url()
                     elif isinstance(out, str):
@@ -4553,14 +4799,14 @@ def rembg_cutout(photo_url: str) -> Image.Image:
                     response = requests.get(result_url)
                     return Image.open(BytesIO(response.content)).convert("RGBA")
             else:
-                print(f"⚠️ Local file not found: {filepath}")
+                logger.warning(f"⚠️ Local file not found: {filepath}")
         
         # For external URLs (Cloudinary packshots), use the URL directly with rembg
         # Replicate can accept URLs directly, which is more reliable than BytesIO
-        print("🔄 Calling rembg API for external URL (using URL directly)...")
+        logger.info("🔄 Calling rembg API for external URL (using URL directly)...")
         try:
             # Use the URL directly - Replicate can fetch from URLs
-            out = replicate.run("cjwbw/rembg", input={"image": photo_url})
+            out = replicate_run("cjwbw/rembg", input={"image": photo_url})
             if hasattr(out, 'url'):
                 result_url = out.url()
             elif isinstance(out, str):
@@ -4569,16 +4815,16 @@ def rembg_cutout(photo_url: str) -> Image.Image:
                 result_url = str(out)
             
             # Download the result
-            print(f"📥 Downloading rembg result from: {result_url[:80]}...")
+            logger.info(f"📥 Downloading rembg result from: {result_url[:80]}...")
             result_response = requests.get(result_url, timeout=10)
             result_response.raise_for_status()
             result_img = Image.open(BytesIO(result_response.content)).convert("RGBA")
-            print(f"✅ Background removed successfully, result size: {result_img.size}")
+            logger.info(f"✅ Background removed successfully, result size: {result_img.size}")
             return result_img
         except Exception as rembg_error:
             # If URL doesn't work, try downloading and using file
-            print(f"⚠️ rembg with URL failed, trying with file: {rembg_error}")
-            print(f"📥 Downloading image from: {photo_url[:80]}...")
+            logger.warning(f"⚠️ rembg with URL failed, trying with file: {rembg_error}")
+            logger.info(f"📥 Downloading image from: {photo_url[:80]}...")
             response = requests.get(photo_url, timeout=10)
             response.raise_for_status()
             
@@ -4592,7 +4838,7 @@ def rembg_cutout(photo_url: str) -> Image.Image:
             try:
                 # Use file path
                 with open(tmp_file_path, 'rb') as f:
-                    out = replicate.run("cjwbw/rembg", input={"image": f})
+                    out = replicate_run("cjwbw/rembg", input={"image": f})
                 if hasattr(out, 'url'):
                     result_url = out.url()
                 elif isinstance(out, str):
@@ -4601,11 +4847,11 @@ def rembg_cutout(photo_url: str) -> Image.Image:
                     result_url = str(out)
                 
                 # Download the result
-                print(f"📥 Downloading rembg result from: {result_url[:80]}...")
+                logger.info(f"📥 Downloading rembg result from: {result_url[:80]}...")
                 result_response = requests.get(result_url, timeout=10)
                 result_response.raise_for_status()
                 result_img = Image.open(BytesIO(result_response.content)).convert("RGBA")
-                print(f"✅ Background removed successfully (file method), result size: {result_img.size}")
+                logger.info(f"✅ Background removed successfully (file method), result size: {result_img.size}")
                 return result_img
             finally:
                 # Clean up temp file
@@ -4615,9 +4861,7 @@ def rembg_cutout(photo_url: str) -> Image.Image:
                     pass
         
     except Exception as e:
-        print(f"❌ Background removal failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Background removal failed: {e}")
         # Fallback: try to download and return as-is
         try:
             import requests
@@ -4628,7 +4872,8 @@ def rembg_cutout(photo_url: str) -> Image.Image:
             # Last resort: return blank image
             return Image.new("RGBA", (800, 800), (255, 255, 255, 0))
 
-def postprocess_cutout(img_rgba: Image.Image) -> Image.Image:
+@timed("pillow", "postprocess")
+def postprocess_cutout(img_rgba: "Image.Image") -> "Image.Image":
     """Clean up the cutout image"""
     try:
         # Trim transparent margins
@@ -4644,10 +4889,11 @@ def postprocess_cutout(img_rgba: Image.Image) -> Image.Image:
         pad = int(max(sharp.size) * 0.06)
         return ImageOps.expand(sharp, border=pad, fill=(0,0,0,0))
     except Exception as e:
-        print(f"Postprocessing failed: {e}")
+        logger.error(f"Postprocessing failed: {e}")
         return img_rgba
 
-def upload_png(img: Image.Image, max_size: int = 768) -> str:
+@timed("pillow", "png_encode")
+def upload_png(img: "Image.Image", max_size: int = 768) -> str:
     """Save RGBA image locally as optimized PNG (scaled) and return /static URL"""
     try:
         os.makedirs("uploads", exist_ok=True)
@@ -4663,7 +4909,7 @@ def upload_png(img: Image.Image, max_size: int = 768) -> str:
         img.save(filepath, format="PNG", optimize=True)
         return get_static_url(filename)
     except Exception as e:
-        print(f"❌ upload_png failed: {e}")
+        logger.error(f"❌ upload_png failed: {e}")
         # Fallback: attempt to save without options
         try:
             filename = f"product_{uuid.uuid4().hex}.png"
@@ -4673,6 +4919,7 @@ def upload_png(img: Image.Image, max_size: int = 768) -> str:
         except Exception:
             raise
 
+@timed("pillow", "jpeg_compress")
 def compress_image_for_processing(filepath: str, max_size: int = 512) -> str:
     """Compress and resize image for efficient processing with Replicate"""
     try:
@@ -4680,7 +4927,7 @@ def compress_image_for_processing(filepath: str, max_size: int = 512) -> str:
         import io
         from PIL import Image
         
-        print(f"🗜️ Compressing {filepath} for processing...")
+        logger.info(f"🗜️ Compressing {filepath} for processing...")
         
         # Open image
         img = Image.open(filepath)
@@ -4709,11 +4956,11 @@ def compress_image_for_processing(filepath: str, max_size: int = 512) -> str:
         base64_data = base64.b64encode(output.getvalue()).decode()
         data_url = f"data:image/jpeg;base64,{base64_data}"
         
-        print(f"✅ Compressed: {original_size} → {img.size}, {compressed_size//1024}KB, base64: {len(data_url)//1024}KB")
+        logger.info(f"✅ Compressed: {original_size} → {img.size}, {compressed_size//1024}KB, base64: {len(data_url)//1024}KB")
         return data_url
         
     except Exception as e:
-        print(f"❌ Failed to compress image: {e}")
+        logger.error(f"❌ Failed to compress image: {e}")
         return filepath
 
 def upload_to_replicate(filepath: str) -> str:
@@ -4724,14 +4971,14 @@ def upload_to_replicate(filepath: str) -> str:
 def enhance_with_nano_banana(image_url: str, prompt: str = "") -> str:
     """Enhance person's realism with Nano Banana (img2img focused on subject)"""
     try:
-        print(f"🍌 Enhancing person with Nano Banana (img2img mode)...")
+        logger.info(f"🍌 Enhancing person with Nano Banana (img2img mode)...")
         
         # Img2img prompt focused ONLY on enhancing the person, not background
         if not prompt:
             prompt = "enhance the person's realism only, ultra detailed skin texture, natural facial features, realistic fabric and clothing texture, professional portrait lighting on subject, sharp focus on person, photorealistic human details, preserve background as is"
         
         # Run Nano Banana in img2img mode with focus on person
-        out = replicate.run("google/nano-banana", input={
+        out = replicate_run("google/nano-banana", input={
             "image": image_url,
             "prompt": prompt,
             "num_inference_steps": 8,  # Very low steps to preserve input
@@ -4749,23 +4996,24 @@ def enhance_with_nano_banana(image_url: str, prompt: str = "") -> str:
         else:
             result_url = str(out)
         
-        print(f"✅ Nano Banana enhancement completed: {result_url[:50]}...")
+        logger.info(f"✅ Nano Banana enhancement completed: {result_url[:50]}...")
         return result_url
         
     except Exception as e:
-        print(f"❌ Nano Banana enhancement failed: {e}")
-        print(f"Continuing with original image")
+        logger.error(f"❌ Nano Banana enhancement failed: {e}")
+        logger.info(f"Continuing with original image")
         return image_url
 
 
-def upload_pil_to_cloudinary(img: Image.Image, folder: str = "auraengine") -> str:
+@timed("storage", "cloudinary_upload")
+def upload_pil_to_cloudinary(img: "Image.Image", folder: str = "auraengine") -> str:
     """
     Upload a PIL Image to Cloudinary and return the public URL.
     """
     try:
         # Check if Cloudinary is configured
         if not (CLOUDINARY_CLOUD_NAME and CLOUDINARY_API_KEY and CLOUDINARY_API_SECRET):
-            print("⚠️ Cloudinary not configured, falling back to local storage")
+            logger.warning("⚠️ Cloudinary not configured, falling back to local storage")
             return upload_png(img)
         
         # Convert PIL Image to bytes
@@ -4783,12 +5031,13 @@ def upload_pil_to_cloudinary(img: Image.Image, folder: str = "auraengine") -> st
             resource_type="image"
         )
         cloudinary_url = result['secure_url']
-        print(f"✅ Uploaded PIL image to Cloudinary: {cloudinary_url[:50]}...")
+        logger.info(f"✅ Uploaded PIL image to Cloudinary: {cloudinary_url[:50]}...")
         return cloudinary_url
     except Exception as e:
-        print(f"❌ Failed to upload PIL image to Cloudinary: {e}")
+        logger.error(f"❌ Failed to upload PIL image to Cloudinary: {e}")
         return upload_png(img)
 
+@timed("storage", "local_save")
 def _save_to_local_storage(url: str, folder: str = "auraengine") -> str:
     """
     Save image/video to local storage when Cloudinary is not configured.
@@ -4820,10 +5069,10 @@ def _save_to_local_storage(url: str, folder: str = "auraengine") -> str:
                 f.write(base64.b64decode(b64))
             
             local_url = f"{get_base_url()}/static/{folder}/{filename}.{ext}"
-            print(f"📁 Saved to local storage: {local_url}")
+            logger.info(f"📁 Saved to local storage: {local_url}")
             return local_url
         except Exception as e:
-            print(f"❌ Failed to save data URL locally: {e}")
+            logger.error(f"❌ Failed to save data URL locally: {e}")
             raise
     
     # Handle http(s) URL - download and save
@@ -4848,10 +5097,10 @@ def _save_to_local_storage(url: str, folder: str = "auraengine") -> str:
                 f.write(response.content)
             
             local_url = f"{get_base_url()}/static/{folder}/{filename}.{ext}"
-            print(f"📁 Downloaded and saved to local storage: {local_url}")
+            logger.info(f"📁 Downloaded and saved to local storage: {local_url}")
             return local_url
         except Exception as e:
-            print(f"❌ Failed to download and save URL locally: {e}")
+            logger.error(f"❌ Failed to download and save URL locally: {e}")
             raise
     
     # Handle local file path - copy to static
@@ -4863,15 +5112,23 @@ def _save_to_local_storage(url: str, folder: str = "auraengine") -> str:
             shutil.copy(url, filepath)
             
             local_url = f"{get_base_url()}/static/{folder}/{filename}.{ext}"
-            print(f"📁 Copied to local storage: {local_url}")
+            logger.info(f"📁 Copied to local storage: {local_url}")
             return local_url
         except Exception as e:
-            print(f"❌ Failed to copy file locally: {e}")
+            logger.error(f"❌ Failed to copy file locally: {e}")
             raise
     
     raise Exception(f"Unknown URL format for local storage: {url[:100] if isinstance(url, str) else type(url)}")
 
+@timed("storage", "cloudinary_upload")
 def upload_to_cloudinary(url: str, folder: str = "auraengine") -> str:
+    """Upload to Cloudinary (see _upload_to_cloudinary), adding the upload to the provider step that produced url"""
+    started = time.perf_counter()
+    stored_url = _upload_to_cloudinary(url, folder)
+    note_upload(url, stored_url, time.perf_counter() - started)
+    return stored_url
+
+def _upload_to_cloudinary(url: str, folder: str = "auraengine") -> str:
     """
     Upload an image or video to Cloudinary and return the public URL.
     Supports:
@@ -4885,7 +5142,7 @@ def upload_to_cloudinary(url: str, folder: str = "auraengine") -> str:
     try:
         # Check if Cloudinary is configured - if not, use local storage fallback
         if not (CLOUDINARY_CLOUD_NAME and CLOUDINARY_API_KEY and CLOUDINARY_API_SECRET):
-            print(f"⚠️ Cloudinary not configured - using local storage fallback")
+            logger.warning(f"⚠️ Cloudinary not configured - using local storage fallback")
             return _save_to_local_storage(url, folder)
         
         # Handle data URL
@@ -4904,10 +5161,10 @@ def upload_to_cloudinary(url: str, folder: str = "auraengine") -> str:
                     resource_type="image"
                 )
                 cloudinary_url = result['secure_url']
-                print(f"✅ Uploaded data URL to Cloudinary: {cloudinary_url[:50]}...")
+                logger.info(f"✅ Uploaded data URL to Cloudinary: {cloudinary_url[:50]}...")
                 return cloudinary_url
             except Exception as e:
-                print(f"❌ Failed to upload data URL to Cloudinary: {e}")
+                logger.error(f"❌ Failed to upload data URL to Cloudinary: {e}")
                 raise
 
         # Handle http(s) URL
@@ -4926,10 +5183,10 @@ def upload_to_cloudinary(url: str, folder: str = "auraengine") -> str:
                     resource_type=resource_type
                 )
                 cloudinary_url = result['secure_url']
-                print(f"✅ Uploaded {resource_type} URL to Cloudinary: {cloudinary_url[:50]}...")
+                logger.info(f"✅ Uploaded {resource_type} URL to Cloudinary: {cloudinary_url[:50]}...")
                 return cloudinary_url
             except Exception as e:
-                print(f"❌ Failed to upload URL to Cloudinary: {e}")
+                logger.error(f"❌ Failed to upload URL to Cloudinary: {e}")
                 raise
 
         # Handle local file path
@@ -4941,18 +5198,19 @@ def upload_to_cloudinary(url: str, folder: str = "auraengine") -> str:
                 resource_type="image"
             )
             cloudinary_url = result['secure_url']
-            print(f"✅ Uploaded local file to Cloudinary: {cloudinary_url[:50]}...")
+            logger.info(f"✅ Uploaded local file to Cloudinary: {cloudinary_url[:50]}...")
             return cloudinary_url
         except Exception as e:
-            print(f"❌ Failed to upload local file to Cloudinary: {e}")
+            logger.error(f"❌ Failed to upload local file to Cloudinary: {e}")
             raise
 
     except Exception as e:
-        print(f"❌ CRITICAL: Failed to upload to Cloudinary: {e}")
-        print(f"   URL: {url[:100] if isinstance(url, str) else url}")
-        print(f"   Folder: {folder}")
+        logger.error(f"❌ CRITICAL: Failed to upload to Cloudinary: {e}")
+        step_logger.info(f"URL: {url[:100] if isinstance(url, str) else url}")
+        step_logger.info(f"Folder: {folder}")
         raise Exception(f"Cloudinary upload failed: {str(e)}")
 
+@timed("storage", "download")
 def download_and_save_image(url: str, prefix: str = "packshot") -> str:
     """
     Persist an image into uploads/ and return a stable /static URL.
@@ -4976,10 +5234,10 @@ def download_and_save_image(url: str, prefix: str = "packshot") -> str:
                 with open(filepath, "wb") as f:
                     f.write(base64.b64decode(b64))
                 local_url = get_static_url(filename)
-                print(f"✅ Saved data URL to {local_url}")
+                logger.info(f"✅ Saved data URL to {local_url}")
                 return local_url
             except Exception as e:
-                print(f"❌ Failed to save data URL: {e}")
+                logger.error(f"❌ Failed to save data URL: {e}")
                 return url
 
         # Handle http(s) URL
@@ -5004,10 +5262,10 @@ def download_and_save_image(url: str, prefix: str = "packshot") -> str:
                         if chunk:
                             f.write(chunk)
                 local_url = get_static_url(filename)
-                print(f"✅ Downloaded image to {local_url}")
+                logger.info(f"✅ Downloaded image to {local_url}")
                 return local_url
             except Exception as e:
-                print(f"❌ Download failed for {url[:120]}...: {e}")
+                logger.error(f"❌ Download failed for {url[:120]}...: {e}")
                 return url
 
         # Treat as local file path
@@ -5018,14 +5276,14 @@ def download_and_save_image(url: str, prefix: str = "packshot") -> str:
             with open(url, "rb") as src, open(filepath, "wb") as dst:
                 dst.write(src.read())
             local_url = get_static_url(filename)
-            print(f"✅ Copied local file to {local_url}")
+            logger.info(f"✅ Copied local file to {local_url}")
             return local_url
         except Exception as e:
-            print(f"❌ Local copy failed: {e}")
+            logger.error(f"❌ Local copy failed: {e}")
             return url
 
     except Exception as e:
-        print(f"❌ Failed to process image: {e}")
+        logger.error(f"❌ Failed to process image: {e}")
         return url
 
 def run_vella_try_on(model_image_url: str, product_image_url: str, quality_mode: str = "standard", clothing_type: str = "top") -> str:
@@ -5040,32 +5298,32 @@ def run_vella_try_on(model_image_url: str, product_image_url: str, quality_mode:
     5. Detects clothing type and uses correct Vella 1.5 parameter
     """
     try:
-        print(f"🎭 Running Vella try-on: model={model_image_url[:80]}..., product={product_image_url[:80]}...")
-        print(f"👕 Clothing type: {clothing_type}")
-        print(f"🔍 Full product_image_url: {product_image_url}")
+        logger.info(f"🎭 Running Vella try-on: model={model_image_url[:80]}..., product={product_image_url[:80]}...")
+        logger.info(f"👕 Clothing type: {clothing_type}")
+        logger.info(f"🔍 Full product_image_url: {product_image_url}")
 
         # Force persist ephemeral replicate URLs to stable /static before calling Vella
         if isinstance(model_image_url, str) and model_image_url.startswith("https://replicate.delivery/"):
             try:
                 model_image_url = upload_to_cloudinary(model_image_url, "vella_model")
-                print(f"🧩 Persisted model to /static for Vella: {model_image_url}")
+                logger.info(f"🧩 Persisted model to /static for Vella: {model_image_url}")
             except Exception as e:
-                print(f"⚠️ Failed to persist model for Vella: {e}")
+                logger.warning(f"⚠️ Failed to persist model for Vella: {e}")
         if isinstance(product_image_url, str) and product_image_url.startswith("https://replicate.delivery/"):
             try:
                 product_image_url = upload_to_cloudinary(product_image_url, "vella_product")
-                print(f"🧩 Persisted garment to /static for Vella: {product_image_url}")
+                logger.info(f"🧩 Persisted garment to /static for Vella: {product_image_url}")
             except Exception as e:
-                print(f"⚠️ Failed to persist garment for Vella: {e}")
+                logger.warning(f"⚠️ Failed to persist garment for Vella: {e}")
 
         # Model input: prefer small public URL; convert only if local /static
         if model_image_url.startswith(get_base_url() + "/static/"):
             filename = model_image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
             model_image_url = upload_to_replicate(filepath)
-            print(f"🗜️ Converted local model to data URL")
+            logger.info(f"🗜️ Converted local model to data URL")
         else:
-            print(f"📁 Using model URL directly: {model_image_url[:50]}...")
+            logger.info(f"📁 Using model URL directly: {model_image_url[:50]}...")
 
         # WEBP Conversion: If garment is WEBP, convert to PNG first so Pillow/rembg can process
         if isinstance(product_image_url, str) and product_image_url.lower().endswith(".webp"):
@@ -5080,9 +5338,9 @@ def run_vella_try_on(model_image_url: str, product_image_url: str, quality_mode:
                 img.save(buf, format="PNG", optimize=True)
                 b64 = base64.b64encode(buf.getvalue()).decode()
                 product_image_url = f"data:image/png;base64,{b64}"
-                print("🧩 Converted WEBP garment to PNG (data URL)")
+                logger.info("🧩 Converted WEBP garment to PNG (data URL)")
             except Exception as e:
-                print(f"⚠️ WEBP→PNG convert failed: {e} — using original URL")
+                logger.warning(f"⚠️ WEBP→PNG convert failed: {e} — using original URL")
 
         # Garment: ensure alpha; prefer URL; convert to data URL only if local /static and URL attempt fails
         # For packshots, check if they already have transparency before trying to remove background
@@ -5099,15 +5357,15 @@ def run_vella_try_on(model_image_url: str, product_image_url: str, quality_mode:
                 # WEBP packshots from Cloudinary packshot generation are usually already isolated
                 # However, Vella might work better with PNG format
                 # Convert WEBP to PNG to ensure Vella can use it correctly
-                print("🧵 WEBP packshot detected, converting to PNG for Vella compatibility...")
+                logger.info("🧵 WEBP packshot detected, converting to PNG for Vella compatibility...")
                 try:
                     import requests
                     from io import BytesIO
-                    print(f"📥 Downloading WEBP packshot from: {product_image_url[:80]}...")
+                    logger.info(f"📥 Downloading WEBP packshot from: {product_image_url[:80]}...")
                     response = requests.get(product_image_url, timeout=10)
                     response.raise_for_status()
                     webp_img = Image.open(BytesIO(response.content)).convert("RGBA")
-                    print(f"✅ Downloaded WEBP, size: {webp_img.size}, mode: {webp_img.mode}")
+                    logger.info(f"✅ Downloaded WEBP, size: {webp_img.size}, mode: {webp_img.mode}")
                     
                     # Convert to PNG with transparency preserved
                     png_buffer = BytesIO()
@@ -5117,66 +5375,64 @@ def run_vella_try_on(model_image_url: str, product_image_url: str, quality_mode:
                     # Upload PNG version to Cloudinary
                     # Verify image properties before uploading
                     png_img = Image.open(png_buffer)
-                    print(f"🔍 PNG image properties:")
-                    print(f"   Size: {png_img.size}")
-                    print(f"   Mode: {png_img.mode}")
-                    print(f"   Has transparency: {png_img.mode in ('RGBA', 'LA')}")
+                    logger.info(f"🔍 PNG image properties:")
+                    step_logger.info(f"Size: {png_img.size}")
+                    step_logger.info(f"Mode: {png_img.mode}")
+                    step_logger.info(f"Has transparency: {png_img.mode in ('RGBA', 'LA')}")
                     
                     # Check if image has reasonable size (packshots should be isolated products)
                     # Vella works best with high resolution images
                     if png_img.size[0] < 512 or png_img.size[1] < 512:
-                        print(f"⚠️ WARNING: Packshot image is small ({png_img.size}), Vella prefers higher resolution")
+                        logger.warning(f"⚠️ WARNING: Packshot image is small ({png_img.size}), Vella prefers higher resolution")
                     elif png_img.size[0] >= 512 and png_img.size[1] >= 512:
-                        print(f"✅ Packshot size is good for Vella ({png_img.size[0]}x{png_img.size[1]})")
+                        logger.info(f"✅ Packshot size is good for Vella ({png_img.size[0]}x{png_img.size[1]})")
                     
                     # Ensure image is high quality for Vella (upscale if needed)
                     # Vella documentation says "High resolution to capture fabric details"
                     target_min_size = 1024
                     if png_img.size[0] < target_min_size or png_img.size[1] < target_min_size:
-                        print(f"📏 Upscaling packshot to minimum {target_min_size}px for better Vella results...")
+                        logger.info(f"📏 Upscaling packshot to minimum {target_min_size}px for better Vella results...")
                         # Calculate scaling factor to maintain aspect ratio
                         scale_factor = max(target_min_size / png_img.size[0], target_min_size / png_img.size[1])
                         new_size = (int(png_img.size[0] * scale_factor), int(png_img.size[1] * scale_factor))
                         png_img = png_img.resize(new_size, Image.LANCZOS)
-                        print(f"✅ Upscaled to {png_img.size}")
+                        logger.info(f"✅ Upscaled to {png_img.size}")
                     
                     png_url = upload_pil_to_cloudinary(png_img, "garment_png")
-                    print(f"✅ Converted WEBP to PNG: {png_url[:80]}...")
-                    print(f"🔍 Final PNG garment URL for Vella: {png_url}")
-                    print(f"🔍 Final garment image size: {png_img.size[0]}x{png_img.size[1]} (Vella prefers high resolution)")
+                    logger.info(f"✅ Converted WEBP to PNG: {png_url[:80]}...")
+                    logger.info(f"🔍 Final PNG garment URL for Vella: {png_url}")
+                    logger.info(f"🔍 Final garment image size: {png_img.size[0]}x{png_img.size[1]} (Vella prefers high resolution)")
                     garment_url = png_url
-                    print(f"🧵 Garment URL (PNG): {garment_url[:80]}...")
+                    logger.info(f"🧵 Garment URL (PNG): {garment_url[:80]}...")
                 except Exception as conv_error:
-                    print(f"⚠️ WEBP→PNG conversion failed: {conv_error}")
-                    print(f"⚠️ Using original WEBP packshot (Vella may not use it correctly)")
+                    logger.warning(f"⚠️ WEBP→PNG conversion failed: {conv_error}")
+                    logger.warning(f"⚠️ Using original WEBP packshot (Vella may not use it correctly)")
                     garment_url = product_image_url
-                    print(f"🧵 Garment URL (WEBP fallback): {garment_url[:80]}...")
+                    logger.info(f"🧵 Garment URL (WEBP fallback): {garment_url[:80]}...")
             elif has_alpha(product_image_url) and not is_packshot:
                 # Only skip processing if it already has alpha AND it's not a packshot
                 garment_url = product_image_url
-                print("🧵 Garment already has alpha, using as-is")
+                logger.info("🧵 Garment already has alpha, using as-is")
             else:
-                print("🪄 Processing garment image (removing background)...")
-                print(f"   Input: {product_image_url[:80]}...")
+                logger.info("🪄 Processing garment image (removing background)...")
+                step_logger.info(f"Input: {product_image_url[:80]}...")
                 try:
                     cut = rembg_cutout(product_image_url)
-                    print(f"✅ Background removal complete, image size: {cut.size}")
+                    logger.info(f"✅ Background removal complete, image size: {cut.size}")
                     cut = postprocess_cutout(cut)
-                    print(f"✅ Post-processing complete, final size: {cut.size}")
+                    logger.info(f"✅ Post-processing complete, final size: {cut.size}")
                     garment_url = upload_pil_to_cloudinary(cut, "garment_cutout")  # -> Cloudinary URL
-                    print(f"🧵 Garment cutout saved: {garment_url[:80]}...")
+                    logger.info(f"🧵 Garment cutout saved: {garment_url[:80]}...")
                 except Exception as rembg_error:
-                    print(f"⚠️ Background removal failed: {rembg_error}")
-                    print(f"⚠️ Using original packshot image (may have background)")
+                    logger.warning(f"⚠️ Background removal failed: {rembg_error}")
+                    logger.warning(f"⚠️ Using original packshot image (may have background)")
                     # For packshots, even if rembg fails, use the original - it's usually already isolated
                     garment_url = product_image_url
-                    print(f"🧵 Garment URL (fallback): {garment_url[:80]}...")
-                print(f"🔍 Final garment URL being sent to Vella: {garment_url}")
+                    logger.info(f"🧵 Garment URL (fallback): {garment_url[:80]}...")
+                logger.info(f"🔍 Final garment URL being sent to Vella: {garment_url}")
         except Exception as e:
-            print(f"⚠️ Garment processing failed: {e}")
-            import traceback
-            traceback.print_exc()
-            print(f"⚠️ Falling back to original product_image_url")
+            logger.exception(f"⚠️ Garment processing failed: {e}")
+            logger.warning(f"⚠️ Falling back to original product_image_url")
             garment_url = product_image_url
 
         # Run Vella 1.5 try-on
@@ -5185,18 +5441,18 @@ def run_vella_try_on(model_image_url: str, product_image_url: str, quality_mode:
             if quality_mode == "high":
                 num_outputs = 1
                 seed = None
-                print("🎨 Using HIGH QUALITY Vella 1.5 mode")
+                logger.info("🎨 Using HIGH QUALITY Vella 1.5 mode")
             else:
                 num_outputs = 1
                 seed = 42
-                print("⚡ Using STANDARD Vella 1.5 mode")
+                logger.info("⚡ Using STANDARD Vella 1.5 mode")
             
-            print(f"🎭 Calling Vella 1.5 API")
-            print(f"   Model: {model_image_url[:80]}...")
-            print(f"   Garment: {garment_url[:80]}...")
-            print(f"   Clothing type: {clothing_type}")
-            print(f"🔍 COMPLETE Vella input - Model URL: {model_image_url}")
-            print(f"🔍 COMPLETE Vella input - Garment URL: {garment_url}")
+            logger.info(f"🎭 Calling Vella 1.5 API")
+            step_logger.info(f"Model: {model_image_url[:80]}...")
+            step_logger.info(f"Garment: {garment_url[:80]}...")
+            step_logger.info(f"Clothing type: {clothing_type}")
+            logger.info(f"🔍 COMPLETE Vella input - Model URL: {model_image_url}")
+            logger.info(f"🔍 COMPLETE Vella input - Garment URL: {garment_url}")
             
             # Build Vella 1.5 input - use correct parameter based on clothing type
             # For tops: top_image, for bottoms: bottom_image
@@ -5218,77 +5474,77 @@ def run_vella_try_on(model_image_url: str, product_image_url: str, quality_mode:
             if is_bottom:
                 # Use bottom_image parameter for pants/shorts/skirts
                 vella_input["bottom_image"] = garment_url
-                print(f"👖 Using bottom_image parameter for {clothing_type}")
-                print(f"🔍 Bottom garment URL: {garment_url[:80]}...")
-                print(f"🔍 Complete bottom_image URL: {garment_url}")
-                print(f"🔍 Packshot image details: PNG format, RGBA mode, Has transparency")
+                logger.info(f"👖 Using bottom_image parameter for {clothing_type}")
+                logger.info(f"🔍 Bottom garment URL: {garment_url[:80]}...")
+                logger.info(f"🔍 Complete bottom_image URL: {garment_url}")
+                logger.info(f"🔍 Packshot image details: PNG format, RGBA mode, Has transparency")
                 
                 # Verify the garment image is accessible and valid
                 try:
                     import requests
                     verify_response = requests.head(garment_url, timeout=5)
-                    print(f"🔍 Garment URL verification: Status {verify_response.status_code}")
+                    logger.info(f"🔍 Garment URL verification: Status {verify_response.status_code}")
                     if verify_response.status_code == 200:
                         content_type = verify_response.headers.get('Content-Type', '')
-                        print(f"🔍 Garment Content-Type: {content_type}")
+                        logger.info(f"🔍 Garment Content-Type: {content_type}")
                         if 'image' not in content_type.lower():
-                            print(f"⚠️ WARNING: Garment URL might not be an image: {content_type}")
+                            logger.warning(f"⚠️ WARNING: Garment URL might not be an image: {content_type}")
                 except Exception as verify_error:
-                    print(f"⚠️ Could not verify garment URL: {verify_error}")
+                    logger.warning(f"⚠️ Could not verify garment URL: {verify_error}")
             elif is_top:
                 vella_input["top_image"] = garment_url
-                print(f"👕 Using top_image parameter for {clothing_type}")
+                logger.info(f"👕 Using top_image parameter for {clothing_type}")
             else:
                 # Default to top_image for unknown types
                 vella_input["top_image"] = garment_url
-                print(f"⚠️ Unknown clothing type '{clothing_type}', defaulting to top_image")
+                logger.warning(f"⚠️ Unknown clothing type '{clothing_type}', defaulting to top_image")
             
             # Also try adding garment_image as a fallback (might help Vella understand better)
             # Note: Vella might prefer one parameter over the other, so we use the specific one (bottom_image/top_image)
             # but keep garment_image as a reference if supported
             
             # Debug: Print what we're sending to Vella
-            print(f"🔍 Vella input structure: {list(vella_input.keys())}")
-            print(f"🔍 Clothing type detection - is_bottom: {is_bottom}, is_top: {is_top}, type: '{clothing_type}'")
+            logger.info(f"🔍 Vella input structure: {list(vella_input.keys())}")
+            logger.info(f"🔍 Clothing type detection - is_bottom: {is_bottom}, is_top: {is_top}, type: '{clothing_type}'")
             
             if seed is not None:
                 vella_input["seed"] = seed
             
-            print(f"🎭 Vella input keys: {list(vella_input.keys())}")
+            logger.info(f"🎭 Vella input keys: {list(vella_input.keys())}")
             
             # Call Vella 1.5 with retry logic
-            print("🔄 Calling Replicate Vella 1.5...")
+            logger.info("🔄 Calling Replicate Vella 1.5...")
             max_retries = 3
             
             for attempt in range(max_retries):
                 try:
-                    print(f"🎭 Vella attempt {attempt + 1}/{max_retries}...")
-                    print(f"🔍 Vella input keys before API call: {list(vella_input.keys())}")
-                    print(f"🔍 Vella input values (truncated): model_image={str(vella_input.get('model_image', ''))[:50]}..., garment_key={'bottom_image' if 'bottom_image' in vella_input else 'top_image' if 'top_image' in vella_input else 'unknown'}")
-                    out = replicate.run("omnious/vella-1.5", input=vella_input)
-                    print(f"✅ Vella API call succeeded on attempt {attempt + 1}!")
-                    print(f"🎭 Vella API response type: {type(out)}")
+                    logger.info(f"🎭 Vella attempt {attempt + 1}/{max_retries}...")
+                    logger.info(f"🔍 Vella input keys before API call: {list(vella_input.keys())}")
+                    logger.info(f"🔍 Vella input values (truncated): model_image={str(vella_input.get('model_image', ''))[:50]}..., garment_key={'bottom_image' if 'bottom_image' in vella_input else 'top_image' if 'top_image' in vella_input else 'unknown'}")
+                    out = replicate_run("omnious/vella-1.5", input=vella_input)
+                    logger.info(f"✅ Vella API call succeeded on attempt {attempt + 1}!")
+                    logger.info(f"🎭 Vella API response type: {type(out)}")
                     if hasattr(out, '__dict__'):
-                        print(f"🎭 Vella response attributes: {list(out.__dict__.keys())}")
+                        logger.info(f"🎭 Vella response attributes: {list(out.__dict__.keys())}")
                     break  # Success, exit retry loop
                 except Exception as e:
-                    print(f"⚠️ Vella attempt {attempt + 1} failed: {e}")
-                    print(f"🔍 Error details: {type(e).__name__}: {str(e)}")
+                    logger.warning(f"⚠️ Vella attempt {attempt + 1} failed: {e}")
+                    logger.error(f"🔍 Error details: {type(e).__name__}: {str(e)}")
                     # If bottom_image was rejected, try garment_image with garment_type as fallback
                     if "bottom_image" in vella_input and ("not supported" in str(e).lower() or "invalid" in str(e).lower() or "unexpected" in str(e).lower()):
-                        print(f"🔄 bottom_image parameter rejected, trying garment_image with garment_type='bottom' fallback...")
+                        logger.info(f"🔄 bottom_image parameter rejected, trying garment_image with garment_type='bottom' fallback...")
                         vella_input.pop("bottom_image", None)
                         vella_input["garment_image"] = garment_url
                         vella_input["garment_type"] = "bottom"
-                        print(f"👖 Retrying with garment_image and garment_type='bottom'")
+                        logger.info(f"👖 Retrying with garment_image and garment_type='bottom'")
                         continue  # Retry with new parameters
                     if attempt < max_retries - 1:
                         wait_time = (attempt + 1) * 10  # Exponential backoff: 10s, 20s, 30s
-                        print(f"⏳ Waiting {wait_time}s before retry...")
+                        logger.info(f"⏳ Waiting {wait_time}s before retry...")
                         import time
                         time.sleep(wait_time)
                     else:
-                        print(f"❌ All {max_retries} Vella attempts failed, raising exception")
+                        logger.error(f"❌ All {max_retries} Vella attempts failed, raising exception")
                         raise e
             
             # Handle different return types
@@ -5305,41 +5561,41 @@ def run_vella_try_on(model_image_url: str, product_image_url: str, quality_mode:
             if isinstance(try_on_url, str) and try_on_url.startswith("https://replicate.delivery/"):
                 try:
                     try_on_url = upload_to_cloudinary(try_on_url, "vella_try_on")
-                    print(f"✅ Persisted Vella result: {try_on_url[:50]}...")
+                    logger.info(f"✅ Persisted Vella result: {try_on_url[:50]}...")
                 except Exception as e:
-                    print(f"⚠️ Failed to persist Vella result: {e}")
+                    logger.warning(f"⚠️ Failed to persist Vella result: {e}")
             
-            print(f"✅ Vella try-on completed: {try_on_url[:50]}...")
+            logger.info(f"✅ Vella try-on completed: {try_on_url[:50]}...")
             return try_on_url
             
         except Exception as e:
-            print(f"❌ Vella try-on failed: {e}")
+            logger.error(f"❌ Vella try-on failed: {e}")
             # Prefer returning the Qwen composite (model_image_url may already be Qwen output)
-            print("↩️ Returning previous composed image instead of placeholder")
+            logger.info("↩️ Returning previous composed image instead of placeholder")
             return model_image_url
         
     except Exception as e:
-        print(f"❌ Vella try-on generation failed: {e}")
-        print("↩️ Returning previous composed image instead of placeholder")
+        logger.error(f"❌ Vella try-on generation failed: {e}")
+        logger.info("↩️ Returning previous composed image instead of placeholder")
         return model_image_url
 
 def run_qwen_add_product(model_image_url: str, product_image_url: str, clothing_type: str, product_name: str) -> str:
     """Add a product to a model image using Qwen Image Edit Plus"""
     try:
-        print(f"🎨 Running Qwen to add {product_name} ({clothing_type}) to image...")
+        logger.info(f"🎨 Running Qwen to add {product_name} ({clothing_type}) to image...")
         
         # Convert local URLs to external URLs for Replicate
         if model_image_url.startswith(get_base_url() + "/static/"):
             filename = model_image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
             model_image_url = upload_to_replicate(filepath)
-            print(f"📁 Converted local model image to external URL")
+            logger.info(f"📁 Converted local model image to external URL")
             
         if product_image_url.startswith(get_base_url() + "/static/"):
             filename = product_image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
             product_image_url = upload_to_replicate(filepath)
-            print(f"📁 Converted local product image to external URL")
+            logger.info(f"📁 Converted local product image to external URL")
         
         # Create a strong prompt that tells Qwen to apply the exact product from the packshot
         clothing_type_lower = clothing_type.lower() if clothing_type else "product"
@@ -5361,15 +5617,15 @@ def run_qwen_add_product(model_image_url: str, product_image_url: str, clothing_
         
         full_prompt = f"{base_prompt} Keep the person's body, pose, face, and all other clothing unchanged. Only replace/add the {clothing_type_lower} from the packshot. Professional fashion photography quality with perfect garment integration."
         
-        print(f"📝 Qwen prompt: {full_prompt[:200]}...")
-        print(f"🖼️ Model image URL: {model_image_url[:80]}...")
-        print(f"🛍️ Product image URL: {product_image_url[:80]}...")
-        print(f"👕 Clothing type: {clothing_type}")
+        logger.info(f"📝 Qwen prompt: {full_prompt[:200]}...")
+        logger.info(f"🖼️ Model image URL: {model_image_url[:80]}...")
+        logger.info(f"🛍️ Product image URL: {product_image_url[:80]}...")
+        logger.info(f"👕 Clothing type: {clothing_type}")
         
         # Use Qwen Image Edit Plus with 2 images (model + product packshot)
         try:
-            print("🔄 Calling Qwen Image Edit Plus...")
-            out = replicate.run("qwen/qwen-image-edit-plus", input={
+            logger.info("🔄 Calling Qwen Image Edit Plus...")
+            out = replicate_run("qwen/qwen-image-edit-plus", input={
                 "prompt": full_prompt,
                 "image": [model_image_url, product_image_url],
                 "num_inference_steps": 50,  # More steps for better accuracy
@@ -5391,24 +5647,20 @@ def run_qwen_add_product(model_image_url: str, product_image_url: str, clothing_
             if isinstance(result_url, str) and result_url.startswith("https://replicate.delivery/"):
                 try:
                     result_url = upload_to_cloudinary(result_url, "qwen_add_product")
-                    print(f"✅ Persisted Qwen result to Cloudinary: {result_url[:80]}...")
+                    logger.info(f"✅ Persisted Qwen result to Cloudinary: {result_url[:80]}...")
                 except Exception as upload_error:
-                    print(f"⚠️ Failed to persist to Cloudinary: {upload_error}")
+                    logger.warning(f"⚠️ Failed to persist to Cloudinary: {upload_error}")
             
-            print(f"✅ Qwen add product completed: {result_url[:80]}...")
+            logger.info(f"✅ Qwen add product completed: {result_url[:80]}...")
             return result_url
             
         except Exception as qwen_error:
-            print(f"❌ Qwen add product failed: {qwen_error}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"❌ Qwen add product failed: {qwen_error}")
             raise qwen_error
             
     except Exception as e:
-        print(f"❌ Qwen add product generation failed: {e}")
-        import traceback
-        traceback.print_exc()
-        print("↩️ Returning original model image instead of placeholder")
+        logger.exception(f"❌ Qwen add product generation failed: {e}")
+        logger.info("↩️ Returning original model image instead of placeholder")
         return model_image_url
 
 
@@ -5428,7 +5680,6 @@ def run_flux_2_pro(prompt: str, reference_images: list, guidance: float = 3.5, s
         URL of generated image, or None if failed
     """
     import time
-    import replicate
     
     MAX_RETRIES = 3
     RETRY_DELAY = 15
@@ -5436,20 +5687,20 @@ def run_flux_2_pro(prompt: str, reference_images: list, guidance: float = 3.5, s
     # Validate reference images
     for idx, url in enumerate(reference_images):
         if not url or not isinstance(url, str):
-            print(f"❌ Invalid reference image {idx+1}: {url}")
+            logger.error(f"❌ Invalid reference image {idx+1}: {url}")
             raise ValueError(f"Reference image {idx+1} is invalid")
         if url.startswith("http://localhost") or url.startswith("http://127.0.0.1"):
-            print(f"❌ Local URL not accessible by Replicate: {url[:80]}")
+            logger.error(f"❌ Local URL not accessible by Replicate: {url[:80]}")
             raise ValueError(f"Reference image {idx+1} is a local URL")
     
     for attempt in range(MAX_RETRIES):
         try:
-            print(f"\n🌊 FLUX 2 PRO (attempt {attempt + 1}/{MAX_RETRIES})...")
-            print(f"📝 Prompt: {prompt[:150]}...")
-            print(f"🖼️ Reference images: {len(reference_images)}")
+            logger.info(f"🌊 FLUX 2 PRO (attempt {attempt + 1}/{MAX_RETRIES})...")
+            logger.info(f"📝 Prompt: {prompt[:150]}...")
+            logger.info(f"🖼️ Reference images: {len(reference_images)}")
             for idx, url in enumerate(reference_images):
-                print(f"   Ref {idx+1}: {url[:60]}...")
-            print(f"⚙️ Parameters: guidance={guidance}, steps={steps}, aspect_ratio={aspect_ratio}")
+                step_logger.info(f"Ref {idx+1}: {url[:60]}...")
+            logger.info(f"⚙️ Parameters: guidance={guidance}, steps={steps}, aspect_ratio={aspect_ratio}")
             
             # Build input - Flux 2 Pro format
             # API docs: https://replicate.com/black-forest-labs/flux-2-pro/api/schema
@@ -5469,10 +5720,10 @@ def run_flux_2_pro(prompt: str, reference_images: list, guidance: float = 3.5, s
                 # Flux 2 Pro accepts up to 8 reference images via input_images parameter
                 images_to_use = reference_images[:8]  # Limit to 8 max
                 input_dict["input_images"] = images_to_use
-                print(f"   📌 Using input_images with {len(images_to_use)} reference image(s)")
+                step_logger.info(f"📌 Using input_images with {len(images_to_use)} reference image(s)")
             
-            print(f"🔄 Calling Replicate API (black-forest-labs/flux-2-pro)...")
-            out = replicate.run("black-forest-labs/flux-2-pro", input=input_dict)
+            logger.info(f"🔄 Calling Replicate API (black-forest-labs/flux-2-pro)...")
+            out = replicate_run("black-forest-labs/flux-2-pro", input=input_dict)
             
             # Handle output
             if hasattr(out, 'url'):
@@ -5484,12 +5735,12 @@ def run_flux_2_pro(prompt: str, reference_images: list, guidance: float = 3.5, s
             else:
                 result_url = str(out)
             
-            print(f"✅ Flux 2 Pro completed: {result_url[:80]}...")
+            logger.info(f"✅ Flux 2 Pro completed: {result_url[:80]}...")
             return result_url
             
         except Exception as e:
             error_msg = str(e).lower()
-            print(f"❌ Flux 2 Pro attempt {attempt + 1} failed: {type(e).__name__}: {e}")
+            logger.error(f"❌ Flux 2 Pro attempt {attempt + 1} failed: {type(e).__name__}: {e}")
             
             # Check if retryable
             is_retryable = any(keyword in error_msg for keyword in [
@@ -5498,14 +5749,12 @@ def run_flux_2_pro(prompt: str, reference_images: list, guidance: float = 3.5, s
             
             if is_retryable and attempt < MAX_RETRIES - 1:
                 wait_time = RETRY_DELAY * (attempt + 1)
-                print(f"⏳ Waiting {wait_time}s before retry...")
+                logger.info(f"⏳ Waiting {wait_time}s before retry...")
                 time.sleep(wait_time)
                 continue
             
             if attempt == MAX_RETRIES - 1:
-                print(f"❌ All {MAX_RETRIES} Flux 2 Pro attempts failed")
-                import traceback
-                traceback.print_exc()
+                logger.exception(f"❌ All {MAX_RETRIES} Flux 2 Pro attempts failed")
                 return None
     
     return None
@@ -5528,7 +5777,6 @@ def run_nano_banana_pro(prompt: str, image_urls: list, strength: float = 0.50, g
         URL of generated image, or None if all retries fail
     """
     import time
-    import replicate
     
     MAX_RETRIES = 3
     RETRY_DELAY = 15  # seconds between retries
@@ -5536,25 +5784,25 @@ def run_nano_banana_pro(prompt: str, image_urls: list, strength: float = 0.50, g
     # Validate image URLs first (don't retry validation errors)
     for idx, url in enumerate(image_urls):
         if not url or not isinstance(url, str):
-            print(f"❌ INPUT VALIDATION ERROR: Image {idx+1} is invalid: {url}")
+            logger.error(f"❌ INPUT VALIDATION ERROR: Image {idx+1} is invalid: {url}")
             raise ValueError(f"Image {idx+1} is invalid: {url}")
         if url.startswith("http://localhost") or url.startswith("http://127.0.0.1"):
-            print(f"❌ INPUT VALIDATION ERROR: Image {idx+1} is a local URL")
+            logger.error(f"❌ INPUT VALIDATION ERROR: Image {idx+1} is a local URL")
             raise ValueError(f"Image {idx+1} is a local URL that Replicate cannot access: {url[:100]}")
         if "/static/" in url and "cloudinary" not in url and "replicate.delivery" not in url:
-            print(f"❌ INPUT VALIDATION ERROR: Image {idx+1} appears to be a local static file")
+            logger.error(f"❌ INPUT VALIDATION ERROR: Image {idx+1} appears to be a local static file")
             raise ValueError(f"Image {idx+1} appears to be a local static file: {url[:100]}")
     
     for attempt in range(MAX_RETRIES):
         try:
-            print(f"\n🍌 PRO Running nano-banana-pro (attempt {attempt + 1}/{MAX_RETRIES})...")
-            print(f"📝 Prompt: {prompt[:150]}...")
+            logger.info(f"🍌 PRO Running nano-banana-pro (attempt {attempt + 1}/{MAX_RETRIES})...")
+            logger.info(f"📝 Prompt: {prompt[:150]}...")
             if negative_prompt:
-                print(f"🚫 Negative prompt: {negative_prompt[:100]}...")
-            print(f"🖼️ Input images: {len(image_urls)}")
+                logger.info(f"🚫 Negative prompt: {negative_prompt[:100]}...")
+            logger.info(f"🖼️ Input images: {len(image_urls)}")
             for idx, url in enumerate(image_urls):
-                print(f"   Image {idx+1}: {url[:80]}...")
-            print(f"⚙️ Parameters: strength={strength}, guidance={guidance_scale}, steps={num_steps}")
+                step_logger.info(f"Image {idx+1}: {url[:80]}...")
+            logger.info(f"⚙️ Parameters: strength={strength}, guidance={guidance_scale}, steps={num_steps}")
             
             # Build input dict
             input_dict = {
@@ -5569,8 +5817,8 @@ def run_nano_banana_pro(prompt: str, image_urls: list, strength: float = 0.50, g
             if negative_prompt:
                 input_dict["negative_prompt"] = negative_prompt
             
-            print(f"🔄 Calling Replicate API...")
-            out = replicate.run("google/nano-banana-pro", input=input_dict)
+            logger.info(f"🔄 Calling Replicate API...")
+            out = replicate_run("google/nano-banana-pro", input=input_dict)
             
             # Handle output
             if hasattr(out, 'url'):
@@ -5582,12 +5830,12 @@ def run_nano_banana_pro(prompt: str, image_urls: list, strength: float = 0.50, g
             else:
                 result_url = str(out)
             
-            print(f"✅ Nano-banana PRO completed: {result_url[:80]}...")
+            logger.info(f"✅ Nano-banana PRO completed: {result_url[:80]}...")
             return result_url
             
         except Exception as e:
             error_msg = str(e).lower()
-            print(f"❌ Attempt {attempt + 1}/{MAX_RETRIES} failed: {type(e).__name__}: {e}")
+            logger.error(f"❌ Attempt {attempt + 1}/{MAX_RETRIES} failed: {type(e).__name__}: {e}")
             
             # Check if it's a queue/timeout error (worth retrying)
             is_retryable = any(keyword in error_msg for keyword in [
@@ -5597,17 +5845,16 @@ def run_nano_banana_pro(prompt: str, image_urls: list, strength: float = 0.50, g
             
             if is_retryable and attempt < MAX_RETRIES - 1:
                 wait_time = RETRY_DELAY * (attempt + 1)  # Exponential backoff
-                print(f"⏳ Replicate queue/timeout issue detected. Waiting {wait_time}s before retry...")
+                logger.info(f"⏳ Replicate queue/timeout issue detected. Waiting {wait_time}s before retry...")
                 time.sleep(wait_time)
                 continue
             
             # Last attempt failed - try fallback
             if attempt == MAX_RETRIES - 1:
-                print(f"❌ All {MAX_RETRIES} attempts failed for nano-banana-pro")
-                print(f"🔄 Attempting fallback to standard nano-banana...")
+                logger.error(f"❌ All {MAX_RETRIES} attempts failed for nano-banana-pro")
+                logger.info(f"🔄 Attempting fallback to standard nano-banana...")
         try:
-            import replicate
-            out = replicate.run("google/nano-banana", input={
+            out = replicate_run("google/nano-banana", input={
                 "prompt": prompt,
                 "image_input": image_urls,
                 "num_inference_steps": num_steps,
@@ -5617,30 +5864,28 @@ def run_nano_banana_pro(prompt: str, image_urls: list, strength: float = 0.50, g
             })
             if hasattr(out, 'url'):
                 result = out.url()
-                print(f"✅ Fallback succeeded: {result[:80]}...")
+                logger.info(f"✅ Fallback succeeded: {result[:80]}...")
                 return result
             elif isinstance(out, str):
-                print(f"✅ Fallback succeeded: {out[:80]}...")
+                logger.info(f"✅ Fallback succeeded: {out[:80]}...")
                 return out
             elif isinstance(out, list) and len(out) > 0:
                 result = out[0] if isinstance(out[0], str) else out[0].url()
-                print(f"✅ Fallback succeeded: {result[:80]}...")
+                logger.info(f"✅ Fallback succeeded: {result[:80]}...")
                 return result
             return str(out)
         except Exception as fallback_error:
-            print(f"❌ FALLBACK ALSO FAILED: {type(fallback_error).__name__}: {fallback_error}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"❌ FALLBACK ALSO FAILED: {type(fallback_error).__name__}: {fallback_error}")
             # Return first image as last resort
-            print(f"⚠️ Returning original image as last resort")
+            logger.warning(f"⚠️ Returning original image as last resort")
             return image_urls[0] if image_urls else ""
 
 def replace_manikin_with_person(manikin_pose_url: str, person_wearing_product_url: str) -> str:
     """Replace manikin in pose image with person wearing product using nano-banana pro"""
     try:
-        print(f"🍌 Replacing manikin with person using nano-banana...")
-        print(f"🦴 Manikin pose: {manikin_pose_url[:50]}...")
-        print(f"👤 Person wearing product: {person_wearing_product_url[:50]}...")
+        logger.info(f"🍌 Replacing manikin with person using nano-banana...")
+        logger.info(f"🦴 Manikin pose: {manikin_pose_url[:50]}...")
+        logger.info(f"👤 Person wearing product: {person_wearing_product_url[:50]}...")
         
         # Ensure URLs are accessible (convert local paths to Cloudinary if needed)
         if person_wearing_product_url.startswith(get_base_url() + "/static/"):
@@ -5659,13 +5904,13 @@ def replace_manikin_with_person(manikin_pose_url: str, person_wearing_product_ur
                     person_wearing_product_url = upload_to_cloudinary(data_url, "person_wearing_product")
             else:
                 # If file doesn't exist locally, try to use the URL directly
-                print(f"⚠️ File not found locally: {static_path} or {uploads_path}, using URL directly")
+                logger.warning(f"⚠️ File not found locally: {static_path} or {uploads_path}, using URL directly")
         
         # If manikin pose URL is a localhost/static URL, try to convert to Cloudinary
         # But first check if it's already a Cloudinary URL (from POSE_IMAGE_URLS)
         if manikin_pose_url.startswith("https://res.cloudinary.com/"):
             # Already a Cloudinary URL, use it directly
-            print(f"✅ Using Cloudinary URL for manikin pose")
+            logger.info(f"✅ Using Cloudinary URL for manikin pose")
         elif manikin_pose_url.startswith(get_base_url() + "/static/") or manikin_pose_url.startswith("http://localhost"):
             # This is a localhost URL - we need to convert it to Cloudinary
             filename = manikin_pose_url.replace(get_base_url() + "/static/", "").replace("http://localhost:8000/static/", "")
@@ -5673,58 +5918,14 @@ def replace_manikin_with_person(manikin_pose_url: str, person_wearing_product_ur
             if filename.startswith("poses/"):
                 filename = filename.replace("poses/", "")
             
-            # First check POSE_IMAGE_URLS for Cloudinary URL
-            if filename in POSE_IMAGE_URLS:
-                cached_url = POSE_IMAGE_URLS[filename]
-                if cached_url and cached_url.startswith("https://res.cloudinary.com/"):
-                    manikin_pose_url = cached_url
-                    print(f"✅ Using Cloudinary URL from cache: {manikin_pose_url[:80]}...")
-                else:
-                    # Cache has localhost URL or None, need to upload
-                    print(f"⚠️ Cache has localhost URL or None, uploading to Cloudinary...")
-                    # Try to find file locally
-                    api_dir = os.path.dirname(os.path.abspath(__file__))
-                    static_path = os.path.join(api_dir, "static", "poses", filename)
-                    uploads_path = os.path.join(api_dir, "uploads", "poses", filename)
-                    filepath = static_path if os.path.exists(static_path) else (uploads_path if os.path.exists(uploads_path) else None)
-                    if filepath and os.path.exists(filepath):
-                        # Read file and upload to Cloudinary
-                        import base64
-                        with open(filepath, "rb") as f:
-                            file_content = f.read()
-                            ext = filename.split('.')[-1] if '.' in filename else 'jpg'
-                            data_url = f"data:image/{ext};base64,{base64.b64encode(file_content).decode()}"
-                            manikin_pose_url = upload_to_cloudinary(data_url, "manikin_pose")
-                            # Update cache
-                            POSE_IMAGE_URLS[filename] = manikin_pose_url
-                            print(f"✅ Uploaded manikin pose to Cloudinary: {manikin_pose_url[:80]}...")
-                    else:
-                        # File not found - this will fail, but at least we tried
-                        print(f"❌ CRITICAL: Pose file not found locally: {filename}")
-                        print(f"❌ Cannot upload to Cloudinary - manikin replacement will fail")
-                        raise FileNotFoundError(f"Pose file not found: {filename}")
-            else:
-                # Not in cache, try to find and upload
-                api_dir = os.path.dirname(os.path.abspath(__file__))
-                static_path = os.path.join(api_dir, "static", "poses", filename)
-                uploads_path = os.path.join(api_dir, "uploads", "poses", filename)
-                filepath = static_path if os.path.exists(static_path) else (uploads_path if os.path.exists(uploads_path) else None)
-                if filepath and os.path.exists(filepath):
-                    # Read file and upload to Cloudinary
-                    import base64
-                    with open(filepath, "rb") as f:
-                        file_content = f.read()
-                        ext = filename.split('.')[-1] if '.' in filename else 'jpg'
-                        data_url = f"data:image/{ext};base64,{base64.b64encode(file_content).decode()}"
-                        manikin_pose_url = upload_to_cloudinary(data_url, "manikin_pose")
-                        # Update cache
-                        POSE_IMAGE_URLS[filename] = manikin_pose_url
-                        print(f"✅ Uploaded manikin pose to Cloudinary: {manikin_pose_url[:80]}...")
-                else:
-                    # File not found - this will fail
-                    print(f"❌ CRITICAL: Pose file not found locally: {filename}")
-                    print(f"❌ Cannot upload to Cloudinary - manikin replacement will fail")
-                    raise FileNotFoundError(f"Pose file not found: {filename}")
+            # Resolve through the pose manifest (uploads once on a miss)
+            try:
+                manikin_pose_url = get_pose_image_url(filename)
+                logger.info(f"✅ Using Cloudinary URL for manikin pose: {manikin_pose_url[:80]}...")
+            except FileNotFoundError:
+                logger.error(f"❌ CRITICAL: Pose file not found locally: {filename}")
+                logger.error(f"❌ Cannot upload to Cloudinary - manikin replacement will fail")
+                raise
         
         # Use nano-banana to modify person's pose without overlay
         # Person first = what to modify, Manikin second = pose to copy
@@ -5741,9 +5942,9 @@ def replace_manikin_with_person(manikin_pose_url: str, person_wearing_product_ur
         
         negative_prompt = "wooden legs, mannequin legs, wooden body, artificial limbs, doll legs, plastic body, mannequin appearance, wooden texture, artificial skin, doll appearance, puppet legs, stiff pose, rigid pose, unnatural stance"
         
-        print(f"📝 In-place pose change prompt: {prompt[:150]}...")
-        print(f"🚫 Negative prompt: {negative_prompt[:100]}...")
-        print(f"🖼️ Image order: [person_wearing_product (base to modify), manikin_pose (pose reference)]")
+        logger.info(f"📝 In-place pose change prompt: {prompt[:150]}...")
+        logger.info(f"🚫 Negative prompt: {negative_prompt[:100]}...")
+        logger.info(f"🖼️ Image order: [person_wearing_product (base to modify), manikin_pose (pose reference)]")
         
         # SWAP BACK: Person first (base to modify), manikin second (pose to reference)
         # Flux 2 Pro with input_images for pose reference
@@ -5758,17 +5959,15 @@ def replace_manikin_with_person(manikin_pose_url: str, person_wearing_product_ur
         # Upload to Cloudinary for stability
         if result_url and result_url != person_wearing_product_url:
             stable_url = upload_to_cloudinary(result_url, "manikin_replacement")
-            print(f"✅ Manikin replaced successfully: {stable_url[:80]}...")
+            logger.info(f"✅ Manikin replaced successfully: {stable_url[:80]}...")
             return stable_url
         else:
-            print(f"⚠️ Manikin replacement returned None or same image, using person wearing product")
-            print(f"⚠️ Result URL: {result_url[:80] if result_url else 'None'}...")
+            logger.warning(f"⚠️ Manikin replacement returned None or same image, using person wearing product")
+            logger.warning(f"⚠️ Result URL: {result_url[:80] if result_url else 'None'}...")
             return person_wearing_product_url
             
     except Exception as e:
-        print(f"❌ Manikin replacement failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Manikin replacement failed: {e}")
         # Fallback to person wearing product
         return person_wearing_product_url
 
@@ -5777,19 +5976,17 @@ def add_product_to_image(current_image_url: str, product_image_url: str, product
     try:
         # Trim whitespace from product name to avoid Cloudinary folder issues
         product_name = product_name.strip()
-        print(f"\n{'='*80}")
-        print(f"👕 ADDING PRODUCT: {product_name} ({product_type})")
-        print(f"{'='*80}")
-        print(f"🖼️ Current image: {current_image_url[:100]}...")
-        print(f"🧵 Product to add: {product_image_url[:100]}...")
-        print(f"📦 Product type: {product_type}")
+        logger.info(f"👕 ADDING PRODUCT: {product_name} ({product_type})")
+        logger.info(f"🖼️ Current image: {current_image_url[:100]}...")
+        logger.info(f"🧵 Product to add: {product_image_url[:100]}...")
+        logger.info(f"📦 Product type: {product_type}")
         
         # Ensure URLs are accessible (convert local paths to Cloudinary if needed)
         # Handle current image URL
         if current_image_url.startswith(get_base_url() + "/static/") or \
            (current_image_url.startswith("http://localhost") and "/static/" in current_image_url) or \
            (current_image_url.startswith("http://127.0.0.1") and "/static/" in current_image_url):
-            print(f"🔄 Converting local current image URL to Cloudinary...")
+            logger.info(f"🔄 Converting local current image URL to Cloudinary...")
             if "/static/" in current_image_url:
                 filename = current_image_url.split("/static/")[-1]
             else:
@@ -5813,22 +6010,22 @@ def add_product_to_image(current_image_url: str, product_image_url: str, product
                     ext = filename.split('.')[-1] if '.' in filename else 'jpg'
                     data_url = f"data:image/{ext};base64,{base64.b64encode(file_content).decode()}"
                     current_image_url = upload_to_cloudinary(data_url, "current_image")
-                    print(f"✅ Uploaded current image to Cloudinary: {current_image_url[:80]}...")
+                    logger.info(f"✅ Uploaded current image to Cloudinary: {current_image_url[:80]}...")
             else:
-                print(f"❌ Could not find local file: {filename}")
+                logger.error(f"❌ Could not find local file: {filename}")
                 raise ValueError(f"Current image file not found: {filename}")
         
         # Handle product image URL
         if product_image_url.startswith(get_base_url() + "/static/") or \
            (product_image_url.startswith("http://localhost") and "/static/" in product_image_url) or \
            (product_image_url.startswith("http://127.0.0.1") and "/static/" in product_image_url):
-            print(f"🔄 Converting local product image URL to Cloudinary...")
+            logger.info(f"🔄 Converting local product image URL to Cloudinary...")
             if "/static/" in product_image_url:
                 filename = product_image_url.split("/static/")[-1]
             else:
                 filename = product_image_url.split("/")[-1]
             
-            print(f"📁 Looking for file: {filename}")
+            logger.info(f"📁 Looking for file: {filename}")
             
             # Try multiple possible paths
             api_dir = os.path.dirname(os.path.abspath(__file__))
@@ -5842,25 +6039,25 @@ def add_product_to_image(current_image_url: str, product_image_url: str, product
                 f"temp/{filename}"
             ]
             
-            print(f"🔍 Searching in {len(possible_paths)} locations:")
+            logger.info(f"🔍 Searching in {len(possible_paths)} locations:")
             for path in possible_paths:
                 exists = os.path.exists(path)
-                print(f"   {'✅' if exists else '❌'} {path}")
+                step_logger.info(f"{'✅' if exists else '❌'} {path}")
             
             filepath = next((p for p in possible_paths if os.path.exists(p)), None)
             if filepath:
-                print(f"✅ Found file at: {filepath}")
+                logger.info(f"✅ Found file at: {filepath}")
                 import base64
                 with open(filepath, "rb") as f:
                     file_content = f.read()
                     ext = filename.split('.')[-1] if '.' in filename else 'jpg'
                     data_url = f"data:image/{ext};base64,{base64.b64encode(file_content).decode()}"
                     product_image_url = upload_to_cloudinary(data_url, "additional_product")
-                    print(f"✅ Uploaded product image to Cloudinary: {product_image_url[:80]}...")
+                    logger.info(f"✅ Uploaded product image to Cloudinary: {product_image_url[:80]}...")
             else:
-                print(f"❌ Could not find local file: {filename}")
-                print(f"⚠️ Product URL in database is local but file doesn't exist")
-                print(f"⚠️ This product's packshot may not have been uploaded to Cloudinary properly")
+                logger.error(f"❌ Could not find local file: {filename}")
+                logger.warning(f"⚠️ Product URL in database is local but file doesn't exist")
+                logger.warning(f"⚠️ This product's packshot may not have been uploaded to Cloudinary properly")
                 raise ValueError(f"Product image file not found: {filename}. The packshot_front_url in the database is a local URL but the file doesn't exist on disk. This product needs to be re-uploaded or its packshot regenerated.")
         
         # Create prompt for adding the garment
@@ -5894,8 +6091,8 @@ def add_product_to_image(current_image_url: str, product_image_url: str, product
                 f"Professional fashion photography with natural styling."
             )
         
-        print(f"📝 Add product prompt: {prompt[:200]}...")
-        print(f"🎯 Calling Flux 2 Pro to add {product_name}...")
+        logger.info(f"📝 Add product prompt: {prompt[:200]}...")
+        logger.info(f"🎯 Calling Flux 2 Pro to add {product_name}...")
         
         # Use Flux 2 Pro to add the product
         try:
@@ -5909,45 +6106,40 @@ def add_product_to_image(current_image_url: str, product_image_url: str, product
             
             # Upload to Cloudinary for stability
             if result_url and result_url != current_image_url:
-                print(f"✅ Flux 2 Pro returned new image, uploading to Cloudinary...")
+                logger.info(f"✅ Flux 2 Pro returned new image, uploading to Cloudinary...")
                 stable_url = upload_to_cloudinary(result_url, f"with_{product_name}")
-                print(f"✅ SUCCESS: Added {product_name} successfully!")
-                print(f"   Result URL: {stable_url[:100]}...")
-                print(f"{'='*80}\n")
+                logger.info(f"✅ SUCCESS: Added {product_name} successfully!")
+                step_logger.info(f"Result URL: {stable_url[:100]}...")
                 return stable_url
             else:
-                print(f"⚠️ WARNING: Product addition returned same image")
-                print(f"   This means Flux 2 Pro didn't modify the image")
-                print(f"   Returning current image without {product_name}")
-                print(f"{'='*80}\n")
+                logger.warning(f"⚠️ WARNING: Product addition returned same image")
+                step_logger.info(f"This means Flux 2 Pro didn't modify the image")
+                step_logger.info(f"Returning current image without {product_name}")
                 return current_image_url
                 
         except ValueError as ve:
             # Input validation error - this is critical
-            print(f"❌ CRITICAL ERROR: Invalid input for Flux 2 Pro")
-            print(f"   Error: {ve}")
-            print(f"   Cannot add {product_name} - returning current image")
-            print(f"{'='*80}\n")
+            logger.error(f"❌ CRITICAL ERROR: Invalid input for Flux 2 Pro")
+            logger.error(f"Error: {ve}")
+            step_logger.info(f"Cannot add {product_name} - returning current image")
             raise  # Re-raise to stop the workflow
     
     except Exception as e:
-        print(f"❌ FAILED TO ADD {product_name}")
-        print(f"   Error type: {type(e).__name__}")
-        print(f"   Error message: {e}")
-        print(f"   Current image: {current_image_url[:100]}")
-        print(f"   Product image: {product_image_url[:100]}")
-        import traceback
-        traceback.print_exc()
-        print(f"⚠️ Returning current image without {product_name}")
-        print(f"{'='*80}\n")
+        logger.error(f"❌ FAILED TO ADD {product_name}")
+        logger.error(f"Error type: {type(e).__name__}")
+        logger.error(f"Error message: {e}")
+        step_logger.info(f"Current image: {current_image_url[:100]}")
+        step_logger.info(f"Product image: {product_image_url[:100]}")
+        logger.exception("Unexpected error")
+        logger.warning(f"⚠️ Returning current image without {product_name}")
         # Fallback to current image
         return current_image_url
 
 def run_qwen_triple_composition(model_image_url: str, product_image_url: str, scene_image_url: str, product_name: str, quality_mode: str = "standard", shot_type_prompt: str = None, clothing_type: str = None) -> str:
     """SINGLE-STEP: Person + Scene + Clothing all at once with Nano-banana PRO"""
     try:
-        print(f"🍌 Running SINGLE-STEP Nano-banana composition")
-        print(f"   All 3 elements in ONE call: Person + Scene + Clothing")
+        logger.info(f"🍌 Running SINGLE-STEP Nano-banana composition")
+        step_logger.info(f"All 3 elements in ONE call: Person + Scene + Clothing")
         
         # Use clothing_type if provided, otherwise fallback to product_name
         garment_description = clothing_type if clothing_type else product_name
@@ -5986,12 +6178,12 @@ def run_qwen_triple_composition(model_image_url: str, product_image_url: str, sc
             "changed skin tone, added tattoos, wrong background, white background"
         )
         
-        print(f"📸 Single-step composition:")
-        print(f"   🧑 IMAGE 1 (Person): {model_image_url[:60]}...")
-        print(f"   🌄 IMAGE 2 (Scene): {scene_image_url[:60]}...")
-        print(f"   👕 IMAGE 3 (Clothing): {product_image_url[:60]}...")
-        print(f"📝 Prompt: {prompt[:150]}...")
-        print(f"🚫 Negative: {negative_prompt[:100]}...")
+        logger.info(f"📸 Single-step composition:")
+        step_logger.info(f"🧑 IMAGE 1 (Person): {model_image_url[:60]}...")
+        step_logger.info(f"🌄 IMAGE 2 (Scene): {scene_image_url[:60]}...")
+        step_logger.info(f"👕 IMAGE 3 (Clothing): {product_image_url[:60]}...")
+        logger.info(f"📝 Prompt: {prompt[:150]}...")
+        logger.info(f"🚫 Negative: {negative_prompt[:100]}...")
         
         try:
             # Call Flux 2 Pro with all 3 images (supports up to 8 reference images)
@@ -6005,21 +6197,19 @@ def run_qwen_triple_composition(model_image_url: str, product_image_url: str, sc
             
             # Upload to Cloudinary for stability
             stable_url = upload_to_cloudinary(result_url, "campaign_image")
-            print(f"✅ Single-step composition complete: {stable_url[:80]}...")
+            logger.info(f"✅ Single-step composition complete: {stable_url[:80]}...")
             return stable_url
             
         except Exception as e:
-            print(f"❌ Flux 2 Pro composition failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"❌ Flux 2 Pro composition failed: {e}")
             if DISABLE_PLACEHOLDERS:
                 return model_image_url
             return f"https://picsum.photos/800/600?random={hash(model_image_url) % 10000}"
             
     except Exception as e:
-        print(f"❌ Single-step composition failed: {e}")
+        logger.error(f"❌ Single-step composition failed: {e}")
         if DISABLE_PLACEHOLDERS:
-            print("↩️ Returning model image instead of placeholder")
+            logger.info("↩️ Returning model image instead of placeholder")
             return model_image_url
         fallback_url = f"https://picsum.photos/800/600?random={hash(model_image_url) % 10000}"
         return fallback_url
@@ -6081,7 +6271,7 @@ CAMPAIGN_SHOT_TYPES = [
 def run_nano_banana_scene_composition(model_image_url: str, scene_image_url: str, quality_mode: str = "standard", shot_type_prompt: str = None) -> str:
     """Compose model pose into scene using Nano Banana"""
     try:
-        print(f"🍌 Running Nano Banana composition: model={model_image_url[:50]}..., scene={scene_image_url[:50]}...")
+        logger.info(f"🍌 Running Nano Banana composition: model={model_image_url[:50]}..., scene={scene_image_url[:50]}...")
         
         # Stabilize ephemeral replicate.delivery inputs by persisting locally first
         if isinstance(model_image_url, str) and model_image_url.startswith("https://replicate.delivery/"):
@@ -6137,24 +6327,24 @@ def run_nano_banana_scene_composition(model_image_url: str, scene_image_url: str
             num_steps = 15        # Conservative steps for reliability
             guidance = 2.5        # Conservative guidance
             strength = 0.15       # Conservative strength
-            print("🎨 Using HIGH QUALITY mode (reliable scene composition)")
+            logger.info("🎨 Using HIGH QUALITY mode (reliable scene composition)")
         else:  # standard
             num_steps = 12        # Conservative steps for reliability
             guidance = 2.0        # Conservative guidance
             strength = 0.12       # Conservative strength
-            print("⚡ Using STANDARD mode (reliable scene composition)")
+            logger.info("⚡ Using STANDARD mode (reliable scene composition)")
 
         # Special handling for Sitting Shot: minimal boost
         if shot_type_prompt and ("sitting" in shot_type_prompt.lower()):
             num_steps = max(num_steps, 15)  # Minimal increase
             guidance = max(guidance, 2.5)   # Minimal increase
             strength = max(strength, 0.15)  # Minimal increase
-            print("🪑 Sitting Shot detected → minimal boost for reliability")
+            logger.info("🪑 Sitting Shot detected → minimal boost for reliability")
         
         # Use Nano Banana for scene composition
         try:
-            print("🔄 Using Nano Banana for scene composition with improved parameters...")
-            out = replicate.run("google/nano-banana", input={
+            logger.info("🔄 Using Nano Banana for scene composition with improved parameters...")
+            out = replicate_run("google/nano-banana", input={
                 "prompt": scene_prompt,
                 "image_input": [model_image_url, scene_image_url],
                 "num_inference_steps": num_steps,
@@ -6173,26 +6363,26 @@ def run_nano_banana_scene_composition(model_image_url: str, scene_image_url: str
             else:
                 scene_composite_url = str(out)
             
-            print(f"✅ Nano Banana scene composition completed: {scene_composite_url[:50]}...")
+            logger.info(f"✅ Nano Banana scene composition completed: {scene_composite_url[:50]}...")
             
             # Immediately persist Replicate URLs to avoid 404 errors
             if isinstance(scene_composite_url, str) and scene_composite_url.startswith("https://replicate.delivery/"):
                 try:
                     scene_composite_url = upload_to_cloudinary(scene_composite_url, "nano_scene_composite")
-                    print(f"✅ Persisted Nano Banana result: {scene_composite_url[:50]}...")
+                    logger.info(f"✅ Persisted Nano Banana result: {scene_composite_url[:50]}...")
                 except Exception as e:
-                    print(f"⚠️ Failed to persist Nano Banana result: {e}")
+                    logger.warning(f"⚠️ Failed to persist Nano Banana result: {e}")
             
             return scene_composite_url
             
         except Exception as e:
-            print(f"⚠️ Nano Banana scene composition failed, retrying with safer params: {e}")
-            print(f"🔍 DEBUG: Model URL: {model_image_url[:100]}...")
-            print(f"🔍 DEBUG: Scene URL: {scene_image_url[:100]}...")
-            print(f"🔍 DEBUG: Prompt: {scene_prompt[:200]}...")
+            logger.warning(f"⚠️ Nano Banana scene composition failed, retrying with safer params: {e}")
+            logger.debug(f"🔍 DEBUG: Model URL: {model_image_url[:100]}...")
+            logger.debug(f"🔍 DEBUG: Scene URL: {scene_image_url[:100]}...")
+            logger.debug(f"🔍 DEBUG: Prompt: {scene_prompt[:200]}...")
             try:
                 # Even more conservative retry parameters
-                safer_out = replicate.run("google/nano-banana", input={
+                safer_out = replicate_run("google/nano-banana", input={
                     "prompt": "Place the person from the first image into the background from the second image. Keep the person's appearance the same.",
                     "image_input": [model_image_url, scene_image_url],
                     "num_inference_steps": 6,
@@ -6208,36 +6398,36 @@ def run_nano_banana_scene_composition(model_image_url: str, scene_image_url: str
                     scene_composite_url = safer_out[0] if isinstance(safer_out[0], str) else safer_out[0].url()
                 else:
                     scene_composite_url = str(safer_out)
-                print(f"✅ Nano Banana retry succeeded: {scene_composite_url[:50]}...")
+                logger.info(f"✅ Nano Banana retry succeeded: {scene_composite_url[:50]}...")
                 
                 # Immediately persist Replicate URLs to avoid 404 errors
                 if isinstance(scene_composite_url, str) and scene_composite_url.startswith("https://replicate.delivery/"):
                     try:
                         scene_composite_url = upload_to_cloudinary(scene_composite_url, "nano_scene_composite_retry")
-                        print(f"✅ Persisted Nano Banana retry result: {scene_composite_url[:50]}...")
+                        logger.info(f"✅ Persisted Nano Banana retry result: {scene_composite_url[:50]}...")
                     except Exception as e:
-                        print(f"⚠️ Failed to persist Nano Banana retry result: {e}")
+                        logger.warning(f"⚠️ Failed to persist Nano Banana retry result: {e}")
                 
                 return scene_composite_url
             except Exception as e2:
-                print(f"❌ Nano Banana retry failed: {e2}")
-                print(f"🔍 DEBUG: Retry failed with model URL: {model_image_url[:100]}...")
-                print(f"🔍 DEBUG: Retry failed with scene URL: {scene_image_url[:100]}...")
+                logger.error(f"❌ Nano Banana retry failed: {e2}")
+                logger.debug(f"🔍 DEBUG: Retry failed with model URL: {model_image_url[:100]}...")
+                logger.debug(f"🔍 DEBUG: Retry failed with scene URL: {scene_image_url[:100]}...")
                 if DISABLE_PLACEHOLDERS:
-                    print("↩️ Returning model image instead of placeholder")
+                    logger.info("↩️ Returning model image instead of placeholder")
                     return model_image_url
                 fallback_url = f"https://picsum.photos/800/600?random={hash(model_image_url + scene_image_url) % 10000}"
-                print(f"Using scene composition fallback URL: {fallback_url}")
+                logger.info(f"Using scene composition fallback URL: {fallback_url}")
                 return fallback_url
         
     except Exception as e:
-        print(f"❌ Scene composition generation failed: {e}")
+        logger.error(f"❌ Scene composition generation failed: {e}")
         if DISABLE_PLACEHOLDERS:
-            print("↩️ Returning model image instead of placeholder")
+            logger.info("↩️ Returning model image instead of placeholder")
             return model_image_url
         # Fallback to a placeholder (disabled by flag)
         fallback_url = f"https://picsum.photos/800/600?random={hash(model_image_url + scene_image_url) % 10000}"
-        print(f"Using scene composition fallback URL: {fallback_url}")
+        logger.info(f"Using scene composition fallback URL: {fallback_url}")
         return fallback_url
 
 def run_qwen_packshot_front_back(
@@ -6247,14 +6437,14 @@ def run_qwen_packshot_front_back(
 ) -> List[str]:
     """Generate front and back packshots using Qwen"""
     try:
-        print("Processing product image for front and back packshots...")
+        logger.info("Processing product image for front and back packshots...")
         
         # Step 1: Ensure we have a public Cloudinary URL for Replicate (NOT local file paths)
-        print(f"🔄 Processing product_image_url: {product_image_url[:100] if len(product_image_url) > 100 else product_image_url}...")
+        logger.info(f"🔄 Processing product_image_url: {product_image_url[:100] if len(product_image_url) > 100 else product_image_url}...")
         
         if product_image_url.startswith("data:image/"):
             product_png_url = upload_to_cloudinary(product_image_url, "product_temp")
-            print(f"✅ Converted data URL to Cloudinary: {product_png_url[:100]}...")
+            logger.info(f"✅ Converted data URL to Cloudinary: {product_png_url[:100]}...")
         elif product_image_url.startswith(get_base_url() + "/static/"):
             filename = product_image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
@@ -6265,45 +6455,45 @@ def run_qwen_packshot_front_back(
                 ext = filename.split('.')[-1] if '.' in filename else 'jpg'
                 data_url = f"data:image/{ext};base64,{base64.b64encode(file_content).decode()}"
                 product_png_url = upload_to_cloudinary(data_url, "product_temp")
-            print(f"✅ Converted static file to Cloudinary: {product_png_url[:100]}...")
+            logger.info(f"✅ Converted static file to Cloudinary: {product_png_url[:100]}...")
         elif product_image_url.startswith("http://localhost"):
             product_png_url = upload_to_cloudinary(product_image_url, "product_temp")
-            print(f"✅ Converted localhost URL to Cloudinary: {product_png_url[:100]}...")
+            logger.info(f"✅ Converted localhost URL to Cloudinary: {product_png_url[:100]}...")
         elif product_image_url.startswith("uploads/"):
             # Direct file path - read and upload to Cloudinary
-            print(f"⚠️ Got direct file path, uploading to Cloudinary...")
+            logger.warning(f"⚠️ Got direct file path, uploading to Cloudinary...")
             import base64
             with open(product_image_url, "rb") as f:
                 file_content = f.read()
                 ext = product_image_url.split('.')[-1] if '.' in product_image_url else 'jpg'
                 data_url = f"data:image/{ext};base64,{base64.b64encode(file_content).decode()}"
                 product_png_url = upload_to_cloudinary(data_url, "product_temp")
-            print(f"✅ Converted file path to Cloudinary: {product_png_url[:100]}...")
+            logger.info(f"✅ Converted file path to Cloudinary: {product_png_url[:100]}...")
         elif product_image_url.startswith("https://res.cloudinary.com/"):
             # Already a Cloudinary URL
             product_png_url = product_image_url
-            print(f"✅ Already a Cloudinary URL: {product_png_url[:100]}...")
+            logger.info(f"✅ Already a Cloudinary URL: {product_png_url[:100]}...")
         else:
             # Assume it's a public URL or upload to Cloudinary to be safe
             if not (product_image_url.startswith("http://") or product_image_url.startswith("https://")):
-                print(f"⚠️ Unknown URL format, attempting to upload to Cloudinary...")
+                logger.warning(f"⚠️ Unknown URL format, attempting to upload to Cloudinary...")
                 product_png_url = upload_to_cloudinary(product_image_url, "product_temp")
             else:
                 product_png_url = product_image_url
-                print(f"✅ Using URL: {product_png_url[:100]}...")
+                logger.info(f"✅ Using URL: {product_png_url[:100]}...")
 
         # Step 2: Simple extraction prompt - what Qwen is designed for
-        print("Generating front packshot...")
+        logger.info("Generating front packshot...")
         if clothing_type:
-            print(f"👕 Clothing type specified: {clothing_type}")
+            logger.info(f"👕 Clothing type specified: {clothing_type}")
             front_prompt = f"Extract the {clothing_type} from the image and create a professional packshot on white background. Keep the exact {clothing_type} design, colors, and details."
         else:
             front_prompt = f"Extract the product from the image and create a professional packshot on white background. Keep the exact product design, colors, and details."
         
         try:
-            print(f"🎨 Calling Qwen with URL: {product_png_url[:100]}...")
-            print(f"📝 Prompt: {front_prompt}")
-            front_out = replicate.run("qwen/qwen-image-edit-plus", input={
+            logger.info(f"🎨 Calling Qwen with URL: {product_png_url[:100]}...")
+            logger.info(f"📝 Prompt: {front_prompt}")
+            front_out = replicate_run("qwen/qwen-image-edit-plus", input={
                 "prompt": front_prompt,
                 "image": [product_png_url],
                 "num_inference_steps": 30,
@@ -6321,25 +6511,25 @@ def run_qwen_packshot_front_back(
             else:
                 front_url = str(front_out)
             
-            print(f"Generated front packshot URL: {front_url}")
+            logger.info(f"Generated front packshot URL: {front_url}")
             
             # Download and save locally
             front_url = upload_to_cloudinary(front_url, "packshot_front")
             
         except Exception as e:
-            print(f"Error generating front packshot: {e}")
+            logger.error(f"Error generating front packshot: {e}")
             front_url = product_image_url  # Fallback to original
 
         # Step 3: Generate back packshot
-        print("Generating back packshot...")
+        logger.info("Generating back packshot...")
         if clothing_type:
             back_prompt = f"Extract the {clothing_type} from the image and create a professional packshot showing the back view on white background. Match the exact {clothing_type} design, colors, and details."
         else:
             back_prompt = f"Extract the product from the image and create a professional packshot showing the back view on white background. Match the exact product design, colors, and details."
         
         try:
-            print(f"🎨 Calling Qwen for back packshot...")
-            back_out = replicate.run("qwen/qwen-image-edit-plus", input={
+            logger.info(f"🎨 Calling Qwen for back packshot...")
+            back_out = replicate_run("qwen/qwen-image-edit-plus", input={
                 "prompt": back_prompt,
                 "image": [product_png_url],
                 "num_inference_steps": 30,
@@ -6357,21 +6547,21 @@ def run_qwen_packshot_front_back(
             else:
                 back_url = str(back_out)
             
-            print(f"Generated back packshot URL: {back_url}")
+            logger.info(f"Generated back packshot URL: {back_url}")
             
             # Download and save locally
             back_url = upload_to_cloudinary(back_url, "packshot_back")
             
         except Exception as e:
-            print(f"Error generating back packshot: {e}")
+            logger.error(f"Error generating back packshot: {e}")
             back_url = product_image_url  # Fallback to original
 
         packshot_urls = [front_url, back_url]
-        print(f"Generated {len(packshot_urls)} packshot URLs: {packshot_urls}")
+        logger.info(f"Generated {len(packshot_urls)} packshot URLs: {packshot_urls}")
         return packshot_urls
         
     except Exception as e:
-        print(f"Qwen front/back packshot generation failed: {e}")
+        logger.error(f"Qwen front/back packshot generation failed: {e}")
         # Fallback to original image
         return [product_image_url, product_image_url]
 
@@ -6388,13 +6578,14 @@ async def upload_product(
     packshot_front_type: str = Form(""),
     packshot_back: UploadFile = File(None),
     packshot_back_type: str = Form(""),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Upload a product with automatic packshot generation"""
+    reservation_id = None
     try:
-        print(f"📦 Uploading product: {name}")
-        print(f"👕 Clothing type received: '{clothing_type}'")
+        logger.info(f"📦 Uploading product: {name}")
+        logger.info(f"👕 Clothing type received: '{clothing_type}'")
         # Save product image
         image_filename = f"product_{hash(name + str(datetime.now()))}.{product_image.filename.split('.')[-1]}"
         image_path = os.path.join("uploads", image_filename)
@@ -6404,13 +6595,13 @@ async def upload_product(
             f.write(content)
         
         # ALWAYS upload to Cloudinary - no local URLs allowed
-        print(f"📤 Uploading product image to Cloudinary...")
+        logger.info(f"📤 Uploading product image to Cloudinary...")
         try:
             ext = product_image.filename.split('.')[-1] if '.' in product_image.filename else 'jpg'
             image_url = upload_to_cloudinary(f"data:image/{ext};base64,{base64.b64encode(content).decode()}", "products")
-            print(f"✅ Product image uploaded: {image_url[:80]}...")
+            logger.info(f"✅ Product image uploaded: {image_url[:80]}...")
         except Exception as e:
-            print(f"❌ Failed to upload product image to Cloudinary: {e}")
+            logger.error(f"❌ Failed to upload product image to Cloudinary: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to upload product image to Cloudinary. Please check your Cloudinary configuration. Error: {str(e)}")
         
         # Initialize packshot URLs
@@ -6428,38 +6619,39 @@ async def upload_product(
         elif not packshot_front or not packshot_back:
             credits_needed = 5  # Only one needs generation
         
-        if credits_needed > 0 and (not user or user.credits < credits_needed):
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Insufficient credits. Need {credits_needed} credits for packshot generation."
-            )
+        # Hold the worst case now; only packshots that are actually generated get charged
+        if credits_needed > 0:
+            reservation = reserve_credits(db, current_user["user_id"], credits_needed, "packshots")
+            if reservation is None:
+                raise insufficient_credits_error(db, current_user["user_id"], credits_needed, "packshot generation")
+            reservation_id = reservation.id
         
         # Handle uploaded packshots - ALWAYS upload to Cloudinary
         if packshot_front:
-            print(f"📤 Uploading front packshot to Cloudinary...")
+            logger.info(f"📤 Uploading front packshot to Cloudinary...")
             content = await packshot_front.read()
             ext = packshot_front.filename.split('.')[-1] if '.' in packshot_front.filename else 'png'
             data_url = f"data:image/{ext};base64,{base64.b64encode(content).decode()}"
             packshot_front_url = upload_to_cloudinary(data_url, "packshot_front")
             packshots.append(packshot_front_url)
-            print(f"✅ Front packshot uploaded: {packshot_front_url[:80]}...")
+            logger.info(f"✅ Front packshot uploaded: {packshot_front_url[:80]}...")
         
         if packshot_back:
-            print(f"📤 Uploading back packshot to Cloudinary...")
+            logger.info(f"📤 Uploading back packshot to Cloudinary...")
             content = await packshot_back.read()
             ext = packshot_back.filename.split('.')[-1] if '.' in packshot_back.filename else 'png'
             data_url = f"data:image/{ext};base64,{base64.b64encode(content).decode()}"
             packshot_back_url = upload_to_cloudinary(data_url, "packshot_back")
             packshots.append(packshot_back_url)
-            print(f"✅ Back packshot uploaded: {packshot_back_url[:80]}...")
+            logger.info(f"✅ Back packshot uploaded: {packshot_back_url[:80]}...")
         
         # Generate missing packshots using Replicate
         if not packshot_front_url or not packshot_back_url:
-            print(f"Generating packshots for product: {name}")
+            logger.info(f"Generating packshots for product: {name}")
             if clothing_type:
-                print(f"👕 Clothing type received: {clothing_type}")
+                logger.info(f"👕 Clothing type received: {clothing_type}")
             else:
-                print("⚠️ WARNING: No clothing_type provided - packshot may include entire outfit")
+                logger.warning("⚠️ WARNING: No clothing_type provided - packshot may include entire outfit")
             user_mods = "preserve exact design and colors from source image, professional product photography, clean background, studio lighting"
             generated_packshots = run_qwen_packshot_front_back(
                 product_image_url=image_url,
@@ -6474,32 +6666,24 @@ async def upload_product(
             if not packshot_back_url and len(generated_packshots) > 1:
                 credits_needed += 5
             
-            # Check if user has enough credits
-            total_available = (user.subscription_credits or 0) + user.credits
-            if total_available < credits_needed:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Insufficient credits. You have {total_available} total credits ({user.subscription_credits or 0} subscription + {user.credits} purchased), but need {credits_needed} for packshot generation."
-            )
-            
             if not packshot_front_url and len(generated_packshots) > 0:
                 # Download and save immediately to avoid ephemeral URL expiration
                 ephemeral_url = generated_packshots[0]
                 packshot_front_url = upload_to_cloudinary(ephemeral_url, "packshot_front")
                 packshots.append(packshot_front_url)
-                print(f"Generated and saved front packshot: {packshot_front_url}")
+                logger.info(f"Generated and saved front packshot: {packshot_front_url}")
             
             if not packshot_back_url and len(generated_packshots) > 1:
                 # Download and save immediately to avoid ephemeral URL expiration
                 ephemeral_url = generated_packshots[1]
                 packshot_back_url = upload_to_cloudinary(ephemeral_url, "packshot_back")
                 packshots.append(packshot_back_url)
-                print(f"Generated and saved back packshot: {packshot_back_url}")
+                logger.info(f"Generated and saved back packshot: {packshot_back_url}")
             
-            # Deduct credits (prioritizing subscription credits) - once for all packshots
-            if credits_needed > 0:
-                if not deduct_credits(user, credits_needed, db):
-                    raise HTTPException(status_code=400, detail="Failed to deduct credits")
+            # Spend the reserved credits for the packshots that were generated
+            if credits_needed > 0 and reservation_id:
+                commit_credits(db, reservation_id, credits_needed)
+                attribute_credits(packshots, credits_needed)
         
         # Create product in database
         product = Product(
@@ -6538,8 +6722,11 @@ async def upload_product(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error uploading product: {e}")
+        logger.error(f"Error uploading product: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if reservation_id:
+            close_reservation(db, reservation_id)
 
 # ---------- Product Categories Endpoint ----------
 @app.get("/categories")
@@ -6583,10 +6770,11 @@ async def get_products_categories():
 @app.post("/products/{product_id}/reroll-packshots")
 async def reroll_packshots(
     product_id: str,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Re-generate packshots for a product"""
+    reservation_id = None
     try:
         # Find product
         product = db.query(Product).filter(
@@ -6603,15 +6791,13 @@ async def reroll_packshots(
             raise HTTPException(status_code=404, detail="User not found")
         
         credits_needed = 10
-        total_available = (user.subscription_credits or 0) + user.credits
-        if total_available < credits_needed:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient credits. You have {total_available} total credits ({user.subscription_credits or 0} subscription + {user.credits} purchased), but need {credits_needed} for packshot regeneration."
-            )
+        reservation = reserve_credits(db, user.id, credits_needed, "packshot_reroll")
+        if reservation is None:
+            raise insufficient_credits_error(db, user.id, credits_needed, "packshot regeneration")
+        reservation_id = reservation.id
         
         # Generate new packshots
-        print(f"Re-generating packshots for product: {product.name}")
+        logger.info(f"Re-generating packshots for product: {product.name}")
         clothing_type = product.clothing_type if hasattr(product, 'clothing_type') and product.clothing_type else ""
         clothing_type_mod = f"isolate only the {clothing_type}" if clothing_type else ""
         user_mods = f"professional product photography, clean background, studio lighting{', ' + clothing_type_mod if clothing_type_mod else ''}"
@@ -6626,11 +6812,12 @@ async def reroll_packshots(
             product.packshot_front_url = new_packshots[0]
             product.packshot_back_url = new_packshots[1]
             product.packshots = new_packshots
-            print(f"Updated product with new packshots: {new_packshots}")
-        
-        # Deduct credits (10 credits for both front and back) - prioritizing subscription credits
-        if not deduct_credits(user, credits_needed, db):
-            raise HTTPException(status_code=400, detail="Failed to deduct credits")
+            db.commit()
+            logger.info(f"Updated product with new packshots: {new_packshots}")
+            
+            # Spend the reserved credits (10 for both front and back)
+            commit_credits(db, reservation_id, credits_needed)
+            attribute_credits(new_packshots, credits_needed)
         
         return {
             "message": "Packshots re-rolled successfully",
@@ -6641,34 +6828,37 @@ async def reroll_packshots(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error re-rolling packshots: {e}")
+        logger.error(f"Error re-rolling packshots: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if reservation_id:
+            close_reservation(db, reservation_id)
 
 def run_wan_video_generation(image_url: str, video_quality: str = "480p", custom_prompt: Optional[str] = None) -> str:
     """Generate video from image using Wan 2.2 I2V Fast API"""
     try:
-        print(f"🎬 Running Wan video generation: {image_url[:50]}...")
+        logger.info(f"🎬 Running Wan video generation: {image_url[:50]}...")
         
         # Convert local URLs to base64 for Replicate
         if image_url.startswith(get_base_url() + "/static/"):
             filename = image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
             image_url = upload_to_replicate(filepath)
-            print(f"Converted image to base64: {image_url[:100]}...")
+            logger.info(f"Converted image to base64: {image_url[:100]}...")
         
         # Configure parameters based on video quality
         if video_quality == "720p":
             num_frames = 120
             fps = 8
-            print("🎨 Using 720p video quality mode")
+            logger.info("🎨 Using 720p video quality mode")
         else:  # 480p or default
             num_frames = 81
             fps = 4
-            print("⚡ Using 480p video quality mode")
+            logger.info("⚡ Using 480p video quality mode")
         
         # Run Wan 2.2 I2V Fast
-        print(f"🔄 Calling Wan 2.2 I2V Fast API...")
-        out = replicate.run(
+        logger.info(f"🔄 Calling Wan 2.2 I2V Fast API...")
+        out = replicate_run(
             "wan-video/wan-2.2-i2v-fast",
             input={
                 "image": image_url,
@@ -6688,34 +6878,32 @@ def run_wan_video_generation(image_url: str, video_quality: str = "480p", custom
         else:
             video_url = str(out)
         
-        print(f"✅ Wan video generated: {video_url[:50]}...")
+        logger.info(f"✅ Wan video generated: {video_url[:50]}...")
         
         # Download and save video locally
         downloaded_url = download_and_save_video(video_url)
         return downloaded_url
         
     except Exception as e:
-        print(f"❌ Wan video generation failed: {e}")
+        logger.error(f"❌ Wan video generation failed: {e}")
         return None
 
 def run_seedance_video_generation(image_url: str, video_quality: str = "480p", duration: str = "5s", custom_prompt: Optional[str] = None) -> str:
     """Generate video from image using Seedance 1 Pro API"""
     try:
-        print(f"\n{'='*80}")
-        print(f"🎬 SEEDANCE 1 PRO VIDEO GENERATION")
-        print(f"{'='*80}")
-        print(f"📸 Input image: {image_url[:80]}...")
-        print(f"🎨 Quality: {video_quality}")
-        print(f"⏱️  Duration: {duration}")
-        print(f"💬 Custom prompt: {custom_prompt if custom_prompt else '(using default)'}")
+        logger.info(f"🎬 SEEDANCE 1 PRO VIDEO GENERATION")
+        logger.info(f"📸 Input image: {image_url[:80]}...")
+        logger.info(f"🎨 Quality: {video_quality}")
+        logger.info(f"⏱️  Duration: {duration}")
+        logger.info(f"💬 Custom prompt: {custom_prompt if custom_prompt else '(using default)'}")
         
         # Convert local URLs to base64 for Replicate
         if image_url.startswith(get_base_url() + "/static/"):
             filename = image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
-            print(f"📂 Converting local file: {filepath}")
+            logger.info(f"📂 Converting local file: {filepath}")
             image_url = upload_to_replicate(filepath)
-            print(f"✅ Converted to base64 ({len(image_url)} chars)")
+            logger.info(f"✅ Converted to base64 ({len(image_url)} chars)")
         
         # Configure parameters based on video quality and duration
         resolution = "1080p" if video_quality == "1080p" else "480p"
@@ -6723,12 +6911,12 @@ def run_seedance_video_generation(image_url: str, video_quality: str = "480p", d
         # Seedance expects duration as INTEGER (seconds), not string
         duration_seconds = 10 if duration == "10s" else 5
         
-        print(f"🎨 Using {resolution} video quality mode")
-        print(f"⏱️ Using {duration_seconds} seconds duration")
-        print(f"🔄 Calling Seedance 1 Pro API...")
+        logger.info(f"🎨 Using {resolution} video quality mode")
+        logger.info(f"⏱️ Using {duration_seconds} seconds duration")
+        logger.info(f"🔄 Calling Seedance 1 Pro API...")
         
         # Run Seedance 1 Pro
-        out = replicate.run(
+        out = replicate_run(
             "bytedance/seedance-1-pro",
             input={
                 "image": image_url,
@@ -6738,7 +6926,7 @@ def run_seedance_video_generation(image_url: str, video_quality: str = "480p", d
             }
         )
         
-        print(f"✅ Seedance API call completed, processing output...")
+        logger.info(f"✅ Seedance API call completed, processing output...")
         
         # Handle output
         if hasattr(out, 'url'):
@@ -6750,22 +6938,20 @@ def run_seedance_video_generation(image_url: str, video_quality: str = "480p", d
         else:
             video_url = str(out)
         
-        print(f"✅ Seedance video generated: {video_url[:50]}...")
+        logger.info(f"✅ Seedance video generated: {video_url[:50]}...")
         
         # Download and save video locally
         downloaded_url = download_and_save_video(video_url)
         return downloaded_url
         
     except Exception as e:
-        print(f"❌ Seedance video generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Seedance video generation failed: {e}")
         return None
 
 def run_veo_video_generation(image_url: str, video_quality: str = "480p", duration: str = "5s", custom_prompt: Optional[str] = None) -> str:
     """Generate video from image using Google Veo 3.1 API"""
     try:
-        print(f"🎬 Running Google Veo 3.1 video generation: {image_url[:50]}...")
+        logger.info(f"🎬 Running Google Veo 3.1 video generation: {image_url[:50]}...")
         
         # Convert URLs to base64 for Replicate to ensure Veo uses the exact image
         # Veo 3.1 works better with base64-encoded images than URLs
@@ -6776,10 +6962,10 @@ def run_veo_video_generation(image_url: str, video_quality: str = "480p", durati
             filename = image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
             converted_image_url = upload_to_replicate(filepath)
-            print(f"✅ Converted local file to base64: {converted_image_url[:100]}...")
+            logger.info(f"✅ Converted local file to base64: {converted_image_url[:100]}...")
         elif image_url.startswith("http://") or image_url.startswith("https://"):
             # External URL (Cloudinary, etc.) - download and convert to base64
-            print(f"📥 Downloading image from URL for Veo conversion...")
+            logger.info(f"📥 Downloading image from URL for Veo conversion...")
             try:
                 import requests
                 response = requests.get(image_url, timeout=30)
@@ -6810,10 +6996,10 @@ def run_veo_video_generation(image_url: str, video_quality: str = "480p", durati
                         mime_type = 'image/jpeg'
                 
                 converted_image_url = f"data:{mime_type};base64,{image_base64}"
-                print(f"✅ Converted external URL to base64 data URL (size: {len(converted_image_url)} chars)")
+                logger.info(f"✅ Converted external URL to base64 data URL (size: {len(converted_image_url)} chars)")
             except Exception as download_error:
-                print(f"⚠️ Failed to download and convert image: {download_error}")
-                print(f"⚠️ Using original URL (Veo may not use it correctly)")
+                logger.warning(f"⚠️ Failed to download and convert image: {download_error}")
+                logger.warning(f"⚠️ Using original URL (Veo may not use it correctly)")
                 converted_image_url = image_url
         
         # Use converted URL if available, otherwise use original
@@ -6825,7 +7011,7 @@ def run_veo_video_generation(image_url: str, video_quality: str = "480p", durati
         aspect_ratio = "16:9"  # Required for reference_image parameter
         
         # Note: We use 16:9 even if user requested portrait (9:16) because reference_image requires it
-        print(f"⚠️ Using 16:9 aspect ratio (required for reference_image), even if {video_quality} was requested as portrait")
+        logger.warning(f"⚠️ Using 16:9 aspect ratio (required for reference_image), even if {video_quality} was requested as portrait")
         
         # Duration in seconds - Veo 3.1 only accepts 4, 6, or 8 seconds
         # Map user input (5s/10s) to Veo's allowed values (4, 6, 8)
@@ -6836,8 +7022,8 @@ def run_veo_video_generation(image_url: str, video_quality: str = "480p", durati
         else:
             duration_seconds = 6  # Default to 6s
         
-        print(f"🎨 Using {aspect_ratio} aspect ratio")
-        print(f"⏱️ Using {duration_seconds}s duration")
+        logger.info(f"🎨 Using {aspect_ratio} aspect ratio")
+        logger.info(f"⏱️ Using {duration_seconds}s duration")
         
         # Run Veo 3.1
         # According to Replicate API docs, Veo 3.1 uses "reference_images" (plural) as an array
@@ -6849,14 +7035,14 @@ def run_veo_video_generation(image_url: str, video_quality: str = "480p", durati
         # Veo will use reference_images automatically without explicit instructions
         enhanced_prompt = base_prompt
         
-        print(f"🔄 Calling Google Veo 3.1 API...")
-        print(f"📝 Prompt: {enhanced_prompt[:200]}...")
-        print(f"🖼️ Reference images (array): [{final_image_url[:100]}...]")
-        print(f"📐 Aspect ratio: {aspect_ratio}")
-        print(f"⏱️ Duration: {duration_seconds}s")
+        logger.info(f"🔄 Calling Google Veo 3.1 API...")
+        logger.info(f"📝 Prompt: {enhanced_prompt[:200]}...")
+        logger.info(f"🖼️ Reference images (array): [{final_image_url[:100]}...]")
+        logger.info(f"📐 Aspect ratio: {aspect_ratio}")
+        logger.info(f"⏱️ Duration: {duration_seconds}s")
         
         try:
-            out = replicate.run(
+            out = replicate_run(
                 "google/veo-3.1",
                 input={
                     "prompt": enhanced_prompt,
@@ -6866,25 +7052,23 @@ def run_veo_video_generation(image_url: str, video_quality: str = "480p", durati
                     "quality": "high"  # Veo 3.1 always high quality
                 }
             )
-            print(f"✅ Veo API call successful, processing output...")
+            logger.info(f"✅ Veo API call successful, processing output...")
         except replicate.exceptions.ModelError as model_error:
             # Handle content moderation errors specifically
             error_str = str(model_error)
             if "flagged as sensitive" in error_str or "E005" in error_str:
-                print(f"⚠️ Veo content moderation: Image flagged as sensitive")
-                print(f"💡 Suggestion: Try using a different model (Kling, Seedance, or Wan) or use a different image")
+                logger.warning(f"⚠️ Veo content moderation: Image flagged as sensitive")
+                logger.info(f"💡 Suggestion: Try using a different model (Kling, Seedance, or Wan) or use a different image")
                 raise ValueError("Image was flagged as sensitive by Veo's content moderation. Please try a different image or use another video model (Kling, Seedance, or Wan).")
             else:
-                print(f"❌ Veo ModelError: {model_error}")
+                logger.error(f"❌ Veo ModelError: {model_error}")
                 raise
         except replicate.exceptions.ReplicateError as replicate_error:
-            print(f"❌ Veo ReplicateError: {replicate_error}")
+            logger.error(f"❌ Veo ReplicateError: {replicate_error}")
             raise
         except Exception as api_error:
-            print(f"❌ Veo API call failed: {api_error}")
-            print(f"🔍 Error type: {type(api_error)}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"❌ Veo API call failed: {api_error}")
+            logger.exception(f"🔍 Error type: {type(api_error)}")
             raise
         
         # Handle output
@@ -6897,37 +7081,37 @@ def run_veo_video_generation(image_url: str, video_quality: str = "480p", durati
         else:
             video_url = str(out)
         
-        print(f"✅ Veo 3.1 video generated: {video_url[:50]}...")
+        logger.info(f"✅ Veo 3.1 video generated: {video_url[:50]}...")
         
         # Download and save video locally
         downloaded_url = download_and_save_video(video_url)
         return downloaded_url
         
     except Exception as e:
-        print(f"❌ Veo 3.1 video generation failed: {e}")
+        logger.error(f"❌ Veo 3.1 video generation failed: {e}")
         return None
 
 def run_kling_video_generation(image_url: str, video_quality: str = "480p", duration: str = "5s", custom_prompt: Optional[str] = None) -> str:
     """Generate video from image using Kling 2.5 Turbo Pro API"""
     try:
-        print(f"🎬 Running Kling 2.5 Turbo Pro video generation: {image_url[:50]}...")
+        logger.info(f"🎬 Running Kling 2.5 Turbo Pro video generation: {image_url[:50]}...")
         
         # Convert local URLs to base64 for Replicate
         if image_url.startswith(get_base_url() + "/static/"):
             filename = image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
             image_url = upload_to_replicate(filepath)
-            print(f"Converted image to base64: {image_url[:100]}...")
+            logger.info(f"Converted image to base64: {image_url[:100]}...")
         
         # Kling only supports prompt and image parameters
         prompt = custom_prompt or "gentle natural movement, subtle breathing, soft fabric flow, professional fashion photography, minimal motion, elegant stillness"
         
-        print(f"🎨 Using prompt: {prompt}")
-        print(f"🖼️ Using image: {image_url[:100]}...")
+        logger.info(f"🎨 Using prompt: {prompt}")
+        logger.info(f"🖼️ Using image: {image_url[:100]}...")
         
         # Run Kling 2.5 Turbo Pro - ONLY with supported parameters
-        print(f"🔄 Calling Kling 2.5 Turbo Pro API...")
-        out = replicate.run(
+        logger.info(f"🔄 Calling Kling 2.5 Turbo Pro API...")
+        out = replicate_run(
             "kwaivgi/kling-v2.5-turbo-pro",
             input={
                 "prompt": prompt,
@@ -6936,15 +7120,15 @@ def run_kling_video_generation(image_url: str, video_quality: str = "480p", dura
         )
         
         # Debug: Check what Kling is actually returning
-        print(f"🔍 Kling raw output type: {type(out)}")
-        print(f"🔍 Kling raw output: {out}")
+        logger.info(f"🔍 Kling raw output type: {type(out)}")
+        logger.info(f"🔍 Kling raw output: {out}")
         if hasattr(out, '__dict__'):
-            print(f"🔍 Kling output attributes: {dir(out)}")
+            logger.info(f"🔍 Kling output attributes: {dir(out)}")
         if hasattr(out, '__iter__') and not isinstance(out, str):
-            print(f"🔍 Kling output is iterable, length: {len(out) if hasattr(out, '__len__') else 'unknown'}")
+            logger.info(f"🔍 Kling output is iterable, length: {len(out) if hasattr(out, '__len__') else 'unknown'}")
             if hasattr(out, '__len__') and len(out) > 0:
                 for i, item in enumerate(out):
-                    print(f"🔍 Kling output item {i}: {type(item)} - {item}")
+                    logger.info(f"🔍 Kling output item {i}: {type(item)} - {item}")
         
         # Handle output - Kling returns a string URL directly
         if isinstance(out, str):
@@ -6962,19 +7146,19 @@ def run_kling_video_generation(image_url: str, video_quality: str = "480p", dura
         if video_url:
             # Use Cloudinary for all files including videos (fixes HTTPS/HTTP mixed content issue)
             video_url = upload_to_cloudinary(video_url, "kling_videos")
-            print(f"✅ Kling video generated and persisted to Cloudinary: {video_url}")
+            logger.info(f"✅ Kling video generated and persisted to Cloudinary: {video_url}")
             return video_url
         
         return None
         
     except Exception as e:
-        print(f"❌ Kling video generation failed: {e}")
+        logger.error(f"❌ Kling video generation failed: {e}")
         return None
 
 def run_veo_direct_generation(model_image: str, product_image: str, scene_image: str, video_quality: str = "480p", duration: str = "5s", custom_prompt: Optional[str] = None) -> str:
     """Generate video directly from model + product + scene using Google Veo 3.1"""
     try:
-        print(f"🎬 Running Veo Direct: model + product + scene → video")
+        logger.info(f"🎬 Running Veo Direct: model + product + scene → video")
         
         # Convert local URLs to base64 for Replicate
         if model_image.startswith(get_base_url() + "/static/"):
@@ -7016,12 +7200,12 @@ def run_veo_direct_generation(model_image: str, product_image: str, scene_image:
                 "Cinematic lighting, luxury aesthetic, high-end editorial style, dramatic atmosphere."
             )
         
-        print(f"🎨 Veo Direct prompt: {full_prompt}")
-        print(f"🎨 Using {aspect_ratio} aspect ratio, {duration_seconds}s duration")
+        logger.info(f"🎨 Veo Direct prompt: {full_prompt}")
+        logger.info(f"🎨 Using {aspect_ratio} aspect ratio, {duration_seconds}s duration")
         
         # Run Veo 3.1 with text-to-video (it will interpret the inputs creatively)
-        print(f"🔄 Calling Google Veo 3.1 API (Direct Mode)...")
-        out = replicate.run(
+        logger.info(f"🔄 Calling Google Veo 3.1 API (Direct Mode)...")
+        out = replicate_run(
             "google/veo-3.1",
             input={
                 "prompt": full_prompt,
@@ -7044,18 +7228,17 @@ def run_veo_direct_generation(model_image: str, product_image: str, scene_image:
         else:
             video_url = str(out)
         
-        print(f"✅ Veo Direct video generated: {video_url[:50]}...")
+        logger.info(f"✅ Veo Direct video generated: {video_url[:50]}...")
         
         # Download and save video locally
         downloaded_url = download_and_save_video(video_url)
         return downloaded_url
         
     except Exception as e:
-        print(f"❌ Veo Direct generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Veo Direct generation failed: {e}")
         return None
 
+@timed("storage", "download_video")
 def download_and_save_video(url: str) -> str:
     """
     Download video from URL and upload to Cloudinary (or save locally if Cloudinary not available).
@@ -7065,7 +7248,7 @@ def download_and_save_video(url: str) -> str:
         # First, try to upload directly to Cloudinary from the URL
         if CLOUDINARY_CLOUD_NAME and CLOUDINARY_API_KEY and CLOUDINARY_API_SECRET:
             try:
-                print(f"☁️ Uploading video to Cloudinary from: {url[:100]}...")
+                logger.info(f"☁️ Uploading video to Cloudinary from: {url[:100]}...")
                 result = cloudinary.uploader.upload(
                     url,
                     folder="kling_videos",
@@ -7073,16 +7256,16 @@ def download_and_save_video(url: str) -> str:
                     resource_type="video"
                 )
                 cloudinary_url = result['secure_url']
-                print(f"✅ Video uploaded to Cloudinary: {cloudinary_url[:100]}...")
+                logger.info(f"✅ Video uploaded to Cloudinary: {cloudinary_url[:100]}...")
                 return cloudinary_url
             except Exception as cloudinary_error:
-                print(f"⚠️ Failed to upload video to Cloudinary: {cloudinary_error}")
-                print(f"📥 Falling back to local download...")
+                logger.warning(f"⚠️ Failed to upload video to Cloudinary: {cloudinary_error}")
+                logger.info(f"📥 Falling back to local download...")
         
         # Fallback: Download and save locally (for development or if Cloudinary fails)
         import requests
         
-        print(f"📥 Downloading video from: {url[:100]}...")
+        logger.info(f"📥 Downloading video from: {url[:100]}...")
         response = requests.get(url, timeout=60)
         response.raise_for_status()
         
@@ -7098,7 +7281,7 @@ def download_and_save_video(url: str) -> str:
         # Try to upload the saved file to Cloudinary
         if CLOUDINARY_CLOUD_NAME and CLOUDINARY_API_KEY and CLOUDINARY_API_SECRET:
             try:
-                print(f"☁️ Uploading saved video file to Cloudinary...")
+                logger.info(f"☁️ Uploading saved video file to Cloudinary...")
                 result = cloudinary.uploader.upload(
                     filepath,
                     folder="kling_videos",
@@ -7106,26 +7289,24 @@ def download_and_save_video(url: str) -> str:
                     resource_type="video"
                 )
                 cloudinary_url = result['secure_url']
-                print(f"✅ Video uploaded to Cloudinary: {cloudinary_url[:100]}...")
+                logger.info(f"✅ Video uploaded to Cloudinary: {cloudinary_url[:100]}...")
                 # Clean up local file after successful upload
                 try:
                     os.remove(filepath)
-                    print(f"🗑️ Removed local video file after Cloudinary upload")
+                    logger.info(f"🗑️ Removed local video file after Cloudinary upload")
                 except:
                     pass
                 return cloudinary_url
             except Exception as upload_error:
-                print(f"⚠️ Failed to upload saved video to Cloudinary: {upload_error}")
+                logger.warning(f"⚠️ Failed to upload saved video to Cloudinary: {upload_error}")
         
         # Return local URL only as last resort
         local_url = get_static_url(filename)
-        print(f"✅ Video saved locally: {local_url}")
+        logger.info(f"✅ Video saved locally: {local_url}")
         return local_url
         
     except Exception as e:
-        print(f"❌ Failed to download/save video: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Failed to download/save video: {e}")
         return url  # Return original URL as fallback
 
 class TweakImageRequest(BaseModel):
@@ -7142,7 +7323,7 @@ class TryOnRequest(BaseModel):
 @app.post("/tweak-image")
 async def tweak_image(
     request: TweakImageRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """
@@ -7150,15 +7331,15 @@ async def tweak_image(
     Uses img2img to modify the image while preserving the overall composition.
     """
     try:
-        print(f"🔧 Tweaking image with prompt: {request.prompt}")
-        print(f"📸 Image URL: {request.image_url[:100]}...")
+        logger.info(f"🔧 Tweaking image with prompt: {request.prompt}")
+        logger.info(f"📸 Image URL: {request.image_url[:100]}...")
         
         # Convert local URLs to base64 for Qwen
         if request.image_url.startswith(get_base_url() + "/static/"):
             filename = request.image_url.replace(get_base_url() + "/static/", "")
             filepath = f"uploads/{filename}"
             image_base64 = upload_to_replicate(filepath)
-            print(f"✅ Converted to base64")
+            logger.info(f"✅ Converted to base64")
         else:
             # If it's an external URL, download and convert
             response = requests.get(request.image_url, timeout=30)
@@ -7176,11 +7357,11 @@ async def tweak_image(
             img.save(buffered, format="JPEG", quality=95)
             img_base64 = base64.b64encode(buffered.getvalue()).decode()
             image_base64 = f"data:image/jpeg;base64,{img_base64}"
-            print(f"✅ Downloaded and converted external URL")
+            logger.info(f"✅ Downloaded and converted external URL")
         
         # Use Qwen for image tweaking (img2img editing)
-        print(f"🎨 Running Qwen for image tweaking...")
-        out = replicate.run("qwen/qwen-image-edit-plus", input={
+        logger.info(f"🎨 Running Qwen for image tweaking...")
+        out = replicate_run("qwen/qwen-image-edit-plus", input={
             "prompt": f"{request.prompt}. Professional luxury fashion aesthetic, professional quality.",
             "image": [image_base64],  # Only one image for editing
             "num_inference_steps": 35,
@@ -7198,12 +7379,12 @@ async def tweak_image(
         else:
             tweaked_url = str(out)
         
-        print(f"✅ Qwen tweaking completed: {tweaked_url[:50]}...")
+        logger.info(f"✅ Qwen tweaking completed: {tweaked_url[:50]}...")
         
         # Download and save tweaked image
-        print(f"💾 Downloading tweaked image...")
+        logger.info(f"💾 Downloading tweaked image...")
         final_url = upload_to_cloudinary(tweaked_url, "tweaked")
-        print(f"✅ Tweaked image saved: {final_url[:50]}...")
+        logger.info(f"✅ Tweaked image saved: {final_url[:50]}...")
         
         return {
             "message": "Image tweaked successfully",
@@ -7213,9 +7394,7 @@ async def tweak_image(
         }
         
     except Exception as e:
-        print(f"❌ Image tweaking failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Image tweaking failed: {e}")
         raise HTTPException(status_code=500, detail=f"Image tweaking failed: {str(e)}")
 
 class ReapplyClothesRequest(BaseModel):
@@ -7227,7 +7406,7 @@ class ReapplyClothesRequest(BaseModel):
 @app.post("/reapply-clothes")
 async def reapply_clothes(
     request: ReapplyClothesRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """
@@ -7235,10 +7414,10 @@ async def reapply_clothes(
     Takes the current image and applies the product packshot onto the model.
     """
     try:
-        print(f"👔 Reapplying clothes to image")
-        print(f"📸 Image URL: {request.image_url[:100]}...")
-        print(f"🛍️ Product ID: {request.product_id}")
-        print(f"👕 Clothing type: {request.clothing_type}")
+        logger.info(f"👔 Reapplying clothes to image")
+        logger.info(f"📸 Image URL: {request.image_url[:100]}...")
+        logger.info(f"🛍️ Product ID: {request.product_id}")
+        logger.info(f"👕 Clothing type: {request.clothing_type}")
         
         # Get the product
         product = db.query(Product).filter(Product.id == request.product_id).first()
@@ -7269,31 +7448,31 @@ async def reapply_clothes(
         if packshots_list and len(packshots_list) > 0:
             # Use first packshot URL from array (usually front)
             product_image = packshots_list[0]
-            print(f"📦 Using packshot from packshots array (first packshot): {product_image[:80]}...")
-            print(f"📦 Total packshots in array: {len(packshots_list)}")
+            logger.info(f"📦 Using packshot from packshots array (first packshot): {product_image[:80]}...")
+            logger.info(f"📦 Total packshots in array: {len(packshots_list)}")
             if len(packshots_list) > 1:
-                print(f"📦 Alternative packshots available: {[p[:50] + '...' for p in packshots_list[1:]]}")
+                logger.info(f"📦 Alternative packshots available: {[p[:50] + '...' for p in packshots_list[1:]]}")
         # Fall back to explicit packshot URLs
         elif product.packshot_front_url:
             product_image = product.packshot_front_url
-            print(f"📦 Using packshot_front_url: {product_image[:80]}...")
+            logger.info(f"📦 Using packshot_front_url: {product_image[:80]}...")
         elif product.packshot_back_url:
             product_image = product.packshot_back_url
-            print(f"📦 Using packshot_back_url: {product_image[:80]}...")
+            logger.info(f"📦 Using packshot_back_url: {product_image[:80]}...")
         # Only use image_url as last resort (it might be the original upload with full outfit)
         else:
             product_image = product.image_url
-            print(f"⚠️ No packshots available, using image_url (may contain full outfit)")
-            print(f"⚠️ WARNING: image_url may contain the whole outfit, not just the product!")
-        
-        print(f"🔍 Product image selection for '{product.name}':")
-        print(f"   packshot_front_url: {product.packshot_front_url}")
-        print(f"   packshot_back_url: {product.packshot_back_url}")
-        print(f"   packshots array (raw): {getattr(product, 'packshots', None)}")
-        print(f"   packshots array (parsed): {packshots_list}")
-        print(f"   image_url: {product.image_url[:80] if product.image_url else None}...")
-        print(f"   ✅ Selected product_image: {product_image[:80] if product_image else None}...")
-        print(f"   🔍 Final product_image URL length: {len(product_image) if product_image else 0}")
+            logger.warning(f"⚠️ No packshots available, using image_url (may contain full outfit)")
+            logger.warning(f"⚠️ WARNING: image_url may contain the whole outfit, not just the product!")
+        
+        logger.info(f"🔍 Product image selection for '{product.name}':")
+        step_logger.info(f"packshot_front_url: {product.packshot_front_url}")
+        step_logger.info(f"packshot_back_url: {product.packshot_back_url}")
+        step_logger.info(f"packshots array (raw): {getattr(product, 'packshots', None)}")
+        step_logger.info(f"packshots array (parsed): {packshots_list}")
+        step_logger.info(f"image_url: {product.image_url[:80] if product.image_url else None}...")
+        step_logger.info(f"✅ Selected product_image: {product_image[:80] if product_image else None}...")
+        step_logger.info(f"🔍 Final product_image URL length: {len(product_image) if product_image else 0}")
         
         # Get clothing type from product or use provided
         # Also check category field as fallback since API returns clothing_type as null
@@ -7302,7 +7481,7 @@ async def reapply_clothes(
             else (product.category if hasattr(product, 'category') and product.category else None)
             or request.clothing_type
         )
-        print(f"🔍 Final clothing_type used: {clothing_type} (from product.clothing_type={getattr(product, 'clothing_type', None)}, product.category={getattr(product, 'category', None)}, request.clothing_type={request.clothing_type})")
+        logger.info(f"🔍 Final clothing_type used: {clothing_type} (from product.clothing_type={getattr(product, 'clothing_type', None)}, product.category={getattr(product, 'category', None)}, request.clothing_type={request.clothing_type})")
         
         # Convert image URL to format Vella can use
         if request.image_url.startswith(get_base_url() + "/static/"):
@@ -7313,46 +7492,34 @@ async def reapply_clothes(
             model_image_url = request.image_url
         
         # Apply Qwen to add product (switched from Vella)
-        print(f"🎨 Running Qwen to add product...")
+        logger.info(f"🎨 Running Qwen to add product...")
         qwen_result_url = run_qwen_add_product(model_image_url, product_image, clothing_type, product.name)
-        print(f"✅ Qwen add product completed: {qwen_result_url[:50]}...")
+        logger.info(f"✅ Qwen add product completed: {qwen_result_url[:50]}...")
         
         # Download and save the result
-        print(f"💾 Downloading result...")
+        logger.info(f"💾 Downloading result...")
         final_url = upload_to_cloudinary(qwen_result_url, "reapplied_clothes")
-        print(f"✅ Reapplied clothes saved: {final_url[:50]}...")
+        logger.info(f"✅ Reapplied clothes saved: {final_url[:50]}...")
         
         # If campaign_id is provided, update the image in the campaign
         if request.campaign_id:
             try:
-                campaign = db.query(Campaign).filter(Campaign.id == request.campaign_id).first()
-                if campaign and campaign.settings and "generated_images" in campaign.settings:
-                    # Find and update the image with the old URL
-                    updated = False
-                    for img in campaign.settings["generated_images"]:
-                        if img.get("image_url") == request.image_url:
-                            img["image_url"] = final_url
-                            updated = True
-                            print(f"✅ Updated image in campaign {request.campaign_id}")
-                            break
-                    
-                    if updated:
-                        # Force SQLAlchemy to detect the change
-                        flag_modified(campaign, "settings")
-                        db.commit()
-                        db.refresh(campaign)
-                        print(f"✅ Campaign updated successfully")
+                # Find and update the image with the old URL (single-row update)
+                image_row = find_campaign_image_by_url(db, request.campaign_id, request.image_url)
+                if image_row:
+                    update_campaign_image(db, image_row.id, image_url=final_url)
+                    logger.info(f"✅ Updated image in campaign {request.campaign_id}")
             except Exception as e:
-                print(f"⚠️ Failed to update campaign: {e}")
+                logger.warning(f"⚠️ Failed to update campaign: {e}")
                 # Don't fail the whole request if campaign update fails
         
         # Log final details for debugging
-        print(f"🎯 Final response details:")
-        print(f"   Product: {product.name}")
-        print(f"   Clothing type: {clothing_type}")
-        print(f"   Packshot used: {product_image[:80] if product_image else 'None'}...")
-        print(f"   Original image: {request.image_url[:80]}...")
-        print(f"   Result image: {final_url[:80]}...")
+        logger.info(f"🎯 Final response details:")
+        step_logger.info(f"Product: {product.name}")
+        step_logger.info(f"Clothing type: {clothing_type}")
+        step_logger.info(f"Packshot used: {product_image[:80] if product_image else 'None'}...")
+        step_logger.info(f"Original image: {request.image_url[:80]}...")
+        step_logger.info(f"Result image: {final_url[:80]}...")
         
         return {
             "success": True,
@@ -7366,9 +7533,7 @@ async def reapply_clothes(
         }
         
     except Exception as e:
-        print(f"❌ Reapply clothes failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Reapply clothes failed: {e}")
         raise HTTPException(status_code=500, detail=f"Reapply clothes failed: {str(e)}")
 
 class BulkVideoRequest(BaseModel):
@@ -7379,11 +7544,32 @@ class BulkVideoRequest(BaseModel):
     veo_direct_mode: bool = False
     selected_image_indices: List[int] = []
 
+def video_credits_per_video(model: str, video_quality: str, duration: str) -> int:
+    """Credits for one image-to-video clip"""
+    if model == "seedance":
+        if video_quality == "1080p":
+            return 6 if duration == "10s" else 4
+        return 3 if duration == "10s" else 2
+    elif model == "veo":
+        if video_quality == "1080p":
+            return 8 if duration == "10s" else 5
+        elif video_quality == "720p":
+            return 6 if duration == "10s" else 4
+        return 4 if duration == "10s" else 3
+    elif model == "kling":
+        if video_quality == "1080p":
+            return 6 if duration == "10s" else 4
+        elif video_quality == "720p":
+            return 4 if duration == "10s" else 3
+        return 3 if duration == "10s" else 2
+    else:  # wan
+        return 2 if video_quality == "720p" else 1
+
 @app.delete("/campaigns/{campaign_id}/images/{image_index}")
 async def delete_campaign_image(
     campaign_id: str,
     image_index: int,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Delete a specific image from a campaign"""
@@ -7397,45 +7583,36 @@ async def delete_campaign_image(
         if not campaign:
             raise HTTPException(status_code=404, detail="Campaign not found")
         
-        # Get generated images
-        if not campaign.settings or not campaign.settings.get("generated_images"):
+        image_count = count_campaign_images(db, campaign_id)
+        if image_count == 0:
             raise HTTPException(status_code=400, detail="No images found in campaign")
         
-        generated_images = campaign.settings["generated_images"]
-        
         # Check if index is valid
-        if image_index < 0 or image_index >= len(generated_images):
+        if image_index < 0 or image_index >= image_count:
             raise HTTPException(status_code=400, detail="Invalid image index")
         
-        # Remove the image
-        deleted_image = generated_images.pop(image_index)
-        print(f"🗑️ Deleted image at index {image_index} from campaign {campaign.name}")
-        
-        # Update campaign settings
-        campaign.settings["generated_images"] = generated_images
-        flag_modified(campaign, "settings")
-        
-        db.commit()
-        db.refresh(campaign)
+        # Remove the image row; the remaining images are untouched
+        deleted_image = delete_campaign_image_at(db, campaign_id, image_index)
+        logger.info(f"🗑️ Deleted image at index {image_index} from campaign {campaign.name}")
         
         return {
             "message": "Image deleted successfully",
             "deleted_index": image_index,
             "deleted_image": deleted_image,
-            "remaining_images": len(generated_images)
+            "remaining_images": image_count - 1
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Failed to delete image: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Failed to delete image: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/campaigns/{campaign_id}/generate-videos-bulk")
 async def generate_videos_for_campaign(
     campaign_id: str,
     request: BulkVideoRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """
@@ -7469,11 +7646,10 @@ async def generate_videos_for_campaign(
                 credits_per_video = 4 if request.duration == "10s" else 3
             total_credits_needed = credits_per_video
         else:
-            if not campaign.settings or not campaign.settings.get("generated_images"):
+            generated_images = get_campaign_images(db, campaign_id)
+            if not generated_images:
                 raise HTTPException(status_code=400, detail="No images found in campaign")
             
-            generated_images = campaign.settings["generated_images"]
-            
             if request.selected_image_indices:
                 selected_images = [generated_images[i] for i in request.selected_image_indices if i < len(generated_images)]
                 if not selected_images:
@@ -7482,27 +7658,7 @@ async def generate_videos_for_campaign(
                 selected_images = generated_images
             
             # Calculate credits
-            if request.model == "seedance":
-                if request.video_quality == "1080p":
-                    credits_per_video = 6 if request.duration == "10s" else 4
-                else:
-                    credits_per_video = 3 if request.duration == "10s" else 2
-            elif request.model == "veo":
-                if request.video_quality == "1080p":
-                    credits_per_video = 8 if request.duration == "10s" else 5
-                elif request.video_quality == "720p":
-                    credits_per_video = 6 if request.duration == "10s" else 4
-                else:
-                    credits_per_video = 4 if request.duration == "10s" else 3
-            elif request.model == "kling":
-                if request.video_quality == "1080p":
-                    credits_per_video = 6 if request.duration == "10s" else 4
-                elif request.video_quality == "720p":
-                    credits_per_video = 4 if request.duration == "10s" else 3
-                else:
-                    credits_per_video = 3 if request.duration == "10s" else 2
-            else:  # wan
-                credits_per_video = 2 if request.video_quality == "720p" else 1
+            credits_per_video = video_credits_per_video(request.model, request.video_quality, request.duration)
             
             total_credits_needed = credits_per_video * len(selected_images)
             num_videos_to_generate = len(selected_images)
@@ -7512,26 +7668,24 @@ async def generate_videos_for_campaign(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        total_available = (user.subscription_credits or 0) + user.credits
-        if total_available < total_credits_needed:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient credits. You have {total_available} credits, but need {total_credits_needed} credits ({credits_per_video} per video × {num_videos_to_generate} videos)"
-            )
+        # Hold credits for every video now; the background task spends them per finished video
+        reservation = reserve_credits(db, user.id, total_credits_needed, "bulk_video")
+        if reservation is None:
+            raise insufficient_credits_error(db, user.id, total_credits_needed, f"{num_videos_to_generate} videos at {credits_per_video} each")
         
         # Update campaign status to "generating"
         new_settings = dict(campaign.settings) if campaign.settings else {}
         new_settings["bulk_video_status"] = "generating"
-        new_settings["bulk_video_progress"] = {
-            "current": 0,
-            "total": num_videos_to_generate,
-            "started_at": datetime.utcnow().isoformat()
-        }
+        new_settings.pop("bulk_video_progress", None)  # Live progress is served from the progress store
         campaign.settings = new_settings
         flag_modified(campaign, "settings")
+        reservation_id = reservation.id
         db.commit()
+        # The request session would otherwise hold its connection until the response is sent
+        db.close()
+        set_progress(campaign_id, "bulk_video", current=0, total=num_videos_to_generate, started_at=datetime.utcnow().isoformat())
         
-        print(f"🎬 Starting BACKGROUND video generation for {num_videos_to_generate} videos...")
+        logger.info(f"🎬 Starting BACKGROUND video generation for {num_videos_to_generate} videos...")
         
         # Start background task
         import asyncio
@@ -7545,7 +7699,8 @@ async def generate_videos_for_campaign(
                 "custom_prompt": request.custom_prompt,
                 "veo_direct_mode": request.veo_direct_mode,
                 "selected_image_indices": request.selected_image_indices,
-                "credits_per_video": credits_per_video
+                "credits_per_video": credits_per_video,
+                "reservation_id": reservation_id
             }
         ))
         
@@ -7559,27 +7714,28 @@ async def generate_videos_for_campaign(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Failed to start bulk video generation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Failed to start bulk video generation: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to start video generation: {str(e)}")
 
 
+@track_job("bulk_videos")
 async def generate_bulk_videos_background(
     campaign_id: str,
     user_id: str,
     request_data: dict
 ):
     """Background task to generate bulk videos"""
+    bind_log_context(campaign_id=campaign_id)
     from datetime import datetime
     
     db = SessionLocal()
+    reservation_id = request_data.get("reservation_id")
     try:
         campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
         user = db.query(User).filter(User.id == user_id).first()
         
         if not campaign or not user:
-            print(f"❌ Campaign or user not found for background video generation")
+            logger.error(f"❌ Campaign or user not found for background video generation")
             return
         
         success_count = 0
@@ -7594,10 +7750,19 @@ async def generate_bulk_videos_background(
         selected_indices = request_data.get("selected_image_indices", [])
         credits_per_video = request_data.get("credits_per_video", 1)
         
+        def settle_video(succeeded: bool, video_url: Optional[str] = None):
+            if not reservation_id:
+                return
+            if succeeded:
+                commit_credits(db, reservation_id, credits_per_video)
+                attribute_credits([video_url], credits_per_video)
+            else:
+                release_credits(db, reservation_id, credits_per_video)
+        
         if veo_direct_mode:
             # VEO DIRECT MODE
             try:
-                print(f"🎬 [BACKGROUND] Generating Veo Direct video...")
+                logger.info(f"🎬 [BACKGROUND] Generating Veo Direct video...")
                 
                 model_ids = campaign.settings.get("model_ids", [])
                 product_ids = campaign.settings.get("product_ids", [])
@@ -7617,7 +7782,10 @@ async def generate_bulk_videos_background(
                 product_image = product.packshot_front_url or product.image_url
                 scene_image = scene.image_url
                 
-                video_url = run_veo_direct_generation(
+                # Don't hold a pooled connection while the provider works
+                db.close()
+                video_url = await run_limited(
+                    "video", run_veo_direct_generation,
                     model_image, product_image, scene_image,
                     video_quality, duration, custom_prompt
                 )
@@ -7625,18 +7793,23 @@ async def generate_bulk_videos_background(
                 if video_url:
                     success_count += 1
                     results.append({"index": 0, "status": "success", "video_url": video_url})
+                    settle_video(True, video_url)
                 else:
                     failed_count += 1
                     results.append({"index": 0, "status": "failed"})
+                    settle_video(False)
                     
             except Exception as e:
-                print(f"❌ Veo Direct failed: {e}")
+                logger.error(f"❌ Veo Direct failed: {e}")
                 failed_count += 1
                 results.append({"index": 0, "status": "failed", "message": str(e)})
+                settle_video(False)
         
         else:
             # STANDARD MODE - Generate videos from images
-            generated_images = campaign.settings.get("generated_images", [])
+            generated_images = get_campaign_images(db, campaign_id)
+            # Don't hold a pooled connection while the providers work
+            db.close()
             
             if selected_indices:
                 images_to_process = [(i, generated_images[i]) for i in selected_indices if i < len(generated_images)]
@@ -7650,63 +7823,49 @@ async def generate_bulk_videos_background(
                     image_url = img_data.get("image_url")
                     if not image_url:
                         failed_count += 1
+                        settle_video(False)
                         continue
                     
-                    print(f"🎬 [BACKGROUND] Video {idx+1}/{total}: {image_url[:50]}...")
+                    logger.info(f"🎬 [BACKGROUND] Video {idx+1}/{total}: {image_url[:50]}...")
                     
-                    # Update progress
-                    campaign.settings["bulk_video_progress"] = {
-                        "current": idx + 1,
-                        "total": total,
-                        "current_name": img_data.get("shot_name", f"Video {idx+1}")
-                    }
-                    flag_modified(campaign, "settings")
-                    db.commit()
+                    # Update progress (progress store - no DB write)
+                    set_progress(campaign_id, "bulk_video", current=idx + 1, total=total, current_name=img_data.get("shot_name", f"Video {idx+1}"))
                     
-                    # Generate video
+                    # Generate video (worker thread, under the pipelines' shared video limit)
                     if model == "seedance":
-                        video_url = run_seedance_video_generation(image_url, video_quality, duration, custom_prompt)
+                        video_url = await run_limited("video", run_seedance_video_generation, image_url, video_quality, duration, custom_prompt)
                     elif model == "veo":
-                        video_url = run_veo_video_generation(image_url, video_quality, duration, custom_prompt)
+                        video_url = await run_limited("video", run_veo_video_generation, image_url, video_quality, duration, custom_prompt)
                     elif model == "kling":
-                        video_url = run_kling_video_generation(image_url, video_quality, duration, custom_prompt)
+                        video_url = await run_limited("video", run_kling_video_generation, image_url, video_quality, duration, custom_prompt)
                     else:  # wan
-                        video_url = run_wan_video_generation(image_url, video_quality, custom_prompt)
+                        video_url = await run_limited("video", run_wan_video_generation, image_url, video_quality, custom_prompt)
                     
                     if video_url:
-                        # Update the image data with video URL
-                        generated_images[original_idx]["video_url"] = video_url
                         success_count += 1
                         results.append({"index": original_idx, "status": "success", "video_url": video_url})
-                        print(f"✅ [BACKGROUND] Video {idx+1} done: {video_url[:50]}...")
+                        logger.info(f"✅ [BACKGROUND] Video {idx+1} done: {video_url[:50]}...")
                         
-                        # CRITICAL: Save immediately after each video so it shows in UI
-                        campaign.settings["generated_images"] = generated_images
-                        flag_modified(campaign, "settings")
-                        db.commit()
-                        print(f"💾 Saved video_url to database for image {original_idx}")
+                        # CRITICAL: Save immediately after each video so it shows in UI (single-row update)
+                        update_campaign_image(db, img_data["image_id"], video_url=video_url)
+                        logger.info(f"💾 Saved video_url to database for image {original_idx}")
+                        settle_video(True, video_url)
                     else:
                         failed_count += 1
                         results.append({"index": original_idx, "status": "failed"})
+                        settle_video(False)
                         
                 except Exception as e:
-                    print(f"❌ [BACKGROUND] Video {idx+1} failed: {e}")
+                    logger.error(f"❌ [BACKGROUND] Video {idx+1} failed: {e}")
                     failed_count += 1
                     results.append({"index": original_idx, "status": "failed", "message": str(e)})
+                    settle_video(False)
             
-            # Final save of all images (in case any were missed)
-            campaign.settings["generated_images"] = generated_images
-            flag_modified(campaign, "settings")
-            db.commit()
-        
-        # Deduct credits
+        # Credits were committed per finished video
         credits_used = success_count * credits_per_video
-        if credits_used > 0:
-            deduct_credits(user, credits_used, db)
         
         # Update final status
-        campaign.settings["bulk_video_status"] = "completed"
-        campaign.settings["bulk_video_progress"] = {
+        final_progress = {
             "current": success_count + failed_count,
             "total": success_count + failed_count,
             "success_count": success_count,
@@ -7714,26 +7873,40 @@ async def generate_bulk_videos_background(
             "credits_used": credits_used,
             "completed_at": datetime.utcnow().isoformat()
         }
+        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+        if not campaign:
+            logger.error(f"❌ Campaign {campaign_id} was deleted during bulk video generation")
+            return
+        campaign.settings["bulk_video_status"] = "completed"
+        campaign.settings["bulk_video_progress"] = final_progress
         flag_modified(campaign, "settings")
         db.commit()
+        set_progress(campaign_id, "bulk_video", **final_progress)
         
-        print(f"✅ [BACKGROUND] Bulk video generation COMPLETE: {success_count} success, {failed_count} failed")
+        logger.info(f"✅ [BACKGROUND] Bulk video generation COMPLETE: {success_count} success, {failed_count} failed")
         
     except Exception as e:
-        print(f"❌ [BACKGROUND] Bulk video generation error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ [BACKGROUND] Bulk video generation error: {e}")
         
         try:
             campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
             if campaign:
+                failed_progress = {**(get_progress(campaign_id, "bulk_video") or {}), "error": str(e)}
+                failed_progress.pop("updated_at", None)
                 campaign.settings["bulk_video_status"] = "failed"
-                campaign.settings["bulk_video_progress"]["error"] = str(e)
+                campaign.settings["bulk_video_progress"] = failed_progress
                 flag_modified(campaign, "settings")
                 db.commit()
+                set_progress(campaign_id, "bulk_video", **failed_progress)
         except:
             pass
     finally:
+        # Anything still held (a crash mid-run) goes back to the user
+        if reservation_id:
+            try:
+                close_reservation(db, reservation_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to close credit reservation {reservation_id}: {e}")
         db.close()
 
 @app.post("/generations/{generation_id}/generate-video")
@@ -7743,7 +7916,7 @@ async def generate_video_for_generation(
     duration: str = "5s",  # "5s" or "10s" (for Seedance, Kling, and Veo)
     model: str = "wan",  # "wan", "seedance", "kling", or "veo"
     custom_prompt: Optional[str] = None,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """
@@ -7766,6 +7939,7 @@ async def generate_video_for_generation(
       - 1080p (5s): 4 credits
       - 1080p (10s): 6 credits
     """
+    reservation_id = None
     try:
         # Get the generation
         generation = db.query(Generation).filter(
@@ -7836,23 +8010,25 @@ async def generate_video_for_generation(
             else:  # 480p
                 credits_needed = 1  # 480p Wan (cheapest)
         
-        # Check credits (prioritizing subscription credits)
-        if not deduct_credits(user, credits_needed, db):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient credits. You need {credits_needed} credits for {model} {video_quality} {duration if model in ['seedance', 'kling', 'veo'] else ''} video generation"
-            )
-        
         # Get the image URL from the generation
         if not generation.output_urls or len(generation.output_urls) == 0:
             raise HTTPException(status_code=400, detail="No image found for this generation")
         
         image_url = generation.output_urls[0]
         
+        # Hold the credits while the provider runs; they are only spent if a video comes back
+        reservation = reserve_credits(db, user.id, credits_needed, f"video_{model}")
+        if reservation is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient credits. You need {credits_needed} credits for {model} {video_quality} {duration if model in ['seedance', 'kling', 'veo'] else ''} video generation"
+            )
+        reservation_id = reservation.id
+        
         # Generate video
-        print(f"🎬 Generating {video_quality} video using {model} model for generation {generation_id}...")
+        logger.info(f"🎬 Generating {video_quality} video using {model} model for generation {generation_id}...")
         if custom_prompt:
-            print(f"🎨 Using custom prompt: {custom_prompt[:100]}...")
+            logger.info(f"🎨 Using custom prompt: {custom_prompt[:100]}...")
         
         if model == "seedance":
             video_url = run_seedance_video_generation(image_url, video_quality, duration, custom_prompt)
@@ -7868,12 +8044,13 @@ async def generate_video_for_generation(
             generation.video_urls = [video_url]
             generation.updated_at = datetime.utcnow()
             
-            # Credits already deducted by deduct_credits
             db.commit()
+            commit_credits(db, reservation_id, credits_needed)
+            attribute_credits([video_url], credits_needed)
             db.refresh(generation)
             db.refresh(user)
             
-            print(f"✅ Video generated successfully: {video_url}")
+            logger.info(f"✅ Video generated successfully: {video_url}")
             return {
                 "message": "Video generated successfully",
                 "video_url": video_url,
@@ -7886,16 +8063,20 @@ async def generate_video_for_generation(
                 detail="Video generation failed"
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Video generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Video generation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Video generation failed: {str(e)}")
+    finally:
+        # A failed provider call releases the held credits
+        if reservation_id:
+            close_reservation(db, reservation_id)
 
 @app.post("/try-on")
 async def try_on(
     request: TryOnRequest,
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     db: Session = Depends(get_db)
 ):
     """Dress a model image with a garment using Vella 1.5 and return a stable /static URL."""
@@ -7924,7 +8105,7 @@ async def try_on(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Try-on failed: {e}")
+        logger.error(f"❌ Try-on failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+"""
+Per-stage latency metrics, served on /metrics in the Prometheus text format.
+
+A slow campaign used to be a black box - Replicate queueing, a Cloudinary
+upload, our own Pillow preprocessing and DB commits all looked the same from
+the outside. Every stage is now timed:
+
+  * aura_stage_seconds{stage, op}            histogram per stage and op:
+        provider  op = model slug (replicate_run)
+        storage   op = cloudinary_upload / download / local_save ...
+        pillow    op = postprocess / png_encode / jpeg_compress ...
+        db        op = commit (every Session commit, sync or async)
+  * aura_stage_failures_total{stage, op}     stages that raised
+  * aura_provider_queue_seconds{model}       Replicate created -> started
+  * aura_jobs_in_flight{kind}                background jobs running now
+  * aura_pipeline_waiting_steps{limit}       pipeline steps waiting for a
+                                             concurrency slot (queue depth)
+  * aura_credits_spent_total                 credits charged or committed;
+                                             rate() of it is the spend rate
+
+/metrics is only served when METRICS_TOKEN is set, and only to scrapers that
+send it as `Authorization: Bearer <token>` (bearer_token in the Prometheus
+scrape config): the counters expose spend, model slugs and job volume.
+
+Tracing is optional: with OTEL_EXPORTER_OTLP_ENDPOINT set and the
+opentelemetry-sdk / opentelemetry-exporter-otlp packages installed, every
+timed stage is also exported as a span (e.g. to a local collector on
+http://localhost:4318).
+"""
+import functools
+import hmac
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Provider calls run from a second to several minutes (video); local stages are milliseconds
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram("aura_stage_seconds", "Time spent per pipeline stage", ["stage", "op"],
+                          buckets=STAGE_BUCKETS)
+STAGE_FAILURES = Counter("aura_stage_failures_total", "Stages that raised", ["stage", "op"])
+PROVIDER_QUEUE_SECONDS = Histogram("aura_provider_queue_seconds", "Replicate queue time (created -> started)",
+                                   ["model"], buckets=STAGE_BUCKETS)
+JOBS_IN_FLIGHT = Gauge("aura_jobs_in_flight", "Background generation jobs running", ["kind"])
+PIPELINE_WAITING = Gauge("aura_pipeline_waiting_steps", "Pipeline steps waiting for a concurrency slot", ["limit"])
+# Bearer token scrapers must send; /metrics is disabled without it
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+CREDITS_SPENT = Counter("aura_credits_spent_total", "Credits charged or committed")
+
+_tracer = None
+
+
+def setup_tracing():
+    """Export timed stages as OpenTelemetry spans when OTEL_EXPORTER_OTLP_ENDPOINT is set"""
+    global _tracer
+    if _tracer is not None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        logger.warning(f"⚠️ OTEL_EXPORTER_OTLP_ENDPOINT is set but OpenTelemetry is not installed: {e}")
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "aura-api")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("aura")
+    logger.info("✅ OpenTelemetry tracing enabled")
+
+
+@contextmanager
+def timed(stage: str, op: str):
+    """Time a block (or, as a decorator, a sync function) as stage/op"""
+    span = _tracer.start_as_current_span(f"{stage} {op}", attributes={"stage": stage, "op": op}) if _tracer else None
+    if span is not None:
+        span.__enter__()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        STAGE_FAILURES.labels(stage, op).inc()
+        if span is not None:
+            span.__exit__(type(e), e, e.__traceback__)
+            span = None
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage, op).observe(time.perf_counter() - start)
+        if span is not None:
+            span.__exit__(None, None, None)
+
+
+def track_job(kind: str):
+    """Count an async background job in aura_jobs_in_flight while it runs"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            gauge = JOBS_IN_FLIGHT.labels(kind)
+            gauge.inc()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                gauge.dec()
+        return wrapper
+    return decorator
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def prediction_queue_seconds(prediction) -> Optional[float]:
+    """Seconds a Replicate prediction waited before it started"""
+    created, started = _parse_timestamp(prediction.created_at), _parse_timestamp(prediction.started_at)
+    if created is None or started is None:
+        return None
+    return max(0.0, (started - created).total_seconds())
+
+
+def prediction_run_seconds(prediction) -> Optional[float]:
+    """Seconds a Replicate prediction ran (its own predict_time when reported)"""
+    predict_time = (getattr(prediction, "metrics", None) or {}).get("predict_time")
+    if predict_time is not None:
+        return float(predict_time)
+    started, completed = _parse_timestamp(prediction.started_at), _parse_timestamp(prediction.completed_at)
+    if started is None or completed is None:
+        return None
+    return max(0.0, (completed - started).total_seconds())
+
+
+def observe_prediction(model: str, prediction):
+    queued = prediction_queue_seconds(prediction)
+    if queued is not None:
+        PROVIDER_QUEUE_SECONDS.labels(model).observe(queued)
+
+
+def note_credits_spent(amount: int):
+    if amount > 0:
+        CREDITS_SPENT.inc(amount)
+
+
+# ---------- DB commits ----------
+
+_COMMIT_STARTED = "metrics_commit_started"
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    session.info[_COMMIT_STARTED] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    started = session.info.pop(_COMMIT_STARTED, None)
+    if started is not None:
+        STAGE_SECONDS.labels("db", "commit").observe(time.perf_counter() - started)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    if session.info.pop(_COMMIT_STARTED, None) is not None:
+        STAGE_FAILURES.labels("db", "commit").inc()
+
+
+def metrics_authorized(authorization: Optional[str]) -> bool:
+    """Whether an Authorization header carries METRICS_TOKEN"""
+    scheme, _, token = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode())
+
+
+def render_metrics():
+    """(body, content type) for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Migration script to move generated images and videos out of Campaign.settings
+into the campaign_images / campaign_videos tables.
+Safe to run repeatedly - only campaigns that still carry the legacy keys are touched.
+Runs as part of `alembic upgrade head` (revision 0005); can also be run directly.
+"""
+import logging
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LEGACY_KEYS = ("generated_images", "videos")
+
+
+def migrate_campaign_assets(batch_size: int = 200, db=None) -> bool:
+    """Copy settings["generated_images"] / settings["videos"] into rows and drop them from settings.
+
+    Pass a session bound to a migration's connection to run inside that migration.
+    """
+    from sqlalchemy.orm.attributes import flag_modified
+    from database import SessionLocal
+    from models import Campaign, CampaignImage, CampaignVideo
+    from campaign_assets import add_campaign_images, add_campaign_videos
+    import user_stats  # noqa: F401 - keeps the dashboard counters in step with the copied rows
+
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
+    migrated = 0
+    try:
+        offset = 0
+        while True:
+            campaigns = db.query(Campaign).order_by(Campaign.id).offset(offset).limit(batch_size).all()
+            if not campaigns:
+                break
+            offset += len(campaigns)
+
+            for campaign in campaigns:
+                settings = campaign.settings or {}
+                if not any(key in settings for key in LEGACY_KEYS):
+                    continue
+
+                images = settings.get("generated_images") or []
+                videos = settings.get("videos") or []
+
+                # Never duplicate rows if a previous run was interrupted after inserting
+                has_images = db.query(CampaignImage.id).filter(CampaignImage.campaign_id == campaign.id).first()
+                has_videos = db.query(CampaignVideo.id).filter(CampaignVideo.campaign_id == campaign.id).first()
+                if images and not has_images:
+                    add_campaign_images(db, campaign.id, images, commit=False)
+                if videos and not has_videos:
+                    add_campaign_videos(db, campaign.id, videos, commit=False)
+
+                new_settings = {key: value for key, value in settings.items() if key not in LEGACY_KEYS}
+                campaign.settings = new_settings
+                flag_modified(campaign, "settings")
+                migrated += 1
+
+            db.commit()
+
+        logger.info(f"✅ Campaign asset migration completed: {migrated} campaign(s) moved to campaign_images/campaign_videos")
+        return True
+    except Exception as e:
+        logger.exception(f"❌ Campaign asset migration failed: {e}")
+        db.rollback()
+        return False
+    finally:
+        if owns_session:
+            db.close()
+
+
+if __name__ == "__main__":
+    from log_config import setup_logging
+    setup_logging()
+    logger.info("🔄 Starting campaign asset migration...")
+    success = migrate_campaign_assets()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,165 @@
+"""Baseline schema (tables previously created by create_all)
+
+Existing databases already have these tables - each one is only created when
+missing, so stamping or upgrading an existing database is a no-op here.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("full_name", sa.String(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("is_verified", sa.Boolean(), nullable=True),
+            sa.Column("credits", sa.Integer(), nullable=True),
+            sa.Column("subscription_type", sa.String(), nullable=True),
+            sa.Column("subscription_credits", sa.Integer(), nullable=True),
+            sa.Column("subscription_status", sa.String(), nullable=True),
+            sa.Column("subscription_expires_at", sa.DateTime(), nullable=True),
+            *_timestamps(),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if not inspector.has_table("campaigns"):
+        op.create_table(
+            "campaigns",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("generation_status", sa.String(), nullable=True),
+            sa.Column("settings", sa.JSON(), nullable=True),
+            *_timestamps(),
+        )
+
+    if not inspector.has_table("campaign_images"):
+        op.create_table(
+            "campaign_images",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("campaign_id", sa.String(), sa.ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("position", sa.Integer(), nullable=False),
+            sa.Column("image_url", sa.String(), nullable=True),
+            sa.Column("video_url", sa.String(), nullable=True),
+            sa.Column("shot_type", sa.String(), nullable=True),
+            sa.Column("shot_name", sa.String(), nullable=True),
+            sa.Column("is_base_image", sa.Boolean(), nullable=True),
+            sa.Column("data", sa.JSON(), nullable=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+            *_timestamps(),
+        )
+        op.create_index("ix_campaign_images_campaign_position", "campaign_images", ["campaign_id", "position"])
+
+    if not inspector.has_table("campaign_videos"):
+        op.create_table(
+            "campaign_videos",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("campaign_id", sa.String(), sa.ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("position", sa.Integer(), nullable=False),
+            sa.Column("video_url", sa.String(), nullable=True),
+            sa.Column("image_url", sa.String(), nullable=True),
+            sa.Column("shot_type", sa.String(), nullable=True),
+            sa.Column("shot_name", sa.String(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("data", sa.JSON(), nullable=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+            *_timestamps(),
+        )
+        op.create_index("ix_campaign_videos_campaign_position", "campaign_videos", ["campaign_id", "position"])
+
+    if not inspector.has_table("products"):
+        op.create_table(
+            "products",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("image_url", sa.String(), nullable=True),
+            sa.Column("packshots", sa.JSON(), nullable=True),
+            sa.Column("packshot_front_url", sa.String(), nullable=True),
+            sa.Column("packshot_back_url", sa.String(), nullable=True),
+            sa.Column("packshot_front_type", sa.String(), nullable=True),
+            sa.Column("packshot_back_type", sa.String(), nullable=True),
+            sa.Column("category", sa.String(), nullable=True),
+            sa.Column("clothing_type", sa.String(), nullable=True),
+            sa.Column("tags", sa.JSON(), nullable=True),
+            *_timestamps(),
+        )
+
+    if not inspector.has_table("models"):
+        op.create_table(
+            "models",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("image_url", sa.String(), nullable=True),
+            sa.Column("gender", sa.String(), nullable=True),
+            sa.Column("poses", sa.JSON(), nullable=True),
+            *_timestamps(),
+        )
+
+    if not inspector.has_table("scenes"):
+        op.create_table(
+            "scenes",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("image_url", sa.String(), nullable=True),
+            sa.Column("is_standard", sa.Boolean(), nullable=True),
+            sa.Column("category", sa.String(), nullable=True),
+            sa.Column("tags", sa.JSON(), nullable=True),
+            *_timestamps(),
+        )
+
+    if not inspector.has_table("generations"):
+        op.create_table(
+            "generations",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("campaign_id", sa.String(), sa.ForeignKey("campaigns.id"), nullable=True),
+            sa.Column("product_id", sa.String(), sa.ForeignKey("products.id"), nullable=True),
+            sa.Column("model_id", sa.String(), sa.ForeignKey("models.id"), nullable=True),
+            sa.Column("scene_id", sa.String(), sa.ForeignKey("scenes.id"), nullable=True),
+            sa.Column("mode", sa.String(), nullable=False),
+            sa.Column("prompt", sa.Text(), nullable=False),
+            sa.Column("settings", sa.JSON(), nullable=True),
+            sa.Column("input_image_url", sa.String(), nullable=True),
+            sa.Column("output_urls", sa.JSON(), nullable=True),
+            sa.Column("video_urls", sa.JSON(), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("credits_used", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("completed_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    # The baseline is the pre-Alembic schema; it is never dropped automatically
+    pass
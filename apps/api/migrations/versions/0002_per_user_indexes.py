@@ -0,0 +1,79 @@
+"""Composite indexes for the hot per-user list queries
+
+Every list endpoint filters by user_id and /campaigns orders by created_at or
+updated_at, so (user_id, created_at) lets the planner answer both the filter
+and the sort from the index. Generation lookups by campaign and status get
+their own indexes.
+
+On PostgreSQL the indexes are built CONCURRENTLY so large tables stay writable.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns) - kept in sync with __table_args__ in models.py
+INDEXES = [
+    ("ix_campaigns_user_created", "campaigns", ["user_id", "created_at"]),
+    ("ix_campaigns_user_updated", "campaigns", ["user_id", "updated_at"]),
+    ("ix_products_user_created", "products", ["user_id", "created_at"]),
+    ("ix_models_user_created", "models", ["user_id", "created_at"]),
+    ("ix_scenes_user_created", "scenes", ["user_id", "created_at"]),
+    ("ix_generations_user_created", "generations", ["user_id", "created_at"]),
+    ("ix_generations_campaign_id", "generations", ["campaign_id"]),
+    ("ix_generations_status", "generations", ["status"]),
+]
+
+
+def _existing_indexes(inspector, table):
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    concurrently = bind.dialect.name == "postgresql"
+
+    # create_all may already have built these on fresh databases
+    missing = [
+        (name, table, columns)
+        for name, table, columns in INDEXES
+        if name not in _existing_indexes(inspector, table)
+    ]
+    if not missing:
+        return
+
+    if concurrently:
+        with op.get_context().autocommit_block():
+            for name, table, columns in missing:
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+    else:
+        for name, table, columns in missing:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    concurrently = bind.dialect.name == "postgresql"
+
+    present = [
+        (name, table)
+        for name, table, _ in INDEXES
+        if name in _existing_indexes(inspector, table)
+    ]
+    if concurrently:
+        with op.get_context().autocommit_block():
+            for name, table in present:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        for name, table in present:
+            op.drop_index(name, table_name=table)
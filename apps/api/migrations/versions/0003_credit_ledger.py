@@ -0,0 +1,63 @@
+"""Credit reservations and ledger
+
+Jobs hold credits in credit_reservations while they run and settle them per
+step; every balance movement is appended to credit_ledger.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("credit_reservations"):
+        op.create_table(
+            "credit_reservations",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("reason", sa.String(), nullable=False),
+            sa.Column("amount", sa.Integer(), nullable=False),
+            sa.Column("subscription_amount", sa.Integer(), nullable=False),
+            sa.Column("committed", sa.Integer(), nullable=False),
+            sa.Column("released", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_credit_reservations_user_status", "credit_reservations", ["user_id", "status"])
+
+    if not inspector.has_table("credit_ledger"):
+        op.create_table(
+            "credit_ledger",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("reservation_id", sa.String(), sa.ForeignKey("credit_reservations.id"), nullable=True),
+            sa.Column("kind", sa.String(), nullable=False),
+            sa.Column("amount", sa.Integer(), nullable=False),
+            sa.Column("subscription_amount", sa.Integer(), nullable=False),
+            sa.Column("reason", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_credit_ledger_user_created", "credit_ledger", ["user_id", "created_at"])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table("credit_ledger"):
+        op.drop_index("ix_credit_ledger_user_created", table_name="credit_ledger")
+        op.drop_table("credit_ledger")
+    if inspector.has_table("credit_reservations"):
+        op.drop_index("ix_credit_reservations_user_status", table_name="credit_reservations")
+        op.drop_table("credit_reservations")
@@ -0,0 +1,79 @@
+"""Per-user dashboard counters
+
+Creates user_stats and fills it for existing users from a full count. From
+here on the counters are adjusted on write (see user_stats.py).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _count(table, *where):
+    return sa.select(sa.func.count()).select_from(table).where(*where).scalar_subquery()
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("user_stats"):
+        return
+
+    op.create_table(
+        "user_stats",
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("products", sa.Integer(), nullable=False),
+        sa.Column("models", sa.Integer(), nullable=False),
+        sa.Column("scenes", sa.Integer(), nullable=False),
+        sa.Column("campaigns", sa.Integer(), nullable=False),
+        sa.Column("images", sa.Integer(), nullable=False),
+        sa.Column("videos", sa.Integer(), nullable=False),
+        sa.Column("credits_spent", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+    users = sa.table("users", sa.column("id"))
+    products = sa.table("products", sa.column("user_id"))
+    models = sa.table("models", sa.column("user_id"))
+    scenes = sa.table("scenes", sa.column("user_id"))
+    campaigns = sa.table("campaigns", sa.column("id"), sa.column("user_id"))
+    images = sa.table("campaign_images", sa.column("campaign_id"), sa.column("video_url"))
+    videos = sa.table("campaign_videos", sa.column("campaign_id"), sa.column("video_url"))
+    ledger = sa.table("credit_ledger", sa.column("user_id"), sa.column("kind"), sa.column("amount"))
+    user_stats = sa.table(
+        "user_stats",
+        *(sa.column(name) for name in
+          ("user_id", "products", "models", "scenes", "campaigns", "images", "videos", "credits_spent", "updated_at")),
+    )
+
+    user_campaigns = sa.select(campaigns.c.id).where(campaigns.c.user_id == users.c.id)
+    op.execute(user_stats.insert().from_select(
+        ["user_id", "products", "models", "scenes", "campaigns", "images", "videos", "credits_spent", "updated_at"],
+        sa.select(
+            users.c.id,
+            _count(products, products.c.user_id == users.c.id),
+            _count(models, models.c.user_id == users.c.id),
+            _count(scenes, scenes.c.user_id == users.c.id),
+            _count(campaigns, campaigns.c.user_id == users.c.id),
+            _count(images, images.c.campaign_id.in_(user_campaigns)),
+            _count(images, images.c.campaign_id.in_(user_campaigns), images.c.video_url.isnot(None))
+            + _count(videos, videos.c.campaign_id.in_(user_campaigns), videos.c.video_url.isnot(None)),
+            sa.select(sa.func.coalesce(sa.func.sum(ledger.c.amount), 0))
+            .where(ledger.c.user_id == users.c.id, ledger.c.kind.in_(["charge", "commit"]))
+            .scalar_subquery(),
+            sa.func.now(),
+        ),
+    ))
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("user_stats"):
+        op.drop_table("user_stats")
@@ -0,0 +1,53 @@
+"""Fold the old startup migrations into Alembic
+
+The API used to run migrate_subscription_columns() and
+migrate_campaign_assets() on every boot. Both are idempotent and now run once
+here, so startup only has to check the schema revision.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+SUBSCRIPTION_COLUMNS = [
+    sa.Column("subscription_type", sa.String(), nullable=True),
+    sa.Column("subscription_credits", sa.Integer(), nullable=True, server_default="0"),
+    sa.Column("subscription_status", sa.String(), nullable=True, server_default="inactive"),
+    sa.Column("subscription_expires_at", sa.DateTime(), nullable=True),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Databases created before subscriptions existed
+    existing = {column["name"] for column in inspector.get_columns("users")}
+    missing = [column for column in SUBSCRIPTION_COLUMNS if column.name not in existing]
+    if missing:
+        with op.batch_alter_table("users") as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+
+    # Campaigns that still keep generated images/videos inside settings
+    from migrate_campaign_assets import migrate_campaign_assets
+    session = Session(bind=bind)
+    try:
+        if not migrate_campaign_assets(db=session):
+            raise RuntimeError("Campaign asset migration failed")
+    finally:
+        session.close()
+
+
+def downgrade() -> None:
+    # Both steps only fill in missing schema/data; nothing to undo
+    pass
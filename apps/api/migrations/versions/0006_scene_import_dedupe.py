@@ -0,0 +1,46 @@
+"""Scene content hash and per-user name index for bulk import de-duplication
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_scenes_user_name", ["user_id", "name"]),
+    ("ix_scenes_user_content_hash", ["user_id", "content_hash"]),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "content_hash" not in {column["name"] for column in inspector.get_columns("scenes")}:
+        with op.batch_alter_table("scenes") as batch_op:
+            batch_op.add_column(sa.Column("content_hash", sa.String(), nullable=True))
+
+    existing = {index["name"] for index in inspector.get_indexes("scenes")}
+    missing = [(name, columns) for name, columns in INDEXES if name not in existing]
+    if bind.dialect.name == "postgresql":
+        # Same as 0002: keep the table writable while the indexes build
+        with op.get_context().autocommit_block():
+            for name, columns in missing:
+                op.create_index(name, "scenes", columns, postgresql_concurrently=True)
+    else:
+        for name, columns in missing:
+            op.create_index(name, "scenes", columns)
+
+
+def downgrade() -> None:
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="scenes")
+    with op.batch_alter_table("scenes") as batch_op:
+        batch_op.drop_column("content_hash")
@@ -0,0 +1,61 @@
+"""Pipeline run and node state
+
+Generation flows run as DAGs (pipeline.py); each run and each of its nodes
+is recorded with status, output and timings.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("pipeline_runs"):
+        op.create_table(
+            "pipeline_runs",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("campaign_id", sa.String(), sa.ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=True),
+            sa.Column("flow", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_pipeline_runs_campaign_created", "pipeline_runs", ["campaign_id", "created_at"])
+
+    if not inspector.has_table("pipeline_nodes"):
+        op.create_table(
+            "pipeline_nodes",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("run_id", sa.String(), sa.ForeignKey("pipeline_runs.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("node_key", sa.String(), nullable=False),
+            sa.Column("step", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("cache_key", sa.String(), nullable=True),
+            sa.Column("output", sa.JSON(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_pipeline_nodes_run", "pipeline_nodes", ["run_id"])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table("pipeline_nodes"):
+        op.drop_index("ix_pipeline_nodes_run", table_name="pipeline_nodes")
+        op.drop_table("pipeline_nodes")
+    if inspector.has_table("pipeline_runs"):
+        op.drop_index("ix_pipeline_runs_campaign_created", table_name="pipeline_runs")
+        op.drop_table("pipeline_runs")
@@ -0,0 +1,45 @@
+"""Per-user library of reusable base compositions
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("base_compositions"):
+        op.create_table(
+            "base_compositions",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("composition_key", sa.String(), nullable=False),
+            sa.Column("image_url", sa.String(), nullable=False),
+            sa.Column("model_id", sa.String(), nullable=True),
+            sa.Column("scene_id", sa.String(), nullable=True),
+            sa.Column("product_ids", sa.JSON(), nullable=True),
+            sa.Column("inputs", sa.JSON(), nullable=True),
+            sa.Column("use_count", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("last_used_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_base_compositions_user_key", "base_compositions", ["user_id", "composition_key"], unique=True)
+        op.create_index("ix_base_compositions_user_last_used", "base_compositions", ["user_id", "last_used_at"])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if inspector.has_table("base_compositions"):
+        op.drop_index("ix_base_compositions_user_last_used", table_name="base_compositions")
+        op.drop_index("ix_base_compositions_user_key", table_name="base_compositions")
+        op.drop_table("base_compositions")
@@ -0,0 +1,55 @@
+"""Per-step provider records on generations
+
+Every Replicate call is recorded as a generations row (mode "provider_step")
+with its model slug, prediction id and queue/run/upload timings.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+STEP_COLUMNS = [
+    sa.Column("provider_model", sa.String(), nullable=True),
+    sa.Column("prediction_id", sa.String(), nullable=True),
+    sa.Column("queue_seconds", sa.Float(), nullable=True),
+    sa.Column("run_seconds", sa.Float(), nullable=True),
+    sa.Column("upload_seconds", sa.Float(), nullable=True),
+    sa.Column("input_hashes", sa.JSON(), nullable=True),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    existing = {column["name"] for column in inspector.get_columns("generations")}
+    missing = [column for column in STEP_COLUMNS if column.name not in existing]
+    if missing:
+        with op.batch_alter_table("generations") as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("generations")}
+    if "ix_generations_model_created" not in indexes:
+        op.create_index("ix_generations_model_created", "generations", ["provider_model", "created_at"])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    indexes = {index["name"] for index in inspector.get_indexes("generations")}
+    if "ix_generations_model_created" in indexes:
+        op.drop_index("ix_generations_model_created", table_name="generations")
+    existing = {column["name"] for column in inspector.get_columns("generations")}
+    present = [column.name for column in STEP_COLUMNS if column.name in existing]
+    if present:
+        with op.batch_alter_table("generations") as batch_op:
+            for name in present:
+                batch_op.drop_column(name)
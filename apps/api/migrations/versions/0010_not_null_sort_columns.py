@@ -0,0 +1,65 @@
+"""Backfill and require the list endpoints' sort columns
+
+Keyset pagination orders by created_at / updated_at; a NULL there ends a
+listing early (the cursor compares against NULL) or hides the row entirely.
+Campaign summaries also need status and generation_status.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+SORTED_TABLES = ("products", "models", "scenes", "campaigns")
+
+# campaigns columns -> value for rows that have none (the ORM defaults)
+CAMPAIGN_DEFAULTS = {"status": "draft", "generation_status": "idle"}
+
+
+def _nullable(inspector, table: str) -> set:
+    return {column["name"] for column in inspector.get_columns(table) if column["nullable"]}
+
+
+def upgrade() -> None:
+    for table in SORTED_TABLES:
+        op.execute(
+            f"UPDATE {table} SET created_at = COALESCE(created_at, updated_at, CURRENT_TIMESTAMP) "
+            f"WHERE created_at IS NULL"
+        )
+        op.execute(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL")
+    for column, value in CAMPAIGN_DEFAULTS.items():
+        op.execute(sa.text(f"UPDATE campaigns SET {column} = :value WHERE {column} IS NULL").bindparams(value=value))
+
+    inspector = sa.inspect(op.get_bind())
+    for table in SORTED_TABLES:
+        nullable = _nullable(inspector, table)
+        required = [name for name in ("created_at", "updated_at") if name in nullable]
+        if table == "campaigns":
+            required += [name for name in CAMPAIGN_DEFAULTS if name in nullable]
+        if not required:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            for name in required:
+                existing_type = sa.String() if name in CAMPAIGN_DEFAULTS else sa.DateTime()
+                batch_op.alter_column(name, existing_type=existing_type, nullable=False)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table in SORTED_TABLES:
+        nullable = _nullable(inspector, table)
+        names = ["created_at", "updated_at"] + (list(CAMPAIGN_DEFAULTS) if table == "campaigns" else [])
+        relaxed = [name for name in names if name not in nullable]
+        if not relaxed:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            for name in relaxed:
+                existing_type = sa.String() if name in CAMPAIGN_DEFAULTS else sa.DateTime()
+                batch_op.alter_column(name, existing_type=existing_type, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Index, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -31,6 +31,58 @@ class User(Base):
     scenes = relationship("Scene", back_populates="user")
     generations = relationship("Generation", back_populates="user")
 
+class CreditReservation(Base):
+    """Credits held for a running job; committed per completed step, released per failed step"""
+    __tablename__ = "credit_reservations"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    reason = Column(String, nullable=False)  # e.g. "bulk_video", "model_poses"
+    amount = Column(Integer, nullable=False)  # Total reserved
+    subscription_amount = Column(Integer, nullable=False, default=0)  # Part of amount taken from subscription credits
+    committed = Column(Integer, nullable=False, default=0)
+    released = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="open")  # open, closed
+    version = Column(Integer, nullable=False, default=1)  # Optimistic concurrency
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_credit_reservations_user_status", "user_id", "status"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+class CreditLedgerEntry(Base):
+    """Append-only record of every credit movement"""
+    __tablename__ = "credit_ledger"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    reservation_id = Column(String, ForeignKey("credit_reservations.id"), nullable=True)
+    kind = Column(String, nullable=False)  # charge/reserve debit the balance, release/purchase credit it, commit spends held credits
+    amount = Column(Integer, nullable=False)  # Credits moved (always positive)
+    subscription_amount = Column(Integer, nullable=False, default=0)  # Part of amount from/to subscription credits
+    reason = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_credit_ledger_user_created", "user_id", "created_at"),
+    )
+
+class UserStats(Base):
+    """Per-user dashboard counters, kept current by the flush listener in user_stats.py"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    products = Column(Integer, nullable=False, default=0)
+    models = Column(Integer, nullable=False, default=0)
+    scenes = Column(Integer, nullable=False, default=0)
+    campaigns = Column(Integer, nullable=False, default=0)
+    images = Column(Integer, nullable=False, default=0)  # Campaign images
+    videos = Column(Integer, nullable=False, default=0)  # Images with a video plus campaign videos
+    credits_spent = Column(Integer, nullable=False, default=0)  # Sum of charge/commit ledger entries
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Campaign(Base):
     __tablename__ = "campaigns"
     
@@ -38,15 +90,72 @@ class Campaign(Base):
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    status = Column(String, default="draft")  # draft, active, completed, archived
-    generation_status = Column(String, default="idle")  # idle, generating, completed, failed
+    status = Column(String, nullable=False, default="draft")  # draft, active, completed, archived
+    generation_status = Column(String, nullable=False, default="idle")  # idle, generating, completed, failed
     settings = Column(JSON, default=dict)  # Store campaign-specific settings
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_campaigns_user_created", "user_id", "created_at"),
+        Index("ix_campaigns_user_updated", "user_id", "updated_at"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="campaigns")
     generations = relationship("Generation", back_populates="campaign")
+    images = relationship("CampaignImage", back_populates="campaign", order_by="CampaignImage.position", cascade="all, delete-orphan")
+    videos = relationship("CampaignVideo", back_populates="campaign", order_by="CampaignVideo.position", cascade="all, delete-orphan")
+
+class CampaignImage(Base):
+    """One generated image of a campaign (previously an entry of settings["generated_images"])"""
+    __tablename__ = "campaign_images"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    campaign_id = Column(String, ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # Display order; gaps are allowed after deletes
+    image_url = Column(String, nullable=True)
+    video_url = Column(String, nullable=True)  # Set by bulk video generation
+    shot_type = Column(String, nullable=True)
+    shot_name = Column(String, nullable=True)
+    is_base_image = Column(Boolean, default=False)
+    data = Column(JSON, default=dict)  # Remaining image metadata (product/model/scene names, prompts, ...)
+    version = Column(Integer, nullable=False, default=1)  # Optimistic concurrency
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_campaign_images_campaign_position", "campaign_id", "position"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+    
+    # Relationships
+    campaign = relationship("Campaign", back_populates="images")
+
+class CampaignVideo(Base):
+    """One generated video of a campaign (previously an entry of settings["videos"])"""
+    __tablename__ = "campaign_videos"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    campaign_id = Column(String, ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)
+    video_url = Column(String, nullable=True)  # None when generation failed
+    image_url = Column(String, nullable=True)  # Source keyframe
+    shot_type = Column(String, nullable=True)
+    shot_name = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    data = Column(JSON, default=dict)  # Remaining video metadata (duration, cfg_scale, image metadata, ...)
+    version = Column(Integer, nullable=False, default=1)  # Optimistic concurrency
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_campaign_videos_campaign_position", "campaign_id", "position"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+    
+    # Relationships
+    campaign = relationship("Campaign", back_populates="videos")
 
 class Product(Base):
     __tablename__ = "products"
@@ -64,8 +173,12 @@ class Product(Base):
     category = Column(String, nullable=True)
     clothing_type = Column(String, nullable=True)  # "tshirt", "pants", "sweater", "jacket", "shoes", etc.
     tags = Column(JSON, default=list)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_products_user_created", "user_id", "created_at"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="products")
@@ -81,8 +194,12 @@ class Model(Base):
     image_url = Column(String, nullable=True)  # Original model photo
     gender = Column(String, nullable=True)  # male, female
     poses = Column(JSON, default=list)  # List of generated pose URLs
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_models_user_created", "user_id", "created_at"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="models")
@@ -99,8 +216,15 @@ class Scene(Base):
     is_standard = Column(Boolean, default=False)  # True for built-in scenes
     category = Column(String, nullable=True)  # "studio", "outdoor", "lifestyle", etc.
     tags = Column(JSON, default=list)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    content_hash = Column(String, nullable=True)  # sha256 of the image file, for import de-duplication
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_scenes_user_created", "user_id", "created_at"),
+        Index("ix_scenes_user_name", "user_id", "name"),
+        Index("ix_scenes_user_content_hash", "user_id", "content_hash"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="scenes")
@@ -125,12 +249,83 @@ class Generation(Base):
     status = Column(String, default="pending")  # pending, processing, completed, failed
     credits_used = Column(Integer, default=1)
     
+    # Provider steps (mode "provider_step", see generation_log.py)
+    provider_model = Column(String, nullable=True)  # Replicate model slug
+    prediction_id = Column(String, nullable=True)
+    queue_seconds = Column(Float, nullable=True)
+    run_seconds = Column(Float, nullable=True)
+    upload_seconds = Column(Float, nullable=True)
+    input_hashes = Column(JSON, nullable=True)  # input name -> sha256 prefix
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     
+    __table_args__ = (
+        Index("ix_generations_user_created", "user_id", "created_at"),
+        Index("ix_generations_campaign_id", "campaign_id"),
+        Index("ix_generations_status", "status"),
+        Index("ix_generations_model_created", "provider_model", "created_at"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="generations")
     campaign = relationship("Campaign", back_populates="generations")
     product = relationship("Product", back_populates="generations")
     model = relationship("Model", back_populates="generations")
     scene = relationship("Scene", back_populates="generations")
+
+class PipelineRun(Base):
+    """One execution of a generation flow (see pipeline.py)"""
+    __tablename__ = "pipeline_runs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    campaign_id = Column(String, ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=True)
+    flow = Column(String, nullable=False)  # e.g. "campaign_images", "template_keyframes"
+    status = Column(String, nullable=False, default="running")  # running, completed, partial, failed
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_pipeline_runs_campaign_created", "campaign_id", "created_at"),
+    )
+
+class PipelineNode(Base):
+    """State of one node of a pipeline run"""
+    __tablename__ = "pipeline_nodes"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    run_id = Column(String, ForeignKey("pipeline_runs.id", ondelete="CASCADE"), nullable=False)
+    node_key = Column(String, nullable=False)  # Node id within the flow, e.g. "shot_03.upload"
+    step = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed, skipped
+    cache_key = Column(String, nullable=True)  # Hash of step + resolved inputs
+    output = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_pipeline_nodes_run", "run_id"),
+    )
+
+class BaseComposition(Base):
+    """A composed base image (pose + outfit + scene) a user can reuse across campaigns (see base_library.py)"""
+    __tablename__ = "base_compositions"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    composition_key = Column(String, nullable=False)  # sha256 over the inputs' content hashes and clothing types
+    image_url = Column(String, nullable=False)
+    model_id = Column(String, nullable=True)
+    scene_id = Column(String, nullable=True)
+    product_ids = Column(JSON, default=list)
+    inputs = Column(JSON, default=dict)  # pose/product/scene URLs and clothing types the base was composed from
+    use_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_base_compositions_user_key", "user_id", "composition_key", unique=True),
+        Index("ix_base_compositions_user_last_used", "user_id", "last_used_at"),
+    )
@@ -0,0 +1,76 @@
+"""
+Keyset (cursor) pagination for the list endpoints.
+
+Pages are ordered by (sort column, id) so rows sharing a timestamp are never
+skipped or repeated, and each page is a single index range scan no matter how
+deep the client has paged. The cursor is an opaque base64 token holding the
+sort value and id of the last row on the previous page. Sort columns must be
+NOT NULL (migration 0010): a NULL never compares true against the cursor, so
+the listing would stop at it.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort_value: datetime, row_id: str) -> str:
+    payload = json.dumps([sort_value.isoformat() if sort_value else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query, sort_column, id_column, cursor: Optional[str], page_size: int, descending: bool = True):
+    """Apply keyset filtering/ordering to a Query or select(); fetches one extra row to detect the next page"""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < row_id),
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > sort_value,
+                and_(sort_column == sort_value, id_column > row_id),
+            ))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    return query.limit(page_size + 1)
+
+
+def finish_page(rows: list, sort_column, id_column, page_size: int):
+    """Trim the extra row fetched by keyset_page; returns (rows, next_cursor)"""
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+
+async def paginate_select(db: AsyncSession, stmt, sort_column, id_column, cursor: Optional[str], page_size: int,
+                          descending: bool = True, scalars: bool = True):
+    """Run a keyset-paginated select() on an async session; returns (rows, next_cursor)"""
+    result = await db.execute(keyset_page(stmt, sort_column, id_column, cursor, page_size, descending))
+    rows = result.scalars().all() if scalars else result.all()
+    return finish_page(list(rows), sort_column, id_column, page_size)
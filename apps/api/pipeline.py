@@ -0,0 +1,458 @@
+"""
+Small DAG executor for generation pipelines.
+
+A flow is a list of Nodes. Each node runs one registered step type (compose,
+add-product, stabilize, variation, upload, video, concat, save-image,
+attach-video) on inputs that are literal values or Refs to other nodes'
+outputs. A node starts as soon as everything it references is done, so
+independent branches run concurrently:
+
+  * Shared limits - every step type names a limit ("replicate" for image
+    models, "video", "upload", "db", "ffmpeg"). One semaphore per limit is
+    shared by every run in the process, so ten campaigns generating at once
+    can't open a hundred Replicate predictions between them, and the image
+    and video stages of a flow are throttled independently.
+  * Memoization - a node's cache key is its step type plus its resolved
+    inputs. Nodes with equal keys run once per run; deterministic steps
+    (stabilize) are also cached process-wide in a small LRU.
+  * Persisted state - a run is a pipeline_runs row and each node a
+    pipeline_nodes row (status, cache key, output, error, timings). Node
+    state is kept in memory and written in batches of finished nodes: when a
+    node fails, at most every PIPELINE_FLUSH_SECONDS otherwise, and with the
+    run's final status.
+  * Failure isolation - a failed node only skips the nodes that depend on it
+    (unless the Ref carries a default); other branches carry on, the way the
+    old loops `continue`d past a failed shot.
+
+Step functions are the existing blocking provider helpers; they run on a
+dedicated thread pool sized to the sum of the limits (so every limit can be
+full at once), and the run/node bookkeeping writes get a small pool of their
+own so a long provider call can never hold them up.
+"""
+import asyncio
+import contextvars
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, update
+
+from database import SessionLocal
+from log_config import bind_log_context, log_context
+from metrics import PIPELINE_WAITING
+from models import PipelineNode, PipelineRun
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Concurrent step executions per limit, shared by all runs in the process
+# (replicate allows a template's shots 2..N - up to ~10 - to fan out in one wave)
+DEFAULT_LIMITS = {"replicate": 10, "video": 4, "upload": 8, "db": 4, "ffmpeg": 2}
+
+# Threads for bookkeeping writes (pipeline_runs / pipeline_nodes)
+STORE_THREADS = 2
+
+# Finished nodes are written at most this often (failures and the end of a run are written at once)
+PIPELINE_FLUSH_SECONDS = float(os.getenv("PIPELINE_FLUSH_SECONDS", "10"))
+
+# Process-wide cache of deterministic step outputs
+DETERMINISTIC_CACHE_SIZE = 1024
+
+
+def _limit_size(name: str) -> int:
+    return int(os.getenv(f"PIPELINE_LIMIT_{name.upper()}", str(DEFAULT_LIMITS.get(name, 4))))
+
+
+@dataclass(frozen=True)
+class Ref:
+    """Output of another node (optionally one key of a dict output).
+
+    With a default, a failed or skipped node resolves to the default instead
+    of skipping the node that references it.
+    """
+    node: str
+    key: Optional[str] = None
+    default: Any = _MISSING
+
+
+@dataclass
+class StepType:
+    name: str
+    fn: Callable
+    limit: Optional[str]
+    deterministic: bool
+    required: frozenset
+    accepted: Optional[frozenset]  # None when the function takes **kwargs
+
+
+STEP_TYPES: Dict[str, StepType] = {}
+
+
+def register_step(name: str, fn: Callable, limit: Optional[str] = None, deterministic: bool = False):
+    """Make fn available to pipelines as step type `name`; its signature is the step's input schema"""
+    params = inspect.signature(fn).parameters.values()
+    required = frozenset(p.name for p in params if p.default is p.empty
+                         and p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
+    takes_kwargs = any(p.kind == p.VAR_KEYWORD for p in params)
+    accepted = None if takes_kwargs else frozenset(
+        p.name for p in params if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
+    STEP_TYPES[name] = StepType(name, fn, limit, deterministic, required, accepted)
+
+
+@dataclass
+class Node:
+    id: str
+    step: str
+    inputs: dict = field(default_factory=dict)
+    after: Tuple[str, ...] = ()  # ordering-only dependencies
+    label: Optional[str] = None  # human readable name for progress messages
+
+    def refs(self) -> List[Ref]:
+        return list(_iter_refs(self.inputs))
+
+    def dependencies(self) -> Set[str]:
+        return set(self.after) | {ref.node for ref in self.refs()}
+
+
+def _iter_refs(value):
+    if isinstance(value, Ref):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_refs(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_refs(item)
+
+
+class PipelineError(ValueError):
+    pass
+
+
+class Pipeline:
+    """A validated DAG of nodes"""
+
+    def __init__(self, name: str, nodes: List[Node]):
+        self.name = name
+        self.nodes: Dict[str, Node] = {}
+        for node in nodes:
+            if node.id in self.nodes:
+                raise PipelineError(f"Duplicate node id: {node.id}")
+            self.nodes[node.id] = node
+        self._validate()
+
+    def _validate(self):
+        for node in self.nodes.values():
+            step = STEP_TYPES.get(node.step)
+            if step is None:
+                raise PipelineError(f"Node {node.id}: unknown step type {node.step!r}")
+            missing = step.required - node.inputs.keys()
+            if missing:
+                raise PipelineError(f"Node {node.id}: missing inputs for {node.step}: {', '.join(sorted(missing))}")
+            if step.accepted is not None:
+                unknown = node.inputs.keys() - step.accepted
+                if unknown:
+                    raise PipelineError(f"Node {node.id}: {node.step} takes no inputs {', '.join(sorted(unknown))}")
+            for dependency in node.dependencies():
+                if dependency not in self.nodes:
+                    raise PipelineError(f"Node {node.id} depends on unknown node {dependency}")
+        # Kahn's algorithm - anything left over sits on a cycle
+        remaining = {node_id: set(node.dependencies()) for node_id, node in self.nodes.items()}
+        while True:
+            ready = [node_id for node_id, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for node_id in ready:
+                del remaining[node_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            raise PipelineError(f"Cycle between nodes: {', '.join(sorted(remaining))}")
+
+
+@dataclass
+class RunResult:
+    run_id: Optional[str]
+    outputs: Dict[str, Any]
+    states: Dict[str, str]
+    errors: Dict[str, str]
+
+
+class _Skipped(Exception):
+    pass
+
+
+# ---------- Shared limits and caches ----------
+
+_loop_semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_deterministic_cache: "OrderedDict[str, Any]" = OrderedDict()
+_deterministic_lock = threading.Lock()
+
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _executor(name: str) -> ThreadPoolExecutor:
+    """"steps": one thread per slot of every limit (plus a few for unlimited steps); "store": bookkeeping"""
+    with _executors_lock:
+        if name not in _executors:
+            if name == "steps":
+                size = sum(_limit_size(limit) for limit in DEFAULT_LIMITS) + 4
+            else:
+                size = STORE_THREADS
+            _executors[name] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"pipeline-{name}")
+        return _executors[name]
+
+
+async def _in_thread(executor: str, fn: Callable, *args, **kwargs):
+    """asyncio.to_thread on one of the pipeline pools (the log context goes along, as with to_thread)"""
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_executor(executor), call)
+
+
+def _semaphore(limit: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphores = _loop_semaphores.setdefault(loop, {})
+    if limit not in semaphores:
+        semaphores[limit] = asyncio.Semaphore(_limit_size(limit))
+    return semaphores[limit]
+
+
+async def run_limited(limit: Optional[str], fn: Callable, *args, **kwargs):
+    """Run a step function under one of the shared limits; blocking functions go to the step pool"""
+    semaphore = _semaphore(limit) if limit else None
+    if semaphore is not None:
+        waiting = PIPELINE_WAITING.labels(limit)
+        waiting.inc()
+        try:
+            await semaphore.acquire()
+        finally:
+            waiting.dec()
+    try:
+        if inspect.iscoroutinefunction(fn):
+            return await fn(*args, **kwargs)
+        return await _in_thread("steps", fn, *args, **kwargs)
+    finally:
+        if semaphore is not None:
+            semaphore.release()
+
+
+def _cache_get(key: str):
+    with _deterministic_lock:
+        if key in _deterministic_cache:
+            _deterministic_cache.move_to_end(key)
+            return _deterministic_cache[key]
+    return _MISSING
+
+
+def _cache_put(key: str, value):
+    with _deterministic_lock:
+        _deterministic_cache[key] = value
+        _deterministic_cache.move_to_end(key)
+        while len(_deterministic_cache) > DETERMINISTIC_CACHE_SIZE:
+            _deterministic_cache.popitem(last=False)
+
+
+def _jsonable(value):
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return json.loads(json.dumps(value, default=str))
+
+
+def cache_key(step: str, inputs: dict) -> str:
+    payload = json.dumps({"step": step, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ---------- Persistence ----------
+
+# Rows per INSERT statement (10 columns each, well under SQLite's bound-parameter limit)
+NODE_ROWS_PER_INSERT = 50
+
+NODE_ROW = {"cache_key": None, "output": None, "error": None, "started_at": None, "finished_at": None}
+
+
+class PipelineStore:
+    """Writes run and node state; failures are logged and never stop a run"""
+
+    def start_run(self, pipeline: Pipeline, campaign_id: Optional[str]) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            run = PipelineRun(flow=pipeline.name, campaign_id=campaign_id, status="running")
+            db.add(run)
+            db.commit()
+            return run.id
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Failed to record pipeline run {pipeline.name}: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _write(self, run_id: Optional[str], nodes: List[dict], finish: Optional[dict] = None):
+        if not run_id or not (nodes or finish):
+            return
+        db = SessionLocal()
+        try:
+            rows = [{**NODE_ROW, "run_id": run_id, **node} for node in nodes]
+            # Multi-row VALUES: an executemany is split into single-row INSERTs wherever NULLs differ
+            for offset in range(0, len(rows), NODE_ROWS_PER_INSERT):
+                db.execute(insert(PipelineNode).values(rows[offset:offset + NODE_ROWS_PER_INSERT]))
+            if finish:
+                db.execute(update(PipelineRun).where(PipelineRun.id == run_id).values(**finish))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ Failed to record pipeline state (run {run_id}, {len(nodes)} node(s)): {e}")
+        finally:
+            db.close()
+
+    def write_nodes(self, run_id: Optional[str], nodes: List[dict]):
+        """Insert finished nodes (one row each, in one statement)"""
+        self._write(run_id, nodes)
+
+    def finish_run(self, run_id: Optional[str], status: str, error: Optional[str] = None, nodes: List[dict] = ()):
+        """Insert the remaining nodes and close the run in one transaction"""
+        self._write(run_id, list(nodes), {"status": status, "error": error, "finished_at": datetime.utcnow()})
+
+
+# ---------- Executor ----------
+
+NodeListener = Callable[[Node, str, Any], None]
+
+
+async def run_pipeline(pipeline: Pipeline, campaign_id: Optional[str] = None,
+                       listener: Optional[NodeListener] = None,
+                       store: Optional[PipelineStore] = None) -> RunResult:
+    """Run every node of the pipeline, each as soon as its dependencies are done.
+
+    listener(node, state, value) is called on the event loop when a node
+    starts ("running", None), finishes ("done", output), fails ("failed",
+    error) or is skipped ("skipped", None).
+    """
+    store = store or PipelineStore()
+    run_id = await _in_thread("store", store.start_run, pipeline, campaign_id)
+    loop = asyncio.get_running_loop()
+    futures = {node_id: loop.create_future() for node_id in pipeline.nodes}
+    memo: Dict[str, asyncio.Future] = {}
+    states = {node_id: "pending" for node_id in pipeline.nodes}
+    errors: Dict[str, str] = {}
+    started: Dict[str, datetime] = {}
+    unsaved: List[dict] = []  # Finished nodes not written yet
+    last_flush = loop.time()
+
+    async def record(node: Node, status: str, urgent: bool = False, **values):
+        nonlocal unsaved, last_flush
+        unsaved.append({"node_key": node.id, "step": node.step, "status": status,
+                        "started_at": started.get(node.id), "finished_at": datetime.utcnow(), **values})
+        if urgent or loop.time() - last_flush >= PIPELINE_FLUSH_SECONDS:
+            batch, unsaved, last_flush = unsaved, [], loop.time()
+            await _in_thread("store", store.write_nodes, run_id, batch)
+
+    def notify(node: Node, state: str, value=None):
+        states[node.id] = state
+        if listener is not None:
+            try:
+                listener(node, state, value)
+            except Exception as e:
+                logger.warning(f"⚠️ Pipeline listener failed for {node.id}: {e}")
+
+    async def resolve(value):
+        if isinstance(value, Ref):
+            try:
+                output = await asyncio.shield(futures[value.node])
+            except Exception:
+                if value.default is _MISSING:
+                    raise _Skipped(value.node)
+                return value.default
+            if value.key is not None:
+                return output.get(value.key) if isinstance(output, dict) else None
+            return output
+        if isinstance(value, dict):
+            return {key: await resolve(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return type(value)([await resolve(item) for item in value])
+        return value
+
+    async def execute(step: StepType, inputs: dict, key: str):
+        if step.deterministic:
+            cached = _cache_get(key)
+            if cached is not _MISSING:
+                return cached
+        output = await run_limited(step.limit, step.fn, **inputs)
+        if step.deterministic:
+            _cache_put(key, output)
+        return output
+
+    async def run_node(node: Node):
+        # Runs as its own task (gather), so this only tags this node's records
+        bind_log_context(node=node.id)
+        step = STEP_TYPES[node.step]
+        try:
+            # Ordering only: wait for these to settle, whatever their outcome
+            if node.after:
+                await asyncio.wait([futures[dependency] for dependency in node.after])
+            inputs = await resolve(node.inputs)
+        except _Skipped as skipped:
+            futures[node.id].set_exception(_Skipped(node.id))
+            notify(node, "skipped")
+            await record(node, "skipped", error=f"dependency {skipped.args[0]} did not finish")
+            return
+
+        key = cache_key(node.step, inputs)
+        notify(node, "running")
+        started[node.id] = datetime.utcnow()
+        shared = memo.get(key)
+        if shared is None:
+            shared = memo[key] = asyncio.ensure_future(execute(step, inputs, key))
+        try:
+            output = await asyncio.shield(shared)
+        except Exception as e:
+            errors[node.id] = str(e)
+            futures[node.id].set_exception(e)
+            logger.error(f"❌ Pipeline {pipeline.name}: node {node.id} ({node.step}) failed: {e}")
+            notify(node, "failed", e)
+            await record(node, "failed", urgent=True, cache_key=key, error=str(e))
+            return
+        futures[node.id].set_result(output)
+        notify(node, "done", output)
+        await record(node, "done", cache_key=key, output=_jsonable(output))
+
+    try:
+        with log_context(job_id=run_id):
+            await asyncio.gather(*(run_node(node) for node in pipeline.nodes.values()))
+    except BaseException:
+        unfinished = [{"node_key": node.id, "step": node.step, "status": states[node.id],
+                       "started_at": started.get(node.id)}
+                      for node in pipeline.nodes.values() if states[node.id] in ("pending", "running")]
+        await _in_thread("store", store.finish_run, run_id, "failed", "run interrupted", unsaved + unfinished)
+        raise
+    finally:
+        # Nobody awaits a failed node's future when all its dependents were skipped
+        for future in futures.values():
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    outputs = {node_id: future.result() for node_id, future in futures.items()
+               if future.done() and not future.cancelled() and future.exception() is None}
+    if errors or any(state == "skipped" for state in states.values()):
+        status = "partial" if outputs else "failed"
+    else:
+        status = "completed"
+    await _in_thread("store", store.finish_run, run_id, status,
+                     "; ".join(f"{k}: {v}" for k, v in errors.items()) or None, unsaved)
+    return RunResult(run_id, outputs, states, errors)
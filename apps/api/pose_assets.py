@@ -0,0 +1,127 @@
+"""
+Persistent manifest of manikin pose assets.
+
+Maps the content hash of each pose image to its stable hosted URL so that
+startup never has to upload (or even contact Cloudinary). The manifest is a
+JSON file shared by every worker on the instance; entries are added lazily the
+first time a pose is actually needed.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+POSE_FILES = ["Pose-neutral.jpg", "Pose-handneck.jpg", "Pose-thinking.jpg"]
+POSE_DIRS = [
+    os.path.join(API_DIR, "static", "poses"),
+    os.path.join(API_DIR, "uploads", "poses"),
+]
+
+POSE_MANIFEST_PATH = os.getenv("POSE_MANIFEST_PATH", os.path.join(API_DIR, "uploads", "pose_manifest.json"))
+
+# Per-process memo of file path -> content hash (pose files never change while running)
+_HASH_CACHE: Dict[str, str] = {}
+
+
+def find_pose_file(pose_filename: str) -> Optional[str]:
+    """Locate a pose image on disk (static/poses first, then uploads/poses)"""
+    for pose_dir in POSE_DIRS:
+        path = os.path.join(pose_dir, pose_filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def pose_content_hash(path: str) -> str:
+    """sha256 of the pose file content"""
+    if path not in _HASH_CACHE:
+        with open(path, "rb") as f:
+            _HASH_CACHE[path] = hashlib.sha256(f.read()).hexdigest()
+    return _HASH_CACHE[path]
+
+
+def pose_public_id(content_hash: str) -> str:
+    """Deterministic public id so re-uploads of the same content are idempotent"""
+    return f"pose_{content_hash[:24]}"
+
+
+def read_manifest() -> Dict[str, dict]:
+    """Read the manifest ({content_hash: entry}); missing or corrupt files read as empty"""
+    try:
+        with open(POSE_MANIFEST_PATH) as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable pose manifest {POSE_MANIFEST_PATH}: {e}")
+        return {}
+
+
+def record_manifest_entry(content_hash: str, pose_filename: str, url: str):
+    """Add an entry under an exclusive file lock so concurrent workers don't clobber each other"""
+    os.makedirs(os.path.dirname(POSE_MANIFEST_PATH), exist_ok=True)
+    with open(f"{POSE_MANIFEST_PATH}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            manifest = read_manifest()
+            manifest[content_hash] = {
+                "filename": pose_filename,
+                "url": url,
+                "recorded_at": datetime.utcnow().isoformat(),
+            }
+            tmp_path = f"{POSE_MANIFEST_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, POSE_MANIFEST_PATH)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_pose_urls() -> Dict[str, Optional[str]]:
+    """Resolve every known pose to its manifest URL without any network calls.
+
+    Poses whose current content has no manifest entry map to None and are
+    uploaded on first use via resolve_pose_url.
+    """
+    manifest = read_manifest()
+    urls = {}
+    for pose_filename in POSE_FILES:
+        path = find_pose_file(pose_filename)
+        if not path:
+            logger.warning(f"⚠️ Pose file not found: {pose_filename}")
+            urls[pose_filename] = None
+            continue
+        entry = manifest.get(pose_content_hash(path))
+        urls[pose_filename] = entry.get("url") if entry else None
+    return urls
+
+
+def resolve_pose_url(pose_filename: str, upload_fn: Callable[[str, str], str]) -> str:
+    """Return the stable URL for a pose, uploading it once if the manifest has no entry.
+
+    upload_fn(path, public_id) must return the hosted URL. Only Cloudinary URLs
+    are persisted; local-storage fallbacks depend on the base URL and stay
+    per-process.
+    """
+    path = find_pose_file(pose_filename)
+    if not path:
+        raise FileNotFoundError(f"Pose file not found: {pose_filename}")
+
+    content_hash = pose_content_hash(path)
+    entry = read_manifest().get(content_hash)
+    if entry and entry.get("url"):
+        return entry["url"]
+
+    url = upload_fn(path, pose_public_id(content_hash))
+    if url and url.startswith("https://res.cloudinary.com/"):
+        record_manifest_entry(content_hash, pose_filename, url)
+        logger.info(f"✅ Recorded {pose_filename} in pose manifest: {url[:80]}...")
+    return url
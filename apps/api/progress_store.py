@@ -0,0 +1,175 @@
+"""
+Lightweight progress channel for generation jobs.
+
+Progress ticks (current/total/current_name) used to be written into
+Campaign.settings, committing the whole campaign row several times per shot.
+They now go to this store instead: an in-process dict, backed by Redis when
+REDIS_URL is set so every worker sees the same progress. A tick is a single
+O(1) write that never touches the database.
+
+Progress is keyed by (campaign_id, kind) where kind is one of PROGRESS_KINDS;
+each kind maps to the settings key the frontend already reads. Every tick is
+also published as a `progress` event for clients on the SSE stream.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from campaign_events import publish_event
+from redis_fallback import RedisFallback
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Progress entries expire once a job has been quiet this long
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", str(6 * 60 * 60)))
+
+# kind -> settings key exposed to the frontend
+PROGRESS_KINDS = {
+    "generation": "generation_progress",
+    "keyframe": "keyframe_progress",
+    "bulk_video": "bulk_video_progress",
+}
+
+
+class MemoryProgressBackend:
+    """Per-process progress store (used when Redis is not configured)"""
+
+    def __init__(self):
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + PROGRESS_TTL_SECONDS, value)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def get_many(self, keys: list) -> list:
+        return [self.get(key) for key in keys]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisProgressBackend:
+    """Progress store shared by all workers through Redis"""
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+
+    def set(self, key: str, value: dict):
+        self._client.set(f"progress:{key}", json.dumps(value), ex=PROGRESS_TTL_SECONDS)
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self._client.get(f"progress:{key}")
+        return json.loads(raw) if raw else None
+
+    def get_many(self, keys: list) -> list:
+        if not keys:
+            return []
+        raws = self._client.mget([f"progress:{key}" for key in keys])
+        return [json.loads(raw) if raw else None for raw in raws]
+
+    def delete(self, key: str):
+        self._client.delete(f"progress:{key}")
+
+
+class ProgressStore:
+    """Redis-backed store with an in-process fallback if Redis is unavailable"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self._memory = MemoryProgressBackend()
+        backend = None
+        if redis_url:
+            try:
+                backend = RedisProgressBackend(redis_url)
+                logger.info("✅ Progress store using Redis")
+            except Exception as e:
+                logger.warning(f"⚠️ Redis progress store unavailable, using in-process store: {e}")
+        self._redis = RedisFallback(backend, "progress", "using in-process store")
+
+    @staticmethod
+    def _key(campaign_id: str, kind: str) -> str:
+        if kind not in PROGRESS_KINDS:
+            raise ValueError(f"Unknown progress kind: {kind}")
+        return f"{campaign_id}:{kind}"
+
+    def set(self, campaign_id: str, kind: str, **fields):
+        """Replace the progress entry for a job"""
+        key = self._key(campaign_id, kind)
+        value = {**fields, "updated_at": time.time()}
+        self._memory.set(key, value)
+        if self._redis.available():
+            try:
+                self._redis.client.set(key, value)
+            except Exception as e:
+                self._redis.failed(f"write ({key})", e)
+
+    def get(self, campaign_id: str, kind: str) -> Optional[dict]:
+        key = self._key(campaign_id, kind)
+        if self._redis.available():
+            try:
+                return self._redis.client.get(key)
+            except Exception as e:
+                self._redis.failed(f"read ({key})", e)
+        return self._memory.get(key)
+
+    def get_all(self, campaign_id: str) -> Dict[str, dict]:
+        """All live progress entries for a campaign keyed by settings key (one round trip)"""
+        kinds = list(PROGRESS_KINDS)
+        keys = [self._key(campaign_id, kind) for kind in kinds]
+        values = None
+        if self._redis.available():
+            try:
+                values = self._redis.client.get_many(keys)
+            except Exception as e:
+                self._redis.failed(f"read ({campaign_id})", e)
+        if values is None:
+            values = self._memory.get_many(keys)
+        return {PROGRESS_KINDS[kind]: value for kind, value in zip(kinds, values) if value is not None}
+
+    def clear(self, campaign_id: str, kind: str):
+        key = self._key(campaign_id, kind)
+        self._memory.delete(key)
+        if self._redis.available():
+            try:
+                self._redis.client.delete(key)
+            except Exception as e:
+                self._redis.failed(f"delete ({key})", e)
+
+
+progress_store = ProgressStore(REDIS_URL)
+
+
+def set_progress(campaign_id: str, kind: str, **fields):
+    progress_store.set(campaign_id, kind, **fields)
+    try:
+        publish_event(campaign_id, "progress", {"kind": kind, **fields}, coalesce_key=f"progress:{kind}")
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to publish progress event for {campaign_id}: {e}")
+
+
+def get_progress(campaign_id: str, kind: str) -> Optional[dict]:
+    return progress_store.get(campaign_id, kind)
+
+
+def get_all_progress(campaign_id: str) -> Dict[str, dict]:
+    """Live progress entries of a campaign keyed by settings key"""
+    return progress_store.get_all(campaign_id)
+
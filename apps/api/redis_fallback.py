@@ -0,0 +1,33 @@
+"""
+Circuit breaker shared by the optional Redis tiers.
+
+The progress store, the auth cache and the event bus all keep working from
+in-process state when Redis is unreachable. Each wraps its client in a
+RedisFallback: after a Redis error the component skips Redis for
+REDIS_RETRY_SECONDS instead of timing out on every call, then tries again.
+"""
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# After a Redis error, skip Redis for this long instead of timing out on every call
+REDIS_RETRY_SECONDS = float(os.getenv("REDIS_RETRY_SECONDS", "30"))
+
+
+class RedisFallback:
+    """A Redis client (or None when Redis is not configured) plus its breaker state"""
+
+    def __init__(self, client, component: str, fallback: str):
+        self.client = client
+        self._component = component  # e.g. "progress store", for the log line
+        self._fallback = fallback  # what the component does meanwhile, e.g. "using in-process store"
+        self._down_until = 0.0
+
+    def available(self) -> bool:
+        return self.client is not None and time.monotonic() >= self._down_until
+
+    def failed(self, action: str, error: Exception):
+        self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning(f"⚠️ Redis {self._component} {action} failed, {self._fallback} for {REDIS_RETRY_SECONDS:g}s: {error}")
@@ -0,0 +1,110 @@
+"""
+Bulk import of scene images from the uploads directory.
+
+The old import ran one `SELECT ... WHERE user_id = ? AND name = ?` per file
+and added scenes one by one, and re-running it after renaming files created
+duplicate scenes pointing at the same image. Now every candidate is derived
+up front, existing scenes are fetched with a single IN query (matching on
+name, image URL and - optionally - content hash), and the new rows go in with
+multi-row INSERTs.
+"""
+import hashlib
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.orm import Session
+
+from models import Scene
+from user_stats import adjust_user_stats
+
+# Rows per INSERT; keeps bind parameters under SQLite's 32766 limit
+INSERT_BATCH_SIZE = 500
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def scene_name_from_file(scene_file: Path) -> str:
+    """"scene_beach_sunset.jpg" -> "Scene Beach Sunset" (same naming as the old per-file import)"""
+    scene_name = scene_file.stem.replace("scene_", "").replace("_", " ").title()
+    if scene_name.startswith("-"):
+        return f"Scene {scene_name[1:]}"
+    return f"Scene {scene_name}"
+
+
+def file_content_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def import_scene_files(db: Session, user_id: str, scene_files: List[Path], base_url: str,
+                       dedupe_content: bool = False) -> dict:
+    """Create scenes for files the user does not already have; returns counts and the added scenes"""
+    candidates = []
+    for scene_file in sorted(scene_files):
+        candidates.append({
+            "name": scene_name_from_file(scene_file),
+            "image_url": f"{base_url}/static/{scene_file.name}",
+            "content_hash": file_content_hash(scene_file) if dedupe_content else None,
+        })
+
+    names = {c["name"] for c in candidates}
+    urls = {c["image_url"] for c in candidates}
+    hashes = {c["content_hash"] for c in candidates if c["content_hash"]}
+
+    # One round trip for everything the user already has
+    matches = [Scene.name.in_(names), Scene.image_url.in_(urls)]
+    if hashes:
+        matches.append(Scene.content_hash.in_(hashes))
+    existing = db.execute(
+        select(Scene.name, Scene.image_url, Scene.content_hash)
+        .where(Scene.user_id == user_id, or_(*matches))
+    ).all()
+    seen_names = {row.name for row in existing}
+    seen_urls = {row.image_url for row in existing}
+    seen_hashes = {row.content_hash for row in existing if row.content_hash}
+
+    now = datetime.utcnow()
+    rows = []
+    skipped = 0
+    for candidate in candidates:
+        content_hash: Optional[str] = candidate["content_hash"]
+        if (candidate["name"] in seen_names or candidate["image_url"] in seen_urls
+                or (content_hash and content_hash in seen_hashes)):
+            skipped += 1
+            continue
+        # Also de-duplicates within this batch
+        seen_names.add(candidate["name"])
+        seen_urls.add(candidate["image_url"])
+        if content_hash:
+            seen_hashes.add(content_hash)
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "name": candidate["name"],
+            "description": "Professional fashion photography scene",
+            "category": "lifestyle",
+            "tags": ["fashion", "photography", "background"],
+            "image_url": candidate["image_url"],
+            "is_standard": False,
+            "content_hash": content_hash,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(Scene).values(rows[start:start + INSERT_BATCH_SIZE]))
+    # Core inserts bypass the flush listener that keeps the dashboard counters
+    adjust_user_stats(db, user_id, scenes=len(rows))
+    db.commit()
+
+    return {
+        "added": len(rows),
+        "skipped": skipped,
+        "scenes": [{"id": row["id"], "name": row["name"], "image_url": row["image_url"]} for row in rows],
+    }
@@ -0,0 +1,79 @@
+"""
+Boot-time schema check.
+
+Migrations are an explicit deploy step (`alembic upgrade head`, run as the
+pre-deploy command); the API no longer runs create_all or migration scripts
+while starting. At boot it only compares alembic_version with the newest
+revision file - one query plus a few small file reads. Alembic itself (about
+half a second to import) is only loaded when MIGRATE_ON_STARTUP asks for an
+upgrade, which is the default for local SQLite databases only.
+"""
+import logging
+import os
+import re
+from typing import Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+VERSIONS_DIR = os.path.join(API_DIR, "migrations", "versions")
+
+_REVISION_LINE = re.compile(r"^(revision|down_revision)\s*=\s*(.+)$", re.MULTILINE)
+_QUOTED = re.compile(r"[\"']([^\"']+)[\"']")
+
+
+def head_revisions() -> Set[str]:
+    """Revisions no other revision builds on, read straight from the migration files"""
+    revisions, parents = set(), set()
+    for filename in os.listdir(VERSIONS_DIR):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, filename)) as f:
+            for key, value in _REVISION_LINE.findall(f.read()):
+                ids = set(_QUOTED.findall(value))
+                (revisions if key == "revision" else parents).update(ids)
+    return revisions - parents
+
+
+def current_revisions(engine: Engine) -> Set[str]:
+    """Revisions stamped in the database (empty when it was never migrated)"""
+    with engine.connect() as conn:
+        try:
+            return {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+        except DBAPIError:
+            return set()
+
+
+def upgrade_to_head():
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(API_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(API_DIR, "migrations"))
+    command.upgrade(config, "head")
+
+
+def migrate_on_startup(database_url: str) -> bool:
+    default = "true" if database_url.startswith("sqlite") else "false"
+    return os.getenv("MIGRATE_ON_STARTUP", default).lower() == "true"
+
+
+def check_schema(engine: Engine, database_url: str) -> bool:
+    """True when the database is at the latest revision (upgrading first if allowed)"""
+    heads = head_revisions()
+    current = current_revisions(engine)
+    if current == heads:
+        logger.info(f"✅ Database schema at revision {', '.join(sorted(heads))}")
+        return True
+
+    if migrate_on_startup(database_url):
+        logger.info(f"🔄 Database schema at {', '.join(sorted(current)) or 'no revision'}; upgrading to {', '.join(sorted(heads))}...")
+        upgrade_to_head()
+        return True
+
+    logger.error(f"❌ Database schema at {', '.join(sorted(current)) or 'no revision'}, code expects {', '.join(sorted(heads))} - run `alembic upgrade head`")
+    return False
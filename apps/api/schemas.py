@@ -1,7 +1,9 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Generic, TypeVar
 from datetime import datetime
 
+T = TypeVar("T")
+
 # User schemas
 class UserCreate(BaseModel):
     email: EmailStr
@@ -58,6 +60,17 @@ class CampaignResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class CampaignSummaryResponse(BaseModel):
+    id: str
+    name: str
+    status: str
+    generation_status: str
+    image_count: int
+    video_count: int
+    cover_image_url: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
 # Product schemas
 class ProductCreate(BaseModel):
     name: str
@@ -170,6 +183,10 @@ class GenerationResponse(BaseModel):
         from_attributes = True
 
 # API Response schemas
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 class MessageResponse(BaseModel):
     message: str
     success: bool = True
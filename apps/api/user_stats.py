@@ -0,0 +1,193 @@
+"""
+Incrementally maintained dashboard counters.
+
+/dashboard/stats used to count products, models, scenes and campaigns on every
+load, and image/video counts would have meant scanning every campaign. Counts
+now live in one user_stats row per user. A flush listener adjusts that row in
+the same transaction as the insert or delete that changed it, so the
+dashboard reads a single row no matter how large the account is.
+
+The listener sees ORM adds/deletes only - code that writes counted rows with
+Core insert()/Query.delete() must call adjust_user_stats() in the same
+transaction. A missing row (users created before the table existed) is
+rebuilt from a full count on first read.
+"""
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import event, func, inspect, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import pin_to_primary
+from models import (
+    Campaign, CampaignImage, CampaignVideo, CreditLedgerEntry, Model, Product, Scene, User, UserStats,
+)
+
+COUNTERS = ("products", "models", "scenes", "campaigns", "images", "videos", "credits_spent")
+
+# Rows owned directly by a user -> counter they feed
+USER_OWNED = {Product: "products", Model: "models", Scene: "scenes", Campaign: "campaigns"}
+
+# Ledger kinds that spend credits (reserve only holds them; release hands them back)
+SPENDING_KINDS = ("charge", "commit")
+
+
+def _had_video(obj) -> bool:
+    """video_url before this flush (None for pending objects)"""
+    history = inspect(obj).attrs.video_url.load_history()
+    if history.deleted:
+        return bool(history.deleted[0])
+    return bool(history.unchanged and history.unchanged[0])
+
+
+def _campaign_owners(session: Session, campaign_ids: set) -> Dict[str, str]:
+    """campaign_id -> user_id, from the session first and the database for the rest"""
+    owners = {}
+    for obj in list(session.new) + list(session.deleted) + list(session.identity_map.values()):
+        if isinstance(obj, Campaign) and obj.id in campaign_ids:
+            owners[obj.id] = obj.user_id
+    missing = campaign_ids - owners.keys()
+    if missing:
+        rows = session.execute(select(Campaign.id, Campaign.user_id).where(Campaign.id.in_(missing)))
+        owners.update({campaign_id: user_id for campaign_id, user_id in rows})
+    return owners
+
+
+def _collect_deltas(session: Session) -> Dict[str, Dict[str, int]]:
+    deltas = defaultdict(lambda: defaultdict(int))
+    asset_deltas = defaultdict(lambda: defaultdict(int))  # keyed by campaign_id until owners are resolved
+
+    for obj, sign in [(o, 1) for o in session.new] + [(o, -1) for o in session.deleted]:
+        counter = USER_OWNED.get(type(obj))
+        if counter:
+            deltas[obj.user_id][counter] += sign
+        elif isinstance(obj, CampaignImage):
+            asset_deltas[obj.campaign_id]["images"] += sign
+            has_video = bool(obj.video_url) if sign > 0 else _had_video(obj)
+            if has_video:
+                asset_deltas[obj.campaign_id]["videos"] += sign
+        elif isinstance(obj, CampaignVideo):
+            has_video = bool(obj.video_url) if sign > 0 else _had_video(obj)
+            if has_video:
+                asset_deltas[obj.campaign_id]["videos"] += sign
+        elif isinstance(obj, CreditLedgerEntry) and sign > 0 and obj.kind in SPENDING_KINDS:
+            deltas[obj.user_id]["credits_spent"] += obj.amount
+
+    # A video_url set or cleared on an existing row
+    for obj in session.dirty:
+        if isinstance(obj, (CampaignImage, CampaignVideo)) and obj not in session.deleted:
+            history = inspect(obj).attrs.video_url.load_history()
+            if history.has_changes():
+                change = int(bool(obj.video_url)) - int(_had_video(obj))
+                if change:
+                    asset_deltas[obj.campaign_id]["videos"] += change
+
+    if asset_deltas:
+        owners = _campaign_owners(session, set(asset_deltas))
+        for campaign_id, counters in asset_deltas.items():
+            user_id = owners.get(campaign_id)
+            if user_id:
+                for counter, delta in counters.items():
+                    deltas[user_id][counter] += delta
+
+    return {
+        user_id: {counter: delta for counter, delta in counters.items() if delta}
+        for user_id, counters in deltas.items()
+    }
+
+
+@event.listens_for(Session, "before_flush")
+def _stats_before_flush(session, flush_context, instances):
+    # Deltas are computed before the flush, while deleted campaigns can still be resolved to their owner
+    deltas = _collect_deltas(session)
+    new_users = [obj for obj in session.new if isinstance(obj, User)]  # ids are assigned during the flush
+    if deltas or new_users:
+        session.info.setdefault("user_stats_deltas", []).append((deltas, new_users))
+
+
+def _apply_deltas(connection, user_id: str, counters: Dict[str, int]):
+    # No row yet means it will be rebuilt from a full count on the next read
+    connection.execute(
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values(**{counter: getattr(UserStats, counter) + delta for counter, delta in counters.items()})
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _stats_after_flush(session, flush_context):
+    pending = session.info.pop("user_stats_deltas", [])
+    if not pending:
+        return
+    connection = session.connection()
+    for deltas, new_users in pending:
+        for user in new_users:
+            connection.execute(insert(UserStats).values(user_id=user.id, **{counter: 0 for counter in COUNTERS}))
+        for user_id, counters in deltas.items():
+            _apply_deltas(connection, user_id, counters)
+
+
+@event.listens_for(Session, "after_rollback")
+def _stats_after_rollback(session):
+    session.info.pop("user_stats_deltas", None)
+
+
+def adjust_user_stats(db: Session, user_id: str, **deltas: int):
+    """Apply counter deltas for writes the flush listener cannot see (Core bulk inserts/deletes)"""
+    counters = {counter: delta for counter, delta in deltas.items() if delta}
+    if counters:
+        _apply_deltas(db.connection(), user_id, counters)
+
+
+def _full_count_select(user_id: str):
+    """Every counter computed from scratch (one round trip)"""
+    user_campaigns = select(Campaign.id).where(Campaign.user_id == user_id)
+    return select(
+        select(func.count(Product.id)).where(Product.user_id == user_id).scalar_subquery(),
+        select(func.count(Model.id)).where(Model.user_id == user_id).scalar_subquery(),
+        select(func.count(Scene.id)).where(Scene.user_id == user_id).scalar_subquery(),
+        select(func.count(Campaign.id)).where(Campaign.user_id == user_id).scalar_subquery(),
+        select(func.count(CampaignImage.id))
+        .where(CampaignImage.campaign_id.in_(user_campaigns)).scalar_subquery(),
+        (
+            select(func.count(CampaignImage.id))
+            .where(CampaignImage.campaign_id.in_(user_campaigns), CampaignImage.video_url.isnot(None))
+            .scalar_subquery()
+            + select(func.count(CampaignVideo.id))
+            .where(CampaignVideo.campaign_id.in_(user_campaigns), CampaignVideo.video_url.isnot(None))
+            .scalar_subquery()
+        ),
+        select(func.coalesce(func.sum(CreditLedgerEntry.amount), 0))
+        .where(CreditLedgerEntry.user_id == user_id, CreditLedgerEntry.kind.in_(SPENDING_KINDS))
+        .scalar_subquery(),
+    )
+
+
+def _stats_dict(row) -> dict:
+    return {counter: getattr(row, counter) or 0 for counter in COUNTERS}
+
+
+async def get_user_stats_async(db: AsyncSession, user_id: str) -> dict:
+    """Dashboard counters for a user; rebuilds the row from a full count when it is missing"""
+    stats: Optional[UserStats] = await db.get(UserStats, user_id)
+    if stats is None:
+        # A lagging replica may not have the row yet; check and rebuild on the primary
+        pin_to_primary(db)
+        stats = await db.get(UserStats, user_id)
+    if stats is not None:
+        return _stats_dict(stats)
+
+    counts = dict(zip(COUNTERS, (await db.execute(_full_count_select(user_id))).one()))
+    db.add(UserStats(user_id=user_id, **counts))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another request rebuilt it first
+        await db.rollback()
+        stats = await db.get(UserStats, user_id)
+        if stats is not None:
+            return _stats_dict(stats)
+    return counts
+
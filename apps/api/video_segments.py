@@ -0,0 +1,266 @@
+"""
+Normalized clip segment cache for unified campaign videos.
+
+Clips coming from Kling, Veo, Seedance and Wan differ in resolution, fps and
+codec parameters, so a plain `-c copy` concat of the raw downloads is fragile.
+Each clip is transcoded once to a canonical profile and cached on disk by
+content hash; unified renders (and reorders) then only need a copy concat.
+The cache is capped at SEGMENT_CACHE_MAX_MB; the least recently used segments
+are evicted first.
+"""
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from typing import List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Canonical segment profile - every cached segment matches this exactly
+SEGMENT_WIDTH = int(os.getenv("SEGMENT_WIDTH", "1280"))
+SEGMENT_HEIGHT = int(os.getenv("SEGMENT_HEIGHT", "720"))
+SEGMENT_FPS = int(os.getenv("SEGMENT_FPS", "24"))
+SEGMENT_GOP = SEGMENT_FPS * 2  # Keyframe every 2 seconds
+SEGMENT_AUDIO_RATE = 44100
+SEGMENT_PRESET = os.getenv("SEGMENT_PRESET", "veryfast")
+SEGMENT_CRF = os.getenv("SEGMENT_CRF", "20")
+
+# Bump when the profile or the ffmpeg arguments change so stale segments are not reused
+PROFILE_VERSION = "v1"
+
+SEGMENT_CACHE_DIR = os.getenv(
+    "SEGMENT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp", "segments"),
+)
+
+# Size cap for cached segments; least recently used ones are evicted first
+SEGMENT_CACHE_MAX_BYTES = int(os.getenv("SEGMENT_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+# Segments used this recently are never evicted (a render may be about to concat them)
+SEGMENT_MIN_AGE_SECONDS = 15 * 60
+
+
+def profile_key() -> str:
+    """Short identifier of the canonical profile, part of every cache key"""
+    return f"{PROFILE_VERSION}_{SEGMENT_WIDTH}x{SEGMENT_HEIGHT}_{SEGMENT_FPS}fps_{SEGMENT_PRESET}_crf{SEGMENT_CRF}"
+
+
+def _ensure_cache_dirs():
+    os.makedirs(os.path.join(SEGMENT_CACHE_DIR, "urls"), exist_ok=True)
+
+
+def _url_index_path(video_url: str) -> str:
+    url_hash = hashlib.sha1(video_url.encode("utf-8")).hexdigest()
+    return os.path.join(SEGMENT_CACHE_DIR, "urls", f"{url_hash}.json")
+
+
+def _segment_path(content_hash: str) -> str:
+    return os.path.join(SEGMENT_CACHE_DIR, f"{content_hash}_{profile_key()}.mp4")
+
+
+def _touch(path: str):
+    """Mark a segment as recently used (eviction goes by mtime)"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def evict_segments(max_bytes: int = SEGMENT_CACHE_MAX_BYTES) -> int:
+    """Delete least recently used segments until the cache fits in max_bytes; returns how many were deleted"""
+    try:
+        entries = []
+        with os.scandir(SEGMENT_CACHE_DIR) as it:
+            for entry in it:
+                # Segments are "<sha256>_<profile>.mp4"; skip in-flight downloads and partial transcodes
+                if entry.is_file() and entry.name.endswith(".mp4") and len(entry.name.split("_", 1)[0]) == 64:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return 0
+
+    cutoff = time.time() - SEGMENT_MIN_AGE_SECONDS
+    evicted = set()
+    for mtime, size, path in sorted(entries):
+        if total <= max_bytes or mtime >= cutoff:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        evicted.add(os.path.basename(path).split("_", 1)[0])
+
+    if evicted:
+        _prune_url_index(evicted)
+        logger.info(f"🧹 Evicted {len(evicted)} cached segment(s), {total // (1024 * 1024)}MB left")
+    return len(evicted)
+
+
+def _prune_url_index(content_hashes: set):
+    """Drop URL index entries pointing at evicted segments"""
+    index_dir = os.path.join(SEGMENT_CACHE_DIR, "urls")
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        try:
+            with open(path) as f:
+                content_hash = json.load(f).get("content_hash")
+        except Exception:
+            content_hash = None
+        if content_hash is None or content_hash in content_hashes:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file's content in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def has_audio_stream(path: str) -> bool:
+    """Check whether a clip carries an audio track"""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a", "-show_entries", "stream=index", "-of", "csv=p=0", path],
+            check=True, capture_output=True, text=True,
+        )
+        return bool(result.stdout.strip())
+    except Exception as e:
+        logger.warning(f"⚠️ ffprobe failed for {path}: {e}")
+        return False
+
+
+def normalize_clip(source_path: str, output_path: str):
+    """Transcode a clip to the canonical segment profile.
+
+    Video is letterboxed into the canonical frame at a constant frame rate with
+    a fixed GOP; a silent stereo track is added when the source has no audio so
+    every segment has identical stream layout.
+    """
+    video_filter = (
+        f"scale={SEGMENT_WIDTH}:{SEGMENT_HEIGHT}:force_original_aspect_ratio=decrease,"
+        f"pad={SEGMENT_WIDTH}:{SEGMENT_HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
+        f"setsar=1,fps={SEGMENT_FPS}"
+    )
+    cmd = ["ffmpeg", "-y", "-i", source_path]
+    if has_audio_stream(source_path):
+        cmd += ["-map", "0:v:0", "-map", "0:a:0"]
+    else:
+        cmd += [
+            "-f", "lavfi", "-i", f"anullsrc=channel_layout=stereo:sample_rate={SEGMENT_AUDIO_RATE}",
+            "-map", "0:v:0", "-map", "1:a:0", "-shortest",
+        ]
+    cmd += [
+        "-vf", video_filter,
+        "-c:v", "libx264", "-preset", SEGMENT_PRESET, "-crf", SEGMENT_CRF,
+        "-pix_fmt", "yuv420p", "-profile:v", "high",
+        "-g", str(SEGMENT_GOP), "-keyint_min", str(SEGMENT_GOP), "-sc_threshold", "0",
+        "-c:a", "aac", "-ar", str(SEGMENT_AUDIO_RATE), "-ac", "2", "-b:a", "128k",
+        "-video_track_timescale", "90000",
+        "-movflags", "+faststart",
+        output_path,
+    ]
+    subprocess.run(cmd, check=True, capture_output=True, text=True)
+
+
+def get_normalized_segment(video_url: str) -> str:
+    """Return the path of the cached canonical segment for a clip URL.
+
+    The URL index lets repeat renders skip the download entirely; otherwise the
+    clip is downloaded, hashed, and only transcoded when no segment with that
+    content hash exists yet.
+    """
+    _ensure_cache_dirs()
+
+    index_path = _url_index_path(video_url)
+    if os.path.exists(index_path):
+        try:
+            with open(index_path) as f:
+                content_hash = json.load(f).get("content_hash")
+            segment_path = _segment_path(content_hash)
+            if content_hash and os.path.exists(segment_path):
+                logger.info(f"♻️ Segment cache hit (url): {content_hash[:12]}")
+                _touch(segment_path)
+                return segment_path
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable segment index {index_path}: {e}")
+
+    download = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4", dir=SEGMENT_CACHE_DIR)
+    try:
+        response = requests.get(video_url, stream=True, timeout=180)
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=1024 * 1024):
+            download.write(chunk)
+        download.close()
+
+        content_hash = file_sha256(download.name)
+        segment_path = _segment_path(content_hash)
+
+        if os.path.exists(segment_path):
+            logger.info(f"♻️ Segment cache hit (content): {content_hash[:12]}")
+            _touch(segment_path)
+        else:
+            logger.info(f"🎞️ Normalizing clip {content_hash[:12]} to {profile_key()}...")
+            # Write to a unique temp name and rename so concurrent workers and threads never see a partial segment
+            fd, partial_path = tempfile.mkstemp(suffix=".partial.mp4", dir=SEGMENT_CACHE_DIR)
+            os.close(fd)
+            try:
+                normalize_clip(download.name, partial_path)
+                os.replace(partial_path, segment_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            logger.info(f"✅ Normalized segment cached: {os.path.getsize(segment_path)} bytes")
+            evict_segments()
+
+        with open(index_path, "w") as f:
+            json.dump({"url": video_url, "content_hash": content_hash, "profile": profile_key()}, f)
+
+        return segment_path
+    finally:
+        if not download.closed:
+            download.close()
+        if os.path.exists(download.name):
+            os.remove(download.name)
+
+
+def concat_segments(segment_paths: List[str], output_path: str, concat_list_path: Optional[str] = None):
+    """Copy-concat canonical segments into a single mp4 (no re-encode)"""
+    own_list = concat_list_path is None
+    if own_list:
+        concat_list_path = tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".txt").name
+    try:
+        with open(concat_list_path, "w") as concat_list:
+            for path in segment_paths:
+                escaped_path = path.replace("'", "'\\''")
+                concat_list.write(f"file '{escaped_path}'\n")
+
+        cmd = [
+            "ffmpeg",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", concat_list_path,
+            "-c", "copy",
+            "-movflags", "+faststart",
+            "-y",
+            output_path,
+        ]
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    finally:
+        if own_list and os.path.exists(concat_list_path):
+            os.remove(concat_list_path)
@@ -366,16 +366,16 @@ export default function CampaignsPage() {
       // Fetch all data in parallel with timeout
       const [campaignsRes, productsRes, modelsRes, scenesRes, posesRes] =
         await Promise.all([
-          fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/campaigns`, {
+          fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/campaigns?paginate=false`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
-          fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/products`, {
+          fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/products?paginate=false`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
-          fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/models`, {
+          fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/models?paginate=false`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
-          fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/scenes`, {
+          fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/scenes?paginate=false`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
           fetchWithTimeout(`${process.env.NEXT_PUBLIC_API_URL}/poses`, {}),
@@ -517,7 +517,7 @@ export default function CampaignsPage() {
   const fetchDataQuietly = async () => {
     if (!token) return null;
     try {
-      const campaignsRes = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/campaigns`, {
+      const campaignsRes = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/campaigns?paginate=false`, {
         headers: { Authorization: `Bearer ${token}` },
       });
       if (campaignsRes.ok) {
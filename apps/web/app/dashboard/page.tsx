@@ -51,13 +51,13 @@ export default function Dashboard() {
       try {
         // Fetch stats in parallel (products, models, scenes)
         const [productsRes, modelsRes, scenesRes] = await Promise.all([
-            fetch(`${process.env.NEXT_PUBLIC_API_URL}/products`, {
+            fetch(`${process.env.NEXT_PUBLIC_API_URL}/products?paginate=false`, {
               headers: { Authorization: `Bearer ${token}` },
             }),
-            fetch(`${process.env.NEXT_PUBLIC_API_URL}/models`, {
+            fetch(`${process.env.NEXT_PUBLIC_API_URL}/models?paginate=false`, {
               headers: { Authorization: `Bearer ${token}` },
             }),
-            fetch(`${process.env.NEXT_PUBLIC_API_URL}/scenes`, {
+            fetch(`${process.env.NEXT_PUBLIC_API_URL}/scenes?paginate=false`, {
               headers: { Authorization: `Bearer ${token}` },
             }),
           ]);
@@ -96,7 +96,7 @@ export default function Dashboard() {
 
         // Fetch only recent campaigns with limit (12 recent campaigns)
         const campaignsRes = await fetch(
-          `${process.env.NEXT_PUBLIC_API_URL}/campaigns?limit=12&order_by=created_at&order=desc`,
+          `${process.env.NEXT_PUBLIC_API_URL}/campaigns?limit=12&order_by=created_at&order=desc&paginate=false`,
           {
             headers: { Authorization: `Bearer ${token}` },
           }
@@ -283,7 +283,7 @@ export default function ModelsPage() {
       console.log("🔑 Using token:", token.substring(0, 20) + "...");
 
       const response = await fetch(
-        `${process.env.NEXT_PUBLIC_API_URL}/models`,
+        `${process.env.NEXT_PUBLIC_API_URL}/models?paginate=false`,
         {
           method: "GET",
           headers: {
@@ -71,7 +71,7 @@ export default function ProductsPage() {
       setIsLoadingProducts(true);
       console.log("🔍 Fetching products from API...");
       const response = await fetch(
-        `${process.env.NEXT_PUBLIC_API_URL}/products`,
+        `${process.env.NEXT_PUBLIC_API_URL}/products?paginate=false`,
         {
           headers: {
             Authorization: `Bearer ${token}`,
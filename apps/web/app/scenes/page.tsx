@@ -71,7 +71,7 @@ export default function ScenesPage() {
     try {
       setScenesLoading(true);
       const response = await fetch(
-        `${process.env.NEXT_PUBLIC_API_URL}/scenes`,
+        `${process.env.NEXT_PUBLIC_API_URL}/scenes?paginate=false`,
         {
           headers: {
             Authorization: `Bearer ${token}`,
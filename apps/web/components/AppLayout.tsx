@@ -79,16 +79,16 @@ export default function AppLayout({ children }: AppLayoutProps) {
     try {
       const [campaignsRes, productsRes, modelsRes, scenesRes] =
         await Promise.all([
-          fetch(`${process.env.NEXT_PUBLIC_API_URL}/campaigns`, {
+          fetch(`${process.env.NEXT_PUBLIC_API_URL}/campaigns?paginate=false`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
-          fetch(`${process.env.NEXT_PUBLIC_API_URL}/products`, {
+          fetch(`${process.env.NEXT_PUBLIC_API_URL}/products?paginate=false`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
-          fetch(`${process.env.NEXT_PUBLIC_API_URL}/models`, {
+          fetch(`${process.env.NEXT_PUBLIC_API_URL}/models?paginate=false`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
-          fetch(`${process.env.NEXT_PUBLIC_API_URL}/scenes`, {
+          fetch(`${process.env.NEXT_PUBLIC_API_URL}/scenes?paginate=false`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
         ]);
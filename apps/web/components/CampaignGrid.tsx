@@ -52,7 +52,7 @@ export default function CampaignGrid({ refreshTrigger }: CampaignGridProps) {
     try {
       setLoading(true);
       const token = localStorage.getItem("token");
-      const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/campaigns`, {
+      const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/campaigns?paginate=false`, {
         headers: token ? { Authorization: `Bearer ${token}` } : {},
       });
       if (res.ok) {